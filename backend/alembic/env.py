@@ -20,6 +20,11 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 target_metadata = None
 
+# alembic.ini only carries a placeholder URL; migrate the database the app is configured for.
+if config.get_main_option("sqlalchemy.url", "").startswith("driver://"):
+    from backend.config import DATABASE_URL
+    config.set_main_option("sqlalchemy.url", DATABASE_URL.replace("%", "%%"))
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
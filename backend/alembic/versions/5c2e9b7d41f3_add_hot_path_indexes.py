@@ -0,0 +1,58 @@
+"""Add composite indexes for hot query paths
+
+Revision ID: 5c2e9b7d41f3
+Revises: a3a86353f7a0
+Create Date: 2026-10-19 10:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c2e9b7d41f3'
+down_revision: Union[str, Sequence[str], None] = 'a3a86353f7a0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index name, table, columns); mirrors the Index()/index=True declarations in backend/models.py
+HOT_PATH_INDEXES = [
+    ('ix_code_snapshots_session_created', 'code_snapshots', ['session_id', 'created_at']),
+    ('ix_messages_thread_created', 'messages', ['thread_id', 'created_at']),
+    ('ix_event_logs_session_type_created', 'event_logs', ['session_id', 'type', 'created_at']),
+    ('ix_event_logs_trace_id', 'event_logs', ['trace_id']),
+    ('ix_diagnosis_logs_session_created', 'diagnosis_logs', ['session_id', 'created_at']),
+    ('ix_diagnosis_logs_trace_id', 'diagnosis_logs', ['trace_id']),
+    ('ix_oracle_task_versions_task_version', 'oracle_task_versions', ['task_id', 'version_number']),
+]
+
+
+def _applicable(inspector, table, columns):
+    # Several of these tables/columns were added through create_all rather than a revision,
+    # so only index what this database actually has.
+    if table not in inspector.get_table_names():
+        return False
+    present = {c['name'] for c in inspector.get_columns(table)}
+    return set(columns) <= present
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    for name, table, columns in HOT_PATH_INDEXES:
+        if not _applicable(inspector, table, columns):
+            continue
+        if name in {ix['name'] for ix in inspector.get_indexes(table)}:
+            continue
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    for name, table, _ in reversed(HOT_PATH_INDEXES):
+        if table in inspector.get_table_names() and name in {ix['name'] for ix in inspector.get_indexes(table)}:
+            op.drop_index(name, table_name=table)
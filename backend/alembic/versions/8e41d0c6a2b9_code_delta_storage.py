@@ -0,0 +1,68 @@
+"""Keyframe + delta storage columns for code states and snapshots
+
+Revision ID: 8e41d0c6a2b9
+Revises: 5c2e9b7d41f3
+Create Date: 2026-10-19 14:31:07.502611
+
+Existing rows keep their full text and read as keyframes. To re-encode them as deltas run
+`python scripts/compact_code_storage.py`; before downgrading, expand them back with
+`python scripts/compact_code_storage.py --expand`.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e41d0c6a2b9'
+down_revision: Union[str, Sequence[str], None] = '5c2e9b7d41f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLES = ['code_snapshots', 'code_states']
+COLUMNS = [
+    ('delta', sa.Text()),
+    ('base_id', sa.String()),
+    ('chain_len', sa.Integer()),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+    for table in TABLES:
+        if table not in tables:
+            continue
+        present = {c['name'] for c in inspector.get_columns(table)}
+        with op.batch_alter_table(table) as batch:
+            for name, type_ in COLUMNS:
+                if name not in present:
+                    batch.add_column(sa.Column(name, type_, nullable=True))
+    if 'code_states' in tables and 'ix_code_states_session_created' not in {ix['name'] for ix in inspector.get_indexes('code_states')}:
+        op.create_index('ix_code_states_session_created', 'code_states', ['session_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = inspector.get_table_names()
+    for table in TABLES:
+        if table in tables and 'delta' in {c['name'] for c in inspector.get_columns(table)}:
+            n = bind.execute(sa.text(f"SELECT COUNT(*) FROM {table} WHERE delta IS NOT NULL")).scalar()
+            if n:
+                raise RuntimeError(f"{table} has {n} delta rows; run scripts/compact_code_storage.py --expand first")
+    if 'code_states' in tables and 'ix_code_states_session_created' in {ix['name'] for ix in inspector.get_indexes('code_states')}:
+        op.drop_index('ix_code_states_session_created', table_name='code_states')
+    for table in TABLES:
+        if table not in tables:
+            continue
+        present = {c['name'] for c in inspector.get_columns(table)}
+        with op.batch_alter_table(table) as batch:
+            for name, _ in reversed(COLUMNS):
+                if name in present:
+                    batch.drop_column(name)
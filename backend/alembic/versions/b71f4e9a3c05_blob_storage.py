@@ -0,0 +1,49 @@
+"""Content-addressed blobs table for large column values
+
+Revision ID: b71f4e9a3c05
+Revises: 8e41d0c6a2b9
+Create Date: 2026-10-19 16:02:44.118230
+
+New writes offload large raw LLM payloads, oracle run code/stdio and long event payload
+strings into `blobs`; existing rows stay inline and read unchanged. To move them as well run
+`python scripts/offload_blobs.py`; before downgrading, inline them again with
+`python scripts/offload_blobs.py --restore`.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b71f4e9a3c05'
+down_revision: Union[str, Sequence[str], None] = '8e41d0c6a2b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if 'blobs' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'blobs',
+        sa.Column('digest', sa.String(), nullable=False),
+        sa.Column('codec', sa.String(), nullable=True),
+        sa.Column('size', sa.Integer(), nullable=True),
+        sa.Column('data', sa.LargeBinary(), nullable=True),
+        sa.Column('created_at', sa.Float(), nullable=True),
+        sa.PrimaryKeyConstraint('digest'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if 'blobs' not in sa.inspect(bind).get_table_names():
+        return
+    n = bind.execute(sa.text("SELECT COUNT(*) FROM blobs")).scalar()
+    if n:
+        raise RuntimeError(f"blobs has {n} rows; run scripts/offload_blobs.py --restore first")
+    op.drop_table('blobs')
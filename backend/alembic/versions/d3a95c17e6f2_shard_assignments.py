@@ -0,0 +1,44 @@
+"""Workspace -> shard assignments for per-workspace databases
+
+Revision ID: d3a95c17e6f2
+Revises: b71f4e9a3c05
+Create Date: 2026-10-19 18:40:12.503817
+
+Only read with DB_SHARDING=workspace, and only on the catalog (DATABASE_URL); shard databases
+get the table too but leave it empty. `python scripts/shard_tool.py migrate` runs this upgrade
+on every shard.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a95c17e6f2'
+down_revision: Union[str, Sequence[str], None] = 'b71f4e9a3c05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if 'shard_assignments' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'shard_assignments',
+        sa.Column('workspace_id', sa.String(), nullable=False),
+        sa.Column('shard', sa.String(), nullable=True),
+        sa.Column('created_at', sa.Float(), nullable=True),
+        sa.PrimaryKeyConstraint('workspace_id'),
+    )
+    op.create_index(op.f('ix_shard_assignments_shard'), 'shard_assignments', ['shard'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if 'shard_assignments' not in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.drop_index(op.f('ix_shard_assignments_shard'), table_name='shard_assignments')
+    op.drop_table('shard_assignments')
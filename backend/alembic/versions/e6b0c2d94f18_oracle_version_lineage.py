@@ -0,0 +1,53 @@
+"""Incremental re-analysis columns on oracle task versions
+
+Revision ID: e6b0c2d94f18
+Revises: d3a95c17e6f2
+Create Date: 2026-10-19 20:12:35.904417
+
+`oracle_task_versions` is built by create_all, which never adds columns to an existing table,
+so databases created before incremental re-analysis lack task_description / parent_version_id.
+Existing versions keep NULL in both and are analyzed from scratch when revised.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6b0c2d94f18'
+down_revision: Union[str, Sequence[str], None] = 'd3a95c17e6f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLE = 'oracle_task_versions'
+COLUMNS = [
+    ('task_description', sa.Text()),
+    ('parent_version_id', sa.String()),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    if TABLE not in inspector.get_table_names():
+        return
+    present = {c['name'] for c in inspector.get_columns(TABLE)}
+    with op.batch_alter_table(TABLE) as batch:
+        for name, type_ in COLUMNS:
+            if name not in present:
+                batch.add_column(sa.Column(name, type_, nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    if TABLE not in inspector.get_table_names():
+        return
+    present = {c['name'] for c in inspector.get_columns(TABLE)}
+    with op.batch_alter_table(TABLE) as batch:
+        for name, _ in reversed(COLUMNS):
+            if name in present:
+                batch.drop_column(name)
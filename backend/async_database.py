@@ -0,0 +1,38 @@
+from typing import AsyncIterator, Optional
+
+from starlette.requests import Request
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from backend.config import DB_SHARDING
+from backend.database import _apply_sqlite_profile, _is_sqlite, async_database_url, engine_options
+
+# Async counterpart of backend.database for `async def` routes. Queries awaited on an
+# AsyncSession run on the async driver (aiosqlite / asyncpg), so the event loop keeps serving
+# websockets and other requests during DB I/O. Code written against a sync Session can still
+# be reused from an async route through `await db.run_sync(fn)`.
+
+
+def build_async_engine(url: Optional[str] = None) -> AsyncEngine:
+    url = url or async_database_url()
+    eng = create_async_engine(url, **engine_options(url))
+    if _is_sqlite(url):
+        event.listen(eng.sync_engine, "connect", _apply_sqlite_profile)
+    return eng
+
+
+async_engine = build_async_engine()
+# expire_on_commit=False: attributes read after commit (e.g. response serialization) must not
+# trigger an implicit lazy load, which an AsyncSession cannot do.
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db(request: Request = None) -> AsyncIterator[AsyncSession]:
+    if DB_SHARDING != "off" and request is not None:
+        from backend.sharding import shard_router
+        maker = shard_router.async_sessionmaker(await shard_router.resolve_request(request))
+    else:
+        maker = AsyncSessionLocal
+    async with maker() as db:
+        yield db
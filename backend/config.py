@@ -28,6 +28,61 @@ PROCESSED_DATA_DIR = DATA_DIR
 # Model Directories
 MODEL_DIR = Path(os.getenv("MODEL_DIR", PROJECT_ROOT / "models"))
 
+# Database
+# Any SQLAlchemy URL; SQLite files get the per-connection profile below, server databases a pool.
+DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{(PROJECT_ROOT / 'backend.db').as_posix()}")
+DATABASE_ASYNC_URL = os.getenv("DATABASE_ASYNC_URL") # defaults to DATABASE_URL on its async driver (aiosqlite / asyncpg)
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"
+DB_SQLITE_JOURNAL_MODE = os.getenv("DB_SQLITE_JOURNAL_MODE", "WAL") # readers no longer block the writer
+DB_SQLITE_SYNCHRONOUS = os.getenv("DB_SQLITE_SYNCHRONOUS", "NORMAL") # durable in WAL mode, no fsync per commit
+DB_SQLITE_MMAP_SIZE = int(os.getenv("DB_SQLITE_MMAP_SIZE", 256 * 1024 * 1024)) # bytes
+DB_SQLITE_CACHE_SIZE_KB = int(os.getenv("DB_SQLITE_CACHE_SIZE_KB", 64 * 1024)) # page cache per connection
+DB_SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("DB_SQLITE_BUSY_TIMEOUT_MS", 5000)) # wait for the write lock instead of failing
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800)) # seconds; below typical server idle timeouts
+DB_SINGLE_WRITER = os.getenv("DB_SINGLE_WRITER", "auto").lower() # auto (SQLite files) | on | off: commit_queue units run on one writer thread
+DB_WRITER_MAX_BATCH = int(os.getenv("DB_WRITER_MAX_BATCH", 64)) # queued units coalesced into one transaction
+DB_WRITER_COALESCE_MS = float(os.getenv("DB_WRITER_COALESCE_MS", 0)) # wait this long for more units; 0 = only what is already queued
+DB_WRITER_QUEUE_MAX = int(os.getenv("DB_WRITER_QUEUE_MAX", 10000))
+DB_SHARDING = os.getenv("DB_SHARDING", "off").lower() # off | workspace (one database per workspace / cohort; DATABASE_URL stays the catalog)
+DB_SHARD_DIR = Path(os.getenv("DB_SHARD_DIR", PROJECT_ROOT / "shards"))
+DB_SHARD_URL_TEMPLATE = os.getenv("DB_SHARD_URL_TEMPLATE", "sqlite:///{dir}/{shard}.db") # {dir} = DB_SHARD_DIR, {shard} = shard name
+
+# Code storage (keyframe + line-delta rows for CodeState / CodeSnapshot)
+CODE_KEYFRAME_INTERVAL = int(os.getenv("CODE_KEYFRAME_INTERVAL", 32)) # max rows per keyframe chain
+CODE_DELTA_MAX_RATIO = float(os.getenv("CODE_DELTA_MAX_RATIO", 0.5)) # store a keyframe when the delta is larger than this share of the text
+CODE_CACHE_ENTRIES = int(os.getenv("CODE_CACHE_ENTRIES", 512)) # materialized texts kept in memory
+
+# Large-object storage (content-addressed, compressed `blobs` table)
+BLOB_OFFLOAD_MIN_BYTES = int(os.getenv("BLOB_OFFLOAD_MIN_BYTES", 8192)) # smaller values stay inline in their column
+BLOB_PREVIEW_CHARS = int(os.getenv("BLOB_PREVIEW_CHARS", 512)) # inline prefix kept for offloaded event payload strings
+BLOB_CACHE_ENTRIES = int(os.getenv("BLOB_CACHE_ENTRIES", 256)) # decompressed blobs kept in memory
+
+# Retention (archive + delete aged rows and log files; 0 days = keep forever)
+RETENTION_ENABLED = os.getenv("RETENTION_ENABLED", "false").lower() == "true" # run the scheduled job in the API process
+RETENTION_INTERVAL_HOURS = float(os.getenv("RETENTION_INTERVAL_HOURS", 24))
+RETENTION_ARCHIVE_DIR = Path(os.getenv("RETENTION_ARCHIVE_DIR", PROJECT_ROOT / "archive")) # <dir>/<session_id>/*.jsonl.gz
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", 1000)) # rows archived + deleted per transaction
+RETENTION_EVENT_LOGS_DAYS = float(os.getenv("RETENTION_EVENT_LOGS_DAYS", 30)) # also takes the diagnoses of those events
+RETENTION_DIAGNOSIS_LOGS_DAYS = float(os.getenv("RETENTION_DIAGNOSIS_LOGS_DAYS", 90))
+RETENTION_AI_STREAM_CHUNKS_DAYS = float(os.getenv("RETENTION_AI_STREAM_CHUNKS_DAYS", 7))
+RETENTION_ORACLE_RUNS_DAYS = float(os.getenv("RETENTION_ORACLE_RUNS_DAYS", 90))
+RETENTION_SESSION_IDLE_DAYS = float(os.getenv("RETENTION_SESSION_IDLE_DAYS", 0)) # archive whole sessions untouched this long
+RETENTION_FILE_LOGS_DAYS = float(os.getenv("RETENTION_FILE_LOGS_DAYS", 30)) # telemetry/*.jsonl and logs/observations/
+RETENTION_BLOB_GRACE_HOURS = float(os.getenv("RETENTION_BLOB_GRACE_HOURS", 24)) # unreferenced blobs younger than this are kept
+RETENTION_VACUUM = os.getenv("RETENTION_VACUUM", "true").lower() == "true" # VACUUM after a run that deleted rows (ANALYZE always)
+RETENTION_ARCHIVE_ON_DELETE = os.getenv("RETENTION_ARCHIVE_ON_DELETE", "true").lower() == "true" # DELETE /sessions/{id} archives first
+
+# Event ingestion
+EVENTS_BATCH_MAX = int(os.getenv("EVENTS_BATCH_MAX", 500)) # events accepted per POST /sessions/{id}/events/batch
+WRITE_BEHIND = os.getenv("WRITE_BEHIND", "true").lower() == "true" # group-commit events / diagnosis logs / pipeline messages
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", 256)) # rows per commit
+WRITE_BEHIND_FLUSH_MS = float(os.getenv("WRITE_BEHIND_FLUSH_MS", 50)) # max time a row waits for its batch
+WRITE_BEHIND_QUEUE_MAX = int(os.getenv("WRITE_BEHIND_QUEUE_MAX", 10000))
+WRITE_BEHIND_PUT_TIMEOUT_SECONDS = float(os.getenv("WRITE_BEHIND_PUT_TIMEOUT_SECONDS", 5)) # backpressure wait before rejecting
+
 # API Keys & LLM Config
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
@@ -35,6 +90,25 @@ OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") # Optional, defaults to None (off
 ZHIPU_API_KEY = os.getenv("ZHIPU_API_KEY")
 LLM_TIMEOUT_SECONDS = int(os.getenv("LLM_TIMEOUT_SECONDS", 120))
 
+# Oracle pipeline
+ORACLE_SPECULATIVE_TESTS = os.getenv("ORACLE_SPECULATIVE_TESTS", "true").lower() == "true"
+ORACLE_ANALYZE_CANDIDATES = int(os.getenv("ORACLE_ANALYZE_CANDIDATES", 1)) # >1 enables first-valid-wins parallel analysis
+ORACLE_ANALYZE_HEDGE_MS = int(os.getenv("ORACLE_ANALYZE_HEDGE_MS", 0)) # 0 = launch all candidates at once
+ORACLE_ANALYZE_DEADLINE_SECONDS = float(os.getenv("ORACLE_ANALYZE_DEADLINE_SECONDS", 300)) # end-to-end budget for one analyze request
+ORACLE_ROUTING = os.getenv("ORACLE_ROUTING", "true").lower() == "true" # try ORACLE_FAST_MODEL first for simple tasks
+ORACLE_FAST_MODEL = os.getenv("ORACLE_FAST_MODEL", "glm-4-flash")
+ORACLE_FAST_MAX_CHARS = int(os.getenv("ORACLE_FAST_MAX_CHARS", 600)) # longer descriptions go straight to the strong model
+ORACLE_STREAM_PARSE = os.getenv("ORACLE_STREAM_PARSE", "false").lower() == "true" # stream oracle completions and abort malformed ones early
+ORACLE_TESTS_CHUNK_SIZE = int(os.getenv("ORACLE_TESTS_CHUNK_SIZE", 8)) # max hidden tests requested per completion
+ORACLE_TESTS_CHUNK_RETRIES = int(os.getenv("ORACLE_TESTS_CHUNK_RETRIES", 1))
+ORACLE_TESTS_MAX_PARALLEL = int(os.getenv("ORACLE_TESTS_MAX_PARALLEL", 6))
+ORACLE_TESTS_EXPECTED_MODE = os.getenv("ORACLE_TESTS_EXPECTED_MODE", "llm") # llm | reference (expected values from running an LLM-written reference)
+ORACLE_TESTS_EXPANSION_MAX = int(os.getenv("ORACLE_TESTS_EXPANSION_MAX", "200")) # upper bound for local_expansion_count on /generate-tests
+ORACLE_TESTS_CACHE = os.getenv("ORACLE_TESTS_CACHE", "true").lower() == "true" # reuse generated bundles for identical /generate-tests requests
+ORACLE_TESTS_CACHE_TTL_SECONDS = float(os.getenv("ORACLE_TESTS_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+ORACLE_WARM_START = os.getenv("ORACLE_WARM_START", "offer") # off | offer (report neighbor) | reuse (prior spec for confirmation) | adjust (diff prompt)
+ORACLE_WARM_START_THRESHOLD = float(os.getenv("ORACLE_WARM_START_THRESHOLD", 0.8)) # estimated Jaccard over character shingles
+
 KEY_FINGERPRINT = get_key_fingerprint(OPENAI_API_KEY)
 
 # Settings
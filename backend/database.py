@@ -1,19 +1,154 @@
-from sqlalchemy import create_engine
+import logging
+from typing import Any, AsyncIterator, Dict, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from backend.config import BASE_DIR
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.requests import Request
+from backend.config import (
+    DATABASE_URL,
+    DATABASE_ASYNC_URL,
+    DB_ECHO,
+    DB_SQLITE_JOURNAL_MODE,
+    DB_SQLITE_SYNCHRONOUS,
+    DB_SQLITE_MMAP_SIZE,
+    DB_SQLITE_CACHE_SIZE_KB,
+    DB_SQLITE_BUSY_TIMEOUT_MS,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_SHARDING,
+)
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///C:/Users/dapi/Desktop/MST_KTtrae/backend.db"
+logger = logging.getLogger("Backend")
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+SQLALCHEMY_DATABASE_URL = DATABASE_URL
+
+
+def _is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def _apply_sqlite_profile(dbapi_conn, connection_record) -> None:
+    # Pragmas are per connection, so they run on every new pooled connection.
+    cur = dbapi_conn.cursor()
+    try:
+        cur.execute(f"PRAGMA busy_timeout={int(DB_SQLITE_BUSY_TIMEOUT_MS)}")
+        cur.execute(f"PRAGMA journal_mode={DB_SQLITE_JOURNAL_MODE}")
+        cur.execute(f"PRAGMA synchronous={DB_SQLITE_SYNCHRONOUS}")
+        cur.execute(f"PRAGMA mmap_size={int(DB_SQLITE_MMAP_SIZE)}")
+        cur.execute(f"PRAGMA cache_size={-int(DB_SQLITE_CACHE_SIZE_KB)}")
+    finally:
+        cur.close()
+
+
+_ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def async_database_url(url: Optional[str] = None) -> str:
+    """DATABASE_ASYNC_URL if set, else the sync URL with its driver swapped for the async one."""
+    if url is None and DATABASE_ASYNC_URL:
+        return DATABASE_ASYNC_URL
+    parsed = make_url(url or SQLALCHEMY_DATABASE_URL)
+    driver = _ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None or parsed.get_driver_name() in ("aiosqlite", "asyncpg"):
+        return parsed.render_as_string(hide_password=False)
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def engine_options(url: str) -> Dict[str, Any]:
+    """create_engine kwargs shared by the sync and async engines."""
+    if _is_sqlite(url):
+        return {
+            "echo": DB_ECHO,
+            "connect_args": {"check_same_thread": False, "timeout": DB_SQLITE_BUSY_TIMEOUT_MS / 1000.0},
+        }
+    return {
+        "echo": DB_ECHO,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+
+def same_database(a: Any, b: Any) -> bool:
+    """True when two URLs point at the same (non in-memory) database."""
+    try:
+        return (a.get_backend_name(), a.host, a.port, a.database) == (
+            b.get_backend_name(), b.host, b.port, b.database
+        ) and a.database not in (None, "", ":memory:")
+    except AttributeError:
+        return False
+
+
+def build_engine(url: Optional[str] = None) -> Engine:
+    """
+    SQLite: tuned per-connection profile (WAL, synchronous, mmap, cache, busy_timeout).
+    Anything else (e.g. postgresql+psycopg2://): QueuePool with DB_POOL_* sizing and pre-ping.
+    """
+    url = url or SQLALCHEMY_DATABASE_URL
+    eng = create_engine(url, **engine_options(url))
+    if _is_sqlite(url):
+        event.listen(eng, "connect", _apply_sqlite_profile)
+    return eng
+
+
+def describe_engine(eng: Optional[Engine] = None) -> Dict[str, Any]:
+    """Effective settings as the database reports them (not just what was requested)."""
+    eng = eng or engine
+    info: Dict[str, Any] = {
+        "url": eng.url.render_as_string(hide_password=True),
+        "dialect": eng.dialect.name,
+        "pool": type(eng.pool).__name__,
+    }
+    if eng.dialect.name == "sqlite":
+        with eng.connect() as conn:
+            for pragma in ("journal_mode", "synchronous", "mmap_size", "cache_size", "busy_timeout"):
+                info[pragma] = conn.exec_driver_sql(f"PRAGMA {pragma}").scalar()
+    else:
+        info["pool_size"] = eng.pool.size() if hasattr(eng.pool, "size") else None
+        info["max_overflow"] = DB_MAX_OVERFLOW
+        info["pool_timeout"] = DB_POOL_TIMEOUT
+        info["pool_recycle"] = DB_POOL_RECYCLE
+        with eng.connect() as conn:
+            info["server_version"] = ".".join(str(p) for p in (eng.dialect.server_version_info or ()))
+    return info
+
+
+def self_check(eng: Optional[Engine] = None) -> Dict[str, Any]:
+    """Connect once, log the effective settings, and flag a SQLite profile that did not take."""
+    eng = eng or engine
+    info = describe_engine(eng)
+    warnings = []
+    if info["dialect"] == "sqlite":
+        # In-memory databases report journal_mode=memory; only file databases can use WAL.
+        if eng.url.database not in (None, "", ":memory:") and str(info.get("journal_mode")).lower() != DB_SQLITE_JOURNAL_MODE.lower():
+            warnings.append(f"journal_mode={info.get('journal_mode')} (requested {DB_SQLITE_JOURNAL_MODE})")
+        if int(info.get("busy_timeout") or 0) < DB_SQLITE_BUSY_TIMEOUT_MS:
+            warnings.append(f"busy_timeout={info.get('busy_timeout')} (requested {DB_SQLITE_BUSY_TIMEOUT_MS})")
+    info["warnings"] = warnings
+    logger.info("[CFG] [DB] " + " ".join(f"{k}={v}" for k, v in info.items() if k != "warnings"))
+    for w in warnings:
+        logger.warning(f"[CFG] [DB] profile not applied: {w}")
+    return info
+
+
+engine = build_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
+async def get_db(request: Request = None) -> AsyncIterator[Session]:
+    """Sync Session for a route; with DB_SHARDING on, bound to the shard the request belongs to."""
+    if DB_SHARDING != "off" and request is not None:
+        from backend.sharding import shard_router
+        db = shard_router.sessionmaker(await shard_router.resolve_request(request))()
+    else:
+        db = SessionLocal()
     try:
         yield db
     finally:
@@ -2,13 +2,19 @@ from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 import logging
+import asyncio
 import sys
 import os
 from backend import models
-from backend.database import engine
-from backend.config import OPENAI_API_KEY, OPENAI_BASE_URL, OPENAI_MODEL, KEY_FINGERPRINT, DOTENV_PATH, ENV_LOADED
+from backend.database import engine, self_check as db_self_check
+from backend.async_database import async_engine
+from backend.sharding import shard_router
+from backend.services.commit_queue import commit_queue
+from backend.services.write_behind import write_behind
+from backend.services.retention import retention
+from backend.config import OPENAI_API_KEY, OPENAI_BASE_URL, OPENAI_MODEL, KEY_FINGERPRINT, DOTENV_PATH, ENV_LOADED, RETENTION_ENABLED
 # from backend.routers import chat, project, diagnose, events, agent, selfcheck, debug, dev, llm_api, runner
-from backend.routers import chat, project, diagnose, agent, selfcheck, debug, dev, llm_api, runner, oracle, psw_telemetry
+from backend.routers import chat, project, diagnose, events, agent, selfcheck, debug, dev, llm_api, runner, oracle, psw_telemetry
 from backend.services.websocket_service import manager
 
 # Setup Logging
@@ -41,7 +47,7 @@ app.add_middleware(
 # Include Routers
 app.include_router(chat.router, prefix="/api", tags=["chat"])
 app.include_router(project.router, prefix="/api", tags=["project"])
-# app.include_router(events.router, prefix="/api", tags=["events"])
+app.include_router(events.router, prefix="/api", tags=["events"])
 app.include_router(agent.router, prefix="/api", tags=["agent"])
 app.include_router(selfcheck.router, prefix="/api", tags=["selfcheck"])
 app.include_router(debug.router, prefix="/api", tags=["debug"])
@@ -57,6 +63,19 @@ async def startup_event():
     # Force print to ensure capture in log file
     print(f"[CFG] OPENAI_KEY_PRESENT={KEY_FINGERPRINT['present']} OPENAI_KEY_PREFIX={KEY_FINGERPRINT['prefix']} OPENAI_KEY_SHA256_8={KEY_FINGERPRINT['sha256_8']} OPENAI_BASE_URL={OPENAI_BASE_URL} ENV_SOURCE={'dotenv' if ENV_LOADED else 'osenv'}", flush=True)
     print(f"[CFG] DOTENV_PATH_USED={DOTENV_PATH}", flush=True)
+    db_info = db_self_check()
+    print(f"[CFG] DB_URL={db_info['url']} DB_DIALECT={db_info['dialect']} DB_POOL={db_info['pool']} DB_JOURNAL_MODE={db_info.get('journal_mode')} DB_WARNINGS={len(db_info['warnings'])}", flush=True)
+    if RETENTION_ENABLED:
+        retention.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Drain queued telemetry rows before the engines go away.
+    await asyncio.to_thread(retention.stop)
+    await asyncio.to_thread(write_behind.close)
+    await asyncio.to_thread(commit_queue.close)
+    await async_engine.dispose()
+    await shard_router.dispose()
 
 @app.get("/health")
 def health_check():
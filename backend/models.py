@@ -1,6 +1,6 @@
 
-from sqlalchemy import Column, String, Integer, Float, Boolean, Text, ForeignKey, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Integer, Float, Boolean, Text, ForeignKey, JSON, Index, LargeBinary
+from sqlalchemy.orm import relationship, deferred
 from backend.database import Base
 from backend.utils import uid, now
 
@@ -36,13 +36,20 @@ class CodeSnapshot(Base):
     
     id = Column(String, primary_key=True, index=True)
     session_id = Column(String, ForeignKey("sessions.id"), index=True)
-    content = Column(Text)
+    content = Column(Text) # full text on keyframes; NULL on delta rows (read via services.code_store)
+    delta = Column(Text, nullable=True) # line ops against base_id
+    base_id = Column(String, nullable=True)
+    chain_len = Column(Integer, default=0) # deltas since the last keyframe
     cursor_line = Column(Integer, nullable=True)
     cursor_col = Column(Integer, nullable=True)
     created_at = Column(Float, default=now)
     
     session = relationship("Session", back_populates="snapshots")
 
+    __table_args__ = (
+        Index("ix_code_snapshots_session_created", "session_id", "created_at"), # latest snapshot per session
+    )
+
 # 4) Thread
 class Thread(Base):
     __tablename__ = "threads"
@@ -73,6 +80,10 @@ class Message(Base):
     
     thread = relationship("Thread", back_populates="messages")
 
+    __table_args__ = (
+        Index("ix_messages_thread_created", "thread_id", "created_at"), # thread history in order
+    )
+
 # 6) EventLog
 class EventLog(Base):
     __tablename__ = "event_logs"
@@ -81,13 +92,17 @@ class EventLog(Base):
     session_id = Column(String, ForeignKey("sessions.id"), index=True)
     type = Column(String) # "edit", "compile", "run", etc.
     payload = Column(JSON)
-    trace_id = Column(String, nullable=True)
+    trace_id = Column(String, nullable=True, index=True)
     code_state_id = Column(String, ForeignKey("code_states.id"), nullable=True)
     created_at = Column(Float, default=now)
     
     session = relationship("Session", back_populates="events")
     code_state = relationship("CodeState", back_populates="events")
 
+    __table_args__ = (
+        Index("ix_event_logs_session_type_created", "session_id", "type", "created_at"), # latest event of given types
+    )
+
 # Fix: In original read output:
 # code_state = relationship("CodeState", back_populates="events")
 # And in CodeState: events = relationship("EventLog", back_populates="code_state")
@@ -98,13 +113,20 @@ class CodeState(Base):
     
     id = Column(String, primary_key=True, index=True)
     session_id = Column(String, ForeignKey("sessions.id"), index=True)
-    content = Column(Text)
-    content_hash = Column(String, index=True)
+    content = Column(Text) # full text on keyframes; NULL on delta rows (read via services.code_store)
+    delta = Column(Text, nullable=True) # line ops against base_id
+    base_id = Column(String, nullable=True)
+    chain_len = Column(Integer, default=0) # deltas since the last keyframe
+    content_hash = Column(String, index=True) # hash of the full text, dedupe key
     trace_id = Column(String, nullable=True)
     created_at = Column(Float, default=now)
     
     events = relationship("EventLog", back_populates="code_state")
 
+    __table_args__ = (
+        Index("ix_code_states_session_created", "session_id", "created_at"), # delta base lookup
+    )
+
 # 7) AIRun
 class AIRun(Base):
     __tablename__ = "ai_runs"
@@ -163,7 +185,7 @@ class DiagnosisLog(Base):
     session_id = Column(String, ForeignKey("sessions.id"), index=True)
     event_id = Column(String, ForeignKey("event_logs.id"), nullable=True) # Optional link to trigger event
     thread_id = Column(String, nullable=True) # General or breakout
-    trace_id = Column(String, nullable=True) # Inherited from event
+    trace_id = Column(String, nullable=True, index=True) # Inherited from event
     code_state_id = Column(String, nullable=True) # Inherited from event
     
     err_type_coarse = Column(String)
@@ -176,6 +198,10 @@ class DiagnosisLog(Base):
     
     created_at = Column(Float, default=now)
 
+    __table_args__ = (
+        Index("ix_diagnosis_logs_session_created", "session_id", "created_at"), # recent diagnoses per session
+    )
+
 # 12) LearningDebt
 class LearningDebt(Base):
     __tablename__ = "learning_debts"
@@ -217,6 +243,9 @@ class OracleTaskVersion(Base):
     status = Column(String) # ready, needs_clarification, etc.
     created_at = Column(Float, default=now)
     
+    task_description = Column(Text, nullable=True) # analyzed input, diffed by incremental re-analysis
+    parent_version_id = Column(String, nullable=True) # set when derived incrementally from another version
+    
     spec_json = Column(JSON)
     ambiguities_json = Column(JSON)
     user_confirmations_json = Column(JSON)
@@ -231,8 +260,9 @@ class OracleTaskVersion(Base):
     hash = Column(String)
     
     # Observability
-    spec_llm_raw_json = Column(JSON, nullable=True)
-    llm_raw_spec_json = Column(JSON, nullable=True) # Alias?
+    # Raw LLM payloads: loaded only when accessed; large ones are {"$blob": ...} refs (services.blob_store)
+    spec_llm_raw_json = deferred(Column(JSON, nullable=True))
+    llm_raw_spec_json = deferred(Column(JSON, nullable=True)) # Alias?
     spec_llm_request_id = Column(String, nullable=True)
     spec_prompt_version = Column(String, nullable=True)
     llm_model_used = Column(String, nullable=True)
@@ -247,11 +277,15 @@ class OracleTaskVersion(Base):
     attempt_fail_reasons_json = Column(JSON, nullable=True)
     missing_fields_json = Column(JSON, nullable=True)
     
-    tests_llm_raw_json = Column(JSON, nullable=True)
-    llm_raw_tests_json = Column(JSON, nullable=True)
+    tests_llm_raw_json = deferred(Column(JSON, nullable=True))
+    llm_raw_tests_json = deferred(Column(JSON, nullable=True))
     tests_llm_request_id = Column(String, nullable=True)
     tests_prompt_version = Column(String, nullable=True)
 
+    __table_args__ = (
+        Index("ix_oracle_task_versions_task_version", "task_id", "version_number"), # versions of a task in order
+    )
+
 # 16) OracleRun
 class OracleRun(Base):
     __tablename__ = "oracle_runs"
@@ -261,7 +295,7 @@ class OracleRun(Base):
     created_at = Column(Float, default=now)
     
     code_snapshot_id = Column(String, nullable=True)
-    code_text = Column(Text, nullable=True)
+    code_text = deferred(Column(Text, nullable=True)) # large texts are "blob:sha256:..." refs
     
     pass_rate = Column(Float)
     passed = Column(Integer)
@@ -273,6 +307,39 @@ class OracleRun(Base):
     sandbox_mode = Column(String)
     resource_limits_json = Column(JSON)
     
-    stdout_trunc = Column(Text, nullable=True)
-    stderr_trunc = Column(Text, nullable=True)
+    stdout_trunc = deferred(Column(Text, nullable=True))
+    stderr_trunc = deferred(Column(Text, nullable=True))
     sandbox_exit_code = Column(Integer, nullable=True)
+
+# 17) OracleTestBundleCache
+class OracleTestBundleCache(Base):
+    __tablename__ = "oracle_test_bundle_cache"
+
+    cache_key = Column(String, primary_key=True, index=True) # sha256 of generation inputs
+    version_id = Column(String, index=True) # Logical FK, used for invalidation
+    created_at = Column(Float, default=now)
+    last_hit_at = Column(Float, nullable=True)
+    hit_count = Column(Integer, default=0)
+
+    tests_json = Column(JSON)
+    tests_meta_json = Column(JSON)
+    prompt_version = Column(String, nullable=True)
+    llm_model_used = Column(String, nullable=True)
+
+# 18) Blob (content-addressed large values, see services.blob_store)
+class Blob(Base):
+    __tablename__ = "blobs"
+
+    digest = Column(String, primary_key=True) # sha256 of the uncompressed bytes
+    codec = Column(String, default="zlib")
+    size = Column(Integer) # uncompressed bytes
+    data = Column(LargeBinary)
+    created_at = Column(Float, default=now) # refreshed when a new reference reuses the blob
+
+# 19) ShardAssignment (catalog only; workspace -> shard when DB_SHARDING=workspace, see backend.sharding)
+class ShardAssignment(Base):
+    __tablename__ = "shard_assignments"
+
+    workspace_id = Column(String, primary_key=True)
+    shard = Column(String, index=True) # several workspaces may share one shard (a cohort)
+    created_at = Column(Float, default=now)
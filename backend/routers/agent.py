@@ -98,7 +98,8 @@ Instruction: {req.instruction}
             messages=messages,
             model="gpt-4o-mini",
             tools=tools,
-            tool_choice={"type": "function", "function": {"name": "update_code"}}
+            tool_choice={"type": "function", "function": {"name": "update_code"}},
+            caller="ai_write"
         )
         
         # 4. Process Tool Call
@@ -1,11 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, Body
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from backend.database import get_db
+from backend.async_database import get_async_db
 from backend import schemas, models, utils
 from backend.services.websocket_service import manager
 from backend.services.chat_service import ChatService
 from backend.services.llm_service import llm_service
 from backend.services.prompting import build_chat_messages
+from backend.services.code_store import code_store
+from backend.services.commit_queue import commit_queue
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel
 import time
@@ -23,19 +28,16 @@ def get_threads(session_id: str, db: Session = Depends(get_db)):
 
 @router.post("/threads", response_model=schemas.Thread)
 def create_thread(thread: schemas.ThreadCreate, db: Session = Depends(get_db)):
-    service = ChatService(db)
-    return service.create_thread(thread)
+    return commit_queue.run(lambda w: ChatService(w).create_thread(thread), db)
 
 @router.post("/threads/{thread_id}/messages", response_model=schemas.Message)
 def post_message(thread_id: str, message: schemas.MessageCreate, db: Session = Depends(get_db)):
-    service = ChatService(db)
     # Check if thread exists
     thread = db.query(models.Thread).filter(models.Thread.id == thread_id).first()
     if not thread:
         raise HTTPException(status_code=404, detail="Thread not found")
-        
-    db_msg = service.add_message(thread_id, message)
-    return db_msg
+
+    return commit_queue.run(lambda w: ChatService(w).add_message(thread_id, message), db)
 
 @router.post("/threads/{thread_id}/messages/user", response_model=schemas.Message)
 def post_user_message(thread_id: str, payload: Dict[str, Any] = Body(...), db: Session = Depends(get_db)):
@@ -64,7 +66,7 @@ import json
 async def generate_assistant_reply(
     thread_id: str, 
     req: ReplyRequest, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # 1. Rate Limiting (10s per thread)
     now = time.time()
@@ -76,25 +78,25 @@ async def generate_assistant_reply(
         )
     _rate_limit_store[thread_id] = now
 
-    service = ChatService(db)
-    
     # 2. Get Thread & Messages
-    thread = db.query(models.Thread).filter(models.Thread.id == thread_id).first()
+    thread = await db.get(models.Thread, thread_id)
     if not thread:
         raise HTTPException(status_code=404, detail="Thread not found")
         
-    messages = service.get_thread_messages(thread_id)
+    messages = await db.run_sync(lambda sync_db: ChatService(sync_db).get_thread_messages(thread_id))
     
     # 3. Get Context (Code Snapshot)
     extra_context = {}
     if req.include_code:
         # Get latest snapshot for the session
-        snap = db.query(models.CodeSnapshot)\
-            .filter(models.CodeSnapshot.session_id == thread.session_id)\
-            .order_by(models.CodeSnapshot.created_at.desc())\
-            .first()
+        snap = (await db.execute(
+            select(models.CodeSnapshot)
+            .where(models.CodeSnapshot.session_id == thread.session_id)
+            .order_by(models.CodeSnapshot.created_at.desc())
+            .limit(1)
+        )).scalars().first()
         if snap:
-            extra_context["code"] = snap.content
+            extra_context["code"] = await db.run_sync(lambda sync_db: code_store.content_of(sync_db, snap))
             
     if thread.type == "breakout" and thread.anchor:
         extra_context["breakout_anchor"] = thread.anchor
@@ -114,7 +116,7 @@ async def generate_assistant_reply(
     msg_id = await stream_and_persist_reply(thread.session_id, thread_id, full_prompt, db, req.mode)
     
     # 6. Return Created Message
-    created_msg = db.query(models.Message).filter(models.Message.id == msg_id).first()
+    created_msg = await db.get(models.Message, msg_id)
     return created_msg
 
 @router.get("/threads/{thread_id}/messages", response_model=List[schemas.Message])
@@ -149,31 +151,35 @@ def generate_summary(thread_id: str, db: Session = Depends(get_db)):
     
     context = "\n".join([f"{m.role}: {m.content}" for m in messages[-10:]])
     prompt = f"Summarize this conversation briefly:\n{context}"
-    summary = llm_service.generate_hint(prompt)
+    summary = llm_service.generate_hint(prompt, caller="chat.summary")
     
-    thread = db.query(models.Thread).filter(models.Thread.id == thread_id).first()
-    if thread:
-        thread.summary = summary
-        db.commit()
+    def set_summary(w: Session) -> None:
+        thread = w.get(models.Thread, thread_id)
+        if thread:
+            thread.summary = summary
+
+    commit_queue.run(set_summary, db)
         
     return {"summary": summary}
 
 
 @router.patch("/threads/{thread_id}", response_model=schemas.Thread)
 def update_thread(thread_id: str, patch: schemas.ThreadUpdate, db: Session = Depends(get_db)):
-    thread = db.query(models.Thread).filter(models.Thread.id == thread_id).first()
+    def apply_patch(w: Session) -> Optional[models.Thread]:
+        thread = w.get(models.Thread, thread_id)
+        if thread is None:
+            return None
+        if patch.title is not None:
+            thread.title = patch.title
+        if patch.summary is not None:
+            thread.summary = patch.summary
+        if patch.collapsed is not None:
+            thread.collapsed = patch.collapsed
+        return thread
+
+    thread = commit_queue.run(apply_patch, db)
     if not thread:
         raise HTTPException(status_code=404, detail="Thread not found")
-
-    if patch.title is not None:
-        thread.title = patch.title
-    if patch.summary is not None:
-        thread.summary = patch.summary
-    if patch.collapsed is not None:
-        thread.collapsed = patch.collapsed
-
-    db.commit()
-    db.refresh(thread)
     return thread
 
 # Unified Breakout creation via threads endpoint or specific one
@@ -182,8 +188,7 @@ def create_breakout(session_id: str, breakout: schemas.ThreadCreate, db: Session
     # Enforce type="breakout" and session_id
     breakout.session_id = session_id
     breakout.type = "breakout"
-    service = ChatService(db)
-    return service.create_thread(breakout)
+    return commit_queue.run(lambda w: ChatService(w).create_thread(breakout), db)
 
 class BreakoutRequest(BaseModel):
     range: Dict[str, int]
@@ -206,8 +211,7 @@ def create_breakout_alias(session_id: str, req: BreakoutRequest, db: Session = D
         title=req.title or "Breakout",
         anchor=anchor
     )
-    service = ChatService(db)
-    return service.create_thread(thread_create)
+    return commit_queue.run(lambda w: ChatService(w).create_thread(thread_create), db)
 
 class Marker(BaseModel):
     thread_id: str
@@ -4,6 +4,8 @@ from backend.database import get_db
 from backend import models, schemas
 from backend.services.websocket_service import manager
 from backend.services.telemetry import telemetry_service
+from backend.services.code_store import code_store
+from backend.sharding import CATALOG, shard_router
 import asyncio
 from typing import Dict, Any, List
 
@@ -108,12 +110,32 @@ def debug_code_state(code_state_id: str, db: Session = Depends(get_db)):
     if not cs:
         raise HTTPException(status_code=404, detail="CodeState not found")
         
+    content = code_store.content_of(db, cs)
     return {
         "id": cs.id,
         "content_hash": cs.content_hash,
-        "content_preview": "\n".join(cs.content.split("\n")[:10]) if cs.content else ""
+        "content_preview": "\n".join(content.split("\n")[:10]) if content else ""
     }
 
 @router.get("/debug/telemetry")
 def debug_telemetry(session_id: str):
     return telemetry_service.get_metrics(session_id)
+
+@router.get("/debug/shards")
+def debug_shards():
+    """Row counts per shard (read-only fan-out over every shard database)."""
+    def counts(db: Session) -> Dict[str, int]:
+        return {
+            "workspaces": db.query(models.Workspace).count(),
+            "sessions": db.query(models.Session).count(),
+            "event_logs": db.query(models.EventLog).count(),
+            "code_states": db.query(models.CodeState).count(),
+        }
+
+    per_shard = shard_router.scatter(counts, None if shard_router.enabled else [CATALOG])
+    totals: Dict[str, int] = {}
+    for c in per_shard.values():
+        for k, v in c.items():
+            if isinstance(v, int):
+                totals[k] = totals.get(k, 0) + v
+    return {"enabled": shard_router.enabled, "shards": per_shard, "totals": totals}
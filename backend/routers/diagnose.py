@@ -2,6 +2,9 @@ from fastapi import APIRouter, HTTPException, Depends
 from backend import schemas, models
 from backend.services.diagnosis_pipeline import DiagnosisPipeline
 from backend.database import get_db
+from backend.async_database import get_async_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 import logging
 from typing import List, Optional
@@ -16,7 +19,7 @@ async def run_session_diagnosis(
     session_id: str, 
     event_id: Optional[str] = None, 
     latest: bool = False,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Trigger a full diagnosis (Coarse + Pedagogical) for a given event or latest event.
@@ -25,11 +28,13 @@ async def run_session_diagnosis(
     
     if latest:
         # Find latest diagnostic event (compile or test fail)
-        last_event = db.query(models.EventLog)\
-            .filter(models.EventLog.session_id == session_id)\
-            .filter(models.EventLog.type.in_(["compile_error", "test_fail", "run_fail"]))\
-            .order_by(models.EventLog.created_at.desc())\
-            .first()
+        last_event = (await db.execute(
+            select(models.EventLog)
+            .where(models.EventLog.session_id == session_id)
+            .where(models.EventLog.type.in_(["compile_error", "test_fail", "run_fail"]))
+            .order_by(models.EventLog.created_at.desc())
+            .limit(1)
+        )).scalars().first()
         if not last_event:
              raise HTTPException(status_code=404, detail="No diagnostic events found for this session")
         event_id = last_event.id
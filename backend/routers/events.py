@@ -1,6 +1,10 @@
 from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 from backend.database import get_db
+from backend.async_database import get_async_db
 from backend import models, schemas, utils
 from backend.services.policy import decide_action
 from backend.services.llm_service import llm_service
@@ -10,7 +14,11 @@ from backend.services.websocket_service import manager
 from backend.services.telemetry import telemetry_service
 from backend.services.diagnosis_pipeline import DiagnosisPipeline
 from backend.services.observation_logger import observation_logger, ObservationEventContext
-from backend.services.edu_spd.engine import edu_spd_engine
+from backend.services.write_behind import write_behind
+from backend.services.code_store import code_store
+from backend.services.blob_store import blob_store
+from backend.services.commit_queue import commit_queue
+from backend.config import EVENTS_BATCH_MAX
 from typing import List, Dict, Any
 import logging
 import hashlib
@@ -19,8 +27,19 @@ import traceback
 logger = logging.getLogger("Backend")
 router = APIRouter()
 
+# The EDU-SPD status engine is not part of this tree; without it no event is treated as needing
+# a proactive intervention (unlock / recap responses still get one).
+try:
+    from backend.services.edu_spd.engine import edu_spd_engine
+except ImportError:
+    edu_spd_engine = None
+    logger.warning("[events] backend.services.edu_spd not available; proactive interventions disabled")
+
 _agent_emit_state: Dict[str, Dict[str, Any]] = {}
 
+# Event types that run the mechanism pipeline (diagnosis -> policy -> intervention).
+TRIGGER_TYPES = ("compile", "compile_error", "run", "test", "idle", "test_pass", "unlock_attempt", "recap_response")
+
 
 def _primary_reason(reason_codes: Any) -> str:
     if not isinstance(reason_codes, list):
@@ -87,53 +106,75 @@ def _mark_agent_emitted(*, session_id: str, edu: Dict[str, Any]) -> None:
 
 # --- Code State API (3.1-C) ---
 @router.post("/code_states", response_model=Dict[str, str])
-async def create_code_state(data: schemas.CodeStateCreate, db: Session = Depends(get_db)):
+async def create_code_state(data: schemas.CodeStateCreate, db: AsyncSession = Depends(get_async_db)):
     # Calculate Hash
     content_hash = hashlib.md5(data.content.encode("utf-8")).hexdigest()
     
     # Check existence (deduplication) - optional, but good for storage
-    existing = db.query(models.CodeState).filter(
-        models.CodeState.session_id == data.session_id, 
-        models.CodeState.content_hash == content_hash
-    ).first()
+    existing = (await db.execute(
+        select(models.CodeState).where(
+            models.CodeState.session_id == data.session_id,
+            models.CodeState.content_hash == content_hash
+        )
+    )).scalars().first()
     
     if existing:
         return {"code_state_id": existing.id, "content_hash": existing.content_hash}
         
-    # Create New
-    new_state = models.CodeState(
-        id=utils.uid("cs"),
-        session_id=data.session_id,
-        content=data.content,
-        content_hash=content_hash,
-        trace_id=data.trace_id
-    )
-    db.add(new_state)
-    db.commit()
-    db.refresh(new_state)
+    # Create New (encoded on the writer, so the delta base is the latest committed state)
+    def insert_state(w: Session) -> models.CodeState:
+        new_state = models.CodeState(
+            id=utils.uid("cs"),
+            session_id=data.session_id,
+            content_hash=content_hash,
+            trace_id=data.trace_id,
+            **code_store.encode(w, models.CodeState, data.session_id, data.content)
+        )
+        w.add(new_state)
+        return new_state
+
+    new_state = await commit_queue.arun(insert_state, db)
+    code_store.remember(new_state, data.content)
     
     return {"code_state_id": new_state.id, "content_hash": new_state.content_hash}
 
 # --- Events API ---
 
 @router.post("/sessions/{session_id}/events", response_model=schemas.EventLog)
-async def create_event(session_id: str, event: schemas.EventLogCreate, db: Session = Depends(get_db)):
+async def create_event(session_id: str, event: schemas.EventLogCreate, db: AsyncSession = Depends(get_async_db)):
     # 1. Save Event
-    sess = db.query(models.Session).filter(models.Session.id == session_id).first()
+    sess = await db.get(models.Session, session_id)
     if not sess:
         raise HTTPException(status_code=404, detail="Session not found")
-        
-    db_event = models.EventLog(
-        id=utils.uid("evt"),
-        session_id=session_id,
-        type=event.type,
-        payload=event.payload,
-        trace_id=event.trace_id,
-        code_state_id=event.code_state_id
-    )
-    db.add(db_event)
-    db.commit()
-    db.refresh(db_event)
+
+    buffered = write_behind.targets(db)
+    # Long stdout/stderr/file text goes to the blobs table; the row keeps a preview.
+    oversized = blob_store.oversized(event.payload)
+    row = {
+        "id": utils.uid("evt"),
+        "session_id": session_id,
+        "type": event.type,
+        "payload": event.payload,
+        "trace_id": event.trace_id,
+        "code_state_id": event.code_state_id,
+        "created_at": utils.now(),
+    }
+    if buffered:
+        if oversized:
+            # Blobs must be committed before the buffered row that refers to them.
+            stored_payload = await commit_queue.arun(lambda w: blob_store.offload_payload(w, event.payload), db)
+        else:
+            stored_payload = event.payload
+        # Group-committed by the write-behind writer; flushed below before anything reads it back.
+        await write_behind.asubmit(models.EventLog, {**row, "payload": stored_payload})
+    else:
+        def insert_event(w: Session) -> None:
+            payload = blob_store.offload_payload(w, event.payload) if oversized else event.payload
+            w.add(models.EventLog(**{**row, "payload": payload}))
+
+        await commit_queue.arun(insert_event, db)
+    # Respond with what the client sent.
+    db_event = models.EventLog(**row)
 
     try:
         observation_logger.ensure_session_started(
@@ -162,9 +203,10 @@ async def create_event(session_id: str, event: schemas.EventLogCreate, db: Sessi
     telemetry_service.track_event(session_id, event.type, event.payload)
     
     # 3. Check for Mechanism Trigger
-    trigger_types = ["compile", "compile_error", "run", "test", "idle", "test_pass", "unlock_attempt", "recap_response"]
-    if event.type in trigger_types:
+    if event.type in TRIGGER_TYPES:
         try:
+            if buffered:
+                await write_behind.aflush()
             await run_mechanism_pipeline(session_id, db_event, db)
         except Exception as e:
             logger.error(f"Mechanism failed: {e}")
@@ -173,21 +215,115 @@ async def create_event(session_id: str, event: schemas.EventLogCreate, db: Sessi
             
     return db_event
 
+@router.post("/sessions/{session_id}/events/batch", response_model=schemas.EventBatchResult)
+async def create_events_batch(session_id: str, batch: schemas.EventBatchCreate, db: AsyncSession = Depends(get_async_db)):
+    """
+    Ordered batch of editor events: one session lookup, one multi-row INSERT in one transaction,
+    one observation-log write. The mechanism pipeline then runs once per trigger type present,
+    on the last event of that type.
+    """
+    if len(batch.events) > EVENTS_BATCH_MAX:
+        raise HTTPException(status_code=413, detail={"error": "batch_too_large", "max": EVENTS_BATCH_MAX, "got": len(batch.events)})
+    sess = await db.get(models.Session, session_id)
+    if not sess:
+        raise HTTPException(status_code=404, detail="Session not found")
+    if not batch.events:
+        return {"session_id": session_id, "accepted": 0, "event_ids": [], "triggered_event_ids": []}
+
+    # Spread created_at by a microsecond per event so ORDER BY created_at keeps the client order.
+    base_ts = float(utils.now())
+    rows = [
+        {
+            "id": utils.uid("evt"),
+            "session_id": session_id,
+            "type": e.type,
+            "payload": e.payload,
+            "trace_id": e.trace_id,
+            "code_state_id": e.code_state_id,
+            "created_at": base_ts + i * 1e-6,
+        }
+        for i, e in enumerate(batch.events)
+    ]
+    oversized = any(blob_store.oversized(row["payload"]) for row in rows)
+
+    def insert_rows(w: Session) -> None:
+        # Blobs go in the same transaction as the event rows, so no row can refer to a missing blob.
+        stored = [{**row, "payload": blob_store.offload_payload(w, row["payload"])} for row in rows] if oversized else rows
+        w.execute(insert(models.EventLog), stored)
+
+    await commit_queue.arun(insert_rows, db)
+
+    try:
+        first_payload = batch.events[0].payload or {}
+        observation_logger.ensure_session_started(
+            session_id,
+            language=sess.language or "python",
+            task_id=first_payload.get("task_id"),
+            task_text=first_payload.get("task_text"),
+            run_command=first_payload.get("run_command"),
+            has_tests=first_payload.get("has_tests"),
+        )
+        observation_logger.append_many(session_id, [
+            (
+                ObservationEventContext(
+                    session_id=session_id,
+                    event_id=row["id"],
+                    event_type=row["type"],
+                    source="frontend",
+                    trace_id=row["trace_id"],
+                    code_state_id=row["code_state_id"],
+                ),
+                row["payload"] or {},
+            )
+            for row in rows
+        ])
+    except Exception:
+        logger.exception("ObservationLogger append failed")
+
+    for row in rows:
+        telemetry_service.track_event(session_id, row["type"], row["payload"])
+
+    last_by_type: Dict[str, str] = {}
+    for row in rows:
+        if row["type"] in TRIGGER_TYPES:
+            last_by_type[row["type"]] = row["id"]
+    triggered = [row["id"] for row in rows if last_by_type.get(row["type"]) == row["id"]]
+    for event_id in triggered:
+        db_event = await db.get(models.EventLog, event_id)
+        try:
+            await run_mechanism_pipeline(session_id, db_event, db)
+        except Exception as e:
+            logger.error(f"Mechanism failed: {e}")
+            traceback.print_exc()
+
+    logger.info(f"[events] batch session_id={session_id} accepted={len(rows)} triggered={len(triggered)}")
+    return {
+        "session_id": session_id,
+        "accepted": len(rows),
+        "event_ids": [row["id"] for row in rows],
+        "triggered_event_ids": triggered,
+    }
+
 @router.post("/session/{session_id}/event", response_model=schemas.EventLog)
-async def create_event_alias(session_id: str, event: schemas.EventLogCreate, db: Session = Depends(get_db)):
+async def create_event_alias(session_id: str, event: schemas.EventLogCreate, db: AsyncSession = Depends(get_async_db)):
     """Alias for /sessions/{session_id}/events to match 1234.md spec"""
     return await create_event(session_id, event, db)
 
 @router.get("/sessions/{session_id}/events", response_model=List[schemas.EventLog])
-def get_events(session_id: str, limit: int = 100, db: Session = Depends(get_db)):
-    return db.query(models.EventLog)\
+def get_events(session_id: str, limit: int = 100, full: bool = False, db: Session = Depends(get_db)):
+    """Offloaded payload strings come back as previews plus `_blobs` digests unless full=true."""
+    events = db.query(models.EventLog)\
         .filter(models.EventLog.session_id == session_id)\
         .order_by(models.EventLog.created_at.desc())\
         .limit(limit)\
         .all()
+    if full:
+        for e in events:
+            set_committed_value(e, "payload", blob_store.load_payload(db, e.payload))
+    return events
 
 # --- Mechanism Pipeline ---
-async def run_mechanism_pipeline(session_id: str, event: models.EventLog, db: Session):
+async def run_mechanism_pipeline(session_id: str, event: models.EventLog, db: AsyncSession):
     trace_id = event.trace_id
 
     pipeline = DiagnosisPipeline(db)
@@ -202,17 +338,19 @@ async def run_mechanism_pipeline(session_id: str, event: models.EventLog, db: Se
 
     raw_code = ""
     if event.code_state_id:
-        cs = db.query(models.CodeState).filter(models.CodeState.id == event.code_state_id).first()
+        cs = await db.get(models.CodeState, event.code_state_id)
         if cs:
-            raw_code = cs.content or ""
+            raw_code = await db.run_sync(lambda sync_db: code_store.content_of(sync_db, cs))
 
     if not raw_code:
-        snap = db.query(models.CodeSnapshot)\
-            .filter(models.CodeSnapshot.session_id == session_id)\
-            .order_by(models.CodeSnapshot.created_at.desc())\
-            .first()
+        snap = (await db.execute(
+            select(models.CodeSnapshot)
+            .where(models.CodeSnapshot.session_id == session_id)
+            .order_by(models.CodeSnapshot.created_at.desc())
+            .limit(1)
+        )).scalars().first()
         if snap:
-            raw_code = snap.content or ""
+            raw_code = await db.run_sync(lambda sync_db: code_store.content_of(sync_db, snap))
 
     plan = decide_action(
         event=event,
@@ -242,7 +380,7 @@ async def run_mechanism_pipeline(session_id: str, event: models.EventLog, db: Se
         "trace_id": trace_id
     })
 
-    edu = edu_spd_engine.peek_status(session_id, debug=False)
+    edu = edu_spd_engine.peek_status(session_id, debug=False) if edu_spd_engine is not None else {}
     allow_proactive = bool(edu.get("need_intervene"))
     if event.type in {"unlock_attempt", "recap_response"}:
         allow_proactive = True
@@ -257,13 +395,14 @@ async def run_mechanism_pipeline(session_id: str, event: models.EventLog, db: Se
         if not _should_emit_agent_message(session_id=session_id, edu=edu):
             return
 
-    chat_service = ChatService(db)
     target_tid = (event.payload or {}).get("breakout_thread_id")
     if not target_tid:
-        general = db.query(models.Thread)\
-            .filter(models.Thread.session_id == session_id)\
-            .filter(models.Thread.type == "global")\
-            .first()
+        general = (await db.execute(
+            select(models.Thread)
+            .where(models.Thread.session_id == session_id)
+            .where(models.Thread.type == "global")
+            .limit(1)
+        )).scalars().first()
         target_tid = general.id if general else None
 
     if not target_tid:
@@ -306,7 +445,7 @@ async def run_mechanism_pipeline(session_id: str, event: models.EventLog, db: Se
         })
 
         try:
-            stream_gen = llm_service.stream_completion(prompt_msgs, model="gpt-4o-mini")
+            stream_gen = llm_service.stream_completion(prompt_msgs, model="gpt-4o-mini", caller="mechanism.intervention")
             seq = 0
             for chunk in stream_gen:
                 await manager.broadcast(session_id, {
@@ -389,11 +528,21 @@ async def run_mechanism_pipeline(session_id: str, event: models.EventLog, db: Se
         "trace_id": trace_id
     }
 
-    msg = schemas.MessageCreate(role="assistant", content=full_content, meta=meta)
-    chat_service.add_message(target_tid, msg, message_id=message_id)
+    if write_behind.targets(db):
+        await write_behind.asubmit(models.Message, {
+            "id": message_id,
+            "thread_id": target_tid,
+            "role": "assistant",
+            "content": full_content,
+            "meta": meta,
+            "created_at": utils.now(),
+        })
+    else:
+        msg = schemas.MessageCreate(role="assistant", content=full_content, meta=meta)
+        await commit_queue.arun(lambda w: ChatService(w).add_message(target_tid, msg, message_id=message_id), db)
 
 @router.post("/events", response_model=schemas.EventLog)
-async def create_event_global_alias(event: schemas.EventLogCreate, db: Session = Depends(get_db)):
+async def create_event_global_alias(event: schemas.EventLogCreate, db: AsyncSession = Depends(get_async_db)):
     """Global alias for /api/event if session_id is in payload, or fail"""
     # Payload must contain session_id if we use this global endpoint
     # But schema doesn't have session_id in top level.
@@ -408,6 +557,6 @@ async def create_event_global_alias(event: schemas.EventLogCreate, db: Session =
     raise HTTPException(status_code=400, detail="session_id required in payload for this endpoint")
 
 @router.post("/event", response_model=schemas.EventLog)
-async def create_event_singular_alias(event: schemas.EventLogCreate, db: Session = Depends(get_db)):
+async def create_event_singular_alias(event: schemas.EventLogCreate, db: AsyncSession = Depends(get_async_db)):
     """Alias for /api/event"""
     return await create_event_global_alias(event, db)
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, Body
 from sqlalchemy.orm import Session
 from backend.database import get_db
 from backend.services.llm_service import llm_service
+from backend.services.llm_telemetry import llm_telemetry
 from backend.services.prompting import build_intervention_prompt
 from typing import Dict, Any, List, Optional
 from pydantic import BaseModel
@@ -45,7 +46,7 @@ def generate_intervention(req: InterventionRequest):
     # For now, let's just convert to string prompt if generate_hint expects string.
     full_prompt = "\n".join([f"{m['role']}: {m['content']}" for m in prompt_msgs])
     
-    response = llm_service.generate_hint(full_prompt)
+    response = llm_service.generate_hint(full_prompt, caller="llm.intervention")
     
     return {"assistant_message": response}
 
@@ -62,9 +63,23 @@ def ai_write_stream(req: StreamRequest):
     def generator():
         # Call LLM Stream (Sync)
         try:
-            for chunk in llm_service.stream_completion([{"role": "user", "content": req.prompt}]):
+            for chunk in llm_service.stream_completion([{"role": "user", "content": req.prompt}], caller="ai_write.stream"):
                 yield chunk
         except Exception as e:
             yield f"[Error: {e}]"
 
     return StreamingResponse(generator(), media_type="text/plain")
+
+@router.get("/llm/metrics")
+def llm_metrics(since_seconds: Optional[float] = None, source: str = "memory"):
+    """
+    Latency percentiles and token totals per (caller, model).
+    source=memory reads the ring buffer; source=db reads the persisted SQLite table.
+    """
+    if source not in ("memory", "db"):
+        raise HTTPException(status_code=400, detail="source must be 'memory' or 'db'")
+    return llm_telemetry.metrics(since_seconds=since_seconds, source=source)
+
+@router.get("/llm/calls/recent")
+def llm_recent_calls(limit: int = 50):
+    return {"calls": llm_telemetry.recent(limit=max(1, min(limit, 500)))}
@@ -2,22 +2,34 @@ from __future__ import annotations
 
 import json
 import logging
-from typing import Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, ConfigDict, Field, ValidationError
-from sqlalchemy.orm import Session
+from sqlalchemy import func
+from sqlalchemy.orm import Session, load_only
 
-from backend.database import get_db
+from backend.database import SessionLocal, get_db
 from backend import models
 from backend.utils import now
-from backend.config import OPENAI_API_KEY, OPENAI_BASE_URL, OPENAI_MODEL, KEY_FINGERPRINT, DOTENV_PATH, ENV_LOADED # Added config imports
+from backend.config import OPENAI_API_KEY, OPENAI_BASE_URL, OPENAI_MODEL, KEY_FINGERPRINT, DOTENV_PATH, ENV_LOADED, LLM_TIMEOUT_SECONDS, ORACLE_SPECULATIVE_TESTS, ORACLE_TESTS_EXPECTED_MODE, ORACLE_TESTS_EXPANSION_MAX, ORACLE_WARM_START, ORACLE_WARM_START_THRESHOLD # Added config imports
 from backend.services.oracle.mock_llm import generate_spec as mock_generate_spec
 from backend.services.oracle.mock_llm import generate_tests as mock_generate_tests
-from backend.services.oracle.llm_oracle import generate_spec_with_llm, generate_tests_with_llm, OracleAnalyzeError
+from backend.services.oracle.llm_oracle import generate_spec_with_llm, reanalyze_spec_with_llm, generate_tests_with_llm, generate_tests_with_reference, generate_reference_solution, OracleAnalyzeError, PROMPT_VERSION, ZHIPU_MODEL
 from backend.services.oracle.types import TaskSpec, GeneratedTests
 from backend.services.oracle.utils import compute_bundle_hash, compute_initial_confidence, compute_post_tests_confidence, new_uuid, truncate_utf8_bytes
 from backend.services.oracle.runner import default_resource_limits, default_sandbox_mode, load_code_text, run_cli_oracle, run_function_oracle
+from backend.services.oracle.speculative import speculative_tests, speculation_key
+from backend.services.oracle.model_router import model_router
+from backend.services.oracle.expansion import expand_tests
+from backend.services.oracle.reference import fill_expected_from_reference
+from backend.services.oracle.progress import AnalyzeProgress, progress_registry
+from backend.services.oracle.similarity import SimilarMatch, similarity_index
+from backend.services.oracle.bundle_cache import bundle_cache_key, get_cached_bundle, invalidate_version, record_hit, store_bundle
+from backend.services.blob_store import blob_store
+from backend.services.commit_queue import commit_queue
 
 
 router = APIRouter(prefix="/oracle", tags=["oracle"])
@@ -27,6 +39,10 @@ logger = logging.getLogger("Backend")
 logger.info(f"[CFG] [ORACLE] OPENAI_KEY_PRESENT={KEY_FINGERPRINT['present']} OPENAI_KEY_PREFIX={KEY_FINGERPRINT['prefix']} OPENAI_KEY_SHA256_8={KEY_FINGERPRINT['sha256_8']} OPENAI_BASE_URL={OPENAI_BASE_URL} ENV_SOURCE={'dotenv' if ENV_LOADED else 'osenv'}")
 logger.info(f"[CFG] [ORACLE] DOTENV_PATH_USED={DOTENV_PATH}")
 
+# Worker threads for /version/spec/stream; the request thread only relays events.
+_analyze_stream_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="oracle-analyze-stream")
+
+
 class StrictModel(BaseModel):
     model_config = ConfigDict(extra="forbid")
 
@@ -47,6 +63,11 @@ class SpecBody(StrictModel):
     optional_interface_constraints: Optional[Dict[str, Any]] = None
     optional_nonfunctional_constraints: Optional[Dict[str, Any]] = None
     debug_invalid_mock: bool = False
+    analyze_candidates: Optional[int] = Field(default=None, ge=1, le=5) # >1: parallel first-valid-wins analysis
+    deadline_seconds: Optional[float] = Field(default=None, gt=0, le=1800) # end-to-end analyze budget; default ORACLE_ANALYZE_DEADLINE_SECONDS
+    warm_start: Optional[str] = Field(default=None, pattern="^(off|offer|reuse|adjust)$") # near-duplicate handling; default ORACLE_WARM_START
+    parent_version_id: Optional[str] = None # revise this version incrementally (new-version default: latest analyzed version)
+    incremental: bool = True # new-version only: False forces a from-scratch analysis
 
 
 class SpecResp(StrictModel):
@@ -56,6 +77,8 @@ class SpecResp(StrictModel):
     oracle_confidence_initial: float
     confidence_reasons: List[str]
     log_id: str
+    deadline_remaining_ms: Optional[int] = None
+    warm_start: Optional[Dict[str, Any]] = None
 
 
 class ConfirmBody(StrictModel):
@@ -73,6 +96,8 @@ class GenerateTestsBody(StrictModel):
     hidden_tests_count: int = 6
     difficulty_profile: Optional[Dict[str, Any]] = None
     debug_invalid_mock: bool = False
+    expected_mode: Optional[str] = Field(default=None, pattern="^(llm|reference)$") # reference: expected values from executing an LLM-written reference
+    local_expansion_count: int = Field(default=0, ge=0, le=ORACLE_TESTS_EXPANSION_MAX) # extra hidden tests derived locally and run against the reference (written and attached first if the version has none)
 
 
 class GenerateTestsResp(StrictModel):
@@ -89,6 +114,9 @@ class GenerateTestsResp(StrictModel):
     hash: str
     seed: int
     log_id: str
+    speculative_hit: bool = False
+    expanded_hidden_tests_count: int = 0
+    cache_hit: bool = False
 
 
 class RunBody(StrictModel):
@@ -129,10 +157,40 @@ def _get_version(db: Session, version_id: str) -> models.OracleTaskVersion:
 
 
 def _next_version_number(db: Session, task_id: str) -> int:
-    existing = db.query(models.OracleTaskVersion).filter(models.OracleTaskVersion.task_id == task_id).all()
-    if not existing:
-        return 1
-    return max(int(v.version_number or 0) for v in existing) + 1
+    latest = db.query(func.max(models.OracleTaskVersion.version_number)).filter(models.OracleTaskVersion.task_id == task_id).scalar()
+    return int(latest or 0) + 1
+
+
+def _insert_version(db: Session, v: models.OracleTaskVersion, raw_text: Any) -> None:
+    """Number and insert a new version as one unit of work, so concurrent analyses get distinct numbers."""
+    def unit(w: Session) -> None:
+        v.version_number = _next_version_number(w, v.task_id)
+        v.spec_llm_raw_json = v.llm_raw_spec_json = blob_store.offload_json(w, raw_text)
+        w.add(v)
+
+    commit_queue.run(unit, db)
+
+
+def _save_version(
+    db: Session,
+    v: models.OracleTaskVersion,
+    fields: List[str],
+    also: Optional[Callable[[Session, models.OracleTaskVersion], None]] = None,
+) -> None:
+    """
+    Persist the listed attributes (already set on v) as one commit_queue unit, plus also(w, row).
+    The request Session only reads, so it never holds the SQLite write lock.
+    """
+    values = {f: getattr(v, f) for f in fields}
+
+    def unit(w: Session) -> None:
+        row = w.get(models.OracleTaskVersion, v.version_id)
+        for f, value in values.items():
+            setattr(row, f, value)
+        if also is not None:
+            also(w, row)
+
+    commit_queue.run(unit, db)
 
 
 def _validate_confirmations(spec_json: Dict[str, Any], selections: Dict[str, str]) -> None:
@@ -219,6 +277,11 @@ def debug_config() -> Dict[str, Any]:
         "key_sha256_8": KEY_FINGERPRINT["sha256_8"] # Added for convenience
     }
 
+@router.get("/debug/routing_stats", response_model=Dict[str, Any])
+def debug_routing_stats(limit: int = 5000) -> Dict[str, Any]:
+    # Outcomes per analyze route (fast, fast->strong, strong) for tuning the routing heuristics
+    return model_router.stats(limit=max(1, min(limit, 50000)))
+
 @router.get("/debug/last_spec_call", response_model=Dict[str, Any])
 def debug_last_spec_call(db: Session = Depends(get_db)) -> Dict[str, Any]:
     # Fetch the most recent task version
@@ -262,19 +325,93 @@ def debug_last_spec_call(db: Session = Depends(get_db)) -> Dict[str, Any]:
 def create_task(body: CreateTaskBody, db: Session = Depends(get_db)) -> Dict[str, Any]:
     task_id = new_uuid()
     t = models.OracleTask(task_id=task_id, project_id=body.project_id, created_at=now(), updated_at=now())
-    db.add(t)
-    db.commit()
+    commit_queue.run(lambda w: w.add(t), db)
     logger.info(f"[oracle] create_task task_id={task_id} project_id={body.project_id}")
     return {"task_id": task_id}
 
 
 @router.post("/task/{task_id}/version/spec", response_model=SpecResp)
 def create_spec(task_id: str, body: SpecBody, db: Session = Depends(get_db)) -> Dict[str, Any]:
+    parent = _resolve_parent(db, task_id, body.parent_version_id) if body.parent_version_id else None
+    return _create_spec_version(task_id, body, db, parent)
+
+
+@router.post("/task/{task_id}/version/spec/stream")
+def create_spec_stream(task_id: str, body: SpecBody) -> StreamingResponse:
+    """
+    create_spec with server-sent progress events. The first event is `started` (stream_id for
+    /analyze/{stream_id}/cancel), then attempt_start / token_progress / validation / repair /
+    attempt_failed from the analyze loop (candidate_start / candidate_failed / candidate_won in
+    parallel mode), and finally `done` (the create_spec response) or
+    `error` (status_code and detail). Closing the connection cancels the analysis.
+    """
+    with SessionLocal() as db:
+        _get_task(db, task_id)
+    progress = progress_registry.open()
+    progress.emit("started", stream_id=progress.stream_id, task_id=task_id)
+
+    def work() -> None:
+        db = SessionLocal()
+        try:
+            parent = _resolve_parent(db, task_id, body.parent_version_id) if body.parent_version_id else None
+            resp = _create_spec_version(task_id, body, db, parent, progress)
+            progress.emit("done", **resp)
+        except HTTPException as e:
+            progress.emit("error", status_code=e.status_code, detail=e.detail)
+        except Exception as e:
+            logger.exception(f"[oracle] create_spec_stream failed stream_id={progress.stream_id}")
+            progress.emit("error", status_code=500, detail=str(e))
+        finally:
+            db.close()
+            progress.close()
+            progress_registry.release(progress.stream_id)
+
+    _analyze_stream_executor.submit(work)
+
+    def events():
+        try:
+            yield from progress.sse()
+        finally:
+            # Client disconnected (or the stream ended): stop spending LLM time on it.
+            progress.cancel()
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.post("/analyze/{stream_id}/cancel", response_model=Dict[str, Any])
+def cancel_analyze(stream_id: str) -> Dict[str, Any]:
+    progress = progress_registry.get(stream_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="stream_not_found")
+    progress.cancel()
+    logger.info(f"[oracle] analyze cancel requested stream_id={stream_id}")
+    return {"stream_id": stream_id, "cancelled": True}
+
+
+def _create_spec_version(
+    task_id: str,
+    body: SpecBody,
+    db: Session,
+    parent: Optional[models.OracleTaskVersion] = None,
+    progress: Optional[AnalyzeProgress] = None,
+) -> Dict[str, Any]:
     _get_task(db, task_id)
     version_id = new_uuid()
-    ver_n = _next_version_number(db, task_id)
 
-    if body.debug_invalid_mock:
+    warm_mode = body.warm_start or ORACLE_WARM_START
+    scope = similarity_index.scope(body.language, body.runtime, body.deliverable_type)
+    # A revision's parent is its warm start; the similarity index is only for new tasks.
+    neighbor = None if body.debug_invalid_mock or warm_mode == "off" or parent is not None else _find_warm_start(db, body.task_description, scope)
+    warm_start_info: Optional[Dict[str, Any]] = None
+    if neighbor is not None:
+        match, prior = neighbor
+        warm_start_info = {"source_version_id": match.version_id, "similarity": round(match.similarity, 3), "mode": warm_mode}
+        logger.info(f"[oracle] warm_start candidate task_id={task_id} source_version_id={match.version_id} similarity={match.similarity:.3f} mode={warm_mode}")
+
+    incremental = None if body.debug_invalid_mock or parent is None else _analyze_incremental(body, parent)
+    if incremental is not None:
+        spec_json, spec_meta = incremental
+    elif body.debug_invalid_mock:
         spec_json, spec_meta = mock_generate_spec(
             task_description=body.task_description,
             language=body.language,
@@ -284,22 +421,51 @@ def create_spec(task_id: str, body: SpecBody, db: Session = Depends(get_db)) ->
             optional_nonfunctional_constraints=body.optional_nonfunctional_constraints,
             debug_invalid_mock=True,
         )
+    elif neighbor is not None and warm_mode == "reuse":
+        # Prior spec is returned as-is for the user to confirm; no LLM call.
+        spec_json = json.loads(json.dumps(prior.spec_json))
+        spec_meta = {
+            "attempts": 0,
+            "attempt_fail_reasons": [],
+            "prompt_version": prior.spec_prompt_version,
+            "schema_version": prior.schema_version,
+            "interaction_model_pred": prior.interaction_model_pred,
+        }
     else:
+        adjust_from = {"spec": prior.spec_json, "description": match.description} if neighbor is not None and warm_mode == "adjust" else None
         try:
-            spec_json, spec_meta = generate_spec_with_llm(
-                task_description=body.task_description,
-                language=body.language,
-                runtime=body.runtime,
-                deliverable_type=body.deliverable_type
-            )
+            try:
+                spec_json, spec_meta = generate_spec_with_llm(
+                    task_description=body.task_description,
+                    language=body.language,
+                    runtime=body.runtime,
+                    deliverable_type=body.deliverable_type,
+                    candidates=body.analyze_candidates,
+                    deadline_seconds=body.deadline_seconds,
+                    warm_start=adjust_from,
+                    progress=progress
+                )
+            except OracleAnalyzeError as e:
+                if adjust_from is None or (progress is not None and progress.cancelled):
+                    raise
+                logger.info(f"[oracle] warm_start adjust failed task_id={task_id} reason={e}; analyzing from scratch")
+                warm_start_info["adjust_failed"] = str(e)
+                spec_json, spec_meta = generate_spec_with_llm(
+                    task_description=body.task_description,
+                    language=body.language,
+                    runtime=body.runtime,
+                    deliverable_type=body.deliverable_type,
+                    candidates=body.analyze_candidates,
+                    deadline_seconds=body.deadline_seconds,
+                    progress=progress
+                )
         except OracleAnalyzeError as e:
             # 3.2 Persist failure trace to DB
             meta = e.metadata
             v = models.OracleTaskVersion(
                 version_id=version_id,
                 task_id=task_id,
-                version_number=ver_n,
-                status="analyze_failed",
+                status="analyze_cancelled" if str(e) == "analyze_cancelled" else "analyze_failed",
                 created_at=now(),
                 spec_json={},
                 ambiguities_json=[],
@@ -311,8 +477,6 @@ def create_spec(task_id: str, body: SpecBody, db: Session = Depends(get_db)) ->
                 seed=0,
                 hash="",
                 # Trace info
-                spec_llm_raw_json=meta.get("raw_text"),
-                llm_raw_spec_json=meta.get("raw_text"),
                 llm_model_used=meta.get("llm_model_used"),
                 llm_provider_used=meta.get("llm_provider_used"),
                 spec_llm_request_id=meta.get("request_id"),
@@ -321,8 +485,7 @@ def create_spec(task_id: str, body: SpecBody, db: Session = Depends(get_db)) ->
                 attempt_fail_reasons_json=meta.get("attempt_fail_reasons"),
                 missing_fields_json=meta.get("missing_fields")
             )
-            db.add(v)
-            db.commit()
+            _insert_version(db, v, meta.get("raw_text"))
             
             logger.info(f"[ANALYZE] version_id={version_id} provider=openai model={meta.get('llm_model_used')} attempts={meta.get('attempts')} status=analyze_failed latency_ms={meta.get('llm_latency_ms')} request_id={meta.get('request_id')} error_type=analyze_failed")
 
@@ -332,7 +495,9 @@ def create_spec(task_id: str, body: SpecBody, db: Session = Depends(get_db)) ->
                 "version_id": version_id,
                 "attempts": meta.get("attempts"),
                 "request_ids": [meta.get("request_id")] if meta.get("request_id") else [],
-                "fail_reasons": [{"attempt": i+1, "message": r} for i, r in enumerate(meta.get("attempt_fail_reasons", []))]
+                "fail_reasons": [{"attempt": i+1, "message": r} for i, r in enumerate(meta.get("attempt_fail_reasons", []))],
+                "reason": str(e),
+                "deadline_remaining_ms": meta.get("deadline_remaining_ms")
             })
 
     logger.info(f"[ORACLE] Spec Meta: {spec_meta}")
@@ -444,7 +609,10 @@ def create_spec(task_id: str, body: SpecBody, db: Session = Depends(get_db)) ->
             current_assumptions.append(f"[Internal] {w['message']}")
         spec_json["assumptions"] = current_assumptions
 
-    conf0, conf_reasons0 = compute_initial_confidence(spec_json)
+    # Answers given on the parent carry over for ambiguities that did not change.
+    carried = _carry_over_confirmations(parent, user_facing_ambiguities) if parent is not None else {}
+    all_carried = bool(user_facing_ambiguities) and len(carried) == len(user_facing_ambiguities)
+    conf0, conf_reasons0 = compute_initial_confidence(spec_json, confirmations={"selections": carried} if carried else None)
     
     # 4) Return-Type Consistency Guard (Post-Processing)
     # Detect if "return None" is implied but signature returns atomic type
@@ -474,10 +642,10 @@ def create_spec(task_id: str, body: SpecBody, db: Session = Depends(get_db)) ->
             # Cap confidence slightly to reflect the ambiguity correction
             conf0 = min(conf0, 0.85)
             
-    status = "awaiting_confirmation" if len(user_facing_ambiguities) > 0 else "ready"
+    status = "awaiting_confirmation" if len(user_facing_ambiguities) > 0 and not all_carried else "ready"
     
     # 5) Confidence floor for valid specs without user ambiguities
-    status = "awaiting_confirmation" if len(user_facing_ambiguities) > 0 else "ready"
+    status = "awaiting_confirmation" if len(user_facing_ambiguities) > 0 and not all_carried else "ready"
     
     # 5) Confidence floor for valid specs without user ambiguities
     if len(user_facing_ambiguities) == 0 and conf0 < 0.4:
@@ -486,6 +654,8 @@ def create_spec(task_id: str, body: SpecBody, db: Session = Depends(get_db)) ->
         
     if conf0 < 0.4:
         status = "low_confidence"
+    elif neighbor is not None and warm_mode == "reuse":
+        status = "awaiting_confirmation"
 
     seed = int(abs(hash(version_id)) % (2**31 - 1))
     public_examples_json = [e.model_dump() for e in spec.public_examples]
@@ -495,22 +665,28 @@ def create_spec(task_id: str, body: SpecBody, db: Session = Depends(get_db)) ->
     v = models.OracleTaskVersion(
         version_id=version_id,
         task_id=task_id,
-        version_number=ver_n,
         status=status,
         created_at=now(),
+        task_description=body.task_description,
+        parent_version_id=parent.version_id if parent is not None else None,
         spec_json=spec_json,
         ambiguities_json=user_facing_ambiguities,
-        user_confirmations_json={},
+        user_confirmations_json={"selections": carried} if carried else {},
         public_examples_json=public_examples_json,
         hidden_tests_json=hidden_tests_json,
         oracle_confidence=float(conf0),
-        conflict_report_json={"confidence_reasons": conf_reasons0},
+        conflict_report_json={
+            "confidence_reasons": conf_reasons0,
+            "local_repairs": spec_meta.get("local_repairs") or [],
+            "routing": spec_meta.get("routing"),
+            "warm_start": warm_start_info,
+            "incremental": spec_meta.get("incremental"),
+            "carried_confirmations": sorted(carried),
+        },
         seed=seed,
         hash=bundle_hash,
     )
     # Observability - assign after init to ensure it sticks
-    v.spec_llm_raw_json = spec_meta.get("raw_text")
-    v.llm_raw_spec_json = spec_meta.get("raw_text")
     v.spec_prompt_version = spec_meta.get("prompt_version")
     
     # Trace B1 - Map from llm_oracle metadata
@@ -525,8 +701,14 @@ def create_spec(task_id: str, body: SpecBody, db: Session = Depends(get_db)) ->
     v.attempt_fail_reasons_json = spec_meta.get("attempt_fail_reasons")
     v.missing_fields_json = spec_meta.get("missing_fields")
 
-    db.add(v)
-    db.commit()
+    _insert_version(db, v, spec_meta.get("raw_text"))
+    if not body.debug_invalid_mock:
+        similarity_index.add(version_id, body.task_description, scope)
+
+    # Speculative stage: a spec that needs no confirmation will almost always be followed by
+    # /generate-tests with default parameters, so start that LLM call now.
+    if status == "ready" and not body.debug_invalid_mock and ORACLE_SPECULATIVE_TESTS:
+        _start_speculative_tests(version_id, spec_json, seed, v.user_confirmations_json or {})
 
     # 3.3 Logs must reflect reality
     logger.info(f"[ANALYZE] version_id={version_id} provider={v.llm_provider_used} model={v.llm_model_used} attempts={v.attempts} status={status} latency_ms={v.llm_latency_ms} request_id={v.spec_llm_request_id}")
@@ -548,9 +730,144 @@ def create_spec(task_id: str, body: SpecBody, db: Session = Depends(get_db)) ->
         "oracle_confidence_initial": float(conf0),
         "confidence_reasons": conf_reasons0,
         "log_id": log_id,
+        "deadline_remaining_ms": spec_meta.get("deadline_remaining_ms"),
+        "warm_start": warm_start_info,
     }
 
 
+def _resolve_parent(db: Session, task_id: str, parent_version_id: Optional[str]) -> Optional[models.OracleTaskVersion]:
+    """Explicit parent (must belong to the task), else the latest version with a usable spec and description."""
+    if parent_version_id:
+        parent = _get_version(db, parent_version_id)
+        if parent.task_id != task_id:
+            raise HTTPException(status_code=400, detail="parent_version_not_in_task")
+        return parent if parent.task_description and parent.spec_json else None
+    return (
+        db.query(models.OracleTaskVersion)
+        .filter(
+            models.OracleTaskVersion.task_id == task_id,
+            models.OracleTaskVersion.task_description.isnot(None),
+            models.OracleTaskVersion.status != "analyze_failed",
+        )
+        .order_by(models.OracleTaskVersion.version_number.desc())
+        .first()
+    )
+
+
+def _analyze_incremental(body: SpecBody, parent: models.OracleTaskVersion) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    if not parent.spec_json or parent.spec_json.get("deliverable") != body.deliverable_type:
+        return None
+    try:
+        return reanalyze_spec_with_llm(
+            prior_spec=parent.spec_json,
+            prior_description=parent.task_description or "",
+            task_description=body.task_description,
+            language=body.language,
+            runtime=body.runtime,
+            deliverable_type=body.deliverable_type,
+            deadline_seconds=body.deadline_seconds,
+        )
+    except OracleAnalyzeError as e:
+        logger.info(f"[oracle] incremental analyze failed parent_version_id={parent.version_id} reason={e} fail_reasons={e.metadata.get('attempt_fail_reasons')}; analyzing from scratch")
+        return None
+
+
+def _carry_over_confirmations(parent: models.OracleTaskVersion, ambiguities: List[Dict[str, Any]]) -> Dict[str, str]:
+    """Parent selections for ambiguities whose question and choices are unchanged."""
+    confirmations = parent.user_confirmations_json if isinstance(parent.user_confirmations_json, dict) else {}
+    selections = confirmations.get("selections") or {}
+    previous = {str(a.get("ambiguity_id")): a for a in (parent.ambiguities_json or []) if isinstance(a, dict)}
+    carried: Dict[str, str] = {}
+    for amb in ambiguities:
+        aid = str(amb.get("ambiguity_id") or "")
+        old = previous.get(aid)
+        if not aid or old is None or aid not in selections:
+            continue
+        same_question = (old.get("question") or old.get("description")) == (amb.get("question") or amb.get("description"))
+        if same_question and old.get("choices") == amb.get("choices"):
+            carried[aid] = str(selections[aid])
+    return carried
+
+
+def _find_warm_start(db: Session, task_description: str, scope: str) -> Optional[Tuple[SimilarMatch, models.OracleTaskVersion]]:
+    """Closest analyzed task above ORACLE_WARM_START_THRESHOLD whose version still has a usable spec."""
+    skip: set = set()
+    for _ in range(3):
+        match = similarity_index.query(task_description, scope, ORACLE_WARM_START_THRESHOLD, exclude=skip)
+        if match is None:
+            return None
+        prior = db.query(models.OracleTaskVersion).filter(models.OracleTaskVersion.version_id == match.version_id).first()
+        if prior is not None and prior.spec_json and prior.status != "analyze_failed":
+            return match, prior
+        skip.add(match.version_id)
+    return None
+
+
+def _reference_for_expansion(spec_json: Dict[str, Any], confirmations: Dict[str, Any], examples: List[Dict[str, Any]]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    LLM-mode bundles carry no reference, so local expansion asks for one. It is only used if it
+    reproduces the bundle's public examples; otherwise expanded tests could contradict them.
+    Returns (code, None) or (None, drop_reason).
+    """
+    code, meta = generate_reference_solution(spec_json, confirmations)
+    if not code:
+        logger.info(f"[oracle] expansion reference unavailable err={meta.get('error')}")
+        return None, "expansion_no_reference"
+    checks = [e for e in examples if isinstance(e, dict) and e.get("name") and "input" in e]
+    kept, drops = fill_expected_from_reference(spec_json, code, [{"name": e["name"], "input": e["input"]} for e in checks])
+    got = {t["name"]: t["expected"] for t in kept}
+    stdio = (spec_json.get("deliverable") or "function") != "function"
+
+    def same(e: Dict[str, Any]) -> bool:
+        if e["name"] not in got:
+            return False
+        if not stdio:
+            return got[e["name"]] == e.get("expected")
+        expected = e.get("expected")
+        expected = expected.get("stdout") if isinstance(expected, dict) else expected
+        return str(got[e["name"]]).strip() == str(expected).strip()
+
+    mismatched = [e["name"] for e in checks if not same(e)]
+    if drops or mismatched:
+        logger.info(f"[oracle] expansion reference rejected mismatched={mismatched} drops={drops}")
+        return None, "expansion_reference_mismatch"
+    return code, None
+
+
+def _tests_generator(expected_mode: str):
+    return generate_tests_with_reference if expected_mode == "reference" else generate_tests_with_llm
+
+
+def _start_speculative_tests(version_id: str, spec_json: Dict[str, Any], seed: int, confirmations: Dict[str, Any]) -> None:
+    # Keyed on the version's confirmations (carried over from its parent on a revision), exactly
+    # as /generate-tests will key its lookup.
+    defaults = GenerateTestsBody()
+    confirmations_copy = json.loads(json.dumps(confirmations))
+    key = speculation_key(
+        spec_json=spec_json,
+        confirmations=confirmations_copy,
+        public_examples_count=defaults.public_examples_count,
+        hidden_tests_count=defaults.hidden_tests_count,
+        difficulty_profile=defaults.difficulty_profile,
+        seed=seed,
+        expected_mode=ORACLE_TESTS_EXPECTED_MODE,
+    )
+    spec_copy = json.loads(json.dumps(spec_json))
+    generate = _tests_generator(ORACLE_TESTS_EXPECTED_MODE)
+    speculative_tests.start(
+        version_id,
+        key,
+        lambda: generate(
+            spec_json=spec_copy,
+            confirmations=confirmations_copy,
+            public_examples_count=defaults.public_examples_count,
+            hidden_tests_count=defaults.hidden_tests_count,
+            difficulty_profile=defaults.difficulty_profile,
+            seed=seed,
+        ),
+    )
+
+
 @router.post("/version/{version_id}/confirm", response_model=ConfirmResp)
 def confirm_version(version_id: str, body: ConfirmBody, db: Session = Depends(get_db)) -> Dict[str, Any]:
     v = _get_version(db, version_id)
@@ -563,6 +880,8 @@ def confirm_version(version_id: str, body: ConfirmBody, db: Session = Depends(ge
                 aid = str(a.get("ambiguity_id") or "")
                 if aid and aid not in body.selections:
                     raise HTTPException(status_code=400, detail=f"missing_confirmation:{aid}")
+    previous = (v.user_confirmations_json or {}).get("selections") if isinstance(v.user_confirmations_json, dict) else None
+    selections_changed = previous != dict(body.selections)
     v.user_confirmations_json = {"selections": dict(body.selections)}
     if v.status != "low_confidence":
         v.status = "ready"
@@ -579,9 +898,13 @@ def confirm_version(version_id: str, body: ConfirmBody, db: Session = Depends(ge
         conflict_report = {}
     conflict_report["confidence_reasons"] = reasons_new
     v.conflict_report_json = conflict_report
-        
-    db.add(v)
-    db.commit()
+
+    _save_version(
+        db, v, ["user_confirmations_json", "status", "oracle_confidence", "conflict_report_json"],
+        also=(lambda w, row: invalidate_version(w, version_id)) if selections_changed else None,
+    )
+    if selections_changed:
+        speculative_tests.discard(version_id)
     log_id = new_uuid()
     logger.info(f"[oracle] confirm log_id={log_id} version_id={version_id} status={v.status} new_conf={v.oracle_confidence}")
     return {"version_id": version_id, "status": v.status, "log_id": log_id}
@@ -597,8 +920,25 @@ def generate_tests(version_id: str, body: GenerateTestsBody, db: Session = Depen
         raise HTTPException(status_code=400, detail="ambiguities_not_confirmed")
 
     seed = int(v.seed or 0) or int(abs(hash(version_id)) % (2**31 - 1))
+    speculative_hit = False
+    expected_mode = body.expected_mode or ORACLE_TESTS_EXPECTED_MODE
+    cache_key = bundle_cache_key(
+        spec_json=spec_json,
+        selections=confirmations.get("selections") if isinstance(confirmations, dict) else {},
+        public_examples_count=int(body.public_examples_count),
+        hidden_tests_count=int(body.hidden_tests_count),
+        difficulty_profile=body.difficulty_profile,
+        seed=seed,
+        expected_mode=expected_mode,
+        prompt_version=PROMPT_VERSION,
+        model=ZHIPU_MODEL,
+    )
+    cached = None if body.debug_invalid_mock else get_cached_bundle(db, cache_key)
+    cache_hit = cached is not None
     
-    if body.debug_invalid_mock:
+    if cached is not None:
+        tests_json, tests_meta = cached
+    elif body.debug_invalid_mock:
         tests_json, tests_meta = mock_generate_tests(
             spec_json=spec_json,
             confirmations=confirmations if isinstance(confirmations, dict) else {},
@@ -609,14 +949,28 @@ def generate_tests(version_id: str, body: GenerateTestsBody, db: Session = Depen
             debug_invalid_mock=True,
         )
     else:
-        tests_json, tests_meta = generate_tests_with_llm(
+        key = speculation_key(
             spec_json=spec_json,
             confirmations=confirmations if isinstance(confirmations, dict) else {},
             public_examples_count=int(body.public_examples_count),
             hidden_tests_count=int(body.hidden_tests_count),
             difficulty_profile=body.difficulty_profile,
-            seed=seed
+            seed=seed,
+            expected_mode=expected_mode,
         )
+        joined = speculative_tests.take(version_id, key, timeout=LLM_TIMEOUT_SECONDS)
+        if joined is not None:
+            tests_json, tests_meta = joined
+            speculative_hit = True
+        else:
+            tests_json, tests_meta = _tests_generator(expected_mode)(
+                spec_json=spec_json,
+                confirmations=confirmations if isinstance(confirmations, dict) else {},
+                public_examples_count=int(body.public_examples_count),
+                hidden_tests_count=int(body.hidden_tests_count),
+                difficulty_profile=body.difficulty_profile,
+                seed=seed
+            )
 
     try:
         bundle = GeneratedTests.model_validate(tests_json)
@@ -631,6 +985,12 @@ def generate_tests(version_id: str, body: GenerateTestsBody, db: Session = Depen
     raw_hidden = [t.model_dump() for t in bundle.hidden_tests]
     filtered: List[Dict[str, Any]] = []
     drop_reasons: List[str] = []
+    if (tests_meta.get("merge_stats") or {}).get("duplicates_dropped"):
+        drop_reasons.append("duplicate")
+    if any(not c.get("ok") for c in tests_meta.get("chunks") or []):
+        drop_reasons.append("chunk_failed")
+    for d in tests_meta.get("reference_drops") or []:
+        drop_reasons.append(str(d.get("reason")))
     seen_name: set[str] = set()
     for t in raw_hidden:
         if not isinstance(t, dict):
@@ -653,7 +1013,32 @@ def generate_tests(version_id: str, body: GenerateTestsBody, db: Session = Depen
             uniq_reasons.append(r)
     dropped = max(0, requested_hidden - len(filtered))
 
-    hidden_tests_json = filtered
+    expansion_stats: Optional[Dict[str, Any]] = None
+    expanded: List[Dict[str, Any]] = []
+    attached_reference: Optional[str] = None
+    if body.local_expansion_count > 0:
+        reference_code = tests_meta.get("reference_solution") or ((v.conflict_report_json or {}).get("reference_solution") or {}).get("code")
+        missing_reason = "expansion_no_reference"
+        if not reference_code and not body.debug_invalid_mock:
+            reference_code, missing_reason = _reference_for_expansion(
+                spec_json, confirmations if isinstance(confirmations, dict) else {}, public_examples_json
+            )
+            attached_reference = reference_code
+        if reference_code:
+            expanded, expansion_stats = expand_tests(
+                spec_json=spec_json,
+                examples=public_examples_json + filtered,
+                reference_code=reference_code,
+                count=int(body.local_expansion_count),
+                seed=seed,
+            )
+            if expansion_stats["kept"] < int(body.local_expansion_count):
+                drop_reasons.append("expansion_insufficient")
+        else:
+            drop_reasons.append(missing_reason)
+        uniq_reasons = list(dict.fromkeys(drop_reasons))
+
+    hidden_tests_json = filtered + expanded
     h = compute_bundle_hash(spec_json=spec_json, public_examples_json=public_examples_json, hidden_tests_json=hidden_tests_json, seed=seed)
 
     conf1, reasons1 = compute_post_tests_confidence(initial=float(v.oracle_confidence or 0.0), hidden_tests=hidden_tests_json)
@@ -680,19 +1065,39 @@ def generate_tests(version_id: str, body: GenerateTestsBody, db: Session = Depen
         "dropped_hidden_tests_count": int(dropped),
         "drop_reasons": uniq_reasons,
     }
+    if tests_meta.get("chunks"):
+        conflict_report["tests_generation_chunks"] = tests_meta["chunks"]
+    if tests_meta.get("reference_solution"):
+        # Kept with the version so expected values can be recomputed or extended later
+        conflict_report["reference_solution"] = {
+            "code": tests_meta["reference_solution"],
+            "drops": tests_meta.get("reference_drops") or [],
+        }
+    elif attached_reference:
+        conflict_report["reference_solution"] = {"code": attached_reference, "drops": [], "source": "local_expansion"}
+    if expansion_stats is not None:
+        conflict_report["local_expansion"] = expansion_stats
     v.conflict_report_json = conflict_report
     v.status = status
     
     # Observability
-    v.tests_llm_raw_json = tests_meta.get("raw_text")
-    v.llm_raw_tests_json = tests_meta.get("raw_text")
     v.tests_prompt_version = tests_meta.get("prompt_version")
-    
-    db.add(v)
-    db.commit()
+
+    def also(w: Session, row: models.OracleTaskVersion) -> None:
+        row.tests_llm_raw_json = row.llm_raw_tests_json = blob_store.offload_json(w, tests_meta.get("raw_text"))
+        if cache_hit:
+            record_hit(w, cache_key)
+        elif not body.debug_invalid_mock:
+            store_bundle(w, cache_key, version_id, tests_json, tests_meta)
+
+    _save_version(
+        db, v,
+        ["public_examples_json", "hidden_tests_json", "seed", "hash", "oracle_confidence", "conflict_report_json", "status", "tests_prompt_version"],
+        also=also,
+    )
 
     log_id = new_uuid()
-    logger.info(f"[oracle] generate_tests log_id={log_id} version_id={version_id} status={v.status} conf={conf1} hidden={len(hidden_tests_json)}")
+    logger.info(f"[oracle] generate_tests log_id={log_id} version_id={version_id} status={v.status} conf={conf1} hidden={len(hidden_tests_json)} speculative_hit={speculative_hit} cache_hit={cache_hit}")
     return {
         "version_id": version_id,
         "status": v.status,
@@ -707,6 +1112,9 @@ def generate_tests(version_id: str, body: GenerateTestsBody, db: Session = Depen
         "hash": h,
         "seed": seed,
         "log_id": log_id,
+        "speculative_hit": speculative_hit,
+        "expanded_hidden_tests_count": len(expanded),
+        "cache_hit": cache_hit,
     }
 
 
@@ -860,8 +1268,13 @@ def run_oracle(version_id: str, body: RunBody, db: Session = Depends(get_db)) ->
         stderr_trunc=stderr_t,
         sandbox_exit_code=exec_result.get("exit_code"),
     )
-    db.add(r)
-    db.commit()
+
+    def insert_run(w: Session) -> None:
+        for col in ("code_text", "stdout_trunc", "stderr_trunc"):
+            setattr(r, col, blob_store.offload_text(w, getattr(r, col)))
+        w.add(r)
+
+    commit_queue.run(insert_run, db)
 
     log_id = new_uuid()
     logger.info(f"[oracle] run log_id={log_id} run_id={run_id} version_id={version_id} pass_rate={pass_rate} passed={passed} failed={failed}")
@@ -882,15 +1295,28 @@ def run_oracle(version_id: str, body: RunBody, db: Session = Depends(get_db)) ->
 
 @router.post("/task/{task_id}/version", response_model=Dict[str, Any])
 def new_version(task_id: str, body: SpecBody, db: Session = Depends(get_db)) -> Dict[str, Any]:
-    resp = create_spec(task_id, body, db)
+    parent = _resolve_parent(db, task_id, body.parent_version_id) if body.incremental else None
+    resp = _create_spec_version(task_id, body, db, parent)
     v = _get_version(db, resp["version_id"])
-    return {"new_version_id": v.version_id, "version_number": int(v.version_number or 0)}
+    return {
+        "new_version_id": v.version_id,
+        "version_number": int(v.version_number or 0),
+        "parent_version_id": v.parent_version_id,
+        "incremental": bool((v.conflict_report_json or {}).get("incremental")),
+        "status": v.status,
+    }
 
 
 @router.get("/task/{task_id}", response_model=Dict[str, Any])
 def get_task(task_id: str, db: Session = Depends(get_db)) -> Dict[str, Any]:
     t = _get_task(db, task_id)
-    vers = db.query(models.OracleTaskVersion).filter(models.OracleTaskVersion.task_id == task_id).order_by(models.OracleTaskVersion.version_number.asc()).all()
+    V = models.OracleTaskVersion
+    # Listing only needs the summary columns; spec, reports and raw LLM payloads stay in the database.
+    vers = db.query(V)\
+        .options(load_only(V.version_id, V.version_number, V.status, V.created_at, V.oracle_confidence, V.public_examples_json, V.hidden_tests_json, V.hash))\
+        .filter(V.task_id == task_id)\
+        .order_by(V.version_number.asc())\
+        .all()
     out = []
     for v in vers:
         hidden_tests = v.hidden_tests_json or []
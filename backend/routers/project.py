@@ -4,6 +4,11 @@ from backend.database import get_db
 from backend import models, schemas, utils
 from backend.services.chat_service import ChatService
 from backend.services.observation_logger import observation_logger, ObservationEventContext
+from backend.services.code_store import code_store
+from backend.services.commit_queue import commit_queue
+from backend.services.retention import retention
+from backend.sharding import CATALOG, shard_router
+from backend.config import RETENTION_ARCHIVE_ON_DELETE
 from typing import List, Dict, Optional
 import os
 import json
@@ -50,9 +55,9 @@ def create_workspace(workspace: schemas.WorkspaceCreate, db: Session = Depends(g
         id=utils.uid("ws"),
         name=workspace.name
     )
-    db.add(db_ws)
-    db.commit()
-    db.refresh(db_ws)
+    commit_queue.run(lambda w: w.add(db_ws), db)
+    if shard_router.enabled:
+        shard_router.ensure_workspace(db_ws.id)
     return db_ws
 
 @router.get("/workspaces", response_model=List[schemas.Workspace])
@@ -69,9 +74,10 @@ def get_default_session(db: Session = Depends(get_db)):
         workspace = db.query(models.Workspace).first()
         if not workspace:
             workspace = models.Workspace(id=utils.uid("ws"), name="Default Workspace")
-            db.add(workspace)
-            db.commit()
-            db.refresh(workspace)
+            commit_queue.run(lambda w: w.add(workspace), db)
+            if shard_router.enabled:
+                # This request runs on the catalog, so the default session lives there.
+                shard_router.assign(workspace.id, CATALOG)
             
         # Create default session
         session = models.Session(
@@ -80,18 +86,16 @@ def get_default_session(db: Session = Depends(get_db)):
             title="Default Session",
             language="python"
         )
-        db.add(session)
-        db.commit()
-        db.refresh(session)
+        commit_queue.run(lambda w: w.add(session), db)
         
         # Seed General thread
-        chat_service = ChatService(db)
-        chat_service.create_thread(schemas.ThreadCreate(
+        general = schemas.ThreadCreate(
             session_id=session.id,
             type="global",
             title="General",
             summary="Global discussion"
-        ))
+        )
+        commit_queue.run(lambda w: ChatService(w).create_thread(general), db)
     
     # Get general thread id
     general_thread = db.query(models.Thread)\
@@ -119,6 +123,10 @@ def get_default_session(db: Session = Depends(get_db)):
 def create_session(session: schemas.SessionCreate, db: Session = Depends(get_db)):
     # Verify workspace exists
     ws = db.query(models.Workspace).filter(models.Workspace.id == session.workspace_id).first()
+    if not ws and shard_router.enabled:
+        # Workspace created before sharding was switched on: copy it into its shard.
+        shard_router.ensure_workspace(session.workspace_id)
+        ws = db.query(models.Workspace).filter(models.Workspace.id == session.workspace_id).first()
     if not ws:
         raise HTTPException(status_code=404, detail="Workspace not found")
         
@@ -128,18 +136,16 @@ def create_session(session: schemas.SessionCreate, db: Session = Depends(get_db)
         title=session.title,
         language=session.language
     )
-    db.add(db_session)
-    db.commit()
-    db.refresh(db_session)
+    commit_queue.run(lambda w: w.add(db_session), db)
     
     # Auto-seed General thread
-    chat_service = ChatService(db)
-    chat_service.create_thread(schemas.ThreadCreate(
+    general = schemas.ThreadCreate(
         session_id=db_session.id,
         type="global",
         title="General",
         summary="Global discussion"
-    ))
+    )
+    commit_queue.run(lambda w: ChatService(w).create_thread(general), db)
 
     try:
         observation_logger.ensure_session_started(
@@ -155,29 +161,37 @@ def create_session(session: schemas.SessionCreate, db: Session = Depends(get_db)
 
 @router.get("/sessions", response_model=List[schemas.Session])
 def get_sessions(workspace_id: str = None, db: Session = Depends(get_db)):
-    query = db.query(models.Session)
-    if workspace_id:
-        query = query.filter(models.Session.workspace_id == workspace_id)
-    return query.order_by(models.Session.updated_at.desc()).all()
+    def list_sessions(db: Session) -> List[schemas.Session]:
+        query = db.query(models.Session)
+        if workspace_id:
+            query = query.filter(models.Session.workspace_id == workspace_id)
+        return [schemas.Session.model_validate(s) for s in query.order_by(models.Session.updated_at.desc())]
+
+    if not shard_router.enabled:
+        return list_sessions(db)
+    # A workspace's sessions may still sit on the catalog (created before sharding or a move).
+    found = [s for rows in shard_router.scatter(list_sessions).values() if isinstance(rows, list) for s in rows]
+    return sorted(found, key=lambda s: s.updated_at, reverse=True)
 
 @router.delete("/sessions/{session_id}")
 def delete_session(session_id: str, db: Session = Depends(get_db)):
     sess = db.query(models.Session).filter(models.Session.id == session_id).first()
     if not sess:
         raise HTTPException(status_code=404, detail="Session not found")
-    
-    # Cascade delete (if not handled by DB FKs)
-    # Deleting threads, snapshots, etc. might be needed if cascade isn't set up.
-    # Assuming DB cascade or manual cleanup. Let's do manual to be safe for now.
-    db.query(models.CodeSnapshot).filter(models.CodeSnapshot.session_id == session_id).delete()
-    db.query(models.Thread).filter(models.Thread.session_id == session_id).delete()
-    db.query(models.EventLog).filter(models.EventLog.session_id == session_id).delete()
-    db.query(models.Marker).filter(models.Marker.session_id == session_id).delete()
-    
-    db.delete(sess)
-    db.commit()
+
+    # Every table hanging off the session (messages, code states, diagnoses, AI runs, ...), archived
+    # first so POST /sessions/{id}/restore can bring it back.
+    commit_queue.run(lambda w: retention.purge_session(w, session_id, reason="deleted", archive=RETENTION_ARCHIVE_ON_DELETE), db)
     return {"ok": True, "deleted_id": session_id}
 
+@router.post("/sessions/{session_id}/restore")
+def restore_session(session_id: str, db: Session = Depends(get_db)):
+    """Re-insert a session's archived rows (deleted or aged out by retention) that are not in the DB."""
+    counts = commit_queue.run(lambda w: retention.restore(w, session_id), db)
+    if counts is None:
+        raise HTTPException(status_code=404, detail="No archive for session")
+    return {"ok": True, "session_id": session_id, "restored": counts}
+
 @router.get("/sessions/{session_id}", response_model=schemas.Session)
 def get_session(session_id: str, db: Session = Depends(get_db)):
     sess = db.query(models.Session).filter(models.Session.id == session_id).first()
@@ -190,6 +204,16 @@ def get_session_threads(session_id: str, db: Session = Depends(get_db)):
     return db.query(models.Thread).filter(models.Thread.session_id == session_id).all()
 
 # --- CodeSnapshot API ---
+def _snapshot_out(db: Session, snap: models.CodeSnapshot, content: Optional[str] = None) -> schemas.CodeSnapshot:
+    return schemas.CodeSnapshot(
+        id=snap.id,
+        session_id=snap.session_id,
+        content=content if content is not None else code_store.content_of(db, snap),
+        cursor_line=snap.cursor_line,
+        cursor_col=snap.cursor_col,
+        created_at=snap.created_at,
+    )
+
 @router.post("/sessions/{session_id}/code", response_model=schemas.CodeSnapshot)
 def save_code_snapshot(session_id: str, snapshot: schemas.CodeSnapshotCreate, db: Session = Depends(get_db)):
     # Verify session
@@ -197,20 +221,22 @@ def save_code_snapshot(session_id: str, snapshot: schemas.CodeSnapshotCreate, db
     if not sess:
         raise HTTPException(status_code=404, detail="Session not found")
         
-    db_snap = models.CodeSnapshot(
-        id=utils.uid("snap"),
-        session_id=session_id,
-        content=snapshot.content,
-        cursor_line=snapshot.cursor_line,
-        cursor_col=snapshot.cursor_col
-    )
-    db.add(db_snap)
-    
-    # Update session updated_at
-    sess.updated_at = utils.now()
-    
-    db.commit()
-    db.refresh(db_snap)
+    def insert_snapshot(w: Session) -> models.CodeSnapshot:
+        # Encoded on the writer so the delta base is the latest committed snapshot.
+        db_snap = models.CodeSnapshot(
+            id=utils.uid("snap"),
+            session_id=session_id,
+            cursor_line=snapshot.cursor_line,
+            cursor_col=snapshot.cursor_col,
+            **code_store.encode(w, models.CodeSnapshot, session_id, snapshot.content)
+        )
+        w.add(db_snap)
+        # Update session updated_at
+        w.get(models.Session, session_id).updated_at = utils.now()
+        return db_snap
+
+    db_snap = commit_queue.run(insert_snapshot, db)
+    code_store.remember(db_snap, snapshot.content)
 
     try:
         file_content = snapshot.content
@@ -238,7 +264,7 @@ def save_code_snapshot(session_id: str, snapshot: schemas.CodeSnapshotCreate, db
         )
     except Exception:
         pass
-    return db_snap
+    return _snapshot_out(db, db_snap, snapshot.content)
 
 @router.post("/session/{session_id}/snapshot", response_model=schemas.CodeSnapshot)
 def save_code_snapshot_alias(session_id: str, snapshot: schemas.CodeSnapshotCreate, db: Session = Depends(get_db)):
@@ -264,7 +290,7 @@ def get_latest_code(session_id: str, db: Session = Depends(get_db)):
         
     if not snap:
         raise HTTPException(status_code=404, detail="No code snapshots found for this session")
-    return snap
+    return _snapshot_out(db, snap)
 
 # --- Replay API ---
 @router.get("/session/{session_id}/replay")
@@ -306,7 +332,7 @@ def replay_session(session_id: str, db: Session = Depends(get_db)):
         "session": sess,
         "threads": threads,
         "markers": markers,
-        "latest_snapshot": snap,
+        "latest_snapshot": _snapshot_out(db, snap) if snap else None,
         "messages": messages
     }
 
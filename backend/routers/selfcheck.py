@@ -3,6 +3,12 @@ import datetime
 import platform
 import sys
 
+from backend.database import self_check as db_self_check
+from backend.services.write_behind import write_behind
+from backend.services.commit_queue import commit_queue
+from backend.services.retention import retention
+from backend.sharding import shard_router
+
 router = APIRouter()
 
 @router.get("/runtime/spec")
@@ -19,3 +25,16 @@ def selfcheck():
         "ok": True,
         "timestamp": datetime.datetime.now().isoformat()
     }
+
+@router.get("/selfcheck/db")
+def selfcheck_db():
+    info = db_self_check()
+    return {
+        "ok": not info["warnings"],
+        "db": info,
+        "write_behind": write_behind.stats(),
+        "commit_queue": commit_queue.stats(),
+        "retention": retention.stats(),
+        "sharding": shard_router.stats(),
+        "timestamp": datetime.datetime.now().isoformat()
+    }
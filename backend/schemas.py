@@ -118,6 +118,15 @@ class EventLog(BaseSchema):
     code_state_id: Optional[str] = None
     created_at: float
 
+class EventBatchCreate(BaseModel):
+    events: List[EventLogCreate] # in client order
+
+class EventBatchResult(BaseModel):
+    session_id: str
+    accepted: int
+    event_ids: List[str]
+    triggered_event_ids: List[str]
+
 # --- AIRun ---
 class AIRun(BaseSchema):
     id: str
@@ -0,0 +1,240 @@
+import hashlib
+import json
+import logging
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from backend import models
+from backend.config import BLOB_OFFLOAD_MIN_BYTES, BLOB_PREVIEW_CHARS, BLOB_CACHE_ENTRIES
+from backend.utils import now
+
+logger = logging.getLogger("Backend")
+
+# Content-addressed, zlib-compressed storage for large column values (the `blobs` table).
+# Values at or above BLOB_OFFLOAD_MIN_BYTES are replaced in their column by a reference:
+#   Text columns: "blob:sha256:<hex>"
+#   JSON columns: {"$blob": "<hex>", "size": <bytes>}
+#   EventLog.payload: long top-level strings become a preview; payload["_blobs"][key] = "<hex>"
+# Identical values (e.g. the duplicated raw LLM columns) share one blob. load()/load_payload()
+# resolve references; anything else passes through unchanged, so old rows keep working.
+
+TEXT_REF_PREFIX = "blob:sha256:"
+JSON_REF_KEY = "$blob"
+PAYLOAD_REFS_KEY = "_blobs"
+CODEC = "zlib"
+
+# Columns that may hold references, by table: "json" | "text" | "payload" (see above).
+OFFLOADED: Dict[str, Dict[str, str]] = {
+    "oracle_task_versions": {"spec_llm_raw_json": "json", "llm_raw_spec_json": "json", "tests_llm_raw_json": "json", "llm_raw_tests_json": "json"},
+    "oracle_runs": {"code_text": "text", "stdout_trunc": "text", "stderr_trunc": "text"},
+    "event_logs": {"payload": "payload"},
+}
+
+
+def digest_of(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def pack(data: bytes) -> Dict[str, Any]:
+    """Row for the blobs table (also used by the backfill migration)."""
+    return {"digest": digest_of(data), "codec": CODEC, "size": len(data), "data": zlib.compress(data, 6), "created_at": now()}
+
+
+def unpack(codec: str, data: bytes) -> bytes:
+    if codec == CODEC:
+        return zlib.decompress(data)
+    return bytes(data)
+
+
+def text_ref(digest: str) -> str:
+    return TEXT_REF_PREFIX + digest
+
+
+def json_ref(digest: str, size: int) -> Dict[str, Any]:
+    return {JSON_REF_KEY: digest, "size": size}
+
+
+def ref_digest(value: Any) -> Optional[str]:
+    if isinstance(value, str) and value.startswith(TEXT_REF_PREFIX) and len(value) == len(TEXT_REF_PREFIX) + 64:
+        return value[len(TEXT_REF_PREFIX):]
+    if isinstance(value, dict) and set(value) == {JSON_REF_KEY, "size"}:
+        return str(value[JSON_REF_KEY])
+    return None
+
+
+def upsert(db: Session, row: Dict[str, Any]) -> None:
+    """
+    INSERT the blob row inside the caller's transaction. If the digest already exists only its
+    created_at is refreshed, so the retention GC grace period also covers reused blobs.
+    """
+    dialect = db.get_bind().dialect.name
+    table = models.Blob.__table__
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table).values(**row)
+        db.execute(stmt.on_conflict_do_update(index_elements=["digest"], set_={"created_at": stmt.excluded.created_at}))
+        return
+    existing = db.get(models.Blob, row["digest"])
+    if existing is None:
+        db.add(models.Blob(**row))
+    else:
+        existing.created_at = row["created_at"]
+    db.flush()
+
+
+class BlobStore:
+    def __init__(
+        self,
+        min_bytes: int = BLOB_OFFLOAD_MIN_BYTES,
+        preview_chars: int = BLOB_PREVIEW_CHARS,
+        cache_entries: int = BLOB_CACHE_ENTRIES,
+    ):
+        self.min_bytes = max(1, int(min_bytes))
+        self.preview_chars = max(0, int(preview_chars))
+        self._cache_entries = max(0, int(cache_entries))
+        self._cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, db: Session, data: bytes) -> str:
+        row = pack(data)
+        upsert(db, row)
+        return row["digest"]
+
+    def get(self, db: Session, digest: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._cache.get(digest)
+            if data is not None:
+                self._cache.move_to_end(digest)
+                return data
+        row = db.get(models.Blob, digest)
+        if row is None:
+            logger.error(f"[blob_store] missing blob digest={digest}")
+            return None
+        data = unpack(row.codec, row.data)
+        if self._cache_entries:
+            with self._lock:
+                self._cache[digest] = data
+                while len(self._cache) > self._cache_entries:
+                    self._cache.popitem(last=False)
+        return data
+
+    # --- write side: replace large values by references ---
+
+    def offload_text(self, db: Session, value: Optional[str]) -> Optional[str]:
+        if not isinstance(value, str):
+            return value
+        data = value.encode("utf-8")
+        if len(data) < self.min_bytes:
+            return value
+        return text_ref(self.put(db, data))
+
+    def offload_json(self, db: Session, value: Any) -> Any:
+        if value is None:
+            return None
+        data = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        if len(data) < self.min_bytes:
+            return value
+        return json_ref(self.put(db, data), len(data))
+
+    def oversized(self, payload: Any) -> bool:
+        """Cheap pre-check (no DB access): does offload_payload have anything to move out?"""
+        if not isinstance(payload, dict):
+            return False
+        # A str is never shorter in UTF-8 than in characters, so only near-threshold values need encoding.
+        return any(
+            isinstance(v, str) and k != PAYLOAD_REFS_KEY and len(v) * 4 >= self.min_bytes and len(v.encode("utf-8")) >= self.min_bytes
+            for k, v in payload.items()
+        )
+
+    def offload_payload(self, db: Session, payload: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Long top-level strings (stdout, stderr, file text) keep a preview inline; the rest moves out."""
+        if not self.oversized(payload):
+            return payload
+        out = dict(payload)
+        refs: Dict[str, str] = dict(out.get(PAYLOAD_REFS_KEY) or {})
+        for key, value in payload.items():
+            if key == PAYLOAD_REFS_KEY or not isinstance(value, str):
+                continue
+            data = value.encode("utf-8")
+            if len(data) < self.min_bytes:
+                continue
+            refs[key] = self.put(db, data)
+            out[key] = value[:self.preview_chars]
+        if refs:
+            out[PAYLOAD_REFS_KEY] = refs
+        return out
+
+    def offload_value(self, db: Session, kind: str, value: Any) -> Any:
+        """Dispatch on an OFFLOADED column kind."""
+        if kind == "json":
+            return self.offload_json(db, value)
+        if kind == "text":
+            return self.offload_text(db, value)
+        return self.offload_payload(db, value)
+
+    # --- read side ---
+
+    def load(self, db: Session, value: Any) -> Any:
+        """Resolve a text or JSON reference; other values are returned as stored."""
+        digest = ref_digest(value)
+        if digest is None:
+            return value
+        data = self.get(db, digest)
+        if data is None:
+            return None
+        text = data.decode("utf-8")
+        return text if isinstance(value, str) else json.loads(text)
+
+    def load_payload(self, db: Session, payload: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if not isinstance(payload, dict) or not payload.get(PAYLOAD_REFS_KEY):
+            return payload
+        out = {k: v for k, v in payload.items() if k != PAYLOAD_REFS_KEY}
+        for key, digest in payload[PAYLOAD_REFS_KEY].items():
+            data = self.get(db, digest)
+            if data is not None:
+                out[key] = data.decode("utf-8")
+        return out
+
+    def load_value(self, db: Session, kind: str, value: Any) -> Any:
+        return self.load_payload(db, value) if kind == "payload" else self.load(db, value)
+
+    # --- maintenance ---
+
+    def referenced_digests(self, db: Session) -> Set[str]:
+        """Every digest still referenced from an OFFLOADED column (full scan; used by the retention GC)."""
+        found: Set[str] = set()
+        for table_name, cols in OFFLOADED.items():
+            table = models.Base.metadata.tables[table_name]
+            for row in db.execute(select(*[table.c[c] for c in cols]).execution_options(yield_per=1000)):
+                for kind, value in zip(cols.values(), row):
+                    if kind == "payload":
+                        if isinstance(value, dict) and isinstance(value.get(PAYLOAD_REFS_KEY), dict):
+                            found.update(value[PAYLOAD_REFS_KEY].values())
+                    else:
+                        digest = ref_digest(value)
+                        if digest:
+                            found.add(digest)
+        return found
+
+    def collect_garbage(self, db: Session, older_than: float) -> int:
+        """Delete blobs nothing refers to, sparing any created (or reused) after older_than. The caller commits."""
+        referenced = self.referenced_digests(db)
+        candidates = [d for (d,) in db.query(models.Blob.digest).filter(models.Blob.created_at < older_than)]
+        garbage = [d for d in candidates if d not in referenced]
+        for i in range(0, len(garbage), 500):
+            db.query(models.Blob).filter(models.Blob.digest.in_(garbage[i:i + 500])).delete(synchronize_session=False)
+        with self._lock:
+            for d in garbage:
+                self._cache.pop(d, None)
+        return len(garbage)
+
+
+blob_store = BlobStore()
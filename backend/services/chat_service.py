@@ -3,6 +3,7 @@ from backend import models, schemas, utils
 from typing import List, Optional
 
 class ChatService:
+    # Writes commit self.db, so routes run them inside a commit_queue unit (ChatService(w)).
     def __init__(self, db: Session):
         self.db = db
 
@@ -0,0 +1,169 @@
+import difflib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from sqlalchemy.orm import Session
+
+from backend.config import CODE_KEYFRAME_INTERVAL, CODE_DELTA_MAX_RATIO, CODE_CACHE_ENTRIES
+
+logger = logging.getLogger("Backend")
+
+# Keyframe + delta storage for CodeState / CodeSnapshot text. A row is either a keyframe
+# (`content` holds the full text; rows written before this existed are keyframes too) or a
+# delta (`content` NULL, `delta` holds line ops against the row `base_id`, normally the
+# session's previous row). `chain_len` counts deltas since the last keyframe and is capped by
+# CODE_KEYFRAME_INTERVAL, so materializing any row applies at most that many deltas.
+
+Op = Union[int, List[str]]  # n > 0: copy n base lines, n < 0: skip -n base lines, [..]: insert lines
+
+
+def line_delta(base: str, text: str) -> List[Op]:
+    a = base.splitlines(keepends=True)
+    b = text.splitlines(keepends=True)
+    ops: List[Op] = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+        if tag == "equal":
+            ops.append(i2 - i1)
+            continue
+        if i2 > i1:
+            ops.append(-(i2 - i1))
+        if j2 > j1:
+            ops.append(b[j1:j2])
+    return ops
+
+
+def apply_delta(base: str, ops: List[Op]) -> str:
+    a = base.splitlines(keepends=True)
+    out: List[str] = []
+    pos = 0
+    for op in ops:
+        if isinstance(op, list):
+            out.extend(op)
+        elif op > 0:
+            out.extend(a[pos:pos + op])
+            pos += op
+        else:
+            pos -= op
+    return "".join(out)
+
+
+def stored_size(row: Any) -> int:
+    return len(row.content or "") + len(row.delta or "")
+
+
+class CodeStore:
+    def __init__(
+        self,
+        keyframe_interval: int = CODE_KEYFRAME_INTERVAL,
+        max_delta_ratio: float = CODE_DELTA_MAX_RATIO,
+        cache_entries: int = CODE_CACHE_ENTRIES,
+    ):
+        self.keyframe_interval = max(1, int(keyframe_interval))
+        self.max_delta_ratio = float(max_delta_ratio)
+        self._cache_entries = max(0, int(cache_entries))
+        self._cache: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    # --- materialized-text cache (LRU) ---
+
+    def _cached(self, table: str, row_id: Optional[str]) -> Optional[str]:
+        if row_id is None:
+            return None
+        with self._lock:
+            text = self._cache.get((table, row_id))
+            if text is not None:
+                self._cache.move_to_end((table, row_id))
+            return text
+
+    def remember(self, row: Any, text: str) -> None:
+        if not self._cache_entries:
+            return
+        with self._lock:
+            self._cache[(row.__tablename__, row.id)] = text
+            self._cache.move_to_end((row.__tablename__, row.id))
+            while len(self._cache) > self._cache_entries:
+                self._cache.popitem(last=False)
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    # --- write / read ---
+
+    def _fields(self, base_row: Any, base_text: Optional[str], text: str, interval: int) -> Dict[str, Any]:
+        keyframe = {"content": text, "delta": None, "base_id": None, "chain_len": 0}
+        if base_row is None or base_text is None or int(base_row.chain_len or 0) + 1 >= interval:
+            return keyframe
+        delta = json.dumps(line_delta(base_text, text), ensure_ascii=False, separators=(",", ":"))
+        if len(delta) > self.max_delta_ratio * max(len(text), 1):
+            return keyframe
+        return {"content": None, "delta": delta, "base_id": base_row.id, "chain_len": int(base_row.chain_len or 0) + 1}
+
+    def encode(self, db: Session, model: Any, session_id: str, text: str) -> Dict[str, Any]:
+        """Storage columns (content/delta/base_id/chain_len) for a new row of model holding text."""
+        prev = db.query(model)\
+            .filter(model.session_id == session_id)\
+            .order_by(model.created_at.desc())\
+            .first()
+        base_text = self.content_of(db, prev) if prev is not None else None
+        return self._fields(prev, base_text, text, self.keyframe_interval)
+
+    def content_of(self, db: Session, row: Any) -> str:
+        """Full text of a stored row; applies at most chain_len deltas from the nearest keyframe."""
+        if row is None:
+            return ""
+        if row.delta is None:
+            return row.content or ""
+        table = row.__tablename__
+        text = self._cached(table, row.id)
+        if text is not None:
+            return text
+        model = type(row)
+        chain = [row]
+        while True:
+            cur = chain[-1]
+            text = self._cached(table, cur.base_id)
+            if text is not None:
+                break
+            base = db.get(model, cur.base_id) if cur.base_id else None
+            if base is None:
+                logger.error(f"[code_store] broken delta chain table={table} row={row.id} missing_base={cur.base_id}")
+                return ""
+            if base.delta is None:
+                text = base.content or ""
+                break
+            chain.append(base)
+        for r in reversed(chain):
+            text = apply_delta(text, json.loads(r.delta))
+            self.remember(r, text)
+        return text
+
+    # --- maintenance ---
+
+    def compact_session(self, db: Session, model: Any, session_id: str, keyframe_interval: Optional[int] = None) -> Dict[str, int]:
+        """
+        Re-encode every row of a session, oldest first, as keyframes + deltas (converts rows that
+        predate delta storage). keyframe_interval=1 expands everything back to full text.
+        The caller commits.
+        """
+        interval = max(1, int(keyframe_interval or self.keyframe_interval))
+        rows = db.query(model)\
+            .filter(model.session_id == session_id)\
+            .order_by(model.created_at.asc(), model.id.asc())\
+            .all()
+        texts = [self.content_of(db, r) for r in rows]
+        before = sum(stored_size(r) for r in rows)
+        prev, prev_text = None, None
+        for row, text in zip(rows, texts):
+            for k, v in self._fields(prev, prev_text, text, interval).items():
+                setattr(row, k, v)
+            self.remember(row, text)
+            prev, prev_text = row, text
+        db.flush()
+        return {"rows": len(rows), "bytes_before": before, "bytes_after": sum(stored_size(r) for r in rows)}
+
+
+code_store = CodeStore()
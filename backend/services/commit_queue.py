@@ -0,0 +1,219 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from backend.database import engine, same_database
+from backend.config import (
+    DB_SINGLE_WRITER,
+    DB_WRITER_MAX_BATCH,
+    DB_WRITER_COALESCE_MS,
+    DB_WRITER_QUEUE_MAX,
+)
+
+logger = logging.getLogger("Backend")
+
+# Single writer for SQLite. A unit of work is fn(db) -> result, where db is a Session on the
+# writer thread's own connection. Units run in arrival order; the units already queued when the
+# writer wakes up (up to DB_WRITER_MAX_BATCH) share one transaction, each inside its own SAVEPOINT,
+# so a failing unit only rolls back itself. Futures resolve after the COMMIT. Request handlers keep
+# reading through their own pooled WAL connections and never hold the write lock, so commits stop
+# colliding on "database is locked".
+# A unit must only touch the database (no LLM / network calls) and must not use the caller's
+# Session; db.commit() inside a unit just releases its savepoint. Objects it adds stay loaded
+# (expire_on_commit=False) and come back detached.
+# Sync routes call run(); async routes await arun(), which waits on the future without blocking the
+# event loop. The retention job keeps its own batched transactions.
+
+_STOP = object()
+
+Unit = Callable[[Session], Any]
+
+
+def _single_writer_default(eng: Engine) -> bool:
+    if DB_SINGLE_WRITER in ("on", "true"):
+        return True
+    if DB_SINGLE_WRITER in ("off", "false"):
+        return False
+    return eng.dialect.name == "sqlite" and eng.url.database not in (None, "", ":memory:")
+
+
+class CommitQueue:
+    def __init__(
+        self,
+        engine: Engine,
+        enabled: Optional[bool] = None,
+        max_batch: int = DB_WRITER_MAX_BATCH,
+        coalesce_ms: float = DB_WRITER_COALESCE_MS,
+        queue_max: int = DB_WRITER_QUEUE_MAX,
+    ):
+        self.engine = engine
+        self.enabled = _single_writer_default(engine) if enabled is None else enabled
+        self.max_batch = max(1, int(max_batch))
+        self.coalesce_seconds = max(0.0, float(coalesce_ms) / 1000.0)
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, int(queue_max)))
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats = {"submitted": 0, "committed": 0, "failed": 0, "transactions": 0, "largest_batch": 0}
+
+    # --- producer side ---
+
+    def serves(self, db: Optional[Session] = None) -> bool:
+        """True when units for db (default: this queue's database) go through the writer thread."""
+        if not self.enabled:
+            return False
+        if db is None:
+            return True
+        url = getattr(getattr(db, "bind", None), "url", None)
+        return url is not None and same_database(url, self.engine.url)
+
+    def submit(self, fn: Unit) -> "Future[Any]":
+        """Queue a unit of work; the future resolves once its transaction has committed."""
+        fut: "Future[Any]" = Future()
+        if not self.enabled:
+            self._run_direct(fn, fut)
+            return fut
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("commit_queue.submit() called from inside a unit of work")
+        self._ensure_started()
+        self._queue.put((fn, fut))
+        with self._lock:
+            self._stats["submitted"] += 1
+        return fut
+
+    def run(self, fn: Unit, db: Optional[Session] = None, timeout: Optional[float] = None) -> Any:
+        """
+        submit(fn) and wait for its result. A db bound to another database (a test engine, a shard)
+        runs fn on that Session and commits it, as the route did before.
+        """
+        if db is not None and not self.serves(db):
+            result = fn(db)
+            db.commit()
+            return result
+        return self.submit(fn).result(timeout)
+
+    async def arun(self, fn: Unit, db: Optional[Union[Session, AsyncSession]] = None) -> Any:
+        if db is not None and not self.serves(db):
+            if isinstance(db, AsyncSession):
+                result = await db.run_sync(fn)
+                await db.commit()
+                return result
+            return await asyncio.to_thread(self.run, fn, db)
+        return await asyncio.wrap_future(self.submit(fn))
+
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        """Apply everything queued, then stop the writer thread."""
+        with self._lock:
+            thread = self._thread
+        if thread is None:
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        with self._lock:
+            self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"enabled": self.enabled, **self._stats, "queued": self._queue.qsize()}
+
+    # --- writer thread ---
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="commit-queue", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        conn: Optional[Connection] = None
+        try:
+            while True:
+                batch: List[Any] = [self._queue.get()]
+                deadline = time.monotonic() + self.coalesce_seconds
+                while batch[-1] is not _STOP and len(batch) < self.max_batch:
+                    try:
+                        remaining = deadline - time.monotonic()
+                        batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                units = [u for u in batch if u is not _STOP and u[1].set_running_or_notify_cancel()]
+                if units:
+                    conn = self._apply(conn, units)
+                if batch[-1] is _STOP:
+                    return
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _apply(self, conn: Optional[Connection], units: List[Tuple[Unit, "Future[Any]"]]) -> Optional[Connection]:
+        outcomes: List[Tuple[bool, Any]] = []
+        try:
+            if conn is None:
+                conn = self.engine.connect()
+            with conn.begin():
+                self._begin_sqlite(conn)
+                for fn, _ in units:
+                    outcomes.append(self._call(conn, fn))
+        except Exception as e:
+            # The COMMIT (or BEGIN) itself failed: nothing in this batch was applied.
+            logger.error(f"[commit_queue] transaction failed units={len(units)} err={e}")
+            outcomes = [(False, e)] * len(units)
+            if conn is not None:
+                conn.close()
+                conn = None
+        ok = 0
+        for (_, fut), (success, value) in zip(units, outcomes):
+            if success:
+                fut.set_result(value)
+                ok += 1
+            else:
+                fut.set_exception(value)
+        with self._lock:
+            self._stats["committed"] += ok
+            self._stats["failed"] += len(units) - ok
+            self._stats["transactions"] += 1
+            self._stats["largest_batch"] = max(self._stats["largest_batch"], len(units))
+        return conn
+
+    @staticmethod
+    def _begin_sqlite(conn: Connection) -> None:
+        # pysqlite only emits BEGIN before DML, so SAVEPOINT ... RELEASE would otherwise run in
+        # autocommit and every unit would commit on its own. IMMEDIATE also takes the write lock up
+        # front, so units that read before they write cannot fail to upgrade their lock.
+        if conn.dialect.name == "sqlite" and not getattr(conn.connection.dbapi_connection, "in_transaction", True):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    def _call(self, conn: Connection, fn: Unit) -> Tuple[bool, Any]:
+        db = Session(bind=conn, join_transaction_mode="create_savepoint", autoflush=False, expire_on_commit=False)
+        try:
+            result = fn(db)
+            db.commit()
+            return True, result
+        except Exception as e:
+            db.rollback()
+            return False, e
+        finally:
+            db.close()
+
+    def _run_direct(self, fn: Unit, fut: "Future[Any]") -> None:
+        with Session(bind=self.engine, autoflush=False, expire_on_commit=False) as db:
+            try:
+                result = fn(db)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                fut.set_exception(e)
+                return
+        fut.set_result(result)
+
+
+commit_queue = CommitQueue(engine)
@@ -3,6 +3,8 @@ from backend import models, schemas, utils
 from backend.services.diagnostic_context import DiagnosticContextBuilder
 from backend.services.pedagogical_classifier import PedagogicalClassifier
 from backend.services.websocket_service import manager
+from backend.services.write_behind import write_behind
+from backend.services.commit_queue import commit_queue
 import json
 import logging
 import random
@@ -17,18 +19,20 @@ from typing import Dict, Any, Optional
 
 class DiagnosisPipeline:
     def __init__(self, db: Session):
+        # db may also be an AsyncSession; run_diagnosis then does its DB work through run_sync.
         self.db = db
         self.context_builder = DiagnosticContextBuilder(db)
         self.classifier = PedagogicalClassifier()
 
-    def resolve_thread_id(self, session_id: str, event_payload: Dict[str, Any]) -> str:
+    def resolve_thread_id(self, session_id: str, event_payload: Dict[str, Any], db: Optional[Session] = None) -> str:
+        db = db or self.db
         # 1. Payload thread_id
         if event_payload.get("thread_id"):
             return event_payload["thread_id"]
             
         # 2. Payload marker_id -> Breakout
         if event_payload.get("marker_id"):
-            marker = self.db.query(models.Marker).filter(models.Marker.id == event_payload["marker_id"]).first()
+            marker = db.query(models.Marker).filter(models.Marker.id == event_payload["marker_id"]).first()
             if marker and marker.thread_id:
                 return marker.thread_id
                 
@@ -38,7 +42,7 @@ class DiagnosisPipeline:
             return event_payload["breakout_id"]
             
         # 4. Default -> General
-        general_thread = self.db.query(models.Thread)\
+        general_thread = db.query(models.Thread)\
             .filter(models.Thread.session_id == session_id, models.Thread.type == "global")\
             .first()
             
@@ -55,14 +59,30 @@ class DiagnosisPipeline:
         return hashlib.md5(summary.encode("utf-8")).hexdigest()
 
     async def run_diagnosis(self, session_id: str, event_id: str) -> schemas.DiagnosisResult:
+        if hasattr(self.db, "run_sync"):
+            # AsyncSession: the steps below run on its async connection, off the event loop
+            result = await self.db.run_sync(self._diagnose, session_id, event_id)
+        else:
+            result = self._diagnose(self.db, session_id, event_id)
+
+        # 6. Save to DB
+        await self._save_to_db(result)
+
+        # 7. Notify WS
+        await self._notify_ws(session_id, result)
+
+        return result
+
+    def _diagnose(self, db: Session, session_id: str, event_id: str) -> schemas.DiagnosisResult:
         # 1. Build Context
-        context = self.context_builder.build(session_id, event_id)
+        builder = self.context_builder if db is self.db else DiagnosticContextBuilder(db)
+        context = builder.build(session_id, event_id)
         current_code = context["current_code"]
         event_payload = context["event_payload"]
         diff_summary = context["diff_summary"]
         
         # Resolve Thread ID
-        thread_id = self.resolve_thread_id(session_id, event_payload)
+        thread_id = self.resolve_thread_id(session_id, event_payload, db=db)
         
         # Resolve Trace ID
         trace_id = context.get("event").trace_id if context.get("event") else event_payload.get("trace_id")
@@ -141,13 +161,7 @@ class DiagnosisPipeline:
             suggested_leaf_start_level=pedagogical_result.get("suggested_leaf_start_level"),
             debug=debug_info
         )
-        
-        # 6. Save to DB
-        self._save_to_db(result)
-        
-        # 7. Notify WS
-        await self._notify_ws(session_id, result)
-        
+
         return result
         
     def _get_coarse_diagnosis(self, context, event_payload) -> Dict[str, Any]:
@@ -166,8 +180,8 @@ class DiagnosisPipeline:
             "debug": {"logit": 0.1, "simulated": True}
         }
 
-    def _save_to_db(self, result: schemas.DiagnosisResult):
-        db_log = models.DiagnosisLog(
+    async def _save_to_db(self, result: schemas.DiagnosisResult):
+        row = dict(
             id=utils.uid("diag"),
             session_id=result.session_id,
             event_id=result.event_id,
@@ -179,10 +193,13 @@ class DiagnosisPipeline:
             confidence=result.confidence,
             evidence_json=result.evidence.model_dump(),
             recommendations_json=result.recommendations,
-            debug_json=result.debug
+            debug_json=result.debug,
+            created_at=utils.now(),
         )
-        self.db.add(db_log)
-        self.db.commit()
+        if write_behind.targets(self.db):
+            await write_behind.asubmit(models.DiagnosisLog, row)
+            return
+        await commit_queue.arun(lambda w: w.add(models.DiagnosisLog(**row)), self.db)
 
 
     async def _notify_ws(self, session_id: str, result: schemas.DiagnosisResult):
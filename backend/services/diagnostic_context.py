@@ -1,6 +1,8 @@
 from typing import Optional, Dict, Any, List
 from sqlalchemy.orm import Session
 from backend import models
+from backend.services.code_store import code_store
+from backend.services.blob_store import blob_store
 import difflib
 
 class DiagnosticContextBuilder:
@@ -14,7 +16,7 @@ class DiagnosticContextBuilder:
             # Fallback for manual testing if event_id doesn't exist
             event_payload = {}
         else:
-            event_payload = event.payload
+            event_payload = blob_store.load_payload(self.db, event.payload)
 
         # 2. Fetch Latest Snapshot
         snapshot = self.db.query(models.CodeSnapshot)\
@@ -22,7 +24,7 @@ class DiagnosticContextBuilder:
             .order_by(models.CodeSnapshot.created_at.desc())\
             .first()
         
-        current_code = snapshot.content if snapshot else ""
+        current_code = code_store.content_of(self.db, snapshot)
 
         # 3. Diff Summary (vs previous snapshot or empty)
         # Find previous snapshot
@@ -33,7 +35,7 @@ class DiagnosticContextBuilder:
                 .order_by(models.CodeSnapshot.created_at.desc())\
                 .first()
         
-        prev_code = prev_snapshot.content if prev_snapshot else ""
+        prev_code = code_store.content_of(self.db, prev_snapshot)
         diff_summary = self._compute_diff_summary(prev_code, current_code)
 
         return {
@@ -1,6 +1,7 @@
 import openai
 from backend.config import OPENAI_API_KEY, OPENAI_MODEL, OPENAI_BASE_URL, LLM_TIMEOUT_SECONDS
-from typing import Generator, Optional, List, Dict, Any
+from backend.services.llm_telemetry import llm_telemetry, LLMCallRecord, provider_for
+from typing import Callable, Generator, Optional, List, Dict, Any
 import logging
 import time
 import json
@@ -27,11 +28,37 @@ class LLMService:
              tools: Optional[List[Dict]] = None,
              tool_choice: Optional[Any] = None,
              extra_client_config: Optional[Dict[str, str]] = None,
-             response_format: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+             response_format: Optional[Dict[str, Any]] = None,
+             caller: str = "unknown",
+             attempt: int = 1,
+             timeout: Optional[float] = None) -> Dict[str, Any]:
         """
         Unified chat method with error handling and standard response format.
         extra_client_config: Optional dict with 'api_key' and 'base_url' to override default client.
+        caller/attempt: Telemetry labels (route name, 1-based attempt number within the caller's retry loop).
+        timeout: Per-request timeout in seconds overriding LLM_TIMEOUT_SECONDS (e.g. what is left of a deadline).
         """
+        provider = "mock" if os.getenv("ORACLE_MOCK_MODE") == "true" else provider_for((extra_client_config or {}).get("base_url") or OPENAI_BASE_URL)
+        rec = LLMCallRecord(caller=caller, model=model, provider=provider, retries=max(0, attempt - 1))
+        try:
+            result = self._chat(messages, model, temperature, max_tokens, tools, tool_choice, extra_client_config, response_format, timeout)
+        except Exception as e:
+            rec.outcome = "timeout" if isinstance(e, openai.APITimeoutError) else "error"
+            rec.error = str(e)
+            rec.latency_ms = int((time.time() - rec.started_at) * 1000)
+            rec.request_id = getattr(e, "request_id", None)
+            llm_telemetry.record(rec)
+            raise
+
+        usage = result.get("usage") or {}
+        rec.prompt_tokens = usage.get("prompt_tokens")
+        rec.completion_tokens = usage.get("completion_tokens")
+        rec.latency_ms = result.get("latency_ms")
+        rec.request_id = result.get("request_id")
+        llm_telemetry.record(rec)
+        return result
+
+    def _chat(self, messages, model, temperature, max_tokens, tools, tool_choice, extra_client_config, response_format, timeout=None) -> Dict[str, Any]:
         # 1. Check for Offline/Mock Mode
         if os.getenv("ORACLE_MOCK_MODE") == "true":
             user_msg = next((m["content"] for m in messages if m["role"] == "user"), "")
@@ -73,6 +100,8 @@ class LLMService:
             kwargs["tool_choice"] = tool_choice
         if response_format:
             kwargs["response_format"] = response_format
+        if timeout:
+            kwargs["timeout"] = timeout
 
         # Use with_raw_response to capture headers (x-request-id)
         # Assuming openai>=1.0
@@ -105,6 +134,98 @@ class LLMService:
             "request_id": req_id or response.id # Fallback to completion ID only if header missing, but prefer header
         }
 
+    def chat_stream(self, messages: List[Dict[str, str]],
+                    on_delta: Callable[[str], None],
+                    model: str = OPENAI_MODEL,
+                    temperature: float = 0.7,
+                    max_tokens: Optional[int] = None,
+                    extra_client_config: Optional[Dict[str, str]] = None,
+                    response_format: Optional[Dict[str, Any]] = None,
+                    caller: str = "unknown",
+                    attempt: int = 1,
+                    timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Streaming variant of chat() for structured output. on_delta sees every text delta and may
+        raise to stop generation early: the stream is closed, the call is recorded as 'aborted',
+        and the exception propagates with the partial text attached as `partial_text`.
+        Returns the same shape as chat().
+        """
+        provider = "mock" if os.getenv("ORACLE_MOCK_MODE") == "true" else provider_for((extra_client_config or {}).get("base_url") or OPENAI_BASE_URL)
+        rec = LLMCallRecord(caller=caller, model=model, provider=provider, retries=max(0, attempt - 1), stream=True)
+        parts: List[str] = []
+        stream = None
+        try:
+            if provider == "mock":
+                text = self._mock_response(next((m["content"] for m in messages if m["role"] == "user"), ""), model)["text"]
+                deltas = (text[i:i + 16] for i in range(0, len(text), 16))
+            else:
+                client_to_use = self.client
+                if extra_client_config:
+                    client_to_use = openai.OpenAI(
+                        api_key=extra_client_config.get("api_key"),
+                        base_url=extra_client_config.get("base_url"),
+                        timeout=LLM_TIMEOUT_SECONDS
+                    )
+                if not client_to_use:
+                    raise RuntimeError("LLM client not initialized (missing API key).")
+                kwargs = {"model": model, "messages": messages, "temperature": temperature, "stream": True}
+                if max_tokens:
+                    kwargs["max_tokens"] = max_tokens
+                if response_format:
+                    kwargs["response_format"] = response_format
+                if timeout:
+                    kwargs["timeout"] = timeout
+                stream = client_to_use.chat.completions.create(**kwargs)
+                deltas = self._stream_deltas(stream, rec)
+
+            for delta in deltas:
+                if rec.ttft_ms is None:
+                    rec.ttft_ms = int((time.time() - rec.started_at) * 1000)
+                parts.append(delta)
+                on_delta(delta)
+        except Exception as e:
+            if isinstance(e, openai.APITimeoutError):
+                rec.outcome = "timeout"
+            elif isinstance(e, (openai.OpenAIError, RuntimeError)):
+                rec.outcome = "error"
+            else:
+                # Raised by on_delta: the caller gave up on this completion.
+                rec.outcome = "aborted"
+            rec.error = str(e)
+            e.partial_text = "".join(parts)
+            raise
+        finally:
+            if stream is not None and rec.outcome != "ok":
+                try:
+                    stream.close()
+                except Exception:
+                    pass
+            if rec.completion_tokens is None and parts:
+                rec.completion_tokens = len(parts)
+            rec.latency_ms = int((time.time() - rec.started_at) * 1000)
+            llm_telemetry.record(rec)
+
+        return {
+            "text": "".join(parts),
+            "raw": None,
+            "usage": {"prompt_tokens": rec.prompt_tokens, "completion_tokens": rec.completion_tokens},
+            "latency_ms": rec.latency_ms,
+            "ttft_ms": rec.ttft_ms,
+            "request_id": rec.request_id,
+        }
+
+    @staticmethod
+    def _stream_deltas(stream, rec: LLMCallRecord) -> Generator[str, None, None]:
+        for chunk in stream:
+            usage = getattr(chunk, "usage", None)
+            if usage:
+                rec.prompt_tokens = getattr(usage, "prompt_tokens", None)
+                rec.completion_tokens = getattr(usage, "completion_tokens", None)
+            if rec.request_id is None:
+                rec.request_id = getattr(chunk, "id", None)
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
     def _mock_response(self, user_msg: str, model: str) -> Dict[str, Any]:
         content = "{}"
         lc = user_msg.lower()
@@ -372,7 +493,7 @@ class LLMService:
             "latency_ms": 350
         }
 
-    def generate_hint(self, context: str, model: str = OPENAI_MODEL) -> str:
+    def generate_hint(self, context: str, model: str = OPENAI_MODEL, caller: str = "hint") -> str:
         """
         Legacy wrapper for simple hint generation.
         """
@@ -381,19 +502,22 @@ class LLMService:
             {"role": "user", "content": context}
         ]
         try:
-            result = self.chat(messages, model=model)
+            result = self.chat(messages, model=model, caller=caller)
             return result["text"]
         except Exception as e:
             return f"Error generating hint: {str(e)}"
 
-    def stream_completion(self, messages: list, model: str = OPENAI_MODEL) -> Generator[str, None, None]:
+    def stream_completion(self, messages: list, model: str = OPENAI_MODEL, caller: str = "stream") -> Generator[str, None, None]:
         """
         Streaming generation for 'AI typing' effect.
+        Records time-to-first-token and total latency once the stream is exhausted.
         """
         if not self.client:
             yield "LLM service unavailable."
             return
 
+        rec = LLMCallRecord(caller=caller, model=model, provider=provider_for(OPENAI_BASE_URL), stream=True)
+        chunks = 0
         try:
             stream = self.client.chat.completions.create(
                 model=model,
@@ -401,10 +525,27 @@ class LLMService:
                 stream=True
             )
             for chunk in stream:
+                usage = getattr(chunk, "usage", None)
+                if usage:
+                    rec.prompt_tokens = getattr(usage, "prompt_tokens", None)
+                    rec.completion_tokens = getattr(usage, "completion_tokens", None)
+                if not chunk.choices:
+                    continue
                 if chunk.choices[0].delta.content is not None:
+                    if rec.ttft_ms is None:
+                        rec.ttft_ms = int((time.time() - rec.started_at) * 1000)
+                    chunks += 1
                     yield chunk.choices[0].delta.content
         except Exception as e:
             logger.error(f"LLM Stream Error: {e}")
+            rec.outcome = "error"
+            rec.error = str(e)
             yield f"[Error: {e}]"
+        finally:
+            if rec.completion_tokens is None and chunks:
+                # Providers rarely report usage on streams; one delta is roughly one token.
+                rec.completion_tokens = chunks
+            rec.latency_ms = int((time.time() - rec.started_at) * 1000)
+            llm_telemetry.record(rec)
 
 llm_service = LLMService()
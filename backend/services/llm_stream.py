@@ -2,10 +2,11 @@
 import asyncio
 import logging
 from typing import Optional
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from backend.services.websocket_service import manager
 from backend.services.llm_service import llm_service
 from backend.services.chat_service import ChatService
+from backend.services.commit_queue import commit_queue
 from backend import schemas, utils
 
 logger = logging.getLogger("Backend")
@@ -14,7 +15,7 @@ async def stream_and_persist_reply(
     session_id: str, 
     thread_id: str, 
     prompt: str, 
-    db: Session,
+    db: AsyncSession,
     mode: str = "global"
 ) -> str:
     """
@@ -41,7 +42,7 @@ async def stream_and_persist_reply(
         full_content = ""
         seq = 0
         
-        stream_gen = llm_service.stream_completion(messages)
+        stream_gen = llm_service.stream_completion(messages, caller="chat.assistant_reply")
         
         # Note: llm_service.stream_completion is a synchronous generator in current impl?
         # If it's blocking, we might block the event loop. 
@@ -76,12 +77,11 @@ async def stream_and_persist_reply(
         await manager.broadcast(session_id, {"type": "ai_state", "state": "done", "thread_id": thread_id})
         
         # 5. Persist to DB
-        chat_service = ChatService(db)
-        chat_service.add_message(
-            thread_id, 
+        await commit_queue.arun(lambda w: ChatService(w).add_message(
+            thread_id,
             schemas.MessageCreate(role="assistant", content=full_content),
             message_id=message_id
-        )
+        ), db)
         
         return message_id
 
@@ -0,0 +1,156 @@
+import sqlite3
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, asdict, field
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+
+RING_BUFFER_SIZE = 2000
+
+
+@dataclass
+class LLMCallRecord:
+    caller: str
+    model: Optional[str]
+    provider: Optional[str]
+    started_at: float = field(default_factory=time.time)
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    ttft_ms: Optional[int] = None
+    latency_ms: Optional[int] = None
+    retries: int = 0
+    outcome: str = "ok"  # ok | error | timeout | aborted
+    stream: bool = False
+    request_id: Optional[str] = None
+    error: Optional[str] = None
+
+
+def provider_for(base_url: Optional[str]) -> str:
+    if not base_url:
+        return "openai"
+    if "bigmodel" in base_url:
+        return "zhipu"
+    return "openai_compatible"
+
+
+def _percentile(sorted_vals: List[int], pct: float) -> Optional[int]:
+    if not sorted_vals:
+        return None
+    idx = int(round((pct / 100.0) * (len(sorted_vals) - 1)))
+    return sorted_vals[max(0, min(idx, len(sorted_vals) - 1))]
+
+
+def summarize(records: Iterable[LLMCallRecord]) -> List[Dict[str, Any]]:
+    groups: Dict[tuple, List[LLMCallRecord]] = {}
+    for r in records:
+        groups.setdefault((r.caller, r.model), []).append(r)
+
+    out: List[Dict[str, Any]] = []
+    for (caller, model), items in sorted(groups.items(), key=lambda kv: (str(kv[0][0]), str(kv[0][1]))):
+        lat = sorted(r.latency_ms for r in items if r.latency_ms is not None)
+        ttft = sorted(r.ttft_ms for r in items if r.ttft_ms is not None)
+        out.append({
+            "caller": caller,
+            "model": model,
+            "calls": len(items),
+            "errors": sum(1 for r in items if r.outcome in ("error", "timeout")),
+            "aborted": sum(1 for r in items if r.outcome == "aborted"),
+            "retries": sum(int(r.retries or 0) for r in items),
+            "latency_ms": {p: _percentile(lat, float(p[1:])) for p in ("p50", "p90", "p95", "p99")},
+            "ttft_ms": {p: _percentile(ttft, float(p[1:])) for p in ("p50", "p95")},
+            "prompt_tokens_total": sum(int(r.prompt_tokens or 0) for r in items),
+            "completion_tokens_total": sum(int(r.completion_tokens or 0) for r in items),
+        })
+    return out
+
+
+class LLMTelemetry:
+    """
+    Records every LLM call into an in-memory ring buffer and a compact SQLite table
+    (telemetry/llm_calls.sqlite). Persistence failures never affect the caller.
+    """
+
+    def __init__(self, repo_root: Optional[Path] = None, buffer_size: int = RING_BUFFER_SIZE):
+        self._repo_root = repo_root or Path(__file__).resolve().parents[2]
+        self._buffer: Deque[LLMCallRecord] = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _db_path(self) -> Path:
+        return self._repo_root / "telemetry" / "llm_calls.sqlite"
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            path = self._db_path()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(path), check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_calls ("
+                "ts REAL, caller TEXT, model TEXT, provider TEXT, "
+                "prompt_tokens INTEGER, completion_tokens INTEGER, "
+                "ttft_ms INTEGER, latency_ms INTEGER, retries INTEGER, "
+                "outcome TEXT, stream INTEGER, request_id TEXT, error TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_calls_caller_ts ON llm_calls (caller, ts)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def record(self, rec: LLMCallRecord) -> None:
+        with self._lock:
+            self._buffer.append(rec)
+            try:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT INTO llm_calls VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        rec.started_at, rec.caller, rec.model, rec.provider,
+                        rec.prompt_tokens, rec.completion_tokens,
+                        rec.ttft_ms, rec.latency_ms, int(rec.retries or 0),
+                        rec.outcome, 1 if rec.stream else 0, rec.request_id,
+                        (rec.error or "")[:500] or None,
+                    ),
+                )
+                conn.commit()
+            except Exception:
+                pass
+
+    def recent(self, limit: int = 100) -> List[Dict[str, Any]]:
+        with self._lock:
+            items = list(self._buffer)[-limit:]
+        return [asdict(r) for r in reversed(items)]
+
+    def metrics(self, since_seconds: Optional[float] = None, source: str = "memory") -> Dict[str, Any]:
+        cutoff = time.time() - since_seconds if since_seconds else 0.0
+        if source == "db":
+            records = self._load_from_db(cutoff)
+        else:
+            with self._lock:
+                records = [r for r in self._buffer if r.started_at >= cutoff]
+        return {"source": source, "window_seconds": since_seconds, "groups": summarize(records)}
+
+    def _load_from_db(self, cutoff: float) -> List[LLMCallRecord]:
+        with self._lock:
+            try:
+                rows = self._connect().execute(
+                    "SELECT ts, caller, model, provider, prompt_tokens, completion_tokens, "
+                    "ttft_ms, latency_ms, retries, outcome, stream, request_id, error "
+                    "FROM llm_calls WHERE ts >= ?",
+                    (cutoff,),
+                ).fetchall()
+            except Exception:
+                return []
+        return [
+            LLMCallRecord(
+                started_at=row[0], caller=row[1], model=row[2], provider=row[3],
+                prompt_tokens=row[4], completion_tokens=row[5], ttft_ms=row[6],
+                latency_ms=row[7], retries=row[8] or 0, outcome=row[9],
+                stream=bool(row[10]), request_id=row[11], error=row[12],
+            )
+            for row in rows
+        ]
+
+
+llm_telemetry = LLMTelemetry()
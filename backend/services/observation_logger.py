@@ -5,7 +5,7 @@ import time
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 
 MAX_TEXT_BYTES = 8 * 1024
@@ -145,11 +145,7 @@ class ObservationLogger:
         self._seq_cache[session_id] = seq + 1
         return seq
 
-    def append(self, ctx: ObservationEventContext, payload: Dict[str, Any]) -> Path:
-        path = self._log_path(ctx.session_id)
-        self._ensure_dir(path)
-        seq = self._next_seq(ctx.session_id, path)
-
+    def _record(self, ctx: ObservationEventContext, payload: Dict[str, Any], seq: int) -> Dict[str, Any]:
         evt_type = ctx.event_type
         mapped_type = evt_type
         if evt_type == "run":
@@ -169,7 +165,7 @@ class ObservationLogger:
             err = _extract_error(out_payload.get("stderr_snippet"))
             out_payload.update(err)
 
-        record = {
+        return {
             "schema_version": "1.0",
             "event_id": ctx.event_id,
             "timestamp": _iso_now(),
@@ -184,9 +180,21 @@ class ObservationLogger:
             "payload": out_payload,
         }
 
-        line = json.dumps(record, ensure_ascii=False)
+    def append(self, ctx: ObservationEventContext, payload: Dict[str, Any]) -> Path:
+        return self.append_many(ctx.session_id, [(ctx, payload)])
+
+    def append_many(self, session_id: str, items: List[Tuple[ObservationEventContext, Dict[str, Any]]]) -> Path:
+        """Append records for one session, in order, with a single write."""
+        path = self._log_path(session_id)
+        if not items:
+            return path
+        self._ensure_dir(path)
+        lines = [
+            json.dumps(self._record(ctx, payload, self._next_seq(session_id, path)), ensure_ascii=False) + "\n"
+            for ctx, payload in items
+        ]
         with path.open("a", encoding="utf-8", newline="\n") as f:
-            f.write(line + "\n")
+            f.write("".join(lines))
             f.flush()
         return path
 
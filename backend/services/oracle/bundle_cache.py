@@ -0,0 +1,91 @@
+import hashlib
+import json
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from backend import models
+from backend.config import ORACLE_TESTS_CACHE, ORACLE_TESTS_CACHE_TTL_SECONDS
+from backend.utils import now
+
+logger = logging.getLogger("Backend")
+
+# Persistent cache of generated test bundles. A repeated /generate-tests call with the same
+# spec, selections, counts, profile, seed, prompt version and model is served from the
+# oracle_test_bundle_cache table instead of calling the LLM again.
+
+
+def bundle_cache_key(
+    spec_json: Dict[str, Any],
+    selections: Dict[str, Any],
+    public_examples_count: int,
+    hidden_tests_count: int,
+    difficulty_profile: Optional[Dict[str, Any]],
+    seed: int,
+    expected_mode: str,
+    prompt_version: str,
+    model: str,
+) -> str:
+    data = {
+        "spec": spec_json,
+        "selections": selections or {},
+        "public": int(public_examples_count),
+        "hidden": int(hidden_tests_count),
+        "difficulty_profile": difficulty_profile,
+        "seed": int(seed),
+        "expected_mode": expected_mode,
+        "prompt_version": prompt_version,
+        "model": model,
+    }
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def get_cached_bundle(db: Session, cache_key: str) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """Read-only lookup; an expired entry is a miss and gets overwritten by store_bundle."""
+    if not ORACLE_TESTS_CACHE:
+        return None
+    row = db.query(models.OracleTestBundleCache).filter(models.OracleTestBundleCache.cache_key == cache_key).first()
+    if row is None or now() - float(row.created_at or 0) > ORACLE_TESTS_CACHE_TTL_SECONDS:
+        return None
+    return row.tests_json, dict(row.tests_meta_json or {})
+
+
+def record_hit(db: Session, cache_key: str) -> None:
+    """Count a served hit. The caller commits with the version update."""
+    row = db.get(models.OracleTestBundleCache, cache_key)
+    if row is not None:
+        row.hit_count = int(row.hit_count or 0) + 1
+        row.last_hit_at = now()
+
+
+def store_bundle(
+    db: Session,
+    cache_key: str,
+    version_id: str,
+    tests_json: Dict[str, Any],
+    tests_meta: Dict[str, Any],
+) -> None:
+    """Store a successfully generated bundle. The caller commits with the version update."""
+    if not ORACLE_TESTS_CACHE or tests_meta.get("error"):
+        return
+    row = db.query(models.OracleTestBundleCache).filter(models.OracleTestBundleCache.cache_key == cache_key).first()
+    if row is None:
+        row = models.OracleTestBundleCache(cache_key=cache_key)
+    row.version_id = version_id
+    row.created_at = now()
+    row.hit_count = 0
+    row.last_hit_at = None
+    row.tests_json = tests_json
+    row.tests_meta_json = tests_meta
+    row.prompt_version = tests_meta.get("prompt_version")
+    row.llm_model_used = tests_meta.get("llm_model_used")
+    db.add(row)
+
+
+def invalidate_version(db: Session, version_id: str) -> int:
+    """Drop every cached bundle generated for version_id (spec or confirmations changed)."""
+    n = db.query(models.OracleTestBundleCache).filter(models.OracleTestBundleCache.version_id == version_id).delete(synchronize_session=False)
+    if n:
+        logger.info(f"[oracle] tests_cache invalidated version_id={version_id} entries={n}")
+    return int(n)
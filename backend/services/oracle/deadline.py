@@ -0,0 +1,32 @@
+import time
+from typing import Optional
+
+# Below this much remaining budget a new LLM attempt is not started: it could not finish.
+MIN_ATTEMPT_SECONDS = 2.0
+
+
+class Deadline:
+    """
+    End-to-end time budget for one oracle request. Retry loops ask it for a per-attempt
+    timeout (the client timeout capped by what is left) and whether another attempt fits.
+    """
+
+    def __init__(self, budget_seconds: float):
+        self.budget_seconds = float(budget_seconds)
+        self._expires_at = time.monotonic() + self.budget_seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self._expires_at - time.monotonic())
+
+    def remaining_ms(self) -> int:
+        return int(self.remaining() * 1000)
+
+    def budget_ms(self) -> int:
+        return int(self.budget_seconds * 1000)
+
+    def can_attempt(self, min_seconds: float = MIN_ATTEMPT_SECONDS) -> bool:
+        return self.remaining() >= min_seconds
+
+    def attempt_timeout(self, cap: Optional[float] = None) -> float:
+        remaining = self.remaining()
+        return remaining if cap is None else min(float(cap), remaining)
@@ -0,0 +1,264 @@
+import logging
+import random
+from typing import Any, Dict, Iterator, List, Tuple
+
+from backend.services.oracle.reference import fill_expected_from_reference
+from backend.services.oracle.test_chunks import canonical_input
+
+logger = logging.getLogger("Backend")
+
+# Local hidden-test expansion: new inputs are derived from the existing examples by
+# type-directed mutation (boundary values, empty collections, large sizes, seeded random
+# samples) and their expected outputs come from executing the version's reference solution.
+# No LLM calls are made.
+
+STRATEGIES = ("boundary", "empty", "large", "random")
+LARGE_COLLECTION_SIZE = 1000
+LARGE_INT = 10 ** 9
+LARGE_STDIN_LINES = 200
+OVERSAMPLE = 2  # the reference may reject some derived inputs, so stage extra candidates
+
+_SHAPE_TYPES = {
+    "int": (int,),
+    "integer": (int,),
+    "float": (int, float),
+    "number": (int, float),
+    "str": (str,),
+    "string": (str,),
+    "bool": (bool,),
+    "boolean": (bool,),
+    "list": (list,),
+    "array": (list,),
+    "dict": (dict,),
+    "object": (dict,),
+}
+
+
+def _int_variants(values: List[int], rng: random.Random, strategy: str) -> List[int]:
+    lo, hi = min(values), max(values)
+    if strategy == "boundary":
+        return [0, 1, -1, lo - 1, hi + 1]
+    if strategy == "empty":
+        return [0]
+    if strategy == "large":
+        return [LARGE_INT, -LARGE_INT]
+    span = max(10, hi - lo)
+    return [rng.randint(lo - span, hi + span) for _ in range(3)]
+
+
+def _float_variants(values: List[float], rng: random.Random, strategy: str) -> List[float]:
+    lo, hi = min(values), max(values)
+    if strategy == "boundary":
+        return [0.0, -0.0, 1e-9, lo - 1.0, hi + 1.0]
+    if strategy == "empty":
+        return [0.0]
+    if strategy == "large":
+        return [1e12, -1e12]
+    span = max(10.0, hi - lo)
+    return [round(rng.uniform(lo - span, hi + span), 6) for _ in range(3)]
+
+
+def _str_variants(values: List[str], rng: random.Random, strategy: str) -> List[str]:
+    alphabet = sorted(set("".join(values))) or list("abc")
+    if strategy == "boundary":
+        return [alphabet[0], alphabet[-1], values[0].upper()]
+    if strategy == "empty":
+        return [""]
+    if strategy == "large":
+        return ["".join(rng.choice(alphabet) for _ in range(LARGE_COLLECTION_SIZE))]
+    longest = max(len(v) for v in values)
+    return ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, max(1, longest * 2)))) for _ in range(3)]
+
+
+def _list_variants(values: List[list], rng: random.Random, strategy: str) -> List[list]:
+    pool = [x for v in values for x in v]
+    if strategy == "empty":
+        return [[]]
+    if not pool:
+        return []
+    if strategy == "boundary":
+        first = pool[0]
+        return [[first], [first, first], sorted(pool, key=canonical_input), list(reversed(values[0]))]
+    if strategy == "large":
+        return [[_mutate(rng.choice(pool), rng, "random") for _ in range(LARGE_COLLECTION_SIZE)]]
+    longest = max(len(v) for v in values)
+    return [[_mutate(rng.choice(pool), rng, "random") for _ in range(rng.randint(1, max(1, longest * 2)))] for _ in range(3)]
+
+
+def _dict_variants(values: List[dict], rng: random.Random, strategy: str) -> List[dict]:
+    if strategy == "empty":
+        return [{}]
+    base = values[0]
+    if not base:
+        return []
+    if strategy == "boundary":
+        k = next(iter(base))
+        return [{k: base[k]}]
+    if strategy == "large":
+        return []  # key sets are usually fixed by the spec; growing them rarely yields valid input
+    return [{k: _mutate(v, rng, "random") for k, v in base.items()}]
+
+
+def _variants(values: List[Any], rng: random.Random, strategy: str) -> List[Any]:
+    """Candidate replacements for one argument position given the values seen there."""
+    sample = values[0]
+    if all(isinstance(v, bool) for v in values):
+        return [not sample] if strategy in ("boundary", "random") else []
+    if all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+        return _int_variants(values, rng, strategy)
+    if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+        return _float_variants([float(v) for v in values], rng, strategy)
+    if all(isinstance(v, str) for v in values):
+        return _str_variants(values, rng, strategy)
+    if all(isinstance(v, list) for v in values):
+        return _list_variants(values, rng, strategy)
+    if all(isinstance(v, dict) for v in values):
+        return _dict_variants(values, rng, strategy)
+    return []
+
+
+def _mutate(value: Any, rng: random.Random, strategy: str) -> Any:
+    options = _variants([value], rng, strategy)
+    return rng.choice(options) if options else value
+
+
+def _positions(inputs: List[Any]) -> Dict[Any, List[Any]]:
+    """Observed values per argument position (list inputs) or keyword (dict inputs)."""
+    seen: Dict[Any, List[Any]] = {}
+    for inp in inputs:
+        items = enumerate(inp) if isinstance(inp, list) else inp.items()
+        for pos, value in items:
+            seen.setdefault(pos, []).append(value)
+    return seen
+
+
+def _replace(template: Any, pos: Any, value: Any) -> Any:
+    if isinstance(template, list):
+        out = list(template)
+        out[pos] = value
+        return out
+    return {**template, pos: value}
+
+
+def _function_candidates(inputs: List[Any], rng: random.Random) -> Iterator[Tuple[str, Any]]:
+    # Only templates whose structure matches the signature are mutated: same arity for
+    # positional inputs, same key set for keyword inputs.
+    shape = canonical_input(sorted(inputs[0].keys())) if isinstance(inputs[0], dict) else len(inputs[0])
+    templates = [
+        i for i in inputs
+        if (isinstance(i, dict) and canonical_input(sorted(i.keys())) == shape)
+        or (isinstance(i, list) and len(i) == shape)
+    ]
+    positions = _positions(templates)
+    per_strategy: Dict[str, List[Any]] = {s: [] for s in STRATEGIES}
+    for strategy in STRATEGIES:
+        for pos, values in positions.items():
+            for value in _variants(values, rng, strategy):
+                per_strategy[strategy].append(_replace(rng.choice(templates), pos, value))
+        if strategy == "random":
+            # Mutate every argument at once as well as one at a time
+            for _ in range(max(3, len(templates))):
+                combo = rng.choice(templates)
+                for pos, values in positions.items():
+                    combo = _replace(combo, pos, _mutate(rng.choice(values), rng, "random"))
+                per_strategy[strategy].append(combo)
+    # Round-robin across strategies so a small count still covers every kind of case
+    while any(per_strategy.values()):
+        for strategy in STRATEGIES:
+            if per_strategy[strategy]:
+                yield strategy, per_strategy[strategy].pop(0)
+
+
+def _cli_candidates(inputs: List[Any], rng: random.Random) -> Iterator[Tuple[str, Any]]:
+    """CLI inputs are stdin text: integer tokens are mutated, lines are repeated for size."""
+    stdins = [i if isinstance(i, str) else str((i or {}).get("stdin", "")) for i in inputs if isinstance(i, (str, dict))]
+    stdins = [s for s in stdins if s.strip()]
+    if not stdins:
+        return
+    yield "empty", ""
+    for strategy in ("boundary", "large", "random"):
+        for text in stdins:
+            tokens = text.split(" ")
+            ints = [int(t) for t in tokens if t.strip().lstrip("-").isdigit()]
+            if strategy == "large":
+                lines = text.splitlines() or [text]
+                yield strategy, "\n".join(lines[-1:] * LARGE_STDIN_LINES) + "\n"
+                continue
+            if not ints:
+                continue
+            for replacement in _int_variants(ints, rng, strategy)[:2]:
+                idx = rng.choice([i for i, t in enumerate(tokens) if t.strip().lstrip("-").isdigit()])
+                stripped = tokens[idx].strip()
+                yield strategy, " ".join(tokens[:idx] + [tokens[idx].replace(stripped, str(replacement))] + tokens[idx + 1:])
+
+
+def _matches_shape(value: Any, spec_json: Dict[str, Any]) -> bool:
+    shape = spec_json.get("output_shape") or {}
+    declared = str(shape.get("type") or (spec_json.get("signature") or {}).get("returns") or "").strip().lower()
+    expected_types = _SHAPE_TYPES.get(declared.split("[")[0])
+    if not expected_types:
+        return True
+    if bool not in expected_types and isinstance(value, bool):
+        return False
+    return isinstance(value, expected_types)
+
+
+def expand_tests(
+    spec_json: Dict[str, Any],
+    examples: List[Dict[str, Any]],
+    reference_code: str,
+    count: int,
+    seed: int,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Derive up to `count` extra hidden tests from `examples` (public examples and hidden
+    tests with inputs). Candidate inputs are deterministic for a given seed, deduped against
+    the examples, and executed against `reference_code`; outputs that do not fit the spec's
+    output_shape are dropped as probable rejections of invalid input. Returns (tests, stats).
+    """
+    stats: Dict[str, Any] = {"requested": int(count), "candidates": 0, "kept": 0, "strategies": {}, "drops": {}}
+    inputs = [e["input"] for e in examples if isinstance(e, dict) and isinstance(e.get("input"), (list, dict, str))]
+    if count <= 0 or not inputs:
+        return [], stats
+
+    rng = random.Random(seed)
+    # Same routing as run_oracle: everything but a function reads stdin and is judged on stdout.
+    stdio = (spec_json.get("deliverable") or "function") != "function"
+    if stdio:
+        candidates = _cli_candidates(inputs, rng)
+    else:
+        structured = [i for i in inputs if isinstance(i, (list, dict)) and i]
+        candidates = _function_candidates(structured, rng) if structured else iter(())
+
+    seen = {canonical_input(i) for i in inputs}
+    staged: List[Dict[str, Any]] = []
+    strategy_of: Dict[str, str] = {}
+    for strategy, inp in candidates:
+        key = canonical_input(inp)
+        if key in seen:
+            continue
+        seen.add(key)
+        name = f"candidate_{len(staged) + 1}"
+        staged.append({"name": name, "input": inp})
+        strategy_of[name] = strategy
+        if len(staged) >= count * OVERSAMPLE:
+            break
+    stats["candidates"] = len(staged)
+
+    kept, drops = fill_expected_from_reference(spec_json, reference_code, staged)
+    for d in drops:
+        stats["drops"][d["reason"]] = stats["drops"].get(d["reason"], 0) + 1
+
+    tests: List[Dict[str, Any]] = []
+    for t in kept:
+        if not stdio and not _matches_shape(t["expected"], spec_json):
+            stats["drops"]["output_shape_mismatch"] = stats["drops"].get("output_shape_mismatch", 0) + 1
+            continue
+        if len(tests) >= count:
+            break
+        strategy = strategy_of[t["name"]]
+        stats["strategies"][strategy] = stats["strategies"].get(strategy, 0) + 1
+        tests.append({"name": f"expanded_{strategy}_{len(tests) + 1}", "input": t["input"], "expected": t["expected"], "tags": ["expanded", strategy]})
+    stats["kept"] = len(tests)
+    logger.info(f"[oracle] local_expansion requested={count} candidates={len(staged)} kept={len(tests)} drops={stats['drops']}")
+    return tests, stats
@@ -0,0 +1,113 @@
+import json
+from typing import Any, Callable, Dict, List, Optional
+
+# Incremental scanner for a JSON object arriving as LLM deltas. It tracks only what it needs
+# to decide early that a completion is hopeless: string/escape state, bracket nesting, and
+# the span of each top-level value. Everything else (Python literals, trailing commas, fences)
+# is left for the tolerant full parse once the stream ends.
+
+MAX_PREAMBLE_CHARS = 400
+
+FieldCheck = Callable[[Any], List[str]]
+
+
+class StreamAbort(Exception):
+    def __init__(self, reason: str, field: Optional[str] = None, problems: Optional[List[str]] = None):
+        self.reason = reason
+        self.field = field
+        self.problems = problems or []
+        super().__init__(f"{reason}" + (f" (field: {field})" if field else ""))
+
+
+class IncrementalJSONParser:
+    """
+    Feed text deltas with feed(); raises StreamAbort as soon as the output cannot become a
+    valid object or a completed top-level field fails its check. `fields` holds the top-level
+    values parsed so far; `complete` turns True when the outer object closes.
+    """
+
+    def __init__(self, field_checks: Optional[Dict[str, FieldCheck]] = None, max_preamble: int = MAX_PREAMBLE_CHARS):
+        self.field_checks = field_checks or {}
+        self.max_preamble = max_preamble
+        self.fields: Dict[str, Any] = {}
+        self.complete = False
+        self._start: Optional[int] = None  # index of the outer '{'
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._key: Optional[str] = None
+        self._value_start: Optional[int] = None
+        self._text = ""
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    def feed(self, chunk: str) -> None:
+        if self.complete or not chunk:
+            self._text += chunk or ""
+            return
+        base = len(self._text)
+        self._text += chunk
+        for offset, ch in enumerate(chunk):
+            self._step(ch, base + offset)
+            if self.complete:
+                break
+
+    def _step(self, ch: str, i: int) -> None:
+        if self._start is None:
+            if ch == "{":
+                self._start = i
+                self._stack.append("{")
+            elif i >= self.max_preamble:
+                raise StreamAbort("no_json_object")
+            return
+
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+                if len(self._stack) == 1 and self._value_start is None:
+                    # Closed a top-level key
+                    self._key = self._text[self._string_start + 1:i]
+            return
+
+        if ch == '"':
+            self._in_string = True
+            self._string_start = i
+        elif ch in "{[":
+            self._stack.append(ch)
+        elif ch in "}]":
+            opener = "{" if ch == "}" else "["
+            if not self._stack or self._stack[-1] != opener:
+                raise StreamAbort("mismatched_bracket")
+            if len(self._stack) == 1:
+                self._finish_field(i)
+                self.complete = True
+            self._stack.pop()
+        elif len(self._stack) == 1:
+            if ch == ":" and self._key is not None and self._value_start is None:
+                self._value_start = i + 1
+            elif ch == ",":
+                self._finish_field(i)
+
+    def _finish_field(self, end: int) -> None:
+        key, start = self._key, self._value_start
+        self._key, self._value_start = None, None
+        if key is None or start is None:
+            return
+        try:
+            value = json.loads(self._text[start:end])
+        except json.JSONDecodeError:
+            # Not strict JSON (Python literals etc.); the final tolerant parse decides.
+            return
+        self.fields[key] = value
+        check = self.field_checks.get(key)
+        if check:
+            problems = check(value)
+            if problems:
+                raise StreamAbort("field_check_failed", field=key, problems=problems)
@@ -2,12 +2,21 @@
 import json
 import logging
 import hashlib
+import difflib
 from typing import Dict, Any, Optional, List, Tuple
 from pydantic import ValidationError
 from backend.services.llm_service import llm_service
 from backend.services.oracle.types import TaskSpec
-from backend.services.oracle.spec_validator import validate_and_normalize, SpecValidationError
-from backend.config import OPENAI_MODEL, ZHIPU_API_KEY
+from backend.services.oracle.spec_validator import validate_and_normalize, SpecValidationError, check_streamed_field, collect_violations, normalize_spec, trigger_scan
+from backend.services.oracle.spec_repair import validate_with_repairs, repair_contradictions, repair_once
+from backend.services.oracle.json_stream import IncrementalJSONParser, StreamAbort
+from backend.services.oracle.deadline import Deadline
+from backend.services.oracle.model_router import model_router, RoutingDecision
+from backend.services.oracle.test_chunks import plan_chunks, merge_chunks, canonical_input, CATEGORY_GUIDANCE
+from backend.services.oracle.reference import fill_expected_from_reference
+from backend.services.oracle.progress import CANCEL_POLL_SECONDS, AnalyzeProgress, AnalyzeCancelled
+from dataclasses import asdict
+from backend.config import OPENAI_MODEL, OPENAI_API_KEY, ZHIPU_API_KEY, LLM_TIMEOUT_SECONDS, ORACLE_ANALYZE_CANDIDATES, ORACLE_ANALYZE_HEDGE_MS, ORACLE_STREAM_PARSE, ORACLE_ANALYZE_DEADLINE_SECONDS, ORACLE_TESTS_CHUNK_SIZE, ORACLE_TESTS_CHUNK_RETRIES, ORACLE_TESTS_MAX_PARALLEL
 
 logger = logging.getLogger("Backend")
 
@@ -112,6 +121,7 @@ def detect_contradictions(spec: TaskSpec, raw_desc: str) -> List[str]:
 
 import time
 import openai
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
 
 import re
 
@@ -138,19 +148,8 @@ def repair_json_syntax(text: str) -> str:
     
     return text
 
-def generate_spec_with_llm(
-    task_description: str,
-    language: str,
-    runtime: str,
-    deliverable_type: str,
-    retries: int = 2
-) -> Tuple[Dict[str, Any], Dict[str, Any]]:
-    
-    # 1. Input Normalization (A1)
-    normalized_desc = task_description.strip()
-    input_hash = compute_input_hash(normalized_desc)
-    
-    system_prompt = f"""Role: Technical Architect. Analyze user task -> Implementation Spec (JSON).
+def _build_spec_system_prompt(language: str, runtime: str, deliverable_type: str) -> str:
+    return f"""Role: Technical Architect. Analyze user task -> Implementation Spec (JSON).
     
     Context:
     - Deliverable: {deliverable_type}
@@ -200,10 +199,146 @@ def generate_spec_with_llm(
     4. Do NOT invent constraints. Use "assumptions" for defaults ONLY if standard practice.
     5. "confidence_reasons": List 1-3 reasons why this spec is accurate (e.g. "Fixed input format", "Standard output", "Clear edge cases").
     """
+
+def _parse_llm_json(raw_text: str) -> Dict[str, Any]:
+    """Strip markdown fences and parse, falling back to repair_json_syntax. Raises json.JSONDecodeError."""
+    json_text = raw_text
+    if "```json" in raw_text:
+        json_text = raw_text.split("```json")[1].split("```")[0]
+    elif "```" in raw_text:
+        json_text = raw_text.split("```")[1].split("```")[0]
+    try:
+        return json.loads(json_text.strip())
+    except json.JSONDecodeError:
+        return json.loads(repair_json_syntax(json_text).strip())
+
+def _format_violations(e: SpecValidationError) -> str:
+    return "; ".join(f"{v.error_code}: {v.message} (field: {v.field_path})" for v in e.violations)
+
+def _build_violation_guidance(violations: List[SpecValidationError]) -> str:
+    lines = [f"Validation Errors ({len(violations)}):"]
+    for i, v in enumerate(violations, 1):
+        lines.append(f"{i}. Rule ID: {v.error_code} | Field: {v.field_path} | {v.message}")
+    lines.append("Instruction: Please fix the JSON to comply with ALL of these rules in one response. Do not repeat the same invalid pattern.")
+    return "\n".join(lines)
+
+def _spec_field_checks() -> Dict[str, Any]:
+    """Per-field checks run while a spec streams in; a failure aborts the completion."""
+    def _check(field: str):
+        return lambda value: [f"{e.error_code}: {e.message} (field: {e.field_path})" for e in check_streamed_field(field, value)]
+
+    checks = {f: _check(f) for f in ("goal_one_liner", "signature", "ambiguities", "public_examples")}
+    # Drift to another deliverable is corrected after parsing; only a non-string is hopeless.
+    checks["deliverable"] = lambda value: [] if isinstance(value, str) else ["spec_invalid: Must be a string (field: deliverable)"]
+    return checks
+
+def _description_diff(previous: str, current: str) -> str:
+    diff = difflib.unified_diff(
+        previous.splitlines(),
+        current.splitlines(),
+        fromfile="previous_description",
+        tofile="new_description",
+        n=1,
+        lineterm="",
+    )
+    return "\n".join(diff)
+
+def _build_adjust_prompt(warm_start: Dict[str, Any], task_description: str) -> str:
+    """
+    Diff-style request for a near-duplicate task: the prior spec plus only the lines of the
+    description that changed, instead of the full description to analyze from scratch.
+    """
+    diff_text = _description_diff(str(warm_start.get("description") or ""), task_description) or "(no textual changes)"
+    return f"""The task below was already analyzed. Adjust the existing spec to the new description instead of starting over.
+    
+    Existing spec (JSON):
+    {json.dumps(warm_start.get("spec") or {}, ensure_ascii=False)}
+    
+    Description changes (unified diff):
+    {diff_text}
+    
+    Rules:
+    1. Keep every field the changes do not affect exactly as it is.
+    2. Update constraints, signature, examples and ambiguities that the changed lines touch.
+    3. Return the COMPLETE adjusted spec as one JSON object following the schema."""
+
+def _stream_abort_guidance(e: StreamAbort) -> str:
+    if e.problems:
+        return "Validation Errors:\n" + "\n".join(f"- {p}" for p in e.problems) + "\nInstruction: Please return the complete JSON again with these fields fixed."
+    return "JSON Parse Error: The output was not valid JSON. Please return ONLY a valid JSON object matching the schema v1.0. Do not include any markdown formatting or extra text."
+
+def generate_spec_with_llm(
+    task_description: str,
+    language: str,
+    runtime: str,
+    deliverable_type: str,
+    retries: int = 2,
+    candidates: Optional[int] = None,
+    stream: Optional[bool] = None,
+    deadline_seconds: Optional[float] = None,
+    warm_start: Optional[Dict[str, Any]] = None,
+    progress: Optional[AnalyzeProgress] = None
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    deadline_seconds: end-to-end budget for all attempts (default ORACLE_ANALYZE_DEADLINE_SECONDS).
+    Each LLM call gets what is left as its timeout; when the budget runs out the loop stops with
+    OracleAnalyzeError("analyze_deadline_exceeded"). Metadata reports deadline_remaining_ms.
+    warm_start: {"spec", "description"} of an already-analyzed similar task; the LLM is asked to
+    adjust that spec to the description diff (always sequential).
+    progress: receives attempt/token/validation/repair events from the sequential loop (candidate
+    events in parallel mode) and can cancel either (OracleAnalyzeError("analyze_cancelled")).
+    Streams sequential completions while attached.
+    """
+    candidates = ORACLE_ANALYZE_CANDIDATES if candidates is None else candidates
+    if warm_start:
+        candidates = 1
+    stream = ORACLE_STREAM_PARSE if stream is None else stream
+    deadline = Deadline(ORACLE_ANALYZE_DEADLINE_SECONDS if deadline_seconds is None else deadline_seconds)
+    # Parallel candidates already span models; routing applies to the sequential loop.
+    routing = None if candidates > 1 else model_router.route(task_description.strip(), deliverable_type, ZHIPU_MODEL)
+    if progress is not None:
+        progress.emit("analyze_start", mode="parallel" if candidates > 1 else "sequential", candidates=candidates, budget_ms=deadline.budget_ms(), model=routing.model if routing else None)
+    try:
+        if candidates > 1:
+            data, metadata = generate_spec_parallel(task_description, language, runtime, deliverable_type, candidates=candidates, retries=retries, deadline=deadline, progress=progress)
+        else:
+            data, metadata = _generate_spec_sequential(task_description, language, runtime, deliverable_type, retries, stream, deadline, routing, warm_start, progress)
+    except OracleAnalyzeError as e:
+        e.metadata["deadline_budget_ms"] = deadline.budget_ms()
+        e.metadata["deadline_remaining_ms"] = deadline.remaining_ms()
+        if routing:
+            e.metadata["routing"] = asdict(routing)
+            model_router.record(routing, str(e), int(e.metadata.get("attempts") or 0), deadline.budget_ms() - deadline.remaining_ms())
+        raise
+    metadata["deadline_budget_ms"] = deadline.budget_ms()
+    metadata["deadline_remaining_ms"] = deadline.remaining_ms()
+    if routing:
+        metadata["routing"] = asdict(routing)
+        model_router.record(routing, "ok", int(metadata.get("attempts") or 0), deadline.budget_ms() - deadline.remaining_ms())
+    return data, metadata
+
+def _generate_spec_sequential(
+    task_description: str,
+    language: str,
+    runtime: str,
+    deliverable_type: str,
+    retries: int,
+    stream: bool,
+    deadline: Deadline,
+    routing: Optional[RoutingDecision] = None,
+    warm_start: Optional[Dict[str, Any]] = None,
+    progress: Optional[AnalyzeProgress] = None
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    routing = routing or RoutingDecision(tier="strong", model=ZHIPU_MODEL, reasons=["default"])
+    # 1. Input Normalization (A1)
+    normalized_desc = task_description.strip()
+    input_hash = compute_input_hash(normalized_desc)
+    
+    system_prompt = _build_spec_system_prompt(language, runtime, deliverable_type)
     
     messages = [
         {"role": "system", "content": system_prompt},
-        {"role": "user", "content": normalized_desc}
+        {"role": "user", "content": _build_adjust_prompt(warm_start, normalized_desc) if warm_start else normalized_desc}
     ]
     
     attempts = 0
@@ -214,35 +349,90 @@ def generate_spec_with_llm(
     last_request_id = None
     last_latency_ms = 0
     
+    def _emit(event: str, **data: Any) -> None:
+        if progress is not None:
+            progress.emit(event, attempt=attempts, **data)
+
+    def _stopped(status: str) -> OracleAnalyzeError:
+        return OracleAnalyzeError(status, {
+            "normalized_input_hash": input_hash,
+            "attempts": attempts,
+            "attempt_fail_reasons": fail_reasons,
+            "final_status": status,
+            "raw_text": raw_text,
+            "request_id": last_request_id,
+            "llm_latency_ms": last_latency_ms,
+            "llm_provider_used": "zhipu",
+            "llm_model_used": routing.model,
+            "missing_fields": [],
+            "ambiguities": []
+        })
+
+    def _fail(reason: str, escalate: bool = True) -> None:
+        # Every failed attempt records how much of the request budget was left after it.
+        fail_reasons.append(f"{reason} [remaining_ms={deadline.remaining_ms()}]")
+        _emit("attempt_failed", reason=reason, remaining_ms=deadline.remaining_ms())
+        # Bad output and fast-model errors/timeouts both retry on the strong model; only running
+        # out of budget does not.
+        if escalate and routing.escalate(ZHIPU_MODEL, attempts, reason.split(":")[0]):
+            logger.info(f"[oracle] analyze escalated to model={ZHIPU_MODEL} attempt={attempts} reason={routing.escalation_reason}")
+
+    raw_text = ""
     while attempts <= retries:
+        if progress is not None and progress.cancelled:
+            logger.info(f"[oracle] analyze cancelled attempts={attempts}")
+            raise _stopped("analyze_cancelled")
+        if attempts > 0 and not deadline.can_attempt():
+            _fail(f"deadline_exceeded: budget_ms={deadline.budget_ms()} after {attempts} attempts", escalate=False)
+            logger.warning(f"[oracle] analyze deadline exceeded attempts={attempts} budget_ms={deadline.budget_ms()}")
+            raise _stopped("analyze_deadline_exceeded")
         attempts += 1
         t0 = time.time()
+        attempt_timeout = deadline.attempt_timeout(LLM_TIMEOUT_SECONDS)
+        local_repairs: List[Dict[str, Any]] = []
+        _emit("attempt_start", model=routing.model, remaining_ms=deadline.remaining_ms())
         try:
             # A1. Real LLM Call
-            response = llm_service.chat(
-                messages=messages,
-                model=ZHIPU_MODEL, # Use Zhipu model
-                temperature=0.2,
-                extra_client_config=zhipu_config, # Inject Zhipu config
-                response_format={"type": "json_object"}
-            )
+            if stream or progress is not None:
+                # Malformed output is rejected mid-generation instead of after the full completion;
+                # an attached progress stream sees token counts and can cancel between deltas.
+                parser = IncrementalJSONParser(_spec_field_checks()) if stream else None
+                current_attempt = attempts
+
+                def on_delta(delta: str) -> None:
+                    if parser is not None:
+                        parser.feed(delta)
+                    if progress is not None:
+                        progress.tokens(current_attempt, delta)
+
+                response = llm_service.chat_stream(
+                    messages=messages,
+                    on_delta=on_delta,
+                    model=routing.model,
+                    temperature=0.2,
+                    extra_client_config=zhipu_config,
+                    response_format={"type": "json_object"},
+                    caller="oracle.analyze",
+                    attempt=attempts,
+                    timeout=attempt_timeout
+                )
+            else:
+                response = llm_service.chat(
+                    messages=messages,
+                    model=routing.model, # Zhipu model chosen by the router
+                    temperature=0.2,
+                    extra_client_config=zhipu_config, # Inject Zhipu config
+                    response_format={"type": "json_object"},
+                    caller="oracle.analyze",
+                    attempt=attempts,
+                    timeout=attempt_timeout
+                )
             
             last_latency_ms = response.get("latency_ms")
             last_request_id = response.get("request_id")
             
             raw_text = response["text"]
-            # Extract JSON if markdown wrapped
-            json_text = raw_text
-            if "```json" in raw_text:
-                json_text = raw_text.split("```json")[1].split("```")[0]
-            elif "```" in raw_text:
-                json_text = raw_text.split("```")[1].split("```")[0]
-            
-            try:
-                data = json.loads(json_text.strip())
-            except json.JSONDecodeError:
-                repaired_json_text = repair_json_syntax(json_text)
-                data = json.loads(repaired_json_text.strip())
+            data = _parse_llm_json(raw_text)
             
             spec = TaskSpec.model_validate(data)
             if spec.deliverable != deliverable_type:
@@ -257,10 +447,17 @@ def generate_spec_with_llm(
 
             # C2. Advanced Validation & Normalization
             try:
-                data = validate_and_normalize(data, normalized_desc)
+                # Mechanical problems are repaired locally; only the rest cost an LLM round trip.
+                data, local_repairs = validate_with_repairs(data, normalized_desc)
                 # Re-validate against Pydantic to ensure normalization didn't break schema
                 spec = TaskSpec.model_validate(data)
+                if local_repairs:
+                    _emit("repair", repairs=local_repairs)
+                _emit("validation", ok=True)
             except SpecValidationError as e:
+                if getattr(e, "repairs", None):
+                    _emit("repair", repairs=e.repairs)
+                _emit("validation", ok=False, violations=[f"{v.error_code}: {v.message} (field: {v.field_path})" for v in e.violations])
                 # FALLBACK STRATEGY (Option 2) for SpecValidationError (e.g. Example Mismatch)
                 if attempts > retries and e.error_code == "spec_example_mismatch":
                     logger.warning(f"Final attempt failed with SpecValidationError: {e.message}. Applying fallback strategy.")
@@ -283,7 +480,7 @@ def generate_spec_with_llm(
                         "attempts": attempts,
                         "attempt_fail_reasons": fail_reasons + [f"spec_validation_fallback: {e.message}"],
                         "llm_provider_used": "zhipu",
-                        "llm_model_used": response.get("model", ZHIPU_MODEL),
+                        "llm_model_used": response.get("model", routing.model),
                         "llm_latency_ms": last_latency_ms,
                         "request_id": last_request_id,
                         "raw_text": raw_text,
@@ -293,7 +490,7 @@ def generate_spec_with_llm(
                     return spec.model_dump(), metadata
 
                 # Stop retrying blindly: Check if this error is identical to the previous one
-                current_fail_reason = f"{e.error_code}: {e.message} (field: {e.field_path})"
+                current_fail_reason = _format_violations(e)
                 if last_fail_reason == current_fail_reason:
                     metadata = {
                         "normalized_input_hash": input_hash,
@@ -303,7 +500,7 @@ def generate_spec_with_llm(
                         "attempts": attempts,
                         "attempt_fail_reasons": fail_reasons + [f"{current_fail_reason} [STUCK]"],
                         "llm_provider_used": "zhipu",
-                        "llm_model_used": response.get("model", ZHIPU_MODEL),
+                        "llm_model_used": response.get("model", routing.model),
                         "llm_latency_ms": last_latency_ms,
                         "request_id": last_request_id,
                         "raw_text": raw_text,
@@ -312,16 +509,14 @@ def generate_spec_with_llm(
                     }
                     raise OracleAnalyzeError("analyze_failed_stuck_validation", metadata)
                 
-                fail_reasons.append(current_fail_reason)
+                _fail(current_fail_reason)
                 last_fail_reason = current_fail_reason
                 
                 # Inject validator feedback into subsequent LLM attempts
                 # OPTIMIZATION: Provide only a concise error summary to avoid token explosion
                 # Construct Fix Guidance
-                guidance = f"""Validation Error: {e.message}
-Rule ID: {e.error_code}
-Field: {e.field_path}
-Instruction: Please fix the JSON to comply with this rule. Do not repeat the same invalid pattern."""
+                # All violations go into one message so a multi-problem spec costs one round trip.
+                guidance = _build_violation_guidance(e.violations)
                 
                 messages.append({"role": "user", "content": guidance})
                 continue
@@ -332,12 +527,20 @@ Instruction: Please fix the JSON to comply with this rule. Do not repeat the sam
             
             if missing:
                 # Self-Correction Loop
-                fail_reasons.append(f"missing_fields: {missing}")
+                _fail(f"missing_fields: {missing}")
                 messages.append({"role": "user", "content": f"Validation Error: Missing required fields {missing}. Please fix."})
                 continue
                 
             # E1. Contradictions
             contradictions = detect_contradictions(spec, normalized_desc)
+            if contradictions:
+                contradiction_repairs = repair_contradictions(data, contradictions)
+                if contradiction_repairs:
+                    spec = TaskSpec.model_validate(data)
+                    if not detect_contradictions(spec, normalized_desc):
+                        local_repairs.extend(contradiction_repairs)
+                        _emit("repair", repairs=contradiction_repairs)
+                        contradictions = []
             if contradictions:
                 # FALLBACK STRATEGY (Option 2): If this is the final attempt, degrade to low_confidence instead of failing.
                 if attempts > retries:
@@ -362,7 +565,7 @@ Instruction: Please fix the JSON to comply with this rule. Do not repeat the sam
                         "attempts": attempts,
                         "attempt_fail_reasons": fail_reasons + [f"contradictions_fallback: {contradictions}"],
                         "llm_provider_used": "zhipu",
-                        "llm_model_used": response.get("model", ZHIPU_MODEL),
+                        "llm_model_used": response.get("model", routing.model),
                         "llm_latency_ms": last_latency_ms,
                         "request_id": last_request_id,
                         "raw_text": raw_text,
@@ -372,7 +575,7 @@ Instruction: Please fix the JSON to comply with this rule. Do not repeat the sam
                     # We must dump the modified spec, not the original data
                     return spec.model_dump(), metadata
 
-                fail_reasons.append(f"contradictions: {contradictions}")
+                _fail(f"contradictions: {contradictions}")
                 messages.append({"role": "user", "content": f"Validation Error: Contradictions detected {contradictions}. \n\nCRITICAL FIX REQUIRED:\n1. If the task is a CLI tool printing text, change 'signature.returns' to 'Any' or 'str'.\n2. If the examples use strings/lists, ensure 'signature.returns' matches.\n3. Do not assume 'int' for CLI unless it only returns an exit code.\n\nPlease fix the JSON."})
                 continue
             
@@ -385,12 +588,13 @@ Instruction: Please fix the JSON to comply with this rule. Do not repeat the sam
                 "attempts": attempts,
                 "attempt_fail_reasons": fail_reasons,
                 "llm_provider_used": "zhipu", # Enforced by usage of llm_service with OPENAI_API_KEY
-                "llm_model_used": response.get("model", ZHIPU_MODEL),
+                "llm_model_used": response.get("model", routing.model),
                 "llm_latency_ms": last_latency_ms,
                 "request_id": last_request_id,
                 "raw_text": raw_text,
                 "missing_fields": missing, # Should be empty or acceptable
-                "ambiguities": data.get("ambiguities", [])
+                "ambiguities": data.get("ambiguities", []),
+                "local_repairs": local_repairs
             }
             
             return data, metadata
@@ -420,7 +624,7 @@ Instruction: Please fix the JSON to comply with this rule. Do not repeat the sam
                     "attempts": attempts,
                     "attempt_fail_reasons": fail_reasons + [f"validation_fallback: {err_msg}"],
                     "llm_provider_used": "zhipu",
-                    "llm_model_used": response.get("model", ZHIPU_MODEL),
+                    "llm_model_used": response.get("model", routing.model),
                     "llm_latency_ms": last_latency_ms,
                     "request_id": last_request_id,
                     "raw_text": raw_text,
@@ -429,12 +633,12 @@ Instruction: Please fix the JSON to comply with this rule. Do not repeat the sam
                 }
                 return spec.model_dump(), metadata
 
-            fail_reasons.append(f"schema_fail: {err_msg}")
+            _fail(f"schema_fail: {err_msg}")
             # Retry logic
             if attempts <= retries:
                 messages.append({"role": "user", "content": f"JSON Schema Validation Failed: {err_msg}. Please correct the JSON format. If there is a type conflict, set 'returns' to 'Any'."})
         except json.JSONDecodeError:
-            fail_reasons.append("json_parse_fail")
+            _fail("json_parse_fail")
             if attempts <= retries:
                 messages.append({"role": "user", "content": "JSON Parse Error: The output was not valid JSON. Please return ONLY a valid JSON object matching the schema v1.0. Do not include any markdown formatting or extra text."})
             elif attempts > retries:
@@ -460,16 +664,27 @@ Instruction: Please fix the JSON to comply with this rule. Do not repeat the sam
                     "attempts": attempts,
                     "attempt_fail_reasons": fail_reasons + ["final_parse_fail"],
                     "llm_provider_used": "zhipu",
-                    "llm_model_used": ZHIPU_MODEL,
+                    "llm_model_used": routing.model,
                     "raw_text": locals().get("raw_text", ""),
                     "request_id": last_request_id
                 }
                 return fallback_spec, meta
+        except AnalyzeCancelled:
+            last_latency_ms = int((time.time() - t0) * 1000)
+            logger.info(f"[oracle] analyze cancelled mid-stream attempt={attempts}")
+            raise _stopped("analyze_cancelled")
+        except StreamAbort as e:
+            last_latency_ms = int((time.time() - t0) * 1000)
+            raw_text = getattr(e, "partial_text", "")
+            logger.info(f"[oracle] stream aborted attempt={attempts} reason={e.reason} field={e.field} chars={len(raw_text)}")
+            _fail(f"stream_abort: {e}" + (f" {e.problems}" if e.problems else ""))
+            if attempts <= retries:
+                messages.append({"role": "user", "content": _stream_abort_guidance(e)})
         except Exception as e:
             last_latency_ms = int((time.time() - t0) * 1000)
             if hasattr(e, 'request_id'):
                 last_request_id = e.request_id
-            fail_reasons.append(f"llm_error: {str(e)}")
+            _fail(f"llm_error: {str(e)}")
             # If it's a provider error, maybe don't retry? But we will retry for now.
             
     # Fallback if all retries failed - STOP FAKE SUCCESS
@@ -482,24 +697,414 @@ Instruction: Please fix the JSON to comply with this rule. Do not repeat the sam
         "request_id": last_request_id,
         "llm_latency_ms": last_latency_ms,
         "llm_provider_used": "zhipu",
-        "llm_model_used": ZHIPU_MODEL,
+        "llm_model_used": routing.model,
         "missing_fields": [], # Can't know if we failed before validation
         "ambiguities": []
     }
     raise OracleAnalyzeError("analyze_failed_after_retries", metadata)
 
-def generate_tests_with_llm(
-    spec_json: Dict[str, Any],
-    confirmations: Dict[str, Any],
-    public_examples_count: int,
-    hidden_tests_count: int,
-    difficulty_profile: Optional[Dict[str, Any]],
-    seed: int
-) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+# Top-level spec fields an incremental re-analysis may replace.
+PATCHABLE_FIELDS = {
+    "goal_one_liner", "interaction_model", "signature", "constraints", "assumptions",
+    "output_ops", "output_shape", "ambiguities", "public_examples", "confidence_reasons",
+}
+
+def _build_incremental_prompt(prior_spec: Dict[str, Any], diff_text: str) -> str:
+    return f"""A task description was revised. Update its existing spec for the changed text only.
+    
+    Existing spec (JSON):
+    {json.dumps(prior_spec, ensure_ascii=False)}
     
+    Description changes (unified diff):
+    {diff_text}
+    
+    Output JSON Schema:
+    {{ "changed_fields": {{ "<top-level spec field>": <complete new value> }} }}
+    Rules:
+    1. Include ONLY top-level fields whose value must change because of the diff; omit all others.
+    2. Each included field carries its complete new value, not a partial edit.
+    3. Allowed fields: {", ".join(sorted(PATCHABLE_FIELDS))}.
+    4. If nothing needs to change, return {{ "changed_fields": {{}} }}."""
+
+def reanalyze_spec_with_llm(
+    prior_spec: Dict[str, Any],
+    prior_description: str,
+    task_description: str,
+    language: str,
+    runtime: str,
+    deliverable_type: str,
+    retries: int = 1,
+    deadline_seconds: Optional[float] = None
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Incremental analyze for a revised task: the model gets the parent spec plus the description
+    diff and returns only the top-level fields that change. Validation runs only the rules
+    reading those fields (plus the ambiguity rule when the description's triggers changed).
+    Raises OracleAnalyzeError when no valid patch is produced; callers fall back to a full analyze.
+    """
+    normalized_desc = task_description.strip()
+    input_hash = compute_input_hash(normalized_desc)
+    diff_text = _description_diff(prior_description.strip(), normalized_desc)
+    base_meta: Dict[str, Any] = {
+        "normalized_input_hash": input_hash,
+        "prompt_version": PROMPT_VERSION,
+        "schema_version": SCHEMA_VERSION,
+        "interaction_model_pred": prior_spec.get("interaction_model"),
+        "llm_provider_used": "zhipu",
+        "llm_model_used": ZHIPU_MODEL,
+    }
+    if not diff_text:
+        # Whitespace-only revision: the parent spec stands as is.
+        return json.loads(json.dumps(prior_spec)), {**base_meta, "attempts": 0, "attempt_fail_reasons": [], "incremental": {"diff_lines": 0, "changed_fields": [], "validated_fields": []}}
+
+    deadline = Deadline(ORACLE_ANALYZE_DEADLINE_SECONDS if deadline_seconds is None else deadline_seconds)
+    messages = [
+        {"role": "system", "content": _build_spec_system_prompt(language, runtime, deliverable_type)},
+        {"role": "user", "content": _build_incremental_prompt(prior_spec, diff_text)},
+    ]
+    triggers_changed = trigger_scan(prior_description) != trigger_scan(normalized_desc)
+    attempts = 0
+    fail_reasons: List[str] = []
+    raw_text = ""
+    response: Dict[str, Any] = {}
+    while attempts <= retries and (attempts == 0 or deadline.can_attempt()):
+        attempts += 1
+        try:
+            response = llm_service.chat(
+                messages=messages,
+                model=ZHIPU_MODEL,
+                temperature=0.2,
+                extra_client_config=zhipu_config,
+                response_format={"type": "json_object"},
+                caller="oracle.analyze.incremental",
+                attempt=attempts,
+                timeout=deadline.attempt_timeout(LLM_TIMEOUT_SECONDS)
+            )
+            raw_text = response["text"]
+            patch = _parse_llm_json(raw_text).get("changed_fields")
+        except json.JSONDecodeError:
+            fail_reasons.append("json_parse_fail")
+            messages.append({"role": "user", "content": "JSON Parse Error: Please return ONLY a valid JSON object of the form {\"changed_fields\": {...}}."})
+            continue
+        except Exception as e:
+            fail_reasons.append(f"llm_error: {e}")
+            continue
+
+        unknown = sorted(set(patch or {}) - PATCHABLE_FIELDS) if isinstance(patch, dict) else []
+        if not isinstance(patch, dict) or unknown:
+            fail_reasons.append(f"bad_patch: {unknown or type(patch).__name__}")
+            messages.append({"role": "user", "content": f"Validation Error: 'changed_fields' must be an object keyed by these fields only: {', '.join(sorted(PATCHABLE_FIELDS))}. Invalid: {unknown}."})
+            continue
+
+        data = {**json.loads(json.dumps(prior_spec)), **patch}
+        data["deliverable"] = deliverable_type
+        affected = set(patch) | ({"ambiguities"} if triggers_changed else set())
+        local_repairs: List[Dict[str, Any]] = []
+        try:
+            # Schema first: the validator rules assume well-formed fields (e.g. ambiguity dicts).
+            TaskSpec.model_validate(data)
+            violations = collect_violations(data, normalized_desc, fields=affected)
+            if violations:
+                fired: set = set()
+                local_repairs = [rec for v in violations if (rec := repair_once(data, v, fired)) is not None]
+                violations = collect_violations(data, normalized_desc, fields=affected | {r["field"].split(".")[0] for r in local_repairs})
+            spec = TaskSpec.model_validate(data)
+        except ValidationError as e:
+            fail_reasons.append(f"schema_fail: {e}")
+            messages.append({"role": "user", "content": f"JSON Schema Validation Failed: {e}. Please correct 'changed_fields'."})
+            continue
+        except Exception as e:
+            # A rule tripping over an unexpected value counts as a bad patch, never as a 500.
+            fail_reasons.append(f"validator_error: {type(e).__name__}: {e}")
+            continue
+        if violations:
+            fail_reasons.append("; ".join(f"{v.error_code}: {v.message} (field: {v.field_path})" for v in violations))
+            messages.append({"role": "user", "content": _build_violation_guidance(violations)})
+            continue
+
+        # The whole merged spec must still pass the full analyze's required-field and contradiction checks.
+        missing = validate_required_fields(spec, data.get("interaction_model", "unknown"))
+        if missing:
+            fail_reasons.append(f"missing_fields: {missing}")
+            messages.append({"role": "user", "content": f"Validation Error: Missing required fields {missing}. Please fix."})
+            continue
+        contradictions = detect_contradictions(spec, normalized_desc)
+        if contradictions:
+            contradiction_repairs = repair_contradictions(data, contradictions)
+            if contradiction_repairs:
+                spec = TaskSpec.model_validate(data)
+                if not detect_contradictions(spec, normalized_desc):
+                    local_repairs.extend(contradiction_repairs)
+                    contradictions = []
+        if contradictions:
+            fail_reasons.append(f"contradictions: {contradictions}")
+            messages.append({"role": "user", "content": f"Validation Error: Contradictions {contradictions}. Please correct 'changed_fields'."})
+            continue
+
+        logger.info(f"[oracle] incremental analyze attempts={attempts} changed_fields={sorted(patch)} validated={sorted(affected)}")
+        return normalize_spec(data), {
+            **base_meta,
+            "attempts": attempts,
+            "attempt_fail_reasons": fail_reasons,
+            "llm_model_used": response.get("model", ZHIPU_MODEL),
+            "llm_latency_ms": response.get("latency_ms"),
+            "request_id": response.get("request_id"),
+            "raw_text": raw_text,
+            "missing_fields": [],
+            "ambiguities": data.get("ambiguities", []),
+            "local_repairs": local_repairs,
+            "incremental": {
+                "diff_lines": len(diff_text.splitlines()),
+                "changed_fields": sorted(patch),
+                "validated_fields": sorted(affected),
+            },
+        }
+
+    raise OracleAnalyzeError("incremental_analyze_failed", {**base_meta, "attempts": attempts, "attempt_fail_reasons": fail_reasons, "raw_text": raw_text})
+
+class CandidateRejected(Exception):
+    pass
+
+def _candidate_plans(k: int) -> List[Dict[str, Any]]:
+    """
+    Candidate request configurations for parallel analysis: temperature spread on the
+    primary provider, plus the OpenAI model when a key is configured.
+    """
+    plans = [
+        {"provider": "zhipu", "model": ZHIPU_MODEL, "client_config": zhipu_config, "temperature": t}
+        for t in (0.2, 0.5, 0.8)
+    ]
+    if OPENAI_API_KEY:
+        plans.insert(1, {"provider": "openai", "model": OPENAI_MODEL, "client_config": None, "temperature": 0.2})
+    while len(plans) < k:
+        base = plans[len(plans) % 3]
+        plans.append(dict(base, temperature=min(1.0, base["temperature"] + 0.1)))
+    return plans[:k]
+
+def _validate_candidate(raw_text: str, normalized_desc: str, deliverable_type: str) -> Tuple[Dict[str, Any], str]:
+    """
+    Full acceptance check for one LLM completion: parse, schema, validate_and_normalize,
+    required fields and contradictions. Returns (data, interaction_model) or raises CandidateRejected.
+    """
+    try:
+        data = _parse_llm_json(raw_text)
+    except json.JSONDecodeError:
+        raise CandidateRejected("json_parse_fail")
+    try:
+        spec = TaskSpec.model_validate(data)
+    except ValidationError as e:
+        raise CandidateRejected(f"schema_fail: {e}")
+    if spec.deliverable != deliverable_type:
+        data["deliverable"] = deliverable_type
+    if deliverable_type == "script":
+        sig = data.get("signature") or {}
+        if isinstance(sig, dict) and sig.get("returns") == "int":
+            sig["returns"] = "Any"
+    try:
+        data, _ = validate_with_repairs(data, normalized_desc)
+        spec = TaskSpec.model_validate(data)
+    except SpecValidationError as e:
+        raise CandidateRejected(_format_violations(e))
+    except ValidationError as e:
+        raise CandidateRejected(f"schema_fail: {e}")
+    interaction_model = data.get("interaction_model", "unknown")
+    missing = validate_required_fields(spec, interaction_model)
+    if missing:
+        raise CandidateRejected(f"missing_fields: {missing}")
+    contradictions = detect_contradictions(spec, normalized_desc)
+    if contradictions and repair_contradictions(data, contradictions):
+        spec = TaskSpec.model_validate(data)
+        contradictions = detect_contradictions(spec, normalized_desc)
+    if contradictions:
+        raise CandidateRejected(f"contradictions: {contradictions}")
+    return data, interaction_model
+
+
+def _drop_candidate(fut: Future) -> str:
+    # A request already in flight cannot be cancelled; it runs until its own timeout (bounded by the
+    # deadline) and the worker thread is left to finish in the background.
+    return "cancelled" if fut.cancel() else "abandoned"
+
+
+def generate_spec_parallel(
+    task_description: str,
+    language: str,
+    runtime: str,
+    deliverable_type: str,
+    candidates: int = 3,
+    hedge_ms: Optional[int] = None,
+    retries: int = 2,
+    deadline: Optional[Deadline] = None,
+    progress: Optional[AnalyzeProgress] = None
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    First-valid-wins analysis: issue up to `candidates` requests concurrently (optionally
+    hedged: the extra candidates only start if no valid spec has arrived after hedge_ms),
+    validate each as it completes and return the first that passes. Losing candidates are
+    recorded in attempt_fail_reasons, as cancelled if they had not started or abandoned if their
+    request was already in flight. If every candidate fails, fall back to the sequential
+    repair loop with whatever is left of the deadline.
+    progress gets candidate_start / candidate_failed / candidate_won events; cancelling it stops
+    the wait within CANCEL_POLL_SECONDS and raises OracleAnalyzeError("analyze_cancelled").
+    """
+    deadline = deadline or Deadline(ORACLE_ANALYZE_DEADLINE_SECONDS)
+    normalized_desc = task_description.strip()
+    input_hash = compute_input_hash(normalized_desc)
+    hedge_ms = ORACLE_ANALYZE_HEDGE_MS if hedge_ms is None else hedge_ms
+    messages = [
+        {"role": "system", "content": _build_spec_system_prompt(language, runtime, deliverable_type)},
+        {"role": "user", "content": normalized_desc}
+    ]
+    plans = _candidate_plans(candidates)
+
+    def _call(plan: Dict[str, Any]) -> Dict[str, Any]:
+        return llm_service.chat(
+            messages=messages,
+            model=plan["model"],
+            temperature=plan["temperature"],
+            extra_client_config=plan["client_config"],
+            response_format={"type": "json_object"},
+            caller="oracle.analyze.parallel",
+            attempt=1,
+            timeout=deadline.attempt_timeout(LLM_TIMEOUT_SECONDS)
+        )
+
+    fail_reasons: List[str] = []
+    executor = ThreadPoolExecutor(max_workers=len(plans), thread_name_prefix="oracle-analyze")
+    futures: Dict[Future, int] = {}
+
+    def _label(idx: int) -> str:
+        plan = plans[idx]
+        return f"candidate[{idx}] {plan['provider']}/{plan['model']} t={plan['temperature']}"
+
+    def _launch(idx: int) -> Future:
+        fut = executor.submit(_call, plans[idx])
+        futures[fut] = idx
+        if progress is not None:
+            progress.emit("candidate_start", candidate=idx, model=plans[idx]["model"], temperature=plans[idx]["temperature"], remaining_ms=deadline.remaining_ms())
+        return fut
+
+    def _candidate_failed(idx: int, reason: str) -> None:
+        fail_reasons.append(f"{_label(idx)}: {reason}")
+        if progress is not None:
+            progress.emit("candidate_failed", candidate=idx, reason=reason, remaining_ms=deadline.remaining_ms())
+
+    try:
+        launch = [0] if hedge_ms and hedge_ms > 0 else list(range(len(plans)))
+        for idx in launch:
+            _launch(idx)
+        hedged = len(launch) == len(plans)
+        hedge_at = time.monotonic() + (hedge_ms or 0) / 1000.0
+        pending = set(futures)
+        while pending:
+            wait_s = deadline.remaining() if hedged else min(max(0.0, hedge_at - time.monotonic()), deadline.remaining())
+            if progress is not None:
+                wait_s = min(wait_s, CANCEL_POLL_SECONDS)
+            done, pending = wait(pending, timeout=wait_s, return_when=FIRST_COMPLETED)
+            if progress is not None and progress.cancelled:
+                for other in pending:
+                    fail_reasons.append(f"{_label(futures[other])}: {_drop_candidate(other)} (analyze cancelled)")
+                logger.info(f"[oracle] parallel analyze cancelled candidates={len(futures)}")
+                raise OracleAnalyzeError("analyze_cancelled", {
+                    "normalized_input_hash": input_hash,
+                    "attempts": len(futures),
+                    "attempt_fail_reasons": fail_reasons,
+                    "final_status": "analyze_cancelled",
+                    "llm_provider_used": "zhipu",
+                    "llm_model_used": ZHIPU_MODEL,
+                    "missing_fields": [],
+                    "ambiguities": [],
+                    "analyze_mode": "parallel"
+                })
+            if not done and not deadline.can_attempt(0.001):
+                for other in pending:
+                    fail_reasons.append(f"candidate[{futures[other]}]: deadline_exceeded, {_drop_candidate(other)} [remaining_ms=0]")
+                break
+            for fut in done:
+                idx = futures[fut]
+                plan = plans[idx]
+                try:
+                    response = fut.result()
+                    data, interaction_model = _validate_candidate(response["text"], normalized_desc, deliverable_type)
+                except CandidateRejected as e:
+                    _candidate_failed(idx, str(e))
+                    continue
+                except Exception as e:
+                    _candidate_failed(idx, f"llm_error: {e}")
+                    continue
+
+                if progress is not None:
+                    progress.emit("candidate_won", candidate=idx, latency_ms=response.get("latency_ms"), remaining_ms=deadline.remaining_ms())
+                for other in pending:
+                    fail_reasons.append(f"{_label(futures[other])}: {_drop_candidate(other)} (lost race)")
+                if not hedged:
+                    fail_reasons.extend(f"{_label(i)}: not_started (hedge)" for i in range(len(launch), len(plans)))
+                metadata = {
+                    "normalized_input_hash": input_hash,
+                    "prompt_version": PROMPT_VERSION,
+                    "schema_version": SCHEMA_VERSION,
+                    "interaction_model_pred": interaction_model,
+                    "attempts": len(futures),
+                    "attempt_fail_reasons": fail_reasons,
+                    "llm_provider_used": plan["provider"],
+                    "llm_model_used": response.get("model", plan["model"]),
+                    "llm_latency_ms": response.get("latency_ms"),
+                    "request_id": response.get("request_id"),
+                    "raw_text": response["text"],
+                    "missing_fields": [],
+                    "ambiguities": data.get("ambiguities", []),
+                    "analyze_mode": "parallel",
+                    "winning_candidate": idx
+                }
+                return data, metadata
+            if not hedged and (done or time.monotonic() >= hedge_at):
+                # Hedge delay elapsed, or the first candidate already failed: launch the rest.
+                for idx in range(1, len(plans)):
+                    pending.add(_launch(idx))
+                hedged = True
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    logger.warning(f"[ANALYZE] all {len(plans)} parallel candidates failed; falling back to sequential repair loop")
+    try:
+        if not deadline.can_attempt():
+            raise OracleAnalyzeError("analyze_deadline_exceeded", {
+                "normalized_input_hash": input_hash,
+                "attempts": 0,
+                "attempt_fail_reasons": [f"deadline_exceeded: budget_ms={deadline.budget_ms()} [remaining_ms={deadline.remaining_ms()}]"],
+                "final_status": "analyze_deadline_exceeded",
+                "llm_provider_used": "zhipu",
+                "llm_model_used": ZHIPU_MODEL,
+                "missing_fields": [],
+                "ambiguities": []
+            })
+        data, metadata = _generate_spec_sequential(task_description, language, runtime, deliverable_type, retries, ORACLE_STREAM_PARSE, deadline, progress=progress)
+    except OracleAnalyzeError as e:
+        e.metadata["attempt_fail_reasons"] = fail_reasons + list(e.metadata.get("attempt_fail_reasons") or [])
+        e.metadata["attempts"] = len(plans) + int(e.metadata.get("attempts") or 0)
+        raise
+    metadata["attempt_fail_reasons"] = fail_reasons + list(metadata.get("attempt_fail_reasons") or [])
+    metadata["attempts"] = len(plans) + int(metadata.get("attempts") or 0)
+    metadata["analyze_mode"] = "parallel_fallback"
+    return data, metadata
+
+def _check_test_list(value: Any) -> List[str]:
+    if not isinstance(value, list):
+        return ["Must be a list"]
+    for i, t in enumerate(value):
+        if not isinstance(t, dict) or not {"name", "input", "expected"} <= set(t):
+            return [f"item {i} must be an object with name, input and expected"]
+    return []
+
+def _generate_test_chunk(spec_json: Dict[str, Any], chunk: Dict[str, Any], seed: int, stream: bool) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """One LLM completion for one chunk. Raises on transport, parse or shape failure."""
+    category = chunk["category"]
+    guidance = CATEGORY_GUIDANCE.get(category, f"{category} cases.")
     prompt = f"""Generate Test Cases.
     Spec: {json.dumps(spec_json)}
-    Count: {public_examples_count} public, {hidden_tests_count} hidden.
+    Count: {chunk["public_count"]} public, {chunk["hidden_count"]} hidden.
+    Focus for hidden tests: {guidance}
+    Seed: {seed}-{chunk["index"]} (vary inputs accordingly; do not reuse the spec's public examples).
     
     Output JSON Schema:
     {{
@@ -507,29 +1112,257 @@ def generate_tests_with_llm(
       "hidden_tests": [ {{ "name": "str", "input": ["args..."], "expected": any }} ]
     }}
     IMPORTANT Rules:
-    1. 'name' is MANDATORY.
+    1. 'name' is MANDATORY. Prefix hidden test names with "{category}_".
     2. 'input' MUST be the list of arguments passed to the function.
        - Example: func(a, b) -> input: [a, b]
        - Example: func(L) -> input: [[1, 2]] (Argument is a list, so wrap it)
     """
-    
-    try:
+    messages = [{"role": "user", "content": prompt}]
+    if stream:
+        parser = IncrementalJSONParser({k: _check_test_list for k in ("public_examples", "hidden_tests")})
+        response = llm_service.chat_stream(
+            messages=messages,
+            on_delta=parser.feed,
+            temperature=0.3,
+            model=ZHIPU_MODEL,
+            extra_client_config=zhipu_config,
+            caller="oracle.generate_tests"
+        )
+    else:
         response = llm_service.chat(
-            messages=[{"role": "user", "content": prompt}],
+            messages=messages,
             temperature=0.3,
             model=ZHIPU_MODEL, # Use Zhipu
-            extra_client_config=zhipu_config # Use Zhipu config
+            extra_client_config=zhipu_config, # Use Zhipu config
+            caller="oracle.generate_tests"
         )
-        # ... parsing logic similar to above ...
-        raw = response["text"]
-        if "```json" in raw: raw = raw.split("```json")[1].split("```")[0]
-        data = json.loads(raw.strip())
-        
-        meta = {
-            "llm_provider_used": "zhipu",
-            "llm_model_used": response.get("model", ZHIPU_MODEL),
-            "raw_text": response["text"]
+    data = _parse_llm_json(response["text"])
+    problems = [f"{k}: {p}" for k in ("public_examples", "hidden_tests") for p in _check_test_list(data.get(k, []))]
+    if problems:
+        raise ValueError(f"malformed chunk: {problems}")
+    return data, response
+
+def generate_tests_with_llm(
+    spec_json: Dict[str, Any],
+    confirmations: Dict[str, Any],
+    public_examples_count: int,
+    hidden_tests_count: int,
+    difficulty_profile: Optional[Dict[str, Any]],
+    seed: int,
+    stream: Optional[bool] = None
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Chunked generation: hidden tests are split by difficulty_profile category (typical / edge /
+    large by default) into chunks of at most ORACLE_TESTS_CHUNK_SIZE, generated in parallel,
+    then merged with canonical-input dedupe and capped to the requested counts. A failed chunk
+    is retried on its own; only if every chunk fails is the bundle empty.
+    """
+    stream = ORACLE_STREAM_PARSE if stream is None else stream
+    chunks = plan_chunks(public_examples_count, hidden_tests_count, difficulty_profile, ORACLE_TESTS_CHUNK_SIZE)
+
+    def _run(chunk: Dict[str, Any]) -> Dict[str, Any]:
+        errors: List[str] = []
+        for attempt in range(1, ORACLE_TESTS_CHUNK_RETRIES + 2):
+            try:
+                data, response = _generate_test_chunk(spec_json, chunk, seed, stream)
+                return {"data": data, "response": response, "attempts": attempt, "errors": errors}
+            except StreamAbort as e:
+                errors.append(f"stream_abort: {e} {e.problems}")
+            except Exception as e:
+                errors.append(str(e))
+        return {"data": None, "response": None, "attempts": ORACLE_TESTS_CHUNK_RETRIES + 1, "errors": errors}
+
+    with ThreadPoolExecutor(max_workers=min(len(chunks), ORACLE_TESTS_MAX_PARALLEL), thread_name_prefix="oracle-tests") as executor:
+        outcomes = list(executor.map(_run, chunks))
+
+    chunk_report = [
+        {
+            "category": c["category"],
+            "requested_hidden": c["hidden_count"],
+            "requested_public": c["public_count"],
+            "attempts": o["attempts"],
+            "ok": o["data"] is not None,
+            "returned_hidden": len((o["data"] or {}).get("hidden_tests") or []),
+            "errors": o["errors"],
         }
-        return data, meta
+        for c, o in zip(chunks, outcomes)
+    ]
+    succeeded = [(c, o) for c, o in zip(chunks, outcomes) if o["data"] is not None]
+    if not succeeded:
+        return {"public_examples": [], "hidden_tests": []}, {"error": "; ".join(e for o in outcomes for e in o["errors"]), "chunks": chunk_report}
+
+    data, merge_stats = merge_chunks([(c, o["data"]) for c, o in succeeded], public_examples_count, hidden_tests_count)
+    logger.info(f"[oracle] generate_tests chunks={len(chunks)} ok={len(succeeded)} hidden={len(data['hidden_tests'])} merge={merge_stats}")
+    meta = {
+        "llm_provider_used": "zhipu",
+        "llm_model_used": succeeded[0][1]["response"].get("model", ZHIPU_MODEL),
+        "raw_text": [o["response"]["text"] for _, o in succeeded],
+        "chunks": chunk_report,
+        "merge_stats": merge_stats
+    }
+    return data, meta
+
+def _reference_entry(spec_json: Dict[str, Any]) -> str:
+    # Matches fill_expected_from_reference: only function deliverables are called directly.
+    if (spec_json.get("deliverable") or "function") != "function":
+        return "a main() that reads stdin and prints to stdout, called under if __name__ == '__main__'"
+    fname = (spec_json.get("signature") or {}).get("function_name") or "solve"
+    return f"a top-level function `{fname}`"
+
+
+def generate_reference_solution(spec_json: Dict[str, Any], confirmations: Dict[str, Any]) -> Tuple[Optional[str], Dict[str, Any]]:
+    """
+    The reference step of generate_tests_with_reference on its own: one LLM call for a reference
+    implementation, no test inputs. Used by local expansion when the bundle's expected values came
+    from the LLM and the version has no reference yet. Returns (code or None, meta).
+    """
+    prompt = f"""Write a reference solution for this spec.
+    Spec: {json.dumps(spec_json)}
+    User decisions on ambiguities: {json.dumps(confirmations or {})}
+    Reference: complete, correct Python 3 source defining {_reference_entry(spec_json)}. Standard library only.
+
+    Output JSON Schema:
+    {{
+      "reference_solution": "python source"
+    }}
+    """
+    try:
+        response = llm_service.chat(
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.2,
+            model=ZHIPU_MODEL,
+            extra_client_config=zhipu_config,
+            response_format={"type": "json_object"},
+            caller="oracle.generate_tests.reference_only"
+        )
+        data = _parse_llm_json(response["text"])
+    except Exception as e:
+        return None, {"error": str(e)}
+    reference = data.get("reference_solution") if isinstance(data, dict) else None
+    if not isinstance(reference, str) or not reference.strip():
+        return None, {"error": "missing_reference_solution", "raw_text": response["text"]}
+    return reference, {"llm_model_used": response.get("model", ZHIPU_MODEL), "request_id": response.get("request_id")}
+
+
+def generate_tests_with_reference(
+    spec_json: Dict[str, Any],
+    confirmations: Dict[str, Any],
+    public_examples_count: int,
+    hidden_tests_count: int,
+    difficulty_profile: Optional[Dict[str, Any]],
+    seed: int,
+    stream: Optional[bool] = None
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Reference mode: the LLM writes one reference implementation plus test inputs only; the
+    expected values come from executing the reference locally in one batch. Tests the
+    reference crashes or times out on are dropped and reported in meta['reference_drops'].
+    """
+    stream = ORACLE_STREAM_PARSE if stream is None else stream
+    category_counts = {}
+    for c in plan_chunks(0, hidden_tests_count, difficulty_profile, max(1, hidden_tests_count)):
+        category_counts[c["category"]] = category_counts.get(c["category"], 0) + c["hidden_count"]
+    mix = ", ".join(f"{n} {cat} ({CATEGORY_GUIDANCE.get(cat, cat + ' cases.')})" for cat, n in category_counts.items())
+    entry = _reference_entry(spec_json)
+    prompt = f"""Write a reference solution and test INPUTS (no expected outputs).
+    Spec: {json.dumps(spec_json)}
+    User decisions on ambiguities: {json.dumps(confirmations or {})}
+    Reference: complete, correct Python 3 source defining {entry}. Standard library only.
+    Count: {public_examples_count} public inputs, {hidden_tests_count} hidden inputs: {mix}.
+    Seed: {seed} (vary inputs accordingly).
+    
+    Output JSON Schema:
+    {{
+      "reference_solution": "python source",
+      "public_inputs": [ {{ "name": "str", "input": ["args..."] }} ],
+      "hidden_inputs": [ {{ "name": "str", "category": "str", "input": ["args..."] }} ]
+    }}
+    IMPORTANT Rules:
+    1. 'name' is MANDATORY and unique.
+    2. 'input' MUST be the list of arguments passed to the function.
+       - Example: func(a, b) -> input: [a, b]
+       - Example: func(L) -> input: [[1, 2]] (Argument is a list, so wrap it)
+    3. Do NOT include expected values; they are computed by running the reference.
+    """
+    messages = [{"role": "user", "content": prompt}]
+    try:
+        if stream:
+            parser = IncrementalJSONParser({k: _check_input_list for k in ("public_inputs", "hidden_inputs")})
+            response = llm_service.chat_stream(
+                messages=messages,
+                on_delta=parser.feed,
+                temperature=0.3,
+                model=ZHIPU_MODEL,
+                extra_client_config=zhipu_config,
+                caller="oracle.generate_tests.reference"
+            )
+        else:
+            response = llm_service.chat(
+                messages=messages,
+                temperature=0.3,
+                model=ZHIPU_MODEL,
+                extra_client_config=zhipu_config,
+                caller="oracle.generate_tests.reference"
+            )
+        data = _parse_llm_json(response["text"])
+    except StreamAbort as e:
+        return {"public_examples": [], "hidden_tests": []}, {"error": f"stream_abort: {e} {e.problems}", "raw_text": getattr(e, "partial_text", ""), "expected_mode": "reference"}
     except Exception as e:
-        return {"public_examples": [], "hidden_tests": []}, {"error": str(e)}
+        return {"public_examples": [], "hidden_tests": []}, {"error": str(e), "expected_mode": "reference"}
+
+    reference = data.get("reference_solution")
+    if not isinstance(reference, str) or not reference.strip():
+        return {"public_examples": [], "hidden_tests": []}, {"error": "missing_reference_solution", "raw_text": response["text"], "expected_mode": "reference"}
+
+    # Dedupe inputs before spending sandbox time on them
+    seen: set = set()
+    names: set = set()
+    staged: List[Dict[str, Any]] = []
+    for kind, key in (("public", "public_inputs"), ("hidden", "hidden_inputs")):
+        for item in data.get(key) or []:
+            if not isinstance(item, dict) or "input" not in item:
+                continue
+            ck = canonical_input(item["input"])
+            if ck in seen:
+                continue
+            seen.add(ck)
+            name = str(item.get("name") or f"{kind}_case")
+            base, n = name, 2
+            while name in names:
+                name = f"{base}_{n}"
+                n += 1
+            names.add(name)
+            staged.append({"kind": kind, "name": name, "input": item["input"], "category": item.get("category")})
+
+    kept, drops = fill_expected_from_reference(spec_json, reference, [{"name": t["name"], "input": t["input"]} for t in staged])
+    kept_by_name = {t["name"]: t for t in kept}
+    public: List[Dict[str, Any]] = []
+    hidden: List[Dict[str, Any]] = []
+    for t in staged:
+        k = kept_by_name.get(t["name"])
+        if k is None:
+            continue
+        if t["kind"] == "public":
+            public.append({"name": t["name"], "input": t["input"], "expected": k["expected"]})
+        else:
+            tags = [str(t["category"])] if t.get("category") else []
+            hidden.append({"name": t["name"], "input": t["input"], "expected": k["expected"], "tags": tags})
+
+    logger.info(f"[oracle] generate_tests reference staged={len(staged)} kept={len(kept)} dropped={len(drops)}")
+    meta = {
+        "llm_provider_used": "zhipu",
+        "llm_model_used": response.get("model", ZHIPU_MODEL),
+        "raw_text": response["text"],
+        "expected_mode": "reference",
+        "reference_solution": reference,
+        "reference_drops": drops
+    }
+    return {"public_examples": public[:public_examples_count], "hidden_tests": hidden[:hidden_tests_count]}, meta
+
+def _check_input_list(value: Any) -> List[str]:
+    if not isinstance(value, list):
+        return ["Must be a list"]
+    for i, t in enumerate(value):
+        if not isinstance(t, dict) or "input" not in t:
+            return [f"item {i} must be an object with name and input"]
+    return []
@@ -44,7 +44,7 @@ Return ONLY raw JSON.
     messages = [{"role": "system", "content": "You are a precise system architect."}, {"role": "user", "content": prompt}]
     
     try:
-        resp = llm_service.chat(messages, temperature=0.1)
+        resp = llm_service.chat(messages, temperature=0.1, caller="oracle.mock_spec")
         text = resp["text"]
         if "```json" in text:
             text = text.split("```json")[1].split("```")[0]
@@ -176,7 +176,7 @@ Output JSON:
 """
     messages = [{"role": "user", "content": prompt}]
     try:
-        resp = llm_service.chat(messages, temperature=0.3)
+        resp = llm_service.chat(messages, temperature=0.3, caller="oracle.mock_tests")
         text = resp["text"]
         if "```json" in text:
             text = text.split("```json")[1].split("```")[0]
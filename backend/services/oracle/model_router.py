@@ -0,0 +1,102 @@
+import json
+import threading
+import time
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from backend.config import ORACLE_ROUTING, ORACLE_FAST_MODEL, ORACLE_FAST_MAX_CHARS
+from backend.services.oracle.spec_validator import trigger_scan
+
+# Deliverables whose specs routinely need the strong model (file I/O contracts, exit codes).
+STRONG_DELIVERABLES = {"script"}
+
+
+@dataclass
+class RoutingDecision:
+    tier: str  # fast | strong
+    model: str
+    reasons: List[str] = field(default_factory=list)
+    escalated_at_attempt: Optional[int] = None
+    escalation_reason: Optional[str] = None
+
+    def escalate(self, strong_model: str, attempt: int, reason: str) -> bool:
+        """Switch to the strong model for the next attempt. Returns False if already strong."""
+        if self.tier == "strong":
+            return False
+        self.tier = "strong"
+        self.model = strong_model
+        self.escalated_at_attempt = attempt
+        self.escalation_reason = reason
+        return True
+
+
+class ModelRouter:
+    """
+    Chooses the analyze model per task: cheap/fast first unless the description is long,
+    trips an ambiguity trigger, or targets a complex deliverable. Outcomes are appended to
+    telemetry/oracle_routing.jsonl so the thresholds can be tuned from real traffic.
+    """
+
+    def __init__(self, repo_root: Optional[Path] = None):
+        self._repo_root = repo_root or Path(__file__).resolve().parents[3]
+        self._lock = threading.Lock()
+
+    def _log_path(self) -> Path:
+        return self._repo_root / "telemetry" / "oracle_routing.jsonl"
+
+    def route(self, task_description: str, deliverable_type: str, strong_model: str) -> RoutingDecision:
+        if not ORACLE_ROUTING or not ORACLE_FAST_MODEL:
+            return RoutingDecision(tier="strong", model=strong_model, reasons=["routing_disabled"])
+
+        reasons: List[str] = []
+        if len(task_description) > ORACLE_FAST_MAX_CHARS:
+            reasons.append(f"long_description:{len(task_description)}")
+        triggers = trigger_scan(task_description)
+        if triggers:
+            reasons.append("triggers:" + ",".join(sorted(triggers)))
+        if deliverable_type in STRONG_DELIVERABLES:
+            reasons.append(f"deliverable:{deliverable_type}")
+
+        if reasons:
+            return RoutingDecision(tier="strong", model=strong_model, reasons=reasons)
+        return RoutingDecision(tier="fast", model=ORACLE_FAST_MODEL, reasons=["simple_task"])
+
+    def record(self, decision: RoutingDecision, outcome: str, attempts: int, latency_ms: Optional[int] = None) -> None:
+        entry = {"ts": time.time(), **asdict(decision), "outcome": outcome, "attempts": attempts, "latency_ms": latency_ms}
+        with self._lock:
+            try:
+                path = self._log_path()
+                path.parent.mkdir(parents=True, exist_ok=True)
+                with path.open("a", encoding="utf-8", newline="\n") as f:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            except Exception:
+                pass
+
+    def stats(self, limit: int = 5000) -> Dict[str, Any]:
+        """Outcome counts per initial route (fast, fast->strong, strong) over the last `limit` decisions."""
+        path = self._log_path()
+        if not path.exists():
+            return {"decisions": 0, "routes": {}}
+        with self._lock:
+            lines = path.read_text(encoding="utf-8").splitlines()[-limit:]
+        routes: Dict[str, Dict[str, Any]] = {}
+        for line in lines:
+            try:
+                e = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            route = "fast->strong" if e.get("escalated_at_attempt") else e.get("tier", "unknown")
+            r = routes.setdefault(route, {"count": 0, "outcomes": {}, "attempts_total": 0, "latency_ms": []})
+            r["count"] += 1
+            r["outcomes"][e.get("outcome")] = r["outcomes"].get(e.get("outcome"), 0) + 1
+            r["attempts_total"] += int(e.get("attempts") or 0)
+            if e.get("latency_ms") is not None:
+                r["latency_ms"].append(int(e["latency_ms"]))
+        for r in routes.values():
+            lat = sorted(r.pop("latency_ms"))
+            r["latency_ms_p50"] = lat[len(lat) // 2] if lat else None
+        return {"decisions": len(lines), "routes": routes}
+
+
+model_router = ModelRouter()
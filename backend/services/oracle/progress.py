@@ -0,0 +1,93 @@
+import json
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional
+
+from backend.services.oracle.utils import new_uuid
+
+# Progress reporting for long analyze requests. The analyze loop emits events into an
+# AnalyzeProgress; the SSE endpoint drains them to the client. Cancellation flows the other
+# way: the client (or a dropped connection) sets the flag and the loop stops at its next
+# attempt boundary or streamed token.
+
+TOKEN_PROGRESS_EVERY_CHARS = 200
+HEARTBEAT_SECONDS = 15.0
+CANCEL_POLL_SECONDS = 0.1  # how often a parallel analyze waiting on candidates checks for cancel
+_DONE = object()
+
+
+class AnalyzeCancelled(Exception):
+    pass
+
+
+class AnalyzeProgress:
+    def __init__(self, stream_id: Optional[str] = None):
+        self.stream_id = stream_id or new_uuid()
+        self._events: "queue.Queue[Any]" = queue.Queue()
+        self._cancelled = threading.Event()
+        self._chars: Dict[int, int] = {}
+        self._reported: Dict[int, int] = {}
+
+    def emit(self, event: str, **data: Any) -> None:
+        self._events.put({"event": event, "ts": time.time(), **data})
+
+    def tokens(self, attempt: int, delta: str) -> None:
+        """Called per streamed delta: throttled token_progress events, and the cancellation point."""
+        self.raise_if_cancelled()
+        total = self._chars.get(attempt, 0) + len(delta)
+        self._chars[attempt] = total
+        if total - self._reported.get(attempt, 0) >= TOKEN_PROGRESS_EVERY_CHARS:
+            self._reported[attempt] = total
+            self.emit("token_progress", attempt=attempt, chars=total)
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        if self._cancelled.is_set():
+            raise AnalyzeCancelled("analyze_cancelled")
+
+    def close(self) -> None:
+        self._events.put(_DONE)
+
+    def sse(self) -> Iterator[str]:
+        """Server-sent event lines until close(); a comment line keeps idle connections open."""
+        while True:
+            try:
+                item = self._events.get(timeout=HEARTBEAT_SECONDS)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+            if item is _DONE:
+                return
+            yield f"event: {item['event']}\ndata: {json.dumps(item, ensure_ascii=False, default=str)}\n\n"
+
+
+class ProgressRegistry:
+    """Open analyze streams by id, so a separate request can cancel one."""
+
+    def __init__(self):
+        self._streams: Dict[str, AnalyzeProgress] = {}
+        self._lock = threading.Lock()
+
+    def open(self) -> AnalyzeProgress:
+        progress = AnalyzeProgress()
+        with self._lock:
+            self._streams[progress.stream_id] = progress
+        return progress
+
+    def get(self, stream_id: str) -> Optional[AnalyzeProgress]:
+        with self._lock:
+            return self._streams.get(stream_id)
+
+    def release(self, stream_id: str) -> None:
+        with self._lock:
+            self._streams.pop(stream_id, None)
+
+
+progress_registry = ProgressRegistry()
@@ -0,0 +1,128 @@
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.services.oracle.runner import default_resource_limits, default_sandbox_mode, run_cli_oracle, run_function_oracle
+
+logger = logging.getLogger("Backend")
+
+# The runners report a failure (with `got`) for every test whose output differs from
+# `expected`. Probing with a value no solution returns turns one batch run into a batch of
+# observed outputs, so expected values come from executing the reference, not from the LLM.
+PROBE_EXPECTED = {"__oracle_reference_probe__": True}
+# run_cli_oracle reads dict expectations as {"stdout", "files"}, so the CLI probe is a plain string.
+CLI_PROBE_EXPECTED = "__oracle_reference_probe__"
+
+REFERENCE_BATCH_TIMEOUT_SEC = 20.0
+REFERENCE_TEST_TIMEOUT_SEC = 5.0
+OUTPUT_MAX_BYTES = 64 * 1024
+
+
+def _probe_tests(tests: List[Dict[str, Any]], probe: Any = PROBE_EXPECTED) -> List[Dict[str, Any]]:
+    return [{"name": t["name"], "input": t["input"], "expected": probe} for t in tests]
+
+
+def _run_function_batch(code: str, function_name: str, tests: List[Dict[str, Any]], timeout_sec: float) -> Dict[str, Any]:
+    return run_function_oracle(
+        db=None,
+        code_text=code,
+        function_name=function_name,
+        tests=_probe_tests(tests),
+        timeout_sec=timeout_sec,
+        stdout_max_bytes=OUTPUT_MAX_BYTES,
+        stderr_max_bytes=OUTPUT_MAX_BYTES,
+        sandbox_mode=default_sandbox_mode(),
+        resource_limits=default_resource_limits(timeout_sec),
+    )
+
+
+def _function_outputs(code: str, function_name: str, tests: List[Dict[str, Any]]) -> Dict[str, Tuple[Optional[Any], Optional[str]]]:
+    """name -> (output, error). One subprocess for the whole batch; if the batch itself dies
+    (timeout, unserializable output) each test is re-run alone so one bad input cannot sink the rest."""
+    result = _run_function_batch(code, function_name, tests, REFERENCE_BATCH_TIMEOUT_SEC)
+    parsed = result.get("parsed")
+    if isinstance(parsed, dict) and not result.get("timed_out"):
+        return _outputs_from_failures(parsed, tests)
+
+    logger.info(f"[oracle] reference batch failed timed_out={bool(result.get('timed_out'))}; isolating {len(tests)} tests")
+    out: Dict[str, Tuple[Optional[Any], Optional[str]]] = {}
+    for t in tests:
+        single = _run_function_batch(code, function_name, [t], REFERENCE_TEST_TIMEOUT_SEC)
+        if single.get("timed_out"):
+            out[t["name"]] = (None, "reference_timeout")
+        elif not isinstance(single.get("parsed"), dict):
+            out[t["name"]] = (None, "reference_output_unserializable")
+        else:
+            out.update(_outputs_from_failures(single["parsed"], [t]))
+    return out
+
+
+def _outputs_from_failures(parsed: Dict[str, Any], tests: List[Dict[str, Any]]) -> Dict[str, Tuple[Optional[Any], Optional[str]]]:
+    out: Dict[str, Tuple[Optional[Any], Optional[str]]] = {}
+    for f in parsed.get("failures") or []:
+        name = f.get("test_name")
+        if name in ("__import__", "__init__", "__runner_init__"):
+            # The reference itself is broken: nothing is usable.
+            return {t["name"]: (None, f"reference_{name.strip('_')}_failed") for t in tests}
+        if f.get("error"):
+            out[name] = (None, "reference_crash")
+        else:
+            out[name] = (f.get("got"), None)
+    for t in tests:
+        out.setdefault(t["name"], (None, "reference_no_output"))
+    return out
+
+
+def _cli_outputs(code: str, tests: List[Dict[str, Any]]) -> Dict[str, Tuple[Optional[Any], Optional[str]]]:
+    result = run_cli_oracle(
+        code_text=code,
+        tests=_probe_tests(tests, CLI_PROBE_EXPECTED),
+        timeout_sec_per_test=REFERENCE_TEST_TIMEOUT_SEC,
+        stdout_max_bytes=OUTPUT_MAX_BYTES,
+        stderr_max_bytes=OUTPUT_MAX_BYTES,
+        sandbox_mode=default_sandbox_mode(),
+        resource_limits=default_resource_limits(REFERENCE_TEST_TIMEOUT_SEC),
+    )
+    out: Dict[str, Tuple[Optional[Any], Optional[str]]] = {}
+    for f in (result.get("parsed") or {}).get("failures") or []:
+        error = f.get("error") or ""
+        if error == "Timeout":
+            out[f["test_name"]] = (None, "reference_timeout")
+        elif "Traceback (most recent call last)" in error:
+            out[f["test_name"]] = (None, "reference_crash")
+        else:
+            out[f["test_name"]] = (f.get("got"), None)
+    for t in tests:
+        out.setdefault(t["name"], (None, "reference_no_output"))
+    return out
+
+
+def fill_expected_from_reference(
+    spec_json: Dict[str, Any],
+    reference_code: str,
+    tests: List[Dict[str, Any]],
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, str]]]:
+    """
+    Execute the reference implementation on every test input (function deliverables via
+    run_function_oracle in one batch, CLI and script via run_cli_oracle, as run_oracle does) and
+    set `expected` to its output.
+    Returns (kept_tests, drops) where drops are {"name", "reason"} for tests the reference
+    crashed on, timed out on, or produced nothing for.
+    """
+    if not tests:
+        return [], []
+    deliverable = spec_json.get("deliverable") or "function"
+    if deliverable != "function":
+        outputs = _cli_outputs(reference_code, tests)
+    else:
+        function_name = str((spec_json.get("signature") or {}).get("function_name") or "solve")
+        outputs = _function_outputs(reference_code, function_name, tests)
+
+    kept: List[Dict[str, Any]] = []
+    drops: List[Dict[str, str]] = []
+    for t in tests:
+        got, error = outputs.get(t["name"], (None, "reference_no_output"))
+        if error:
+            drops.append({"name": t["name"], "reason": error})
+            continue
+        kept.append({**t, "expected": got})
+    return kept, drops
@@ -0,0 +1,157 @@
+import heapq
+import json
+import re
+import threading
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Near-duplicate lookup over analyzed task descriptions. Descriptions are reduced to character
+# shingles (works for Chinese and English alike), summarized by a MinHash signature, and
+# bucketed by LSH bands so a lookup only compares against the few entries sharing a band.
+# The signature is one-permutation MinHash: each shingle is hashed once, the low bits pick one of
+# NUM_PERM bins and the rest is the value that bin keeps the minimum of. Empty bins borrow from the
+# next non-empty one (densification). One pass over the shingles instead of NUM_PERM passes.
+
+SHINGLE_SIZE = 4
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+MAX_SHINGLES = 2048  # longer texts keep the shingles with the smallest values (a consistent sample)
+SIGNATURE_VERSION = 2  # bump when the signature scheme changes; older log entries are re-signed
+_BIN_BITS = 6  # log2(NUM_PERM)
+_MIX = 0x9E3779B97F4A7C15  # odd, so multiplying a 32-bit crc by it is a bijection
+_MASK64 = (1 << 64) - 1
+_VALUE_SPAN = 1 << (64 - _BIN_BITS)  # values are < _VALUE_SPAN; borrowed ones are offset past it
+_MAX_HASH = NUM_PERM * _VALUE_SPAN
+
+
+def normalize_description(text: str) -> str:
+    return re.sub(r"\s+", " ", (text or "").strip().lower())
+
+
+def shingles(text: str, k: int = SHINGLE_SIZE) -> set:
+    norm = normalize_description(text)
+    if len(norm) <= k:
+        return {norm} if norm else set()
+    return {norm[i:i + k] for i in range(len(norm) - k + 1)}
+
+
+def minhash(text: str) -> List[int]:
+    mixed = [(zlib.crc32(s.encode("utf-8")) * _MIX) & _MASK64 for s in shingles(text)]
+    if not mixed:
+        return [_MAX_HASH] * NUM_PERM
+    if len(mixed) > MAX_SHINGLES:
+        mixed = heapq.nsmallest(MAX_SHINGLES, mixed, key=lambda h: h >> _BIN_BITS)
+    bins = [_MAX_HASH] * NUM_PERM
+    for h in mixed:
+        b, value = h & (NUM_PERM - 1), h >> _BIN_BITS
+        if value < bins[b]:
+            bins[b] = value
+    sig = list(bins)
+    for b in range(NUM_PERM):
+        if bins[b] == _MAX_HASH:
+            # Offset by the distance so a borrowed value only matches one borrowed the same way.
+            step = 1
+            while bins[(b + step) % NUM_PERM] == _MAX_HASH:
+                step += 1
+            sig[b] = bins[(b + step) % NUM_PERM] + step * _VALUE_SPAN
+    return sig
+
+
+def estimate_similarity(sig_a: List[int], sig_b: List[int]) -> float:
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def _band_keys(sig: List[int]) -> List[Tuple[int, Tuple[int, ...]]]:
+    return [(b, tuple(sig[b * ROWS:(b + 1) * ROWS])) for b in range(BANDS)]
+
+
+@dataclass
+class SimilarMatch:
+    version_id: str
+    similarity: float
+    description: str
+
+
+class SimilarityIndex:
+    """
+    MinHash/LSH index of analyzed descriptions, scoped by (language, runtime, deliverable).
+    Entries are appended to telemetry/oracle_similarity.jsonl and reloaded on first use.
+    """
+
+    def __init__(self, repo_root: Optional[Path] = None):
+        self._repo_root = repo_root or Path(__file__).resolve().parents[3]
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._entries: List[Tuple[str, str, str, List[int]]] = []  # (version_id, scope, description, signature)
+        self._buckets: Dict[Tuple[str, int, Tuple[int, ...]], List[int]] = {}
+
+    def _log_path(self) -> Path:
+        return self._repo_root / "telemetry" / "oracle_similarity.jsonl"
+
+    def _insert(self, version_id: str, scope: str, description: str, sig: List[int]) -> None:
+        idx = len(self._entries)
+        self._entries.append((version_id, scope, description, sig))
+        for band, key in _band_keys(sig):
+            self._buckets.setdefault((scope, band, key), []).append(idx)
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        path = self._log_path()
+        if path.exists():
+            for line in path.read_text(encoding="utf-8").splitlines():
+                try:
+                    e = json.loads(line)
+                    if e.get("signature_version") == SIGNATURE_VERSION:
+                        sig = [int(x) for x in e["signature"]]
+                    else:
+                        sig = minhash(str(e["description"]))
+                except (json.JSONDecodeError, KeyError, TypeError, ValueError, AttributeError):
+                    continue
+                if len(sig) == NUM_PERM:
+                    self._insert(str(e["version_id"]), str(e["scope"]), str(e.get("description") or ""), sig)
+        self._loaded = True
+
+    @staticmethod
+    def scope(language: str, runtime: str, deliverable_type: str) -> str:
+        return f"{language}|{runtime}|{deliverable_type}"
+
+    def add(self, version_id: str, description: str, scope: str) -> None:
+        sig = minhash(description)
+        with self._lock:
+            self._ensure_loaded()
+            self._insert(version_id, scope, description, sig)
+            try:
+                path = self._log_path()
+                path.parent.mkdir(parents=True, exist_ok=True)
+                with path.open("a", encoding="utf-8", newline="\n") as f:
+                    f.write(json.dumps({"version_id": version_id, "scope": scope, "description": description, "signature": sig, "signature_version": SIGNATURE_VERSION}, ensure_ascii=False) + "\n")
+            except Exception:
+                pass
+
+    def query(self, description: str, scope: str, threshold: float, exclude: Optional[set] = None) -> Optional[SimilarMatch]:
+        """Best neighbor at or above threshold within scope; ties go to the most recent entry."""
+        sig = minhash(description)
+        with self._lock:
+            self._ensure_loaded()
+            candidates: set = set()
+            for band, key in _band_keys(sig):
+                candidates.update(self._buckets.get((scope, band, key), ()))
+            best: Optional[Tuple[float, int]] = None
+            for idx in candidates:
+                version_id = self._entries[idx][0]
+                if exclude and version_id in exclude:
+                    continue
+                sim = estimate_similarity(sig, self._entries[idx][3])
+                if sim >= threshold and (best is None or (sim, idx) > best):
+                    best = (sim, idx)
+        if best is None:
+            return None
+        version_id, _, prior_description, _ = self._entries[best[1]]
+        return SimilarMatch(version_id=version_id, similarity=best[0], description=prior_description)
+
+
+similarity_index = SimilarityIndex()
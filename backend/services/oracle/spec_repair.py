@@ -0,0 +1,151 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from backend.services.oracle.spec_validator import validate_and_normalize, SpecValidationError
+
+# Deterministic, rule-based fixes for mechanical spec problems. Each rule either repairs the
+# spec dict in place and returns a repair record, or returns None when it does not apply.
+# Anything without a rule still goes back to the LLM.
+
+BROAD_RETURN = "Any"
+MAX_REPAIR_ROUNDS = 6
+
+
+def _example_kind(val: Any) -> str:
+    if isinstance(val, bool): return "bool"
+    if isinstance(val, int): return "int"
+    if isinstance(val, str): return "str"
+    if isinstance(val, list): return "list"
+    if isinstance(val, dict): return "dict"
+    return "unknown"
+
+
+def _record(rule: str, field: str, before: Any, after: Any) -> Dict[str, Any]:
+    return {"rule": rule, "field": field, "from": before, "to": after}
+
+
+def _fix_cli_function_name(spec: Dict[str, Any], err: SpecValidationError) -> Optional[Dict[str, Any]]:
+    if err.field_path != "signature.function_name" or spec.get("deliverable") != "cli":
+        return None
+    sig = spec["signature"]
+    before = sig.get("function_name")
+    sig["function_name"] = "main"
+    return _record("cli_function_name_main", err.field_path, before, "main")
+
+
+def _fix_function_named_main(spec: Dict[str, Any], err: SpecValidationError) -> Optional[Dict[str, Any]]:
+    if err.field_path != "signature.function_name" or spec.get("deliverable") != "function":
+        return None
+    sig = spec["signature"]
+    if sig.get("function_name") != "main":
+        return None
+    sig["function_name"] = "solve"
+    return _record("function_name_not_main", err.field_path, "main", "solve")
+
+
+def _fix_entrypoint_args(spec: Dict[str, Any], err: SpecValidationError) -> Optional[Dict[str, Any]]:
+    if err.field_path != "signature.args" or spec.get("deliverable") not in ("cli", "script"):
+        return None
+    sig = spec["signature"]
+    before = list(sig.get("args") or [])
+    if not before:
+        return None
+    sig["args"] = []
+    return _record(f"{spec['deliverable']}_args_empty", err.field_path, before, [])
+
+
+def _fix_example_mismatch(spec: Dict[str, Any], err: SpecValidationError) -> Optional[Dict[str, Any]]:
+    if err.error_code != "spec_example_mismatch":
+        return None
+    sig = spec["signature"]
+    before = sig.get("returns")
+    kinds = {_example_kind(ex.get("expected")) for ex in spec.get("public_examples") or [] if isinstance(ex, dict)}
+    kinds.discard("unknown")
+    # One consistent example kind wins; mixed kinds can only be described by a broad type.
+    after = kinds.pop() if len(kinds) == 1 else BROAD_RETURN
+    if after == before:
+        after = BROAD_RETURN
+    sig["returns"] = after
+    return _record("returns_match_examples", "signature.returns", before, after)
+
+
+def _fix_ambiguous_output_returns(spec: Dict[str, Any], err: SpecValidationError) -> Optional[Dict[str, Any]]:
+    if err.field_path != "signature.returns" or "Ambiguous output" not in err.message:
+        return None
+    sig = spec["signature"]
+    before = sig.get("returns")
+    sig["returns"] = BROAD_RETURN
+    return _record("ambiguous_output_broad_returns", err.field_path, before, BROAD_RETURN)
+
+
+REPAIR_RULES: List[Callable[[Dict[str, Any], SpecValidationError], Optional[Dict[str, Any]]]] = [
+    _fix_cli_function_name,
+    _fix_function_named_main,
+    _fix_entrypoint_args,
+    _fix_example_mismatch,
+    _fix_ambiguous_output_returns,
+]
+
+
+def repair_once(spec: Dict[str, Any], err: SpecValidationError, skip: Optional[set] = None) -> Optional[Dict[str, Any]]:
+    if not isinstance(spec.get("signature"), dict):
+        return None
+    for rule in REPAIR_RULES:
+        if skip and rule.__name__ in skip:
+            continue
+        rec = rule(spec, err)
+        if rec is not None:
+            if skip is not None:
+                skip.add(rule.__name__)
+            return rec
+    return None
+
+
+def validate_with_repairs(spec: Dict[str, Any], task_description: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    validate_and_normalize, repairing mechanical errors locally and re-validating.
+    Every violation of a round is offered to the rules (each rule fires at most once per
+    round, so several example mismatches widen the return type only once).
+    Returns (normalized_spec, repairs). Raises the first SpecValidationError no rule can fix,
+    carrying the residual `violations`; the repairs applied so far are attached as `err.repairs`.
+    """
+    repairs: List[Dict[str, Any]] = []
+    for _ in range(MAX_REPAIR_ROUNDS):
+        try:
+            return validate_and_normalize(spec, task_description), repairs
+        except SpecValidationError as e:
+            fired: set = set()
+            round_repairs = [rec for v in e.violations if (rec := repair_once(spec, v, fired)) is not None]
+            if not round_repairs:
+                e.repairs = repairs
+                raise
+            repairs.extend(round_repairs)
+    try:
+        return validate_and_normalize(spec, task_description), repairs
+    except SpecValidationError as e:
+        e.repairs = repairs
+        raise
+
+
+def repair_contradictions(spec: Dict[str, Any], contradictions: List[str]) -> List[Dict[str, Any]]:
+    """
+    Local fixes for detect_contradictions findings (return type vs examples, ambiguous output
+    with a narrow return type). Mutates spec; returns the repairs applied.
+    """
+    sig = spec.get("signature")
+    if not isinstance(sig, dict):
+        return []
+    repairs: List[Dict[str, Any]] = []
+    for c in contradictions:
+        before = sig.get("returns")
+        if c.startswith("return_type_conflict"):
+            kinds = {_example_kind(ex.get("expected")) for ex in spec.get("public_examples") or [] if isinstance(ex, dict)}
+            kinds.discard("unknown")
+            after = kinds.pop() if len(kinds) == 1 and not spec.get("ambiguities") else BROAD_RETURN
+            if after == before:
+                after = BROAD_RETURN
+            sig["returns"] = after
+            repairs.append(_record("returns_match_examples", "signature.returns", before, after))
+        elif c.startswith("ambiguous_return_type_requires_broad_signature"):
+            sig["returns"] = BROAD_RETURN
+            repairs.append(_record("ambiguous_output_broad_returns", "signature.returns", before, BROAD_RETURN))
+    return repairs
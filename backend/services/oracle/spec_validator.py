@@ -8,6 +8,7 @@ class SpecValidationError(Exception):
         self.field_path = field_path
         self.message = message
         self.raw_snippet = raw_snippet
+        self.violations: List["SpecValidationError"] = [self]
         super().__init__(f"[{error_code}] {field_path}: {message}")
 
 TRIGGERS = [
@@ -21,129 +22,208 @@ TRIGGERS = [
     (r"返回单个值还是列表", "return_type_conflict")
 ]
 
+# Compiled once at import; trigger_scan runs on every analyze attempt.
+_COMPILED_TRIGGERS = [(re.compile(pattern, re.IGNORECASE), category) for pattern, category in TRIGGERS]
+
+TRIGGER_KEYWORDS = {
+    "output_format": ["output", "format", "return", "list", "string"],
+    "tie_breaking": ["tie", "break", "order", "sort"],
+    "error_handling": ["error", "id", "missing", "invalid"],
+    "input_format": ["input", "list", "string", "format"],
+    "case_sensitivity": ["case", "sensitive", "ignore"],
+    "return_type_conflict": ["return", "type", "list", "string"]
+}
+
+REQUIRED_FIELDS = ["goal_one_liner", "deliverable", "language", "runtime", "signature", "ambiguities", "public_examples"]
+
+OUTPUT_AMBIGUITY_KEYWORDS = ["return", "output", "format", "shape", "list vs string", "single string"]
+
 def trigger_scan(task_description: str) -> Set[str]:
     found = set()
-    desc_lower = task_description.lower()
-    for pattern, category in TRIGGERS:
-        if re.search(pattern, task_description, re.IGNORECASE): # Regex search on raw string
+    for pattern, category in _COMPILED_TRIGGERS:
+        if pattern.search(task_description): # Regex search on raw string
             found.add(category)
     return found
 
-def validate_and_normalize(spec_dict: Dict[str, Any], task_description: str) -> Dict[str, Any]:
+def _guess_kind(val):
+    if isinstance(val, int): return "int"
+    if isinstance(val, str): return "str"
+    if isinstance(val, list): return "list"
+    if isinstance(val, dict): return "dict"
+    return "unknown"
+
+# Each rule yields every violation it finds and skips silently when a field it depends on
+# is malformed (that field's own rule reports it), so one pass reports all problems.
+
+def _rule_required_fields(spec_dict: Dict[str, Any], task_description: str):
     # 2.1 Required top-level fields
-    required_fields = ["goal_one_liner", "deliverable", "language", "runtime", "signature", "ambiguities", "public_examples"]
-    for field in required_fields:
+    for field in REQUIRED_FIELDS:
         if field not in spec_dict:
-             raise SpecValidationError("spec_invalid", field, "Missing required field")
-        
+            yield SpecValidationError("spec_invalid", field, "Missing required field")
+            continue
+
         # Basic type checks
         val = spec_dict[field]
         if field == "goal_one_liner" and (not isinstance(val, str) or not val.strip()):
-            raise SpecValidationError("spec_invalid", field, "Must be non-empty string")
+            yield SpecValidationError("spec_invalid", field, "Must be non-empty string")
         if field == "deliverable" and val not in ["cli", "function", "script"]:
-            raise SpecValidationError("spec_invalid", field, "Must be 'cli', 'function', or 'script'")
+            yield SpecValidationError("spec_invalid", field, "Must be 'cli', 'function', or 'script'")
         if field == "ambiguities" and not isinstance(val, list):
-            raise SpecValidationError("spec_invalid", field, "Must be a list")
+            yield SpecValidationError("spec_invalid", field, "Must be a list")
         if field == "public_examples" and not isinstance(val, list):
-            raise SpecValidationError("spec_invalid", field, "Must be a list")
+            yield SpecValidationError("spec_invalid", field, "Must be a list")
 
+def _rule_signature_shape(spec_dict: Dict[str, Any], task_description: str):
+    if "signature" not in spec_dict:
+        return
     sig = spec_dict["signature"]
     if not isinstance(sig, dict):
-        raise SpecValidationError("spec_invalid", "signature", "Must be a dict")
-    
+        yield SpecValidationError("spec_invalid", "signature", "Must be a dict")
+        return
+
     if "function_name" not in sig or not isinstance(sig["function_name"], str) or not sig["function_name"]:
-        raise SpecValidationError("spec_invalid", "signature.function_name", "Must be non-empty string")
+        yield SpecValidationError("spec_invalid", "signature.function_name", "Must be non-empty string")
     if "args" not in sig or not isinstance(sig["args"], list):
-        raise SpecValidationError("spec_invalid", "signature.args", "Must be a list of strings")
+        yield SpecValidationError("spec_invalid", "signature.args", "Must be a list of strings")
     if "returns" not in sig or not isinstance(sig["returns"], str) or not sig["returns"]:
-        raise SpecValidationError("spec_invalid", "signature.returns", "Must be non-empty string")
+        yield SpecValidationError("spec_invalid", "signature.returns", "Must be non-empty string")
 
+def _rule_deliverable_shape(spec_dict: Dict[str, Any], task_description: str):
     # 2.2 Deliverable-specific shape
-    deliverable = spec_dict["deliverable"]
-    fname = sig["function_name"]
-    args = sig["args"]
-    constraints = spec_dict.get("constraints", []) or []
-    
+    sig = spec_dict.get("signature")
+    if not isinstance(sig, dict):
+        return
+    deliverable = spec_dict.get("deliverable")
+    fname = sig.get("function_name")
+    args = sig.get("args")
+
     if deliverable == "cli":
         if fname != "main":
-             raise SpecValidationError("spec_invalid", "signature.function_name", "CLI deliverable must have function_name='main'")
-        if args != []:
-             raise SpecValidationError("spec_invalid", "signature.args", "CLI deliverable must have args=[]")
+            yield SpecValidationError("spec_invalid", "signature.function_name", "CLI deliverable must have function_name='main'")
+        if isinstance(args, list) and args != []:
+            yield SpecValidationError("spec_invalid", "signature.args", "CLI deliverable must have args=[]")
 
     if deliverable == "script":
-        if args != []:
-             raise SpecValidationError("spec_invalid", "signature.args", "SCRIPT deliverable must have args=[]")
+        if isinstance(args, list) and args != []:
+            yield SpecValidationError("spec_invalid", "signature.args", "SCRIPT deliverable must have args=[]")
 
     if deliverable == "function":
         if fname == "main":
-             raise SpecValidationError("spec_invalid", "signature.function_name", "Function deliverable must not be 'main'")
+            yield SpecValidationError("spec_invalid", "signature.function_name", "Function deliverable must not be 'main'")
 
+def _rule_trigger_ambiguities(spec_dict: Dict[str, Any], task_description: str):
     # 3. Ambiguity Detection
-    detected_triggers = trigger_scan(task_description)
-    if detected_triggers:
-        ambiguities = spec_dict["ambiguities"]
-        # Check if ambiguities cover the triggers
-        # Heuristic: check if ambiguity_id or question contains keywords related to trigger category
-        # Simple mapping for now
-        keywords_map = {
-            "output_format": ["output", "format", "return", "list", "string"],
-            "tie_breaking": ["tie", "break", "order", "sort"],
-            "error_handling": ["error", "id", "missing", "invalid"],
-            "input_format": ["input", "list", "string", "format"],
-            "case_sensitivity": ["case", "sensitive", "ignore"],
-            "return_type_conflict": ["return", "type", "list", "string"]
-        }
-        
-        for category in detected_triggers:
-            covered = False
-            keywords = keywords_map.get(category, [])
-            for amb in ambiguities:
-                aid = str(amb.get("ambiguity_id", "")).lower()
-                q = str(amb.get("question", "")).lower()
-                if any(k in aid for k in keywords) or any(k in q for k in keywords):
-                    covered = True
-                    break
-            
-            if not covered:
-                raise SpecValidationError("spec_missing_ambiguity", "ambiguities", f"Missing ambiguity for detected trigger: {category}")
+    ambiguities = spec_dict.get("ambiguities")
+    if not isinstance(ambiguities, list):
+        return
+    # Heuristic: check if ambiguity_id or question contains keywords related to trigger category
+    for category in sorted(trigger_scan(task_description)):
+        keywords = TRIGGER_KEYWORDS.get(category, [])
+        covered = False
+        for amb in ambiguities:
+            aid = str(amb.get("ambiguity_id", "")).lower()
+            q = str(amb.get("question", "")).lower()
+            if any(k in aid for k in keywords) or any(k in q for k in keywords):
+                covered = True
+                break
 
+        if not covered:
+            yield SpecValidationError("spec_missing_ambiguity", "ambiguities", f"Missing ambiguity for detected trigger: {category}")
+
+def _rule_returns_vs_examples(spec_dict: Dict[str, Any], task_description: str):
     # 4. Returns vs Examples
-    ret = sig["returns"]
-    examples = spec_dict["public_examples"]
-    
-    def guess_kind(val):
-        if isinstance(val, int): return "int"
-        if isinstance(val, str): return "str"
-        if isinstance(val, list): return "list"
-        if isinstance(val, dict): return "dict"
-        return "unknown"
+    sig = spec_dict.get("signature")
+    examples = spec_dict.get("public_examples")
+    if not isinstance(sig, dict) or not isinstance(examples, list):
+        return
+    ret = sig.get("returns")
 
     # Only check strict types if return type is not Any/Union
     if ret in ["int", "str", "list", "dict"]:
-        for ex in examples:
-            expected = ex.get("expected")
-            kind = guess_kind(expected)
+        for i, ex in enumerate(examples):
+            if not isinstance(ex, dict):
+                continue
+            kind = _guess_kind(ex.get("expected"))
+            # list vs list[int] and dict vs dict[...] are fine: ret is the bare kind here
             if kind != "unknown" and ret != kind:
-                # Relaxed list check: list vs list[int]
-                if ret == "list" and kind == "list": continue
-                if ret == "dict" and kind == "dict": continue
-                
-                raise SpecValidationError("spec_example_mismatch", "public_examples", f"Return type {ret} contradicts example type {kind}")
+                yield SpecValidationError("spec_example_mismatch", f"public_examples[{i}].expected", f"Return type {ret} contradicts example type {kind}")
 
+def _rule_output_ambiguity_returns(spec_dict: Dict[str, Any], task_description: str):
     # 4.2 Ambiguity implies wide returns
+    sig = spec_dict.get("signature")
+    ambiguities = spec_dict.get("ambiguities")
+    if not isinstance(sig, dict) or not isinstance(ambiguities, list):
+        return
+    ret = sig.get("returns")
+    if not isinstance(ret, str) or not ret:
+        return
+
     has_output_ambiguity = False
-    for amb in spec_dict["ambiguities"]:
+    for amb in ambiguities:
         q = (amb.get("question") or "").lower()
         aid = (amb.get("ambiguity_id") or "").lower()
-        keywords = ["return", "output", "format", "shape", "list vs string", "single string"]
-        if any(k in q or k in aid for k in keywords):
+        if any(k in q or k in aid for k in OUTPUT_AMBIGUITY_KEYWORDS):
             has_output_ambiguity = True
             break
-    
+
     if has_output_ambiguity:
         if ret not in ["Any", "Union"] and "Union" not in ret:
-             raise SpecValidationError("spec_invalid", "signature.returns", "Ambiguous output format requires Any or Union return type")
+            yield SpecValidationError("spec_invalid", "signature.returns", "Ambiguous output format requires Any or Union return type")
+
+SPEC_RULES = [
+    _rule_required_fields,
+    _rule_signature_shape,
+    _rule_deliverable_shape,
+    _rule_trigger_ambiguities,
+    _rule_returns_vs_examples,
+    _rule_output_ambiguity_returns,
+]
+
+# Top-level fields each rule reads, so an incremental re-analysis can re-check only the rules
+# its changed fields can affect.
+RULE_FIELDS = {
+    _rule_required_fields: set(REQUIRED_FIELDS),
+    _rule_signature_shape: {"signature"},
+    _rule_deliverable_shape: {"signature", "deliverable"},
+    _rule_trigger_ambiguities: {"ambiguities"},
+    _rule_returns_vs_examples: {"signature", "public_examples"},
+    _rule_output_ambiguity_returns: {"signature", "ambiguities"},
+}
+
+def collect_violations(spec_dict: Dict[str, Any], task_description: str, fields: Optional[Set[str]] = None) -> List[SpecValidationError]:
+    """
+    Evaluate every rule and return all violations, in rule order. With `fields`, only rules
+    reading at least one of those top-level fields run.
+    """
+    violations: List[SpecValidationError] = []
+    for rule in SPEC_RULES:
+        if fields is not None and not (RULE_FIELDS[rule] & fields):
+            continue
+        violations.extend(rule(spec_dict, task_description))
+    return violations
+
+def check_streamed_field(field: str, value: Any) -> List[SpecValidationError]:
+    """
+    Rules that depend on a single top-level field, usable while the rest of the spec is still
+    streaming. `deliverable` is skipped: drift is corrected after parsing, not rejected.
+    """
+    partial = {field: value}
+    if field == "signature":
+        return list(_rule_signature_shape(partial, ""))
+    if field in REQUIRED_FIELDS and field != "deliverable":
+        return [v for v in _rule_required_fields(partial, "") if v.field_path == field]
+    return []
+
+def validate_and_normalize(spec_dict: Dict[str, Any], task_description: str) -> Dict[str, Any]:
+    violations = collect_violations(spec_dict, task_description)
+    if violations:
+        # Raise the first violation for callers that handle one error; the full list rides along.
+        err = violations[0]
+        err.violations = violations
+        raise err
+    return normalize_spec(spec_dict)
 
+def normalize_spec(spec_dict: Dict[str, Any]) -> Dict[str, Any]:
     # 5. Normalization
     # Canonicalize constraints
     if "constraints" in spec_dict:
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger("Backend")
+
+SPECULATION_TTL_SECONDS = 600
+MAX_PENDING = 64
+
+
+def speculation_key(
+    spec_json: Dict[str, Any],
+    confirmations: Dict[str, Any],
+    public_examples_count: int,
+    hidden_tests_count: int,
+    difficulty_profile: Optional[Dict[str, Any]],
+    seed: int,
+    expected_mode: str = "llm",
+) -> str:
+    data = {
+        "spec": spec_json,
+        "confirmations": confirmations or {},
+        "public": int(public_examples_count),
+        "hidden": int(hidden_tests_count),
+        "difficulty_profile": difficulty_profile,
+        "seed": int(seed),
+        "expected_mode": expected_mode,
+    }
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class SpeculativeTestGenerator:
+    """
+    Starts test generation for a version before the client asks for it.
+    /generate-tests joins the pending result when its parameters hash to the same key,
+    otherwise the speculative result is discarded.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="oracle-spec-tests")
+        self._pending: Dict[str, Tuple[str, float, Future]] = {}
+        self._lock = threading.Lock()
+
+    def _prune(self) -> None:
+        cutoff = time.time() - SPECULATION_TTL_SECONDS
+        for vid in [vid for vid, (_, ts, _) in self._pending.items() if ts < cutoff]:
+            self._pending.pop(vid, None)
+        while len(self._pending) >= MAX_PENDING:
+            oldest = min(self._pending.items(), key=lambda kv: kv[1][1])[0]
+            self._pending.pop(oldest, None)
+
+    def start(self, version_id: str, key: str, fn: Callable[[], Tuple[Dict[str, Any], Dict[str, Any]]]) -> None:
+        with self._lock:
+            self._prune()
+            fut = self._executor.submit(fn)
+            self._pending[version_id] = (key, time.time(), fut)
+        logger.info(f"[oracle] speculative generate_tests started version_id={version_id}")
+
+    def take(self, version_id: str, key: str, timeout: Optional[float] = None) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        with self._lock:
+            entry = self._pending.pop(version_id, None)
+        if entry is None:
+            return None
+        spec_key, _, fut = entry
+        if spec_key != key:
+            self._drop(version_id, fut, "params_mismatch")
+            return None
+        try:
+            tests_json, tests_meta = fut.result(timeout=timeout)
+        except Exception as e:
+            logger.info(f"[oracle] speculative generate_tests discarded version_id={version_id} reason={e!r}")
+            return None
+        if isinstance(tests_meta, dict) and tests_meta.get("error"):
+            logger.info(f"[oracle] speculative generate_tests discarded version_id={version_id} reason=llm_error")
+            return None
+        return tests_json, tests_meta
+
+    def discard(self, version_id: str) -> None:
+        with self._lock:
+            entry = self._pending.pop(version_id, None)
+        if entry is not None:
+            self._drop(version_id, entry[2], "discarded")
+
+    @staticmethod
+    def _drop(version_id: str, fut: Future, reason: str) -> None:
+        # cancel() only stops a call that has not started; one already talking to the LLM runs to
+        # completion and its result is ignored.
+        outcome = "cancelled" if fut.cancel() else "abandoned"
+        logger.info(f"[oracle] speculative generate_tests {outcome} version_id={version_id} reason={reason}")
+
+
+speculative_tests = SpeculativeTestGenerator()
@@ -0,0 +1,138 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+# Planning and merging for chunked hidden-test generation. Each chunk asks the LLM for one
+# category of tests; chunks run in parallel and are merged with input-level dedupe.
+
+DEFAULT_PROFILE = {"typical": 0.5, "edge": 0.3, "large": 0.2}
+
+CATEGORY_GUIDANCE = {
+    "typical": "Typical cases: ordinary, representative inputs exercising the main behaviour.",
+    "edge": "Edge cases: empty inputs, single elements, boundaries, duplicates, negative/zero values, unusual but valid formats.",
+    "large": "Large inputs: the biggest inputs the spec allows that still fit in this JSON response (long lists, many operations). Keep each test under ~2 KB of JSON.",
+}
+
+
+def _profile_weights(difficulty_profile: Optional[Dict[str, Any]]) -> Dict[str, float]:
+    weights: Dict[str, float] = {}
+    for k, v in (difficulty_profile or {}).items():
+        if isinstance(v, (int, float)) and not isinstance(v, bool) and v > 0:
+            weights[str(k)] = float(v)
+    return weights or dict(DEFAULT_PROFILE)
+
+
+def _apportion(total: int, weights: Dict[str, float]) -> Dict[str, int]:
+    """Largest-remainder split of `total` across categories, preserving profile order on ties."""
+    wsum = sum(weights.values())
+    exact = {k: total * w / wsum for k, w in weights.items()}
+    counts = {k: int(v) for k, v in exact.items()}
+    leftover = total - sum(counts.values())
+    order = sorted(weights, key=lambda k: exact[k] - counts[k], reverse=True)
+    for k in order[:leftover]:
+        counts[k] += 1
+    return counts
+
+
+def plan_chunks(
+    public_examples_count: int,
+    hidden_tests_count: int,
+    difficulty_profile: Optional[Dict[str, Any]],
+    max_chunk_size: int,
+) -> List[Dict[str, Any]]:
+    """
+    One chunk per profile category, split further so no chunk asks for more than
+    max_chunk_size hidden tests. Public examples are requested from the first typical chunk
+    (or the first chunk when the profile has no typical category).
+    """
+    counts = _apportion(max(0, int(hidden_tests_count)), _profile_weights(difficulty_profile))
+    chunks: List[Dict[str, Any]] = []
+    for category, n in counts.items():
+        while n > 0:
+            take = min(n, max(1, max_chunk_size))
+            chunks.append({"category": category, "hidden_count": take, "public_count": 0})
+            n -= take
+    if not chunks:
+        chunks.append({"category": "typical", "hidden_count": 0, "public_count": 0})
+    owner = next((c for c in chunks if c["category"] == "typical"), chunks[0])
+    owner["public_count"] = max(0, int(public_examples_count))
+    for i, c in enumerate(chunks):
+        c["index"] = i
+    return chunks
+
+
+def canonical_input(value: Any) -> str:
+    try:
+        return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    except (TypeError, ValueError):
+        return repr(value)
+
+
+def merge_chunks(
+    results: List[Tuple[Dict[str, Any], Dict[str, Any]]],
+    public_examples_count: int,
+    hidden_tests_count: int,
+) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    """
+    Merge (chunk, data) pairs in chunk order. Hidden tests whose canonical input repeats an
+    earlier hidden test or a public example are dropped; names are made unique; both lists
+    are capped to the requested counts. Returns (bundle, stats).
+    """
+    public: List[Dict[str, Any]] = []
+    hidden: List[Dict[str, Any]] = []
+    seen_inputs: set = set()
+    seen_names: set = set()
+    stats = {"duplicates_dropped": 0, "malformed_dropped": 0, "capped": 0}
+
+    def _unique_name(name: str, category: str) -> str:
+        base = name or f"{category}_case"
+        candidate, n = base, 2
+        while candidate in seen_names:
+            candidate = f"{base}_{n}"
+            n += 1
+        seen_names.add(candidate)
+        return candidate
+
+    for chunk, data in results:
+        for ex in data.get("public_examples") or []:
+            if not isinstance(ex, dict) or "input" not in ex:
+                stats["malformed_dropped"] += 1
+                continue
+            key = canonical_input(ex.get("input"))
+            if key in seen_inputs:
+                stats["duplicates_dropped"] += 1
+                continue
+            seen_inputs.add(key)
+            public.append({**ex, "name": _unique_name(str(ex.get("name") or ""), "public")})
+
+    # Each chunk first fills its own quota so one verbose category cannot crowd out the
+    # others; surplus tests then backfill whatever under-delivering chunks left open.
+    overflow: List[Dict[str, Any]] = []
+    for chunk, data in results:
+        taken = 0
+        for t in data.get("hidden_tests") or []:
+            if not isinstance(t, dict) or "input" not in t:
+                stats["malformed_dropped"] += 1
+                continue
+            key = canonical_input(t.get("input"))
+            if key in seen_inputs:
+                stats["duplicates_dropped"] += 1
+                continue
+            seen_inputs.add(key)
+            tags = list(t.get("tags") or [])
+            if chunk["category"] not in tags:
+                tags.append(chunk["category"])
+            test = {**t, "name": _unique_name(str(t.get("name") or ""), chunk["category"]), "tags": tags}
+            if taken < int(chunk.get("hidden_count") or 0):
+                hidden.append(test)
+                taken += 1
+            else:
+                overflow.append(test)
+    hidden.extend(overflow)
+
+    if len(public) > public_examples_count:
+        stats["capped"] += len(public) - public_examples_count
+        public = public[:public_examples_count]
+    if len(hidden) > hidden_tests_count:
+        stats["capped"] += len(hidden) - hidden_tests_count
+        hidden = hidden[:hidden_tests_count]
+    return {"public_examples": public, "hidden_tests": hidden}, stats
@@ -0,0 +1,439 @@
+import gzip
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import Table, delete, exists, insert, null, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from backend import models
+from backend.database import engine
+from backend.config import (
+    PROJECT_ROOT,
+    RETENTION_INTERVAL_HOURS,
+    RETENTION_ARCHIVE_DIR,
+    RETENTION_BATCH_SIZE,
+    RETENTION_EVENT_LOGS_DAYS,
+    RETENTION_DIAGNOSIS_LOGS_DAYS,
+    RETENTION_AI_STREAM_CHUNKS_DAYS,
+    RETENTION_ORACLE_RUNS_DAYS,
+    RETENTION_SESSION_IDLE_DAYS,
+    RETENTION_FILE_LOGS_DAYS,
+    RETENTION_BLOB_GRACE_HOURS,
+    RETENTION_VACUUM,
+)
+from backend.services.blob_store import OFFLOADED, blob_store
+from backend.utils import now
+
+logger = logging.getLogger("Backend")
+
+# Keeps the hot tables small. Each run:
+#   1. ages out rows per RetentionPolicy (and rows cascading from them), RETENTION_BATCH_SIZE per transaction;
+#   2. archives whole sessions idle for RETENTION_SESSION_IDLE_DAYS (off by default);
+#   3. sweeps orphans (messages without a thread, diagnoses / AI runs without a session, chunks without a run);
+#   4. moves aged telemetry/*.jsonl and logs/observations/ files into the archive;
+#   5. drops unreferenced blobs, then runs ANALYZE (and VACUUM if anything was deleted).
+# Rows are written to RETENTION_ARCHIVE_DIR/<group>/<stamp>-<reason>-<id>.jsonl.gz before they
+# are deleted, one {"table", "row"} object per line, with blob references inlined. <group> is the
+# session id (oracle runs: oracle_<version_id>, orphans: _orphans), and restore(group) re-inserts them.
+
+ORPHAN_GROUP = "_orphans"
+# Process-wide logs in telemetry/ (routing history, similarity index) that are read back at startup; not per-session.
+SHARED_LOG_FILES = {"oracle_routing.jsonl", "oracle_similarity.jsonl"}
+DAY = 86400.0
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    table: str
+    days: float # 0 = keep forever
+    group: str # "<table>.<column>" naming the archive group of a row (joined through the FK if another table)
+    group_prefix: str = ""
+    cascade: Tuple[Tuple[str, str], ...] = () # (child table, column holding this table's primary key)
+
+
+def default_policies() -> List[RetentionPolicy]:
+    return [
+        RetentionPolicy("event_logs", RETENTION_EVENT_LOGS_DAYS, "event_logs.session_id", cascade=(("diagnosis_logs", "event_id"),)),
+        RetentionPolicy("diagnosis_logs", RETENTION_DIAGNOSIS_LOGS_DAYS, "diagnosis_logs.session_id"),
+        RetentionPolicy("ai_stream_chunks", RETENTION_AI_STREAM_CHUNKS_DAYS, "ai_runs.session_id"),
+        RetentionPolicy("oracle_runs", RETENTION_ORACLE_RUNS_DAYS, "oracle_runs.version_id", group_prefix="oracle_"),
+    ]
+
+
+# Everything belonging to a session, parents first (restore order; deletes run in reverse).
+# The link is a session_id-like column of the table, or (column, parent table) for rows reached through a parent.
+SESSION_GRAPH = [
+    ("sessions", "id"),
+    ("threads", "session_id"),
+    ("messages", ("thread_id", "threads")),
+    ("markers", "session_id"),
+    ("code_snapshots", "session_id"),
+    ("code_states", "session_id"),
+    ("event_logs", "session_id"),
+    ("diagnosis_logs", "session_id"),
+    ("ai_runs", "session_id"),
+    ("ai_stream_chunks", ("run_id", "ai_runs")),
+    ("editor_ops", ("run_id", "ai_runs")),
+    ("learning_debts", "session_id"),
+    ("concept_mastery", "session_id"),
+]
+RESTORE_ORDER = [name for name, _ in SESSION_GRAPH] + ["oracle_runs"]
+
+# (table, column, parent table). Runs come before their chunks so one sweep catches both.
+ORPHANS = [
+    ("messages", "thread_id", "threads"),
+    ("diagnosis_logs", "session_id", "sessions"),
+    ("ai_runs", "session_id", "sessions"),
+    ("ai_stream_chunks", "run_id", "ai_runs"),
+    ("editor_ops", "run_id", "ai_runs"),
+]
+
+
+def _table(name: str) -> Table:
+    return models.Base.metadata.tables[name]
+
+
+def _pk(table: Table):
+    return list(table.primary_key.columns)[0]
+
+
+def _safe_group(group: Any) -> str:
+    return re.sub(r"[^A-Za-z0-9_-]", "_", str(group)) if group else ORPHAN_GROUP
+
+
+def _merge(total: Dict[str, int], counts: Dict[str, int]) -> Dict[str, int]:
+    for k, v in counts.items():
+        total[k] = total.get(k, 0) + v
+    return total
+
+
+def session_wheres(session_id: str) -> List[Tuple[str, Any]]:
+    """(table, WHERE clause) selecting everything of a session, in SESSION_GRAPH order."""
+    out = []
+    for name, link in SESSION_GRAPH:
+        table = _table(name)
+        if isinstance(link, tuple):
+            col, parent = link
+            parent_table = _table(parent)
+            where = table.c[col].in_(select(_pk(parent_table)).where(parent_table.c.session_id == session_id))
+        else:
+            where = table.c[link] == session_id
+        out.append((name, where))
+    return out
+
+
+def export_rows(db: Session, table: Table, where: Any) -> List[Dict[str, Any]]:
+    """Matching rows as plain dicts with blob references inlined, so they are portable to another database."""
+    rows = [dict(r) for r in db.execute(select(table).where(where)).mappings()]
+    cols = OFFLOADED.get(table.name)
+    if cols:
+        for row in rows:
+            for col, kind in cols.items():
+                row[col] = blob_store.load_value(db, kind, row[col])
+    return rows
+
+
+def import_rows(db: Session, table_name: str, rows: List[Dict[str, Any]]) -> int:
+    """Insert exported rows whose primary key is not present yet (large values offloaded again). The caller commits."""
+    table = _table(table_name)
+    pk = _pk(table)
+    ids = list({r[pk.name] for r in rows})
+    existing = set()
+    for i in range(0, len(ids), 500):
+        existing.update(x for (x,) in db.execute(select(pk).where(pk.in_(ids[i:i + 500]))))
+    # executemany needs one key set per statement; rows exported under an older schema may differ.
+    fresh: Dict[Tuple[str, ...], List[Dict[str, Any]]] = defaultdict(list)
+    for r in rows:
+        if r[pk.name] in existing:
+            continue
+        existing.add(r[pk.name])
+        row = {k: v for k, v in r.items() if k in table.c}
+        for col, kind in OFFLOADED.get(table_name, {}).items():
+            if col in row:
+                row[col] = blob_store.offload_value(db, kind, row[col])
+        fresh[tuple(sorted(row))].append(row)
+    for group_rows in fresh.values():
+        db.execute(insert(table), group_rows)
+    return sum(len(g) for g in fresh.values())
+
+
+class RetentionService:
+    def __init__(
+        self,
+        engine: Engine,
+        archive_dir: Path = RETENTION_ARCHIVE_DIR,
+        policies: Optional[List[RetentionPolicy]] = None,
+        batch_size: int = RETENTION_BATCH_SIZE,
+        session_idle_days: float = RETENTION_SESSION_IDLE_DAYS,
+        file_logs_days: float = RETENTION_FILE_LOGS_DAYS,
+        blob_grace_hours: float = RETENTION_BLOB_GRACE_HOURS,
+        vacuum: bool = RETENTION_VACUUM,
+        interval_hours: float = RETENTION_INTERVAL_HOURS,
+        repo_root: Path = PROJECT_ROOT,
+    ):
+        self.engine = engine
+        self._session_factory = sessionmaker(bind=engine, autoflush=False)
+        self.archive_dir = Path(archive_dir)
+        self.policies = default_policies() if policies is None else policies
+        self.batch_size = max(1, int(batch_size))
+        self.session_idle_days = float(session_idle_days)
+        self.file_logs_days = float(file_logs_days)
+        self.blob_grace_seconds = max(0.0, float(blob_grace_hours)) * 3600
+        self.vacuum = vacuum
+        self.interval_seconds = max(60.0, float(interval_hours) * 3600)
+        self.repo_root = Path(repo_root)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._last: Dict[str, Any] = {}
+
+    # --- archive files ---
+
+    def _write_archive(self, group: Any, reason: str, rows_by_table: Dict[str, List[Dict[str, Any]]]) -> Optional[Path]:
+        if not any(rows_by_table.values()):
+            return None
+        folder = self.archive_dir / _safe_group(group)
+        folder.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        path = folder / f"{stamp}-{reason}-{uuid.uuid4().hex[:8]}.jsonl.gz"
+        tmp = path.with_suffix(".tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            for table, rows in rows_by_table.items():
+                for row in rows:
+                    f.write(json.dumps({"table": table, "row": row}, ensure_ascii=False, default=str) + "\n")
+        os.replace(tmp, path)
+        return path
+
+    # --- row retention ---
+
+    def _drain(
+        self,
+        db: Session,
+        table_name: str,
+        where: Any,
+        group_col: Any,
+        reason: str,
+        group_prefix: str = "",
+        cascade: Tuple[Tuple[str, str], ...] = (),
+        from_: Any = None,
+    ) -> Dict[str, int]:
+        """Archive + delete matching rows (and their cascade), one committed transaction per batch."""
+        table = _table(table_name)
+        pk = _pk(table)
+        counts: Dict[str, int] = {}
+        while True:
+            q = select(pk, group_col).select_from(from_ if from_ is not None else table).where(where).limit(self.batch_size)
+            batch = db.execute(q).all()
+            if not batch:
+                break
+            groups: Dict[Optional[str], List[Any]] = defaultdict(list)
+            for row_id, group in batch:
+                groups[f"{group_prefix}{group}" if group else None].append(row_id)
+            for group, ids in groups.items():
+                rows_by_table = {child: export_rows(db, _table(child), _table(child).c[col].in_(ids)) for child, col in cascade}
+                rows_by_table[table_name] = export_rows(db, table, pk.in_(ids))
+                self._write_archive(group, reason, rows_by_table)
+                for child, col in cascade:
+                    db.execute(delete(_table(child)).where(_table(child).c[col].in_(ids)))
+                db.execute(delete(table).where(pk.in_(ids)))
+                _merge(counts, {t: len(rows) for t, rows in rows_by_table.items()})
+            db.commit()
+            if len(batch) < self.batch_size:
+                break
+        return counts
+
+    def _expire(self, db: Session, policy: RetentionPolicy, now_ts: float) -> Dict[str, int]:
+        if policy.days <= 0:
+            return {}
+        table = _table(policy.table)
+        group_table, group_col = policy.group.split(".")
+        from_ = table if group_table == policy.table else table.outerjoin(_table(group_table))
+        return self._drain(
+            db, policy.table,
+            where=table.c.created_at < now_ts - policy.days * DAY,
+            group_col=_table(group_table).c[group_col],
+            reason="aged",
+            group_prefix=policy.group_prefix,
+            cascade=policy.cascade,
+            from_=from_,
+        )
+
+    def _sweep_orphans(self, db: Session) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for name, col, parent in ORPHANS:
+            table, parent_table = _table(name), _table(parent)
+            where = table.c[col].isnot(None) & ~exists().where(_pk(parent_table) == table.c[col])
+            _merge(counts, self._drain(db, name, where, null(), "orphan"))
+        return counts
+
+    def purge_session(self, db: Session, session_id: str, reason: str = "deleted", archive: bool = True) -> Dict[str, int]:
+        """Archive (optionally) and delete a session with everything hanging off it. The caller commits."""
+        wheres = session_wheres(session_id)
+        if archive:
+            self._write_archive(session_id, reason, {name: export_rows(db, _table(name), where) for name, where in wheres})
+        return {name: db.execute(delete(_table(name)).where(where)).rowcount for name, where in reversed(wheres)}
+
+    def _expire_idle_sessions(self, db: Session, cutoff: float) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        while True:
+            ids = [sid for (sid,) in db.query(models.Session.id).filter(models.Session.updated_at < cutoff).limit(self.batch_size)]
+            for sid in ids:
+                _merge(counts, self.purge_session(db, sid, reason="idle"))
+                db.commit()
+            if len(ids) < self.batch_size:
+                return counts
+
+    # --- log files ---
+
+    def _archive_files(self, cutoff: float) -> int:
+        paths = [p for p in (self.repo_root / "telemetry").glob("*.jsonl") if p.name not in SHARED_LOG_FILES]
+        paths += list((self.repo_root / "logs" / "observations").glob("*/*.jsonl"))
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        n = 0
+        for path in paths:
+            try:
+                if path.stat().st_mtime >= cutoff:
+                    continue
+                rel = path.relative_to(self.repo_root)
+                dest = self.archive_dir / _safe_group(path.stem) / "files" / rel.parent / f"{rel.name}.{stamp}.gz"
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                with path.open("rb") as src, gzip.open(dest, "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                path.unlink()
+                n += 1
+                if path.parent.name != "telemetry" and not any(path.parent.iterdir()):
+                    path.parent.rmdir()
+            except OSError as e:
+                logger.error(f"[retention] file archive failed path={path} err={e}")
+        return n
+
+    def _restore_files(self, folder: Path) -> int:
+        n = 0
+        for archived in sorted((folder / "files").rglob("*.gz")):
+            rel = archived.relative_to(folder / "files")
+            target = self.repo_root / rel.parent / archived.name.rsplit(".", 2)[0]
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with gzip.open(archived, "rb") as src, target.open("ab") as dst:
+                shutil.copyfileobj(src, dst)
+            archived.unlink()
+            n += 1
+        return n
+
+    # --- restore ---
+
+    def restore(self, db: Session, group: str) -> Optional[Dict[str, int]]:
+        """
+        Re-insert the archived rows of a group (a session id, or oracle_<version_id>) that are not in
+        the database, and put its log files back. None when there is no archive. The caller commits.
+        Restored rows are subject to the policies again on the next run; a restored session counts
+        as freshly active for the idle policy.
+        """
+        folder = self.archive_dir / _safe_group(group)
+        if not folder.is_dir():
+            return None
+        by_table: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for path in sorted(folder.glob("*.jsonl.gz")):
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    rec = json.loads(line)
+                    by_table[rec["table"]].append(rec["row"])
+        counts: Dict[str, int] = {}
+        for name in RESTORE_ORDER:
+            if by_table.get(name):
+                counts[name] = import_rows(db, name, by_table[name])
+        db.query(models.Session).filter(models.Session.id == group).update({"updated_at": now()}, synchronize_session=False)
+        counts["files"] = self._restore_files(folder)
+        logger.info(f"[retention] restore group={group} counts={counts}")
+        return counts
+
+    # --- job ---
+
+    def maintain(self, vacuum: bool) -> List[str]:
+        """ANALYZE (+ VACUUM) outside a transaction; returns the statements run."""
+        dialect = self.engine.dialect.name
+        if dialect == "sqlite":
+            stmts = (["VACUUM"] if vacuum else []) + ["ANALYZE", "PRAGMA wal_checkpoint(TRUNCATE)"]
+        elif dialect == "postgresql":
+            stmts = ["VACUUM ANALYZE" if vacuum else "ANALYZE"]
+        else:
+            return []
+        with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            for stmt in stmts:
+                conn.exec_driver_sql(stmt)
+        return stmts
+
+    def run_once(self) -> Dict[str, Any]:
+        started = now()
+        report: Dict[str, Any] = {"started_at": started, "deleted": {}, "files_archived": 0, "blobs_collected": 0}
+        db = self._session_factory()
+        try:
+            for policy in self.policies:
+                _merge(report["deleted"], self._expire(db, policy, started))
+            if self.session_idle_days > 0:
+                _merge(report["deleted"], self._expire_idle_sessions(db, started - self.session_idle_days * DAY))
+            _merge(report["deleted"], self._sweep_orphans(db))
+            report["blobs_collected"] = blob_store.collect_garbage(db, started - self.blob_grace_seconds)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        if self.file_logs_days > 0:
+            report["files_archived"] = self._archive_files(started - self.file_logs_days * DAY)
+        changed = any(report["deleted"].values()) or report["blobs_collected"] > 0
+        report["maintenance"] = self.maintain(vacuum=self.vacuum and changed)
+        report["seconds"] = round(now() - started, 3)
+        logger.info(
+            f"[retention] run deleted={report['deleted']} files={report['files_archived']} "
+            f"blobs={report['blobs_collected']} maintenance={report['maintenance']} seconds={report['seconds']}"
+        )
+        with self._lock:
+            self._last = report
+        return report
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"running": self._thread is not None, "last_run": dict(self._last) or None}
+
+    # --- scheduler thread ---
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="retention", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 10.0) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._stop.set()
+        thread.join(timeout)
+
+    def _loop(self) -> None:
+        # First run shortly after startup (restarts must not keep postponing it), then every interval.
+        delay = min(60.0, self.interval_seconds)
+        while not self._stop.wait(delay):
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("[retention] run failed")
+            delay = self.interval_seconds
+
+
+retention = RetentionService(engine)
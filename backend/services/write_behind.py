@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.engine import Engine
+
+from backend.database import engine, same_database
+from backend.services.commit_queue import commit_queue
+from backend.config import (
+    WRITE_BEHIND,
+    WRITE_BEHIND_BATCH_SIZE,
+    WRITE_BEHIND_FLUSH_MS,
+    WRITE_BEHIND_QUEUE_MAX,
+    WRITE_BEHIND_PUT_TIMEOUT_SECONDS,
+)
+
+logger = logging.getLogger("Backend")
+
+# Group commit for append-only, telemetry-class rows (events, diagnosis logs, pipeline messages).
+# Request handlers enqueue plain row dicts; one writer thread drains the queue and commits them
+# in a single transaction per batch (WRITE_BEHIND_BATCH_SIZE rows or WRITE_BEHIND_FLUSH_MS,
+# whichever comes first), so N requests cost one fsync instead of N. Callers that read their own
+# rows back call flush() first.
+
+_STOP = object()
+
+
+class WriteBehindFull(Exception):
+    pass
+
+
+class _Barrier:
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class WriteBehindWriter:
+    def __init__(
+        self,
+        engine: Engine,
+        enabled: bool = WRITE_BEHIND,
+        batch_size: int = WRITE_BEHIND_BATCH_SIZE,
+        flush_ms: float = WRITE_BEHIND_FLUSH_MS,
+        queue_max: int = WRITE_BEHIND_QUEUE_MAX,
+        put_timeout: float = WRITE_BEHIND_PUT_TIMEOUT_SECONDS,
+    ):
+        self.engine = engine
+        self.enabled = enabled
+        self.batch_size = max(1, int(batch_size))
+        self.flush_seconds = max(0.0, float(flush_ms) / 1000.0)
+        self.put_timeout = put_timeout
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, int(queue_max)))
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats = {"submitted": 0, "committed": 0, "batches": 0, "failed": 0}
+
+    # --- producer side ---
+
+    def targets(self, db: Any) -> bool:
+        """True when db is bound to the same database this writer commits to."""
+        if not self.enabled:
+            return False
+        url = getattr(getattr(db, "bind", None), "url", None)
+        return url is not None and same_database(url, self.engine.url)
+
+    def submit(self, model: Any, row: Dict[str, Any]) -> None:
+        """Queue one row for model's table. Blocks up to put_timeout when the queue is full."""
+        if not self.enabled:
+            self._write([(model.__table__, row)])
+            return
+        self._ensure_started()
+        item = (model.__table__, row)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            try:
+                self._queue.put(item, timeout=self.put_timeout)
+            except queue.Full:
+                raise WriteBehindFull(f"write-behind queue full ({self._queue.maxsize} rows)")
+        with self._lock:
+            self._stats["submitted"] += 1
+
+    async def asubmit(self, model: Any, row: Dict[str, Any]) -> None:
+        """submit() for async callers; only leaves the event loop when it has to wait."""
+        if self.enabled and not self._queue.full():
+            self.submit(model, row)
+        else:
+            await asyncio.to_thread(self.submit, model, row)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Barrier: returns once every row submitted before this call is committed."""
+        if not self.enabled or self._thread is None:
+            return True
+        barrier = _Barrier()
+        self._queue.put(barrier)
+        return barrier.done.wait(timeout)
+
+    async def aflush(self, timeout: Optional[float] = None) -> bool:
+        return await asyncio.to_thread(self.flush, timeout)
+
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        """Drain everything queued, then stop the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "queued": self._queue.qsize()}
+
+    # --- writer thread ---
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            batch: List[Any] = [item]
+            deadline = time.monotonic() + self.flush_seconds
+            while not isinstance(batch[-1], _Barrier) and batch[-1] is not _STOP and len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            rows = [x for x in batch if isinstance(x, tuple)]
+            if rows:
+                self._write(rows)
+            for x in batch:
+                if isinstance(x, _Barrier):
+                    x.done.set()
+            if batch[-1] is _STOP:
+                return
+
+    def _transaction(self, work: Callable[[Any], Any]) -> None:
+        # On the single-writer database a batch is one unit of work for commit_queue, so it
+        # never competes with request writes for the SQLite lock.
+        if commit_queue.enabled and same_database(self.engine.url, commit_queue.engine.url):
+            commit_queue.run(lambda db: work(db.connection()))
+        else:
+            with self.engine.begin() as conn:
+                work(conn)
+
+    def _write(self, rows: List[Tuple[Any, Dict[str, Any]]]) -> None:
+        # executemany needs one key set per statement, so group by (table, keys) in arrival order.
+        groups: Dict[Tuple[Any, Tuple[str, ...]], List[Dict[str, Any]]] = {}
+        for table, row in rows:
+            groups.setdefault((table, tuple(sorted(row))), []).append(row)
+        try:
+            def insert_all(conn: Any) -> None:
+                for (table, _), group in groups.items():
+                    conn.execute(table.insert(), group)
+            self._transaction(insert_all)
+            ok = len(rows)
+        except Exception as e:
+            logger.error(f"[write_behind] batch commit failed rows={len(rows)} err={e}; retrying row by row")
+            ok = 0
+            for table, row in rows:
+                try:
+                    self._transaction(lambda conn: conn.execute(table.insert(), [row]))
+                    ok += 1
+                except Exception as row_err:
+                    logger.error(f"[write_behind] dropped row table={table.name} id={row.get('id')} err={row_err}")
+        with self._lock:
+            self._stats["committed"] += ok
+            self._stats["failed"] += len(rows) - ok
+            self._stats["batches"] += 1
+
+
+write_behind = WriteBehindWriter(engine)
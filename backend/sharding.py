@@ -0,0 +1,306 @@
+import asyncio
+import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.requests import Request
+
+from backend import models
+from backend.database import build_engine, async_database_url, engine
+from backend.services.retention import export_rows, import_rows, session_wheres
+from backend.config import DB_SHARDING, DB_SHARD_DIR, DB_SHARD_URL_TEMPLATE
+
+logger = logging.getLogger("Backend")
+
+# Per-workspace databases (DB_SHARDING=workspace). The DATABASE_URL database is the catalog: it keeps
+# workspaces, shard assignments, oracle tables and any session created without a workspace, and is
+# itself the shard named "catalog". Every other shard is DB_SHARD_URL_TEMPLATE with the shard name,
+# created with the current schema on first use. A workspace's shard is its ShardAssignment row
+# (several workspaces may share one: a cohort), else the workspace id.
+# get_db / get_async_db pick the shard from the request: a session / thread / event / code state id
+# (path, query or JSON body) is located by probing the shards once and then cached; a workspace_id
+# goes to the workspace's shard; anything else goes to the catalog. Rows never move between shards
+# except through move_workspace (scripts/shard_tool.py), which drops the caches.
+
+CATALOG = "catalog"
+# Request keys that identify a shard, tried in this order: key -> table holding that id.
+ROUTING_KEYS = {
+    "session_id": "sessions",
+    "thread_id": "threads",
+    "breakout_id": "threads",
+    "event_id": "event_logs",
+    "code_state_id": "code_states",
+}
+LOCATION_CACHE_MAX = 100_000
+
+_MISS = object()
+
+
+def shard_name(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_-]", "_", str(value)) or CATALOG
+
+
+async def request_keys(request: Request) -> Dict[str, str]:
+    """Routing keys of a request: path params, then query params, then top-level JSON body fields."""
+    keys = {**request.query_params, **request.path_params}
+    wanted = list(ROUTING_KEYS) + ["workspace_id"]
+    if not any(keys.get(k) for k in wanted) and request.method in ("POST", "PUT", "PATCH") \
+            and "json" in request.headers.get("content-type", ""):
+        try:
+            body = await request.json() # Starlette caches the body, the route still parses it
+        except Exception:
+            body = None
+        if isinstance(body, dict):
+            keys.update({k: body[k] for k in wanted if isinstance(body.get(k), str)})
+    return keys
+
+
+class ShardRouter:
+    def __init__(
+        self,
+        catalog: Engine,
+        enabled: bool = DB_SHARDING == "workspace",
+        shard_dir: Path = DB_SHARD_DIR,
+        url_template: str = DB_SHARD_URL_TEMPLATE,
+    ):
+        self.catalog = catalog
+        self.enabled = enabled
+        self.shard_dir = Path(shard_dir)
+        self.url_template = url_template
+        self._engines: Dict[str, Engine] = {CATALOG: catalog}
+        self._sessionmakers: Dict[str, sessionmaker] = {}
+        self._async_sessionmakers: Dict[str, Any] = {} # sqlalchemy.ext.asyncio is imported on first use
+        self._async_engines: Dict[str, Any] = {}
+        self._locations: Dict[tuple, str] = {} # (table, id) -> shard
+        self._assignments: Dict[str, str] = {} # workspace_id -> shard
+        self._lock = threading.RLock()
+
+    # --- engines ---
+
+    def url_for(self, shard: str) -> str:
+        if shard == CATALOG:
+            return self.catalog.url.render_as_string(hide_password=False)
+        return self.url_template.format(dir=self.shard_dir.as_posix(), shard=shard_name(shard))
+
+    def engine(self, shard: str) -> Engine:
+        eng = self._engines.get(shard)
+        if eng is not None:
+            return eng
+        with self._lock:
+            eng = self._engines.get(shard)
+            if eng is None:
+                url = self.url_for(shard)
+                db_path = make_url(url).database
+                if url.startswith("sqlite") and db_path not in (None, "", ":memory:"):
+                    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+                eng = build_engine(url)
+                # New shards come up with the current schema, as main.py does for the catalog.
+                models.Base.metadata.create_all(bind=eng)
+                self._engines[shard] = eng
+                logger.info(f"[sharding] opened shard={shard} url={eng.url}")
+        return eng
+
+    def sessionmaker(self, shard: str) -> sessionmaker:
+        maker = self._sessionmakers.get(shard)
+        if maker is None:
+            maker = self._sessionmakers.setdefault(shard, sessionmaker(autocommit=False, autoflush=False, bind=self.engine(shard)))
+        return maker
+
+    def async_sessionmaker(self, shard: str):
+        maker = self._async_sessionmakers.get(shard)
+        if maker is None:
+            from sqlalchemy.ext.asyncio import async_sessionmaker
+            from backend.async_database import build_async_engine
+            with self._lock:
+                maker = self._async_sessionmakers.get(shard)
+                if maker is None:
+                    self.engine(shard) # creates the shard and its schema
+                    eng = build_async_engine(async_database_url(self.url_for(shard)))
+                    self._async_engines[shard] = eng
+                    maker = async_sessionmaker(bind=eng, autoflush=False, expire_on_commit=False)
+                    self._async_sessionmakers[shard] = maker
+        return maker
+
+    def shard_names(self) -> List[str]:
+        """Catalog first, then every assigned shard and (SQLite) every shard file on disk."""
+        names = set(self._catalog_assignments().values())
+        if self.url_template.startswith("sqlite"):
+            marker = "__shard__"
+            path = Path(make_url(self.url_template.format(dir=self.shard_dir.as_posix(), shard=marker)).database)
+            prefix, suffix = path.name.split(marker)
+            names.update(p.name[len(prefix):len(p.name) - len(suffix)] for p in path.parent.glob(f"{prefix}*{suffix}"))
+        names.discard(CATALOG)
+        return [CATALOG] + sorted(names)
+
+    def stats(self) -> Dict[str, Any]:
+        if not self.enabled:
+            return {"enabled": False}
+        return {
+            "enabled": True,
+            "shards": self.shard_names(),
+            "open": sorted(self._engines),
+            "locations_cached": len(self._locations),
+        }
+
+    async def dispose(self) -> None:
+        for eng in list(self._async_engines.values()):
+            await eng.dispose()
+        for shard, eng in list(self._engines.items()):
+            if shard != CATALOG:
+                eng.dispose()
+
+    # --- routing ---
+
+    def _catalog_assignments(self) -> Dict[str, str]:
+        with Session(self.catalog) as db:
+            rows = db.query(models.ShardAssignment.workspace_id, models.ShardAssignment.shard).all()
+        with self._lock:
+            self._assignments.update(dict(rows))
+        return dict(rows)
+
+    def shard_for_workspace(self, workspace_id: str) -> str:
+        shard = self._assignments.get(workspace_id)
+        if shard is None:
+            with Session(self.catalog) as db:
+                row = db.get(models.ShardAssignment, workspace_id)
+            shard = row.shard if row is not None else shard_name(workspace_id)
+            with self._lock:
+                self._assignments[workspace_id] = shard
+        return shard
+
+    def assign(self, workspace_id: str, shard: str) -> None:
+        """Pin a workspace to a shard (cohorts). Existing sessions stay put; use move_workspace for those."""
+        with Session(self.catalog) as db:
+            row = db.get(models.ShardAssignment, workspace_id)
+            if row is None:
+                db.add(models.ShardAssignment(workspace_id=workspace_id, shard=shard))
+            else:
+                row.shard = shard
+            db.commit()
+        with self._lock:
+            self._assignments[workspace_id] = shard
+
+    def locate(self, table_name: str, key: str) -> Optional[str]:
+        """Shard holding the row with this primary key, probing shards on the first lookup."""
+        shard = self._locations.get((table_name, key))
+        if shard is not None:
+            return shard
+        table = models.Base.metadata.tables[table_name]
+        pk = list(table.primary_key.columns)[0]
+        for name in self.shard_names():
+            with self.engine(name).connect() as conn:
+                if conn.execute(select(pk).where(pk == key)).first() is None:
+                    continue
+            with self._lock:
+                if len(self._locations) >= LOCATION_CACHE_MAX:
+                    self._locations.clear()
+                self._locations[(table_name, key)] = name
+            return name
+        return None
+
+    def resolve(self, keys: Mapping[str, Any]) -> str:
+        for key, table in ROUTING_KEYS.items():
+            if keys.get(key):
+                shard = self.locate(table, str(keys[key]))
+                if shard is not None:
+                    return shard
+        if keys.get("workspace_id"):
+            return self.shard_for_workspace(str(keys["workspace_id"]))
+        return CATALOG
+
+    def _resolve_cached(self, keys: Mapping[str, Any]) -> Any:
+        """resolve() from the caches alone, or _MISS when that needs database lookups."""
+        for key, table in ROUTING_KEYS.items():
+            if keys.get(key):
+                return self._locations.get((table, str(keys[key])), _MISS)
+        if keys.get("workspace_id"):
+            return self._assignments.get(str(keys["workspace_id"]), _MISS)
+        return CATALOG
+
+    async def resolve_request(self, request: Request) -> str:
+        keys = await request_keys(request)
+        shard = self._resolve_cached(keys)
+        if shard is _MISS:
+            shard = await asyncio.to_thread(self.resolve, keys)
+        return shard
+
+    def forget(self) -> None:
+        with self._lock:
+            self._locations.clear()
+            self._assignments.clear()
+
+    # --- cross-shard reads ---
+
+    def scatter(self, fn: Callable[[Session], Any], shards: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Run fn(db) on every shard in parallel, read-only (always rolled back); {shard: result or {"error": ...}}."""
+        names = shards or self.shard_names()
+
+        def one(name: str) -> Any:
+            db = self.sessionmaker(name)()
+            try:
+                return fn(db)
+            except Exception as e:
+                logger.error(f"[sharding] scatter failed shard={name} err={e}")
+                return {"error": str(e)}
+            finally:
+                db.rollback()
+                db.close()
+
+        with ThreadPoolExecutor(max_workers=min(8, max(1, len(names))), thread_name_prefix="shard-scatter") as pool:
+            return dict(zip(names, pool.map(one, names)))
+
+    # --- maintenance ---
+
+    def ensure_workspace(self, workspace_id: str) -> str:
+        """Copy the catalog's workspace row into the workspace's shard (sessions there check it exists)."""
+        shard = self.shard_for_workspace(workspace_id)
+        if shard == CATALOG:
+            return shard
+        with Session(self.catalog) as src:
+            ws = src.get(models.Workspace, workspace_id)
+            row = {"id": ws.id, "name": ws.name, "created_at": ws.created_at} if ws is not None else None
+        if row is not None:
+            with self.sessionmaker(shard)() as dst:
+                if dst.get(models.Workspace, workspace_id) is None:
+                    dst.add(models.Workspace(**row))
+                    dst.commit()
+        return shard
+
+    def move_workspace(self, workspace_id: str, target: Optional[str] = None) -> Dict[str, int]:
+        """
+        Move every session of a workspace (with everything hanging off it) into target (default: its
+        assigned shard, else its own), then pin the workspace there. Run while the workspace is idle.
+        Each session is committed on the target before it is deleted from its source.
+        """
+        target = target or self.shard_for_workspace(workspace_id)
+        self.assign(workspace_id, target)
+        self.ensure_workspace(workspace_id)
+        moved: Dict[str, int] = {}
+        for source in self.shard_names():
+            if source == target:
+                continue
+            with self.sessionmaker(source)() as src:
+                session_ids = [sid for (sid,) in src.query(models.Session.id).filter(models.Session.workspace_id == workspace_id)]
+                for sid in session_ids:
+                    wheres = session_wheres(sid)
+                    tables = models.Base.metadata.tables
+                    with self.sessionmaker(target)() as dst:
+                        for name, where in wheres:
+                            n = import_rows(dst, name, export_rows(src, tables[name], where))
+                            moved[name] = moved.get(name, 0) + n
+                        dst.commit()
+                    for name, where in reversed(wheres):
+                        src.execute(delete(tables[name]).where(where))
+                    src.commit()
+                    logger.info(f"[sharding] moved session={sid} workspace={workspace_id} {source} -> {target}")
+        self.forget()
+        return moved
+
+
+shard_router = ShardRouter(engine)
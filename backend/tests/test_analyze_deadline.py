@@ -0,0 +1,52 @@
+import time
+import unittest
+from unittest.mock import patch
+
+from backend.services.oracle.llm_oracle import generate_spec_with_llm, OracleAnalyzeError
+
+
+class TestAnalyzeDeadline(unittest.TestCase):
+
+    @patch("backend.services.oracle.llm_oracle.llm_service.chat")
+    def test_budget_stops_retry_loop(self, mock_chat):
+        timeouts = []
+
+        def slow_bad_json(messages, model, temperature, **kwargs):
+            timeouts.append(kwargs["timeout"])
+            time.sleep(0.12)
+            return {"text": "not json", "latency_ms": 120, "request_id": f"r{len(timeouts)}"}
+
+        mock_chat.side_effect = slow_bad_json
+        # Scale the minimum attempt window down to the test's sub-second budget.
+        with patch("backend.services.oracle.deadline.Deadline.can_attempt", lambda self, min_seconds=0.05: self.remaining() >= min_seconds):
+            with self.assertRaises(OracleAnalyzeError) as ctx:
+                generate_spec_with_llm("add two numbers", "python", "python", "function", retries=10, deadline_seconds=0.3)
+
+        self.assertEqual(str(ctx.exception), "analyze_deadline_exceeded")
+        meta = ctx.exception.metadata
+        self.assertLess(meta["attempts"], 5)
+        self.assertEqual(meta["deadline_budget_ms"], 300)
+        self.assertLess(meta["deadline_remaining_ms"], 100)
+        self.assertTrue(meta["attempt_fail_reasons"][-1].startswith("deadline_exceeded"))
+        self.assertTrue(all("[remaining_ms=" in r for r in meta["attempt_fail_reasons"]))
+        # Per-attempt timeout shrinks with the budget
+        self.assertLessEqual(timeouts[0], 0.3)
+        self.assertEqual(timeouts, sorted(timeouts, reverse=True))
+
+    @patch("backend.services.oracle.llm_oracle.llm_service.chat")
+    def test_success_reports_remaining_budget(self, mock_chat):
+        mock_chat.return_value = {
+            "text": '{"goal_one_liner": "Add", "deliverable": "function", "language": "python", "runtime": "python", '
+                    '"signature": {"function_name": "add", "args": ["a", "b"], "returns": "int"}, '
+                    '"output_shape": {"type": "int"}, "ambiguities": [], "public_examples": [{"name": "ex1", "input": [1, 2], "expected": 3}]}',
+            "latency_ms": 5,
+            "request_id": "ok",
+        }
+        spec, meta = generate_spec_with_llm("add two numbers", "python", "python", "function", deadline_seconds=60)
+        self.assertEqual(meta["deadline_budget_ms"], 60000)
+        self.assertGreater(meta["deadline_remaining_ms"], 59000)
+        self.assertLessEqual(mock_chat.call_args.kwargs["timeout"], 60)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend import models
+from backend.database import Base
+from backend.routers.oracle import SpecBody, cancel_analyze, create_spec_stream
+from backend.services.oracle.progress import progress_registry
+from backend.services.oracle.similarity import SimilarityIndex
+
+SPEC = {
+    "goal_one_liner": "Sum numbers",
+    "interaction_model": "function_single",
+    "deliverable": "function",
+    "language": "python",
+    "runtime": "python",
+    "signature": {"function_name": "total", "args": ["nums"], "returns": "int"},
+    "constraints": ["Empty list returns 0"],
+    "assumptions": [],
+    "output_ops": [],
+    "output_shape": {"type": "int"},
+    "ambiguities": [],
+    "public_examples": [{"name": "ex1", "input": [[1, 2]], "expected": 3}],
+    "confidence_reasons": ["Clear task"],
+}
+
+
+def _events(resp):
+    async def collect():
+        return [chunk async for chunk in resp.body_iterator]
+
+    out = []
+    for block in "".join(asyncio.run(collect())).split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if lines:
+            out.append((lines["event"], json.loads(lines["data"])))
+    return out
+
+
+@patch("backend.routers.oracle.ORACLE_SPECULATIVE_TESTS", False)
+class TestAnalyzeProgress(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=engine)
+        self.Session = sessionmaker(bind=engine)
+        with self.Session() as db:
+            db.add(models.OracleTask(task_id="t1"))
+            db.commit()
+        for target, value in (
+            ("backend.routers.oracle.SessionLocal", self.Session),
+            ("backend.routers.oracle.similarity_index", SimilarityIndex(repo_root=Path(self.tmp.name))),
+        ):
+            patcher = patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    @patch("backend.services.oracle.llm_oracle.llm_service.chat_stream")
+    def test_events_follow_the_retry_loop(self, mock_stream):
+        incomplete = dict(SPEC, output_shape={})
+        texts = [json.dumps(incomplete), json.dumps(SPEC)]
+
+        def fake_stream(messages, on_delta, **kwargs):
+            text = texts.pop(0)
+            for i in range(0, len(text), 50):
+                on_delta(text[i:i + 50])
+            return {"text": text, "latency_ms": 5}
+
+        mock_stream.side_effect = fake_stream
+        events = _events(create_spec_stream("t1", SpecBody(task_description="sum numbers", warm_start="off")))
+        names = [e for e, _ in events]
+        self.assertEqual(names[:3], ["started", "analyze_start", "attempt_start"])
+        self.assertIn("token_progress", names)
+        failed = next(d for e, d in events if e == "attempt_failed")
+        self.assertTrue(failed["reason"].startswith("missing_fields"))
+        self.assertEqual([d["attempt"] for e, d in events if e == "attempt_start"], [1, 2])
+        self.assertEqual(names[-1], "done")
+        with self.Session() as db:
+            v = db.query(models.OracleTaskVersion).filter_by(version_id=events[-1][1]["version_id"]).one()
+            self.assertEqual(v.attempts, 2)
+
+    @patch("backend.services.oracle.llm_oracle.llm_service.chat_stream")
+    def test_cancel_stops_the_worker(self, mock_stream):
+        state = {"deltas": 0}
+        opened = []
+
+        def fake_stream(messages, on_delta, **kwargs):
+            for _ in range(200):
+                if state["deltas"] == 3:
+                    cancel_analyze(opened[0].stream_id)
+                state["deltas"] += 1
+                on_delta("x" * 20)
+                time.sleep(0.005)
+            return {"text": json.dumps(SPEC), "latency_ms": 5}
+
+        mock_stream.side_effect = fake_stream
+        real_open = progress_registry.open
+        with patch.object(progress_registry, "open", side_effect=lambda: opened.append(real_open()) or opened[-1]):
+            resp = create_spec_stream("t1", SpecBody(task_description="sum numbers", warm_start="off"))
+        events = _events(resp)
+        self.assertEqual(events[-1][0], "error")
+        self.assertEqual(events[-1][1]["detail"]["reason"], "analyze_cancelled")
+        self.assertLessEqual(state["deltas"], 5)
+        self.assertEqual(mock_stream.call_count, 1)
+        with self.Session() as db:
+            self.assertEqual(db.query(models.OracleTaskVersion).one().status, "analyze_cancelled")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from backend.database import async_database_url
+
+
+class TestAsyncDatabaseUrl(unittest.TestCase):
+
+    def test_driver_swap(self):
+        self.assertEqual(async_database_url("sqlite:////tmp/a.db"), "sqlite+aiosqlite:////tmp/a.db")
+        self.assertEqual(
+            async_database_url("postgresql://u:p@db:5432/mst"),
+            "postgresql+asyncpg://u:p@db:5432/mst",
+        )
+        self.assertEqual(
+            async_database_url("postgresql+psycopg2://u:p@db/mst"),
+            "postgresql+asyncpg://u:p@db/mst",
+        )
+        self.assertEqual(async_database_url("sqlite+aiosqlite:///x.db"), "sqlite+aiosqlite:///x.db")
+
+
+class TestAsyncEventRoutes(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        from backend import models
+        from backend.async_database import build_async_engine
+        from backend.database import Base
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = build_async_engine(f"sqlite+aiosqlite:///{(Path(self.tmp.name) / 'db.sqlite').as_posix()}")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.Session = async_sessionmaker(bind=self.engine, expire_on_commit=False)
+        async with self.Session() as db:
+            db.add(models.Session(id="s1", language="python"))
+            await db.commit()
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+        self.tmp.cleanup()
+
+    async def test_code_state_dedup(self):
+        from backend import schemas
+        from backend.routers.events import create_code_state
+
+        async with self.Session() as db:
+            first = await create_code_state(schemas.CodeStateCreate(session_id="s1", content="print(1)"), db=db)
+            again = await create_code_state(schemas.CodeStateCreate(session_id="s1", content="print(1)"), db=db)
+        self.assertEqual(first["code_state_id"], again["code_state_id"])
+
+    @patch("backend.routers.events.observation_logger")
+    @patch("backend.routers.events.telemetry_service")
+    async def test_event_persists_and_diagnoses_without_blocking(self, _telemetry, _observations):
+        from fastapi import HTTPException
+        from sqlalchemy import select
+
+        from backend import models, schemas
+        from backend.routers.events import create_event
+
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        t = asyncio.create_task(ticker())
+        try:
+            async with self.Session() as db:
+                with patch("backend.routers.events.decide_action", side_effect=RuntimeError("stop after diagnosis")):
+                    evt = await create_event("s1", schemas.EventLogCreate(type="compile", payload={"error": "NameError"}), db=db)
+                with self.assertRaises(HTTPException):
+                    await create_event("missing", schemas.EventLogCreate(type="edit", payload={}), db=db)
+                logs = (await db.execute(select(models.DiagnosisLog))).scalars().all()
+        finally:
+            t.cancel()
+        self.assertEqual(evt.session_id, "s1")
+        self.assertEqual([log.event_id for log in logs], [evt.id])
+        self.assertGreater(ticks, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend import models
+from backend.database import Base
+from backend.services.blob_store import BlobStore, PAYLOAD_REFS_KEY, ref_digest
+
+
+class TestBlobStore(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        self.store = BlobStore(min_bytes=1024, preview_chars=16, cache_entries=0)
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_small_values_stay_inline(self):
+        self.assertEqual(self.store.offload_text(self.db, "short"), "short")
+        self.assertEqual(self.store.offload_json(self.db, {"a": 1}), {"a": 1})
+        payload = {"stdout": "ok", "exit_code": 0}
+        self.assertIs(self.store.offload_payload(self.db, payload), payload)
+        self.assertEqual(self.db.query(models.Blob).count(), 0)
+
+    def test_round_trip_and_dedupe(self):
+        text = "Traceback (most recent call last):\n" * 200
+        raw = {"choices": [{"message": {"content": "é" * 2000}}]}
+        text_ref = self.store.offload_text(self.db, text)
+        json_ref = self.store.offload_json(self.db, raw)
+        again = self.store.offload_json(self.db, raw)
+        self.db.commit()
+        self.assertTrue(text_ref.startswith("blob:sha256:"))
+        self.assertEqual(json_ref, again)
+        self.assertEqual(self.db.query(models.Blob).count(), 2)
+        blob = self.db.get(models.Blob, ref_digest(text_ref))
+        self.assertEqual(blob.size, len(text))
+        self.assertLess(len(blob.data), len(text) // 10)
+        self.assertEqual(self.store.load(self.db, text_ref), text)
+        self.assertEqual(self.store.load(self.db, json_ref), raw)
+        self.assertEqual(self.store.load(self.db, "plain"), "plain")
+
+    def test_payload_keeps_preview_and_restores(self):
+        payload = {"stdout": "x" * 5000, "stderr": "boom", "exit_code": 1}
+        stored = self.store.offload_payload(self.db, payload)
+        self.db.commit()
+        self.assertEqual(stored["stdout"], "x" * 16)
+        self.assertEqual(stored["stderr"], "boom")
+        self.assertEqual(set(stored[PAYLOAD_REFS_KEY]), {"stdout"})
+        self.assertEqual(self.store.load_payload(self.db, stored), payload)
+
+    def test_raw_columns_are_deferred(self):
+        raw = self.store.offload_json(self.db, "x" * 4096)
+        self.db.add(models.OracleTaskVersion(version_id="v1", task_id="t1", version_number=1, status="ready",
+                                             spec_llm_raw_json=raw, llm_raw_spec_json=raw))
+        self.db.add(models.OracleRun(run_id="r1", version_id="v1", code_text=self.store.offload_text(self.db, "y" * 4096)))
+        self.db.commit()
+        self.db.expunge_all()
+        statements = []
+        event.listen(self.engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+        v = self.db.get(models.OracleTaskVersion, "v1")
+        run = self.db.get(models.OracleRun, "r1")
+        self.assertNotIn("spec_llm_raw_json", statements[0])
+        self.assertNotIn("code_text", statements[1])
+        self.assertIn("code_text", inspect(run).unloaded)
+        self.assertEqual(self.store.load(self.db, v.spec_llm_raw_json), "x" * 4096)
+        self.assertEqual(self.store.load(self.db, run.code_text), "y" * 4096)
+        self.assertEqual(self.db.query(models.Blob).count(), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
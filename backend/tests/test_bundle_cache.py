@@ -0,0 +1,78 @@
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend import models
+from backend.database import Base
+from backend.routers.oracle import ConfirmBody, GenerateTestsBody, confirm_version, generate_tests
+
+SPEC = {
+    "goal_one_liner": "Sum",
+    "deliverable": "function",
+    "signature": {"function_name": "total", "args": ["nums"], "returns": "int"},
+    "constraints": ["small"],
+    "ambiguities": [{"ambiguity_id": "empty", "question": "Empty list?", "choices": [{"choice_id": "zero", "text": "0"}, {"choice_id": "none", "text": "None"}]}],
+}
+BUNDLE = {
+    "public_examples": [{"name": "p1", "input": [[1, 2]], "expected": 3}],
+    "hidden_tests": [{"name": "h1", "input": [[4]], "expected": 4}],
+}
+
+
+class TestBundleCache(unittest.TestCase):
+
+    def setUp(self):
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=engine)
+        self.db = sessionmaker(bind=engine)()
+        self.db.add(models.OracleTaskVersion(
+            version_id="v1", task_id="t1", status="ready", spec_json=SPEC,
+            ambiguities_json=SPEC["ambiguities"], user_confirmations_json={"selections": {"empty": "zero"}},
+            oracle_confidence=0.9, seed=11,
+        ))
+        self.db.commit()
+
+    def tearDown(self):
+        self.db.close()
+
+    @patch("backend.routers.oracle.generate_tests_with_llm")
+    def test_repeat_request_is_served_from_cache(self, mock_gen):
+        mock_gen.return_value = (BUNDLE, {"prompt_version": "p", "raw_text": "{}"})
+        body = GenerateTestsBody(public_examples_count=1, hidden_tests_count=1, expected_mode="llm")
+        first = generate_tests("v1", body, db=self.db)
+        second = generate_tests("v1", body, db=self.db)
+        self.assertFalse(first["cache_hit"])
+        self.assertTrue(second["cache_hit"])
+        self.assertEqual(first["hash"], second["hash"])
+        self.assertEqual(mock_gen.call_count, 1)
+        row = self.db.query(models.OracleTestBundleCache).one()
+        self.assertEqual(row.hit_count, 1)
+
+        # Different counts are a different key
+        generate_tests("v1", GenerateTestsBody(public_examples_count=1, hidden_tests_count=2, expected_mode="llm"), db=self.db)
+        self.assertEqual(mock_gen.call_count, 2)
+
+    @patch("backend.routers.oracle.generate_tests_with_llm")
+    def test_changed_confirmations_invalidate(self, mock_gen):
+        mock_gen.return_value = (BUNDLE, {"prompt_version": "p"})
+        body = GenerateTestsBody(public_examples_count=1, hidden_tests_count=1, expected_mode="llm")
+        generate_tests("v1", body, db=self.db)
+        confirm_version("v1", ConfirmBody(selections={"empty": "zero"}), db=self.db)
+        self.assertEqual(self.db.query(models.OracleTestBundleCache).count(), 1)  # unchanged selections keep the entry
+        confirm_version("v1", ConfirmBody(selections={"empty": "none"}), db=self.db)
+        self.assertEqual(self.db.query(models.OracleTestBundleCache).count(), 0)
+        self.assertFalse(generate_tests("v1", body, db=self.db)["cache_hit"])
+        self.assertEqual(mock_gen.call_count, 2)
+
+    @patch("backend.routers.oracle.generate_tests_with_llm")
+    def test_failed_generation_is_not_cached(self, mock_gen):
+        mock_gen.return_value = ({"public_examples": [], "hidden_tests": []}, {"error": "timeout"})
+        generate_tests("v1", GenerateTestsBody(public_examples_count=1, hidden_tests_count=1, expected_mode="llm"), db=self.db)
+        self.assertEqual(self.db.query(models.OracleTestBundleCache).count(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import json
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from backend.services.oracle.llm_oracle import generate_tests_with_llm
+from backend.services.oracle.test_chunks import plan_chunks, merge_chunks
+
+SPEC = {"goal_one_liner": "Sum", "signature": {"function_name": "total", "args": ["nums"], "returns": "int"}}
+
+
+class TestChunkPlanning(unittest.TestCase):
+
+    def test_default_profile_split(self):
+        chunks = plan_chunks(5, 10, None, max_chunk_size=8)
+        self.assertEqual([(c["category"], c["hidden_count"]) for c in chunks], [("typical", 5), ("edge", 3), ("large", 2)])
+        self.assertEqual([c["public_count"] for c in chunks], [5, 0, 0])
+
+    def test_large_counts_are_split_to_chunk_size(self):
+        chunks = plan_chunks(0, 20, {"edge": 1}, max_chunk_size=8)
+        self.assertEqual([c["hidden_count"] for c in chunks], [8, 8, 4])
+        self.assertEqual([c["index"] for c in chunks], [0, 1, 2])
+
+    def test_merge_dedupes_inputs_and_caps(self):
+        typical = {"category": "typical", "hidden_count": 2}
+        edge = {"category": "edge", "hidden_count": 1}
+        results = [
+            (typical, {"public_examples": [{"name": "p", "input": [[1]], "expected": 1}],
+                       "hidden_tests": [{"name": "t", "input": [[1, 2]], "expected": 3},
+                                        {"name": "t", "input": [[2, 3]], "expected": 5},
+                                        {"name": "extra", "input": [[9]], "expected": 9}]}),
+            (edge, {"hidden_tests": [{"name": "e", "input": [[1]], "expected": 1},
+                                     {"name": "e2", "input": [{"b": 1, "a": 2}], "expected": 0},
+                                     {"name": "e3", "input": [{"a": 2, "b": 1}], "expected": 0}]}),
+        ]
+        bundle, stats = merge_chunks(results, public_examples_count=1, hidden_tests_count=3)
+        names = [t["name"] for t in bundle["hidden_tests"]]
+        # Quotas first (2 typical, 1 edge), then overflow; duplicate of the public input and the
+        # key-order-only variant are dropped.
+        self.assertEqual(names, ["t", "t_2", "e2"])
+        self.assertEqual(bundle["hidden_tests"][2]["tags"], ["edge"])
+        self.assertEqual(stats["duplicates_dropped"], 2)
+        self.assertEqual(stats["capped"], 1)
+
+
+class TestChunkedGeneration(unittest.TestCase):
+
+    @patch("backend.services.oracle.llm_oracle.llm_service.chat")
+    def test_chunks_run_in_parallel_and_failed_chunk_retries(self, mock_chat):
+        calls = {"edge": 0}
+        lock = threading.Lock()
+
+        def fake_chat(messages, **kwargs):
+            prompt = messages[0]["content"]
+            time.sleep(0.2)
+            if "Edge cases" in prompt:
+                with lock:
+                    calls["edge"] += 1
+                    first = calls["edge"] == 1
+                if first:
+                    return {"text": "{\"hidden_tests\": [", "latency_ms": 200}  # truncated
+                return {"text": json.dumps({"hidden_tests": [{"name": "edge_empty", "input": [[]], "expected": 0}]}), "latency_ms": 200}
+            if "Large inputs" in prompt:
+                return {"text": json.dumps({"hidden_tests": [{"name": "large_1", "input": [list(range(100))], "expected": 4950}]}), "latency_ms": 200}
+            return {"text": json.dumps({
+                "public_examples": [{"name": "p1", "input": [[1, 2]], "expected": 3}],
+                "hidden_tests": [{"name": "typical_1", "input": [[3, 4]], "expected": 7},
+                                 {"name": "typical_2", "input": [[5]], "expected": 5}],
+            }), "latency_ms": 200}
+
+        mock_chat.side_effect = fake_chat
+        t0 = time.time()
+        data, meta = generate_tests_with_llm(SPEC, {}, 1, 4, {"typical": 2, "edge": 1, "large": 1}, seed=7, stream=False)
+        elapsed = time.time() - t0
+
+        self.assertLess(elapsed, 0.6)  # ~one chunk plus one retry, not three sequential calls
+        self.assertEqual(len(data["public_examples"]), 1)
+        self.assertEqual(sorted(t["name"] for t in data["hidden_tests"]), ["edge_empty", "large_1", "typical_1", "typical_2"])
+        edge = next(c for c in meta["chunks"] if c["category"] == "edge")
+        self.assertEqual((edge["ok"], edge["attempts"]), (True, 2))
+
+    @patch("backend.services.oracle.llm_oracle.ORACLE_TESTS_CHUNK_RETRIES", 0)
+    @patch("backend.services.oracle.llm_oracle.llm_service.chat")
+    def test_partial_failure_keeps_other_chunks(self, mock_chat):
+        def fake_chat(messages, **kwargs):
+            if "Large inputs" in messages[0]["content"]:
+                raise RuntimeError("provider timeout")
+            return {"text": json.dumps({"hidden_tests": [{"name": "x", "input": [[len(messages[0]["content"]) % 97]], "expected": 0}]}), "latency_ms": 1}
+
+        mock_chat.side_effect = fake_chat
+        data, meta = generate_tests_with_llm(SPEC, {}, 0, 3, {"typical": 1, "large": 1}, seed=1, stream=False)
+        self.assertNotIn("error", meta)
+        self.assertEqual(len(data["hidden_tests"]), 1)
+        self.assertEqual([c["ok"] for c in meta["chunks"]], [True, False])
+
+
+if __name__ == "__main__":
+    unittest.main()
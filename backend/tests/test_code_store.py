@@ -0,0 +1,95 @@
+import random
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend import models
+from backend.database import Base
+from backend.services.code_store import CodeStore, apply_delta, line_delta, stored_size
+
+
+def _edits(n, seed=7):
+    rng = random.Random(seed)
+    lines = [f"def f{i}(x):\n    return x + {i}\n" for i in range(60)]
+    versions = []
+    for _ in range(n):
+        i = rng.randrange(len(lines))
+        op = rng.random()
+        if op < 0.5:
+            lines[i] = lines[i].replace("x +", f"x * {rng.randrange(9)} +", 1)
+        elif op < 0.8:
+            lines.insert(i, f"# note {rng.randrange(1000)}\n")
+        elif len(lines) > 5:
+            del lines[i]
+        versions.append("".join(lines))
+    return versions
+
+
+class TestLineDelta(unittest.TestCase):
+
+    def test_round_trip_edge_cases(self):
+        cases = [
+            ("", "print(1)"),
+            ("a\nb\nc\n", "a\nc\n"),
+            ("a\r\nb\r\n", "a\r\nB\r\nc"),
+            ("no newline", "no newline\n"),
+            ("x\n" * 5, ""),
+        ]
+        for base, text in cases:
+            self.assertEqual(apply_delta(base, line_delta(base, text)), text)
+
+
+class TestCodeStore(unittest.TestCase):
+
+    def setUp(self):
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=engine)
+        self.db = sessionmaker(bind=engine)()
+        self.store = CodeStore(keyframe_interval=8, max_delta_ratio=0.5, cache_entries=64)
+
+    def tearDown(self):
+        self.db.close()
+
+    def _save(self, i, text):
+        row = models.CodeSnapshot(id=f"snap_{i:03d}", session_id="s1", created_at=float(i),
+                                  **self.store.encode(self.db, models.CodeSnapshot, "s1", text))
+        self.db.add(row)
+        self.db.commit()
+        self.store.remember(row, text)
+        return row
+
+    def test_bounded_chains_reconstruct_without_cache(self):
+        versions = _edits(40)
+        rows = [self._save(i, t) for i, t in enumerate(versions)]
+        self.assertEqual(rows[0].chain_len, 0)
+        self.assertIsNone(rows[0].delta)
+        self.assertTrue(all(r.chain_len < 8 for r in rows))
+        self.assertGreater(sum(1 for r in rows if r.delta is not None), 30)
+        self.store.clear_cache()
+        self.db.expire_all()
+        for row, text in zip(rows, versions):
+            self.assertEqual(self.store.content_of(self.db, row), text)
+
+    def test_compaction_converts_full_rows_and_expand_restores(self):
+        versions = _edits(64, seed=3)
+        for i, text in enumerate(versions):
+            self.db.add(models.CodeSnapshot(id=f"snap_{i:03d}", session_id="s1", content=text, created_at=float(i)))
+        self.db.commit()
+        res = self.store.compact_session(self.db, models.CodeSnapshot, "s1", keyframe_interval=32)
+        self.db.commit()
+        self.assertEqual(res["rows"], 64)
+        self.assertGreater(res["bytes_before"], 10 * res["bytes_after"])
+        self.store.clear_cache()
+        rows = self.db.query(models.CodeSnapshot).order_by(models.CodeSnapshot.created_at).all()
+        self.assertEqual([self.store.content_of(self.db, r) for r in rows], versions)
+
+        self.store.compact_session(self.db, models.CodeSnapshot, "s1", keyframe_interval=1)
+        self.db.commit()
+        self.assertTrue(all(r.delta is None and r.content == t for r, t in zip(rows, versions)))
+        self.assertEqual(sum(stored_size(r) for r in rows), res["bytes_before"])
+
+
+if __name__ == "__main__":
+    unittest.main()
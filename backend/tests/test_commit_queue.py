@@ -0,0 +1,174 @@
+import asyncio
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend import models
+from backend.database import Base, build_engine
+from backend.services.code_store import CodeStore
+from backend.services.commit_queue import CommitQueue
+from backend.services.write_behind import WriteBehindWriter
+
+
+class TestCommitQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = build_engine(f"sqlite:///{(Path(self.tmp.name) / 'db.sqlite').as_posix()}")
+        Base.metadata.create_all(bind=self.engine)
+        self.queue = CommitQueue(self.engine, enabled=True, max_batch=100)
+
+    def tearDown(self):
+        self.queue.close()
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def _ids(self):
+        with sessionmaker(bind=self.engine)() as db:
+            return sorted(w.id for w in db.query(models.Workspace))
+
+    def test_units_coalesce_and_failures_stay_isolated(self):
+        gate = threading.Event()
+        first = self.queue.submit(lambda db: gate.wait(5)) # holds the writer so the rest queue up
+        futures = [self.queue.submit(lambda db, i=i: db.add(models.Workspace(id=f"ws{i:02d}", name="w"))) for i in range(20)]
+        dup = self.queue.submit(lambda db: (db.add(models.Workspace(id="ws03", name="dup")), db.flush()))
+        last = self.queue.submit(lambda db: db.query(models.Workspace).count())
+        gate.set()
+
+        self.assertTrue(first.result(5))
+        for f in futures:
+            f.result(5)
+        self.assertIsInstance(dup.exception(5), IntegrityError)
+        self.assertEqual(last.result(5), 20) # sees the units ahead of it, not the rolled-back one
+        self.assertEqual(self._ids(), [f"ws{i:02d}" for i in range(20)])
+        stats = self.queue.stats()
+        self.assertEqual((stats["committed"], stats["failed"]), (22, 1))
+        self.assertLessEqual(stats["transactions"], 3)
+
+    def test_batch_is_one_sqlite_transaction(self):
+        statements, commits = [], []
+        event.listen(self.engine, "before_cursor_execute", lambda conn, cur, stmt, *a: statements.append(stmt.split()[0]))
+        event.listen(self.engine, "commit", lambda conn: commits.append(1))
+        gate, started, release, busy = threading.Event(), threading.Event(), threading.Event(), threading.Event()
+        first = self.queue.submit(lambda db: (busy.set(), gate.wait(5)))
+        self.assertTrue(busy.wait(5)) # the writer is inside `first`; the next three queue up behind it
+        a = self.queue.submit(lambda db: db.add(models.Workspace(id="ws_a", name="w")))
+        b = self.queue.submit(lambda db: (started.set(), release.wait(5)))
+        c = self.queue.submit(lambda db: db.add(models.Workspace(id="ws_c", name="w")))
+        gate.set()
+        first.result(5)
+        self.assertTrue(started.wait(5))
+        self.assertEqual(self._ids(), []) # ws_a is flushed but its savepoint release did not commit it
+        release.set()
+        a.result(5), b.result(5), c.result(5)
+        self.assertEqual(self._ids(), ["ws_a", "ws_c"])
+        writer_statements = [x for x in statements if x in ("BEGIN", "SAVEPOINT", "RELEASE", "COMMIT")]
+        # Two batches ([first] and [a, b, c]), each BEGIN ... COMMIT; b never touches the db, so
+        # only a and c open a savepoint.
+        self.assertEqual(writer_statements.count("BEGIN"), 2)
+        self.assertEqual(writer_statements.count("SAVEPOINT"), 2)
+        self.assertEqual(writer_statements.count("RELEASE"), 2)
+        self.assertEqual(len(commits), 2)
+
+    def test_run_returns_loaded_objects_and_async_callers(self):
+        ws = self.queue.run(lambda db: db.merge(models.Workspace(id="ws1", name="w")))
+        self.assertEqual((ws.id, ws.name), ("ws1", "w"))
+        self.assertIsNotNone(ws.created_at) # column default, loaded before the writer's session closed
+        count = asyncio.run(self.queue.arun(lambda db: db.query(models.Workspace).count()))
+        self.assertEqual(count, 1)
+
+    def test_other_database_runs_on_callers_session(self):
+        other = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=other)
+        db = sessionmaker(bind=other)()
+        self.assertFalse(self.queue.serves(db))
+        self.queue.run(lambda w: w.add(models.Workspace(id="mem", name="w")), db)
+        self.assertEqual(db.query(models.Workspace).count(), 1)
+        self.assertEqual(self._ids(), [])
+        db.close()
+
+    def test_write_behind_batches_go_through_the_writer(self):
+        writer = WriteBehindWriter(self.engine, enabled=True, batch_size=50, flush_ms=1000)
+        with patch("backend.services.write_behind.commit_queue", self.queue):
+            for i in range(30):
+                writer.submit(models.EventLog, {"id": f"evt_{i}", "session_id": "s1", "type": "edit", "payload": {}})
+            self.assertTrue(writer.flush(timeout=5))
+            writer.close()
+        self.assertEqual(self.queue.stats()["committed"], 1)
+        with sessionmaker(bind=self.engine)() as db:
+            self.assertEqual(db.query(models.EventLog).count(), 30)
+
+
+
+class TestAsyncWritersThroughQueue(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        from backend.async_database import build_async_engine
+
+        self.tmp = tempfile.TemporaryDirectory()
+        path = (Path(self.tmp.name) / "db.sqlite").as_posix()
+        self.engine = build_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(bind=self.engine)
+        with sessionmaker(bind=self.engine)() as db:
+            db.add(models.Session(id="s1", language="python"))
+            db.commit()
+        self.queue = CommitQueue(self.engine, enabled=True, max_batch=100)
+        self.async_engine = build_async_engine(f"sqlite+aiosqlite:///{path}")
+        self.Session = async_sessionmaker(bind=self.async_engine, expire_on_commit=False)
+
+    async def asyncTearDown(self):
+        self.queue.close()
+        await self.async_engine.dispose()
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    async def test_concurrent_code_state_and_event_writers(self):
+        from backend import schemas
+        from backend.routers.events import create_code_state, create_event, create_events_batch
+
+        contents = [f"x = {i}\n" * (i + 1) for i in range(20)]
+        big = "y" * 200_000 # offloaded to the blobs table inside the event's unit
+
+        async def code_state(content):
+            async with self.Session() as db:
+                return await create_code_state(schemas.CodeStateCreate(session_id="s1", content=content), db=db)
+
+        async def batch(i):
+            async with self.Session() as db:
+                events = [schemas.EventLogCreate(type="edit", payload={"batch": i, "j": j}) for j in range(5)]
+                return await create_events_batch("s1", schemas.EventBatchCreate(events=events), db=db)
+
+        async def single(i):
+            async with self.Session() as db:
+                return await create_event("s1", schemas.EventLogCreate(type="edit", payload={"stdout": big, "i": i}), db=db)
+
+        with patch("backend.routers.events.commit_queue", self.queue), \
+                patch("backend.routers.events.observation_logger"), \
+                patch("backend.routers.events.telemetry_service"):
+            results = await asyncio.gather(
+                *[code_state(c) for c in contents], *[batch(i) for i in range(10)], *[single(i) for i in range(5)]
+            )
+
+        stats = self.queue.stats()
+        self.assertEqual((stats["committed"], stats["failed"]), (35, 0))
+        self.assertLessEqual(stats["transactions"], 35)
+        with sessionmaker(bind=self.engine)() as db:
+            self.assertEqual(db.query(models.EventLog).count(), 55)
+            self.assertGreaterEqual(db.query(models.Blob).count(), 1)
+            # Each state was delta-encoded on the writer against the last committed one.
+            fresh = CodeStore()
+            for content, res in zip(contents, results[:20]):
+                self.assertEqual(fresh.content_of(db, db.get(models.CodeState, res["code_state_id"])), content)
+
+
+if __name__ == "__main__":
+    unittest.main()
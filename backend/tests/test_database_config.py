@@ -0,0 +1,65 @@
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from sqlalchemy import Column, Integer, String
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from backend.database import build_engine, describe_engine, self_check
+
+_Base = declarative_base()
+
+
+class _Row(_Base):
+    __tablename__ = "rows"
+    id = Column(Integer, primary_key=True)
+    payload = Column(String)
+
+
+class TestSqliteProfile(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = build_engine(f"sqlite:///{(Path(self.tmp.name) / 'db.sqlite').as_posix()}")
+        _Base.metadata.create_all(bind=self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def test_pragmas_apply_per_connection(self):
+        info = describe_engine(self.engine)
+        self.assertEqual(info["journal_mode"], "wal")
+        self.assertEqual(info["synchronous"], 1)  # NORMAL
+        self.assertGreaterEqual(info["busy_timeout"], 5000)
+        self.assertLess(info["cache_size"], 0)  # negative = KiB
+        self.assertEqual(self_check(self.engine)["warnings"], [])
+
+    def test_concurrent_writers_do_not_lock(self):
+        Session = sessionmaker(bind=self.engine)
+        errors = []
+
+        def writer(n):
+            try:
+                for i in range(25):
+                    db = Session()
+                    db.add(_Row(payload=f"{n}-{i}"))
+                    db.commit()
+                    db.close()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+        db = Session()
+        self.assertEqual(db.query(_Row).count(), 200)
+        db.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
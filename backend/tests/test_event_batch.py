@@ -0,0 +1,74 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+from backend.services.observation_logger import ObservationEventContext, ObservationLogger
+
+
+class TestObservationAppendMany(unittest.TestCase):
+
+    def test_batch_keeps_order_and_seq(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            obs = ObservationLogger(repo_root=Path(tmp))
+            obs.append(ObservationEventContext(session_id="s1", event_id="e0", event_type="edit", source="frontend"), {})
+            items = [
+                (ObservationEventContext(session_id="s1", event_id=f"e{i}", event_type=t, source="frontend"), {"stderr": "x"})
+                for i, t in enumerate(["edit", "run", "run_fail"], start=1)
+            ]
+            path = obs.append_many("s1", items)
+            records = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+        self.assertEqual([r["event_id"] for r in records], ["e0", "e1", "e2", "e3"])
+        self.assertEqual([r["seq"] for r in records], [0, 1, 2, 3])
+        self.assertEqual([r["event_type"] for r in records[1:]], ["edit", "run_start", "run_end"])
+
+
+class TestEventBatchRoute(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        from backend import models
+        from backend.async_database import build_async_engine
+        from backend.database import Base
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = build_async_engine(f"sqlite+aiosqlite:///{(Path(self.tmp.name) / 'db.sqlite').as_posix()}")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.Session = async_sessionmaker(bind=self.engine, expire_on_commit=False)
+        async with self.Session() as db:
+            db.add(models.Session(id="s1", language="python"))
+            await db.commit()
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+        self.tmp.cleanup()
+
+    @patch("backend.routers.events.telemetry_service")
+    async def test_batch_inserts_in_order_and_triggers_once_per_type(self, _telemetry):
+        from sqlalchemy import select
+
+        from backend import models, schemas
+        from backend.routers.events import create_events_batch
+
+        types = ["edit", "compile", "edit", "compile", "run", "edit"]
+        batch = schemas.EventBatchCreate(events=[schemas.EventLogCreate(type=t, payload={"i": i}) for i, t in enumerate(types)])
+        with patch("backend.routers.events.observation_logger") as obs, \
+                patch("backend.routers.events.run_mechanism_pipeline", new_callable=AsyncMock) as mech:
+            async with self.Session() as db:
+                res = await create_events_batch("s1", batch, db=db)
+                rows = (await db.execute(
+                    select(models.EventLog).where(models.EventLog.session_id == "s1").order_by(models.EventLog.created_at.asc())
+                )).scalars().all()
+        self.assertEqual(res["accepted"], 6)
+        self.assertEqual([r.type for r in rows], types)
+        self.assertEqual([r.id for r in rows], res["event_ids"])
+        self.assertEqual(res["triggered_event_ids"], [res["event_ids"][3], res["event_ids"][4]])
+        self.assertEqual([c.args[1].id for c in mech.await_args_list], res["triggered_event_ids"])
+        self.assertEqual(obs.append_many.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
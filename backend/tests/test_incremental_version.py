@@ -0,0 +1,120 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend import models
+from backend.database import Base
+from backend.routers.oracle import ConfirmBody, SpecBody, confirm_version, create_spec, new_version
+from backend.services.oracle.similarity import SimilarityIndex
+from backend.services.oracle.spec_validator import collect_violations
+
+DESC = "Write a function total(nums) that returns the sum of a list of integers.\nNegative numbers are allowed.\nInputs have at most 1000 items."
+AMBIGUITY = {
+    "ambiguity_id": "empty_input",
+    "question": "How should an empty list be handled?",
+    "choices": [{"choice_id": "zero", "text": "0"}, {"choice_id": "error", "text": "Raise ValueError"}],
+}
+SPEC = {
+    "goal_one_liner": "Sum a list",
+    "interaction_model": "function_single",
+    "deliverable": "function",
+    "language": "python",
+    "runtime": "python",
+    "signature": {"function_name": "total", "args": ["nums"], "returns": "int"},
+    "constraints": ["Negative numbers are allowed"],
+    "assumptions": [],
+    "output_ops": [],
+    "output_shape": {"type": "int"},
+    "ambiguities": [AMBIGUITY],
+    "public_examples": [{"name": "ex1", "input": [[1, 2]], "expected": 3}],
+}
+
+
+class TestFieldScopedValidation(unittest.TestCase):
+
+    def test_only_rules_reading_changed_fields_run(self):
+        spec = dict(SPEC, goal_one_liner="", signature={"function_name": "main", "args": ["nums"], "returns": "int"})
+        self.assertEqual({v.field_path for v in collect_violations(spec, "", fields={"constraints"})}, set())
+        self.assertEqual({v.field_path for v in collect_violations(spec, "", fields={"signature"})}, {"goal_one_liner", "signature.function_name"})
+
+
+@patch("backend.routers.oracle.ORACLE_SPECULATIVE_TESTS", False)
+class TestIncrementalVersion(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        patcher = patch("backend.routers.oracle.similarity_index", SimilarityIndex(repo_root=Path(self.tmp.name)))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=engine)
+        self.db = sessionmaker(bind=engine)()
+        self.db.add(models.OracleTask(task_id="t1"))
+        self.db.commit()
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    def _first_version(self, mock_chat):
+        mock_chat.return_value = {"text": json.dumps(SPEC), "latency_ms": 5}
+        first = create_spec("t1", SpecBody(task_description=DESC, warm_start="off"), db=self.db)
+        confirm_version(first["version_id"], ConfirmBody(selections={"empty_input": "zero"}), db=self.db)
+        return first["version_id"]
+
+    @patch("backend.services.oracle.llm_oracle.llm_service.chat")
+    def test_revision_sends_diff_and_carries_confirmations(self, mock_chat):
+        parent_id = self._first_version(mock_chat)
+        revised = DESC.replace("at most 1000 items", "at most 10 items")
+        mock_chat.return_value = {"text": json.dumps({"changed_fields": {"constraints": ["Negative numbers are allowed", "At most 10 items"]}}), "latency_ms": 3}
+
+        resp = new_version("t1", SpecBody(task_description=revised), db=self.db)
+
+        prompt = mock_chat.call_args.kwargs["messages"][1]["content"]
+        self.assertIn("-Inputs have at most 1000 items.", prompt)
+        self.assertIn("+Inputs have at most 10 items.", prompt)
+        self.assertNotIn("Write a function total(nums)", prompt)  # unchanged lines beyond the context window stay out
+        self.assertEqual(mock_chat.call_args.kwargs["caller"], "oracle.analyze.incremental")
+        self.assertEqual((resp["parent_version_id"], resp["incremental"], resp["status"]), (parent_id, True, "ready"))
+        v = self.db.query(models.OracleTaskVersion).filter_by(version_id=resp["new_version_id"]).one()
+        self.assertIn("At most 10 items", v.spec_json["constraints"])
+        self.assertEqual(v.user_confirmations_json, {"selections": {"empty_input": "zero"}})
+        self.assertEqual(v.conflict_report_json["incremental"]["changed_fields"], ["constraints"])
+        self.assertEqual(v.task_description, revised)
+
+    @patch("backend.services.oracle.llm_oracle.llm_service.chat")
+    def test_changed_ambiguity_is_not_carried(self, mock_chat):
+        self._first_version(mock_chat)
+        changed = dict(AMBIGUITY, choices=AMBIGUITY["choices"] + [{"choice_id": "none", "text": "None"}])
+        mock_chat.return_value = {"text": json.dumps({"changed_fields": {"ambiguities": [changed], "signature": {"function_name": "total", "args": ["nums"], "returns": "Any"}}}), "latency_ms": 3}
+        resp = new_version("t1", SpecBody(task_description=DESC + "\nEmpty input may return None."), db=self.db)
+        self.assertEqual(resp["status"], "awaiting_confirmation")
+
+    @patch("backend.services.oracle.llm_oracle.llm_service.chat")
+    def test_invalid_patch_falls_back_to_full_analysis(self, mock_chat):
+        self._first_version(mock_chat)
+        bad = {"text": json.dumps({"changed_fields": {"deliverable": "cli"}}), "latency_ms": 1}
+        mock_chat.side_effect = [bad, bad, {"text": json.dumps(SPEC), "latency_ms": 5}]
+        resp = new_version("t1", SpecBody(task_description=DESC + "\nUse Python 3."), db=self.db)
+        self.assertFalse(resp["incremental"])
+        self.assertEqual(mock_chat.call_args.kwargs["caller"], "oracle.analyze")
+
+
+    @patch("backend.services.oracle.llm_oracle.llm_service.chat")
+    def test_malformed_or_incomplete_patch_falls_back_instead_of_failing(self, mock_chat):
+        self._first_version(mock_chat)
+        malformed = {"text": json.dumps({"changed_fields": {"ambiguities": ["empty input?"]}}), "latency_ms": 1}
+        incomplete = {"text": json.dumps({"changed_fields": {"output_shape": {}}}), "latency_ms": 1}
+        mock_chat.side_effect = [malformed, incomplete, {"text": json.dumps(SPEC), "latency_ms": 5}]
+        resp = new_version("t1", SpecBody(task_description=DESC + "\nEmpty input may return None."), db=self.db)
+        self.assertFalse(resp["incremental"])
+        self.assertEqual(mock_chat.call_args.kwargs["caller"], "oracle.analyze")
+
+if __name__ == "__main__":
+    unittest.main()
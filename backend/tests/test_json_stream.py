@@ -0,0 +1,94 @@
+import json
+import unittest
+from unittest.mock import patch
+
+from backend.services.oracle.json_stream import IncrementalJSONParser, StreamAbort
+from backend.services.oracle.llm_oracle import generate_spec_with_llm
+
+
+def _feed_all(parser, text, size=7):
+    for i in range(0, len(text), size):
+        parser.feed(text[i:i + size])
+
+
+def _spec(returns):
+    return {
+        "goal_one_liner": "Add two numbers",
+        "interaction_model": "function_single",
+        "deliverable": "function",
+        "language": "python",
+        "runtime": "python",
+        "signature": {"function_name": "add", "args": ["a", "b"], "returns": returns},
+        "constraints": ["Return a + b"],
+        "assumptions": [],
+        "output_ops": [],
+        "output_shape": {"type": "int"},
+        "ambiguities": [],
+        "public_examples": [{"name": "ex1", "input": [1, 2], "expected": 3}],
+    }
+
+
+class TestIncrementalJSONParser(unittest.TestCase):
+
+    def test_fenced_object_with_nested_strings(self):
+        parser = IncrementalJSONParser()
+        _feed_all(parser, '```json\n{"a": "x}]\\"y", "b": {"c": [1, 2]}, "d": 3}\n```')
+        self.assertTrue(parser.complete)
+        self.assertEqual(parser.fields, {"a": 'x}]"y', "b": {"c": [1, 2]}, "d": 3})
+
+    def test_python_literals_are_left_for_final_parse(self):
+        parser = IncrementalJSONParser()
+        _feed_all(parser, '{"a": None, "b": [1, 2,], "c": 1}')
+        self.assertTrue(parser.complete)
+        self.assertEqual(parser.fields, {"c": 1})
+
+    def test_mismatched_bracket_aborts(self):
+        parser = IncrementalJSONParser()
+        with self.assertRaises(StreamAbort) as ctx:
+            _feed_all(parser, '{"a": [1, 2}, "b": 1}')
+        self.assertEqual(ctx.exception.reason, "mismatched_bracket")
+
+    def test_prose_without_object_aborts(self):
+        parser = IncrementalJSONParser(max_preamble=20)
+        with self.assertRaises(StreamAbort) as ctx:
+            _feed_all(parser, "I cannot produce JSON for this request, sorry.")
+        self.assertEqual(ctx.exception.reason, "no_json_object")
+
+    def test_field_check_aborts_before_completion(self):
+        parser = IncrementalJSONParser({"signature": lambda v: [] if v.get("returns") else ["empty returns"]})
+        with self.assertRaises(StreamAbort) as ctx:
+            _feed_all(parser, '{"signature": {"returns": ""}, "public_examples": [')
+        self.assertEqual(ctx.exception.field, "signature")
+        self.assertEqual(ctx.exception.problems, ["empty returns"])
+
+
+class TestStreamedAnalyze(unittest.TestCase):
+
+    @patch("backend.services.oracle.llm_oracle.llm_service.chat_stream")
+    def test_bad_signature_aborts_attempt_early(self, mock_stream):
+        delivered = []
+
+        def fake_stream(messages, on_delta, **kwargs):
+            text = json.dumps(_spec("" if not delivered else "int"))
+            sent = 0
+            try:
+                for i in range(0, len(text), 10):
+                    on_delta(text[i:i + 10])
+                    sent += 10
+            finally:
+                delivered.append((sent, len(text)))
+            return {"text": text, "latency_ms": 5, "request_id": f"r{len(delivered)}"}
+
+        mock_stream.side_effect = fake_stream
+        spec, meta = generate_spec_with_llm("add two numbers", "python", "python", "function", retries=2, stream=True)
+        self.assertEqual(meta["attempts"], 2)
+        self.assertEqual(spec["signature"]["returns"], "int")
+        first_sent, first_total = delivered[0]
+        self.assertLess(first_sent, first_total)
+        self.assertTrue(meta["attempt_fail_reasons"][0].startswith("stream_abort: field_check_failed (field: signature)"))
+        guidance = mock_stream.call_args_list[1].kwargs["messages"][-1]["content"]
+        self.assertIn("signature.returns", guidance)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from backend.services.llm_telemetry import LLMTelemetry, LLMCallRecord
+from backend.services import llm_service as llm_service_module
+
+
+class TestLLMTelemetry(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.telemetry = LLMTelemetry(repo_root=Path(self._tmp.name), buffer_size=10)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_metrics_group_by_caller_and_model(self):
+        for latency in (100, 200, 300, 400):
+            self.telemetry.record(LLMCallRecord(caller="oracle.analyze", model="glm", provider="zhipu",
+                                                prompt_tokens=10, completion_tokens=5, latency_ms=latency))
+        self.telemetry.record(LLMCallRecord(caller="hint", model="gpt", provider="openai",
+                                            latency_ms=50, outcome="error", retries=1))
+
+        groups = {(g["caller"], g["model"]): g for g in self.telemetry.metrics()["groups"]}
+        analyze = groups[("oracle.analyze", "glm")]
+        self.assertEqual(analyze["calls"], 4)
+        self.assertEqual(analyze["prompt_tokens_total"], 40)
+        self.assertEqual(analyze["completion_tokens_total"], 20)
+        self.assertEqual(analyze["latency_ms"]["p95"], 400)
+        self.assertEqual(groups[("hint", "gpt")]["errors"], 1)
+        self.assertEqual(groups[("hint", "gpt")]["retries"], 1)
+
+    def test_ring_buffer_is_bounded_but_db_keeps_everything(self):
+        for i in range(15):
+            self.telemetry.record(LLMCallRecord(caller="c", model="m", provider="p", latency_ms=i))
+        self.assertEqual(len(self.telemetry.recent(limit=100)), 10)
+        db_groups = self.telemetry.metrics(source="db")["groups"]
+        self.assertEqual(db_groups[0]["calls"], 15)
+
+    def test_chat_records_mock_call(self):
+        with patch.object(llm_service_module, "llm_telemetry", self.telemetry), \
+             patch.dict(os.environ, {"ORACLE_MOCK_MODE": "true"}):
+            llm_service_module.llm_service.chat([{"role": "user", "content": "mock_clear_cli"}],
+                                                model="glm", caller="oracle.analyze", attempt=2)
+        rec = self.telemetry.recent(limit=1)[0]
+        self.assertEqual(rec["caller"], "oracle.analyze")
+        self.assertEqual(rec["provider"], "mock")
+        self.assertEqual(rec["retries"], 1)
+        self.assertEqual(rec["prompt_tokens"], 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import json
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend import models
+from backend.database import Base
+from backend.routers.oracle import GenerateTestsBody, generate_tests
+from backend.services.oracle.expansion import expand_tests
+
+SPEC = {
+    "deliverable": "function",
+    "signature": {"function_name": "total", "args": ["nums"], "returns": "int"},
+    "output_shape": {"type": "int"},
+}
+# Rejects very large inputs, so the "large" candidates are dropped by the reference
+REFERENCE = "def total(nums):\n    if len(nums) > 500:\n        raise ValueError('too big')\n    return sum(nums)\n"
+EXAMPLES = [
+    {"name": "a", "input": [[1, 2, 3]], "expected": 6},
+    {"name": "b", "input": [[5]], "expected": 5},
+]
+
+
+class TestLocalExpansion(unittest.TestCase):
+
+    def test_expected_values_come_from_reference(self):
+        tests, stats = expand_tests(SPEC, EXAMPLES, REFERENCE, 6, seed=42)
+        self.assertEqual(len(tests), 6)
+        for t in tests:
+            self.assertEqual(t["expected"], sum(t["input"][0]))
+            self.assertEqual(t["tags"][0], "expanded")
+            self.assertNotIn(t["input"], [e["input"] for e in EXAMPLES])
+        self.assertIn([[]], [t["input"] for t in tests])
+        self.assertEqual(stats["drops"], {"reference_crash": 1})
+        self.assertEqual(stats["kept"], 6)
+
+    def test_seed_is_deterministic(self):
+        first, _ = expand_tests(SPEC, EXAMPLES, REFERENCE, 5, seed=7)
+        second, _ = expand_tests(SPEC, EXAMPLES, REFERENCE, 5, seed=7)
+        other, _ = expand_tests(SPEC, EXAMPLES, REFERENCE, 5, seed=8)
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+
+    def test_output_shape_mismatch_is_dropped(self):
+        lenient = "def total(nums):\n    return None if not nums else sum(nums)\n"
+        tests, stats = expand_tests(SPEC, EXAMPLES, lenient, 4, seed=1)
+        self.assertNotIn([[]], [t["input"] for t in tests])
+        self.assertEqual(stats["drops"].get("output_shape_mismatch"), 1)
+
+    def test_cli_stdin_expansion(self):
+        spec = {"deliverable": "cli", "signature": {"function_name": "main", "args": [], "returns": "Any"}}
+        code = "import sys\nprint(sum(int(x) for x in sys.stdin.read().split()))\n"
+        tests, _ = expand_tests(spec, [{"name": "a", "input": "3 4", "expected": "7"}], code, 3, seed=1)
+        self.assertEqual(tests[0]["input"], "")
+        self.assertEqual(tests[0]["expected"], "0")
+        for t in tests:
+            self.assertEqual(t["expected"], str(sum(int(x) for x in t["input"].split())))
+
+
+    def test_script_expansion_uses_stdout(self):
+        spec = {"deliverable": "script", "signature": {"function_name": "main", "args": [], "returns": "int"}, "output_shape": {"type": "int"}}
+        code = "import sys\nprint(len(sys.stdin.read().split()))\n"
+        tests, _ = expand_tests(spec, [{"name": "a", "input": "3 4", "expected": "2"}], code, 3, seed=1)
+        self.assertTrue(tests)
+        for t in tests:
+            self.assertEqual(t["expected"], str(len(t["input"].split())))
+
+
+BUNDLE = {
+    "public_examples": [{"name": "p1", "input": [[1, 2]], "expected": 3}],
+    "hidden_tests": [{"name": "h1", "input": [[4]], "expected": 4}],
+}
+
+
+@patch("backend.routers.oracle.generate_tests_with_llm", return_value=(BUNDLE, {"prompt_version": "p"}))
+@patch("backend.services.oracle.llm_oracle.llm_service.chat")
+class TestExpansionInLlmMode(unittest.TestCase):
+
+    def setUp(self):
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=engine)
+        self.db = sessionmaker(bind=engine)()
+        self.db.add(models.OracleTaskVersion(
+            version_id="v1", task_id="t1", status="ready", spec_json={**SPEC, "ambiguities": []},
+            ambiguities_json=[], user_confirmations_json={}, oracle_confidence=0.9, seed=11,
+        ))
+        self.db.commit()
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_reference_is_generated_and_attached(self, mock_chat, _gen):
+        mock_chat.return_value = {"text": json.dumps({"reference_solution": REFERENCE}), "request_id": "r"}
+        resp = generate_tests("v1", GenerateTestsBody(local_expansion_count=4), db=self.db)
+        self.assertEqual(resp["expanded_hidden_tests_count"], 4)
+        self.assertNotIn("expansion_no_reference", resp["drop_reasons"])
+        v = self.db.get(models.OracleTaskVersion, "v1")
+        self.assertEqual(v.conflict_report_json["reference_solution"]["code"], REFERENCE)
+        for t in v.hidden_tests_json[1:]:
+            self.assertEqual(t["expected"], sum(t["input"][0]))
+
+        # The attached reference is reused
+        generate_tests("v1", GenerateTestsBody(local_expansion_count=2), db=self.db)
+        self.assertEqual(mock_chat.call_count, 1)
+
+    def test_reference_that_contradicts_the_bundle_is_not_used(self, mock_chat, _gen):
+        wrong = "def total(nums):\n    return len(nums)\n"
+        mock_chat.return_value = {"text": json.dumps({"reference_solution": wrong}), "request_id": "r"}
+        resp = generate_tests("v1", GenerateTestsBody(local_expansion_count=4), db=self.db)
+        self.assertEqual(resp["expanded_hidden_tests_count"], 0)
+        self.assertIn("expansion_reference_mismatch", resp["drop_reasons"])
+        self.assertNotIn("reference_solution", self.db.get(models.OracleTaskVersion, "v1").conflict_report_json)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from backend.config import ORACLE_FAST_MODEL
+from backend.services.oracle.llm_oracle import generate_spec_with_llm, ZHIPU_MODEL
+from backend.services.oracle.model_router import ModelRouter
+
+
+def _spec(returns):
+    return {
+        "goal_one_liner": "Sum numbers",
+        "interaction_model": "function_single",
+        "deliverable": "function",
+        "language": "python",
+        "runtime": "python",
+        "signature": {"function_name": "total", "args": ["nums"], "returns": returns},
+        "constraints": [],
+        "assumptions": [],
+        "output_ops": [],
+        "output_shape": {"type": "int"},
+        "ambiguities": [],
+        "public_examples": [{"name": "ex1", "input": [[1, 2]], "expected": 3}],
+    }
+
+
+class TestModelRouting(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.router = ModelRouter(repo_root=Path(self.tmp.name))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_route_heuristics(self):
+        self.assertEqual(self.router.route("sum numbers from a list", "function", "strong").tier, "fast")
+        self.assertEqual(self.router.route("x" * 5000, "function", "strong").tier, "strong")
+        d = self.router.route("返回最多的单词，并列怎么办？", "function", "strong")
+        self.assertEqual((d.tier, d.model), ("strong", "strong"))
+        self.assertIn("triggers:tie_breaking", d.reasons)
+        self.assertEqual(self.router.route("copy a file", "script", "strong").tier, "strong")
+        with patch("backend.services.oracle.model_router.ORACLE_ROUTING", False):
+            self.assertEqual(self.router.route("sum numbers", "function", "strong").reasons, ["routing_disabled"])
+
+    def test_stats_group_by_route(self):
+        fast = self.router.route("sum numbers", "function", "strong")
+        self.router.record(fast, "ok", 1, 100)
+        escalated = self.router.route("sum numbers", "function", "strong")
+        escalated.escalate("strong", 1, "spec_invalid")
+        self.router.record(escalated, "ok", 2, 300)
+        stats = self.router.stats()
+        self.assertEqual(stats["decisions"], 2)
+        self.assertEqual(stats["routes"]["fast"]["count"], 1)
+        self.assertEqual(stats["routes"]["fast->strong"]["attempts_total"], 2)
+
+    @patch("backend.services.oracle.llm_oracle.model_router")
+    @patch("backend.services.oracle.llm_oracle.llm_service.chat")
+    def test_escalates_after_validation_failure(self, mock_chat, mock_router):
+        mock_router.route.side_effect = self.router.route
+        mock_chat.side_effect = [
+            {"text": json.dumps(_spec("")), "latency_ms": 5, "request_id": "fast"},
+            {"text": json.dumps(_spec("int")), "latency_ms": 50, "request_id": "strong"},
+        ]
+        spec, meta = generate_spec_with_llm("sum numbers from a list", "python", "python", "function")
+        models = [c.kwargs["model"] for c in mock_chat.call_args_list]
+        self.assertEqual(models, [ORACLE_FAST_MODEL, ZHIPU_MODEL])
+        self.assertEqual(meta["routing"]["escalated_at_attempt"], 1)
+        self.assertEqual(meta["routing"]["escalation_reason"], "spec_invalid")
+        self.assertEqual(meta["llm_model_used"], ZHIPU_MODEL)
+        mock_router.record.assert_called_once()
+
+    @patch("backend.services.oracle.llm_oracle.model_router")
+    @patch("backend.services.oracle.llm_oracle.llm_service.chat")
+    def test_escalates_after_fast_model_error(self, mock_chat, mock_router):
+        mock_router.route.side_effect = self.router.route
+        mock_chat.side_effect = [
+            TimeoutError("fast model timed out"),
+            {"text": json.dumps(_spec("int")), "latency_ms": 50, "request_id": "strong"},
+        ]
+        spec, meta = generate_spec_with_llm("sum numbers from a list", "python", "python", "function")
+        models = [c.kwargs["model"] for c in mock_chat.call_args_list]
+        self.assertEqual(models, [ORACLE_FAST_MODEL, ZHIPU_MODEL])
+        self.assertEqual(meta["routing"]["escalation_reason"], "llm_error")
+        self.assertEqual(spec["signature"]["returns"], "int")
+
+
+if __name__ == "__main__":
+    unittest.main()
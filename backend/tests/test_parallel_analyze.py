@@ -0,0 +1,137 @@
+import json
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from backend.services.oracle.llm_oracle import OracleAnalyzeError, generate_spec_with_llm, generate_spec_parallel
+from backend.services.oracle.progress import AnalyzeProgress
+
+
+def _spec(returns):
+    return {
+        "goal_one_liner": "Add two numbers",
+        "interaction_model": "function_single",
+        "deliverable": "function",
+        "language": "python",
+        "runtime": "python",
+        "signature": {"function_name": "add", "args": ["a", "b"], "returns": returns},
+        "constraints": ["Return a + b"],
+        "assumptions": [],
+        "output_ops": [],
+        "output_shape": {"type": "int"},
+        "ambiguities": [],
+        "public_examples": [{"name": "ex1", "input": [1, 2], "expected": 3}],
+    }
+
+
+def _drain(progress):
+    events = []
+    while not progress._events.empty():
+        events.append(progress._events.get_nowait())
+    return events
+
+
+class TestParallelAnalyze(unittest.TestCase):
+    @patch("backend.services.oracle.llm_oracle.OPENAI_API_KEY", None)
+    @patch("backend.services.oracle.llm_oracle.llm_service.chat")
+    def test_first_valid_candidate_wins(self, mock_chat):
+        def fake_chat(messages, model, temperature, **kwargs):
+            if temperature == 0.2:
+                # Fast but invalid in a way no local repair covers: empty return type.
+                return {"text": json.dumps(_spec("")), "latency_ms": 5, "request_id": "bad"}
+            if temperature == 0.5:
+                time.sleep(0.05)
+                return {"text": json.dumps(_spec("int")), "latency_ms": 50, "request_id": "good"}
+            time.sleep(1.0)
+            return {"text": json.dumps(_spec("int")), "latency_ms": 1000, "request_id": "slow"}
+
+        mock_chat.side_effect = fake_chat
+        t0 = time.time()
+        spec, meta = generate_spec_with_llm("add two numbers", "python", "python", "function", candidates=3)
+        self.assertLess(time.time() - t0, 0.9)
+        self.assertEqual(spec["signature"]["returns"], "int")
+        self.assertEqual(meta["request_id"], "good")
+        self.assertEqual(meta["analyze_mode"], "parallel")
+        reasons = meta["attempt_fail_reasons"]
+        self.assertTrue(any("candidate[0]" in r and "signature.returns" in r for r in reasons), reasons)
+        # Already waiting on the LLM when candidate[1] won: it cannot be cancelled, only abandoned.
+        self.assertTrue(any("candidate[2]" in r and "abandoned (lost race)" in r for r in reasons), reasons)
+
+    @patch("backend.services.oracle.llm_oracle.OPENAI_API_KEY", None)
+    @patch("backend.services.oracle.llm_oracle.llm_service.chat")
+    def test_hedged_mode_skips_extra_candidates_when_first_is_fast(self, mock_chat):
+        mock_chat.return_value = {"text": json.dumps(_spec("int")), "latency_ms": 5, "request_id": "first"}
+        spec, meta = generate_spec_parallel("add two numbers", "python", "python", "function", candidates=3, hedge_ms=500)
+        self.assertEqual(mock_chat.call_count, 1)
+        self.assertEqual(meta["attempts"], 1)
+        self.assertTrue(all("not_started" in r for r in meta["attempt_fail_reasons"]))
+
+
+class TestParallelAnalyzeProgress(unittest.TestCase):
+    @patch("backend.services.oracle.llm_oracle.OPENAI_API_KEY", None)
+    @patch("backend.services.oracle.llm_oracle.llm_service.chat")
+    def test_candidate_events_reach_progress(self, mock_chat):
+        def fake_chat(messages, model, temperature, **kwargs):
+            if temperature == 0.2:
+                return {"text": "not json", "latency_ms": 5, "request_id": "bad"}
+            time.sleep(0.05)
+            return {"text": json.dumps(_spec("int")), "latency_ms": 50, "request_id": "good"}
+
+        mock_chat.side_effect = fake_chat
+        progress = AnalyzeProgress()
+        spec, meta = generate_spec_with_llm("add two numbers", "python", "python", "function", candidates=2, progress=progress)
+        self.assertEqual(meta["request_id"], "good")
+        events = _drain(progress)
+        names = [e["event"] for e in events]
+        self.assertEqual(names.count("candidate_start"), 2)
+        failed = [e for e in events if e["event"] == "candidate_failed"]
+        self.assertEqual([(e["candidate"], e["reason"]) for e in failed], [(0, "json_parse_fail")])
+        won = [e for e in events if e["event"] == "candidate_won"]
+        self.assertEqual([(e["candidate"], e["latency_ms"]) for e in won], [(1, 50)])
+
+    @patch("backend.services.oracle.llm_oracle.OPENAI_API_KEY", None)
+    @patch("backend.services.oracle.llm_oracle.llm_service.chat")
+    def test_cancel_stops_the_wait_on_candidates(self, mock_chat):
+        def fake_chat(messages, model, temperature, **kwargs):
+            time.sleep(2.0)
+            return {"text": json.dumps(_spec("int")), "latency_ms": 2000, "request_id": "slow"}
+
+        mock_chat.side_effect = fake_chat
+        progress = AnalyzeProgress()
+        timer = threading.Timer(0.1, progress.cancel)
+        timer.start()
+        self.addCleanup(timer.cancel)
+        t0 = time.time()
+        with self.assertRaises(OracleAnalyzeError) as ctx:
+            generate_spec_parallel("add two numbers", "python", "python", "function", candidates=3, hedge_ms=0, progress=progress)
+        self.assertLess(time.time() - t0, 1.0)
+        self.assertEqual(str(ctx.exception), "analyze_cancelled")
+        meta = ctx.exception.metadata
+        self.assertEqual(meta["final_status"], "analyze_cancelled")
+        self.assertEqual(len(meta["attempt_fail_reasons"]), 3)
+        self.assertTrue(all("(analyze cancelled)" in r for r in meta["attempt_fail_reasons"]))
+
+    @patch("backend.services.oracle.llm_oracle.OPENAI_API_KEY", None)
+    @patch("backend.services.oracle.llm_oracle.llm_service.chat_stream")
+    @patch("backend.services.oracle.llm_oracle.llm_service.chat")
+    def test_sequential_fallback_reports_to_the_same_progress(self, mock_chat, mock_stream):
+        mock_chat.return_value = {"text": "not json", "latency_ms": 5, "request_id": "bad"}
+
+        def fake_stream(messages, on_delta, **kwargs):
+            text = json.dumps(_spec("int"))
+            on_delta(text)
+            return {"text": text, "latency_ms": 5, "request_id": "fallback"}
+
+        mock_stream.side_effect = fake_stream
+        progress = AnalyzeProgress()
+        spec, meta = generate_spec_parallel("add two numbers", "python", "python", "function", candidates=2, hedge_ms=0, progress=progress)
+        self.assertEqual(meta["analyze_mode"], "parallel_fallback")
+        names = [e["event"] for e in _drain(progress)]
+        self.assertEqual(names.count("candidate_failed"), 2)
+        self.assertIn("attempt_start", names)
+        self.assertGreater(names.index("attempt_start"), max(i for i, n in enumerate(names) if n == "candidate_failed"))
+
+
+if __name__ == "__main__":
+    unittest.main()
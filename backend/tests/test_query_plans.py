@@ -0,0 +1,83 @@
+import unittest
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.pool import StaticPool
+
+from backend import models
+from backend.database import Base
+
+# Hot queries -> the index each one must search with. Plans come from EXPLAIN QUERY PLAN on the
+# create_all schema, which carries the same indexes as the 5c2e9b7d41f3 migration.
+HOT_QUERIES = {
+    "latest_snapshot": (
+        select(models.CodeSnapshot)
+        .where(models.CodeSnapshot.session_id == "s1")
+        .order_by(models.CodeSnapshot.created_at.desc())
+        .limit(1),
+        "ix_code_snapshots_session_created",
+    ),
+    "thread_messages": (
+        select(models.Message)
+        .where(models.Message.thread_id == "t1")
+        .order_by(models.Message.created_at.asc()),
+        "ix_messages_thread_created",
+    ),
+    "latest_diagnostic_event": (
+        select(models.EventLog)
+        .where(models.EventLog.session_id == "s1")
+        .where(models.EventLog.type.in_(["compile_error", "test_fail", "run_fail"]))
+        .order_by(models.EventLog.created_at.desc())
+        .limit(1),
+        "ix_event_logs_session_type_created",
+    ),
+    "recent_diagnoses": (
+        select(models.DiagnosisLog)
+        .where(models.DiagnosisLog.session_id == "s1")
+        .order_by(models.DiagnosisLog.created_at.desc())
+        .limit(5),
+        "ix_diagnosis_logs_session_created",
+    ),
+    "task_versions": (
+        select(models.OracleTaskVersion)
+        .where(models.OracleTaskVersion.task_id == "t1")
+        .order_by(models.OracleTaskVersion.version_number.desc()),
+        "ix_oracle_task_versions_task_version",
+    ),
+    "event_by_trace": (
+        select(models.EventLog).where(models.EventLog.trace_id == "trace_1"),
+        "ix_event_logs_trace_id",
+    ),
+    "diagnosis_by_trace": (
+        select(models.DiagnosisLog).where(models.DiagnosisLog.trace_id == "trace_1"),
+        "ix_diagnosis_logs_trace_id",
+    ),
+}
+
+# The IN over `type` yields one index range per type, so the few matching rows are sorted.
+SORT_ALLOWED = {"latest_diagnostic_event"}
+
+
+class TestHotQueryPlans(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=cls.engine)
+
+    def _plan(self, query):
+        sql = str(query.compile(self.engine, compile_kwargs={"literal_binds": True}))
+        with self.engine.connect() as conn:
+            return [row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql)]
+
+    def test_hot_queries_search_their_index(self):
+        for name, (query, index) in HOT_QUERIES.items():
+            with self.subTest(query=name):
+                plan = self._plan(query)
+                self.assertTrue(any(f"USING INDEX {index}" in step or f"USING COVERING INDEX {index}" in step for step in plan), plan)
+                self.assertFalse(any(step.startswith("SCAN") for step in plan), plan)
+                if name not in SORT_ALLOWED:
+                    self.assertFalse(any("TEMP B-TREE" in step for step in plan), plan)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import json
+import unittest
+from unittest.mock import patch
+
+from backend.services.oracle.llm_oracle import generate_tests_with_reference
+from backend.services.oracle.reference import fill_expected_from_reference
+
+FUNC_SPEC = {"deliverable": "function", "signature": {"function_name": "ratio", "args": ["a", "b"], "returns": "float"}}
+REFERENCE = "def ratio(a, b):\n    return a / b\n"
+
+
+class TestReferenceExecution(unittest.TestCase):
+
+    def test_expected_values_come_from_reference(self):
+        tests = [
+            {"name": "t1", "input": [6, 3]},
+            {"name": "zero", "input": [1, 0]},
+            {"name": "t2", "input": [1, 4]},
+        ]
+        kept, drops = fill_expected_from_reference(FUNC_SPEC, REFERENCE, tests)
+        self.assertEqual([(t["name"], t["expected"]) for t in kept], [("t1", 2.0), ("t2", 0.25)])
+        self.assertEqual(drops, [{"name": "zero", "reason": "reference_crash"}])
+
+    def test_broken_reference_drops_everything(self):
+        kept, drops = fill_expected_from_reference(FUNC_SPEC, "def ratio(a, b) return", [{"name": "t1", "input": [1, 1]}])
+        self.assertEqual(kept, [])
+        self.assertEqual(drops[0]["reason"], "reference_import_failed")
+
+    def test_cli_reference(self):
+        spec = {"deliverable": "cli", "signature": {"function_name": "main", "args": [], "returns": "Any"}}
+        code = "import sys\nnums = [int(x) for x in sys.stdin.read().split()]\nprint(sum(nums) // (len(nums) - 1))\n"
+        kept, drops = fill_expected_from_reference(spec, code, [{"name": "a", "input": "4 6"}, {"name": "b", "input": "5"}])
+        self.assertEqual(kept, [{"name": "a", "input": "4 6", "expected": "10"}])
+        self.assertEqual(drops, [{"name": "b", "reason": "reference_crash"}])
+
+    def test_script_reference_runs_on_stdin(self):
+        spec = {"deliverable": "script", "signature": {"function_name": "main", "args": [], "returns": "Any"}}
+        code = "import sys\nprint(sys.stdin.read().strip().upper())\n"
+        kept, drops = fill_expected_from_reference(spec, code, [{"name": "a", "input": "hi"}])
+        self.assertEqual((kept, drops), ([{"name": "a", "input": "hi", "expected": "HI"}], []))
+
+    @patch("backend.services.oracle.llm_oracle.llm_service.chat")
+    def test_reference_mode_bundle(self, mock_chat):
+        mock_chat.return_value = {"text": json.dumps({
+            "reference_solution": REFERENCE,
+            "public_inputs": [{"name": "p1", "input": [6, 3]}],
+            "hidden_inputs": [
+                {"name": "h1", "category": "typical", "input": [9, 3]},
+                {"name": "h1", "category": "edge", "input": [0, 5]},
+                {"name": "dup", "category": "edge", "input": [6, 3]},
+                {"name": "boom", "category": "edge", "input": [1, 0]},
+            ],
+        }), "latency_ms": 5}
+        data, meta = generate_tests_with_reference(FUNC_SPEC, {}, 1, 3, None, seed=3, stream=False)
+        self.assertEqual(data["public_examples"], [{"name": "p1", "input": [6, 3], "expected": 2.0}])
+        self.assertEqual([(t["name"], t["expected"], t["tags"]) for t in data["hidden_tests"]], [("h1", 3.0, ["typical"]), ("h1_2", 0.0, ["edge"])])
+        self.assertEqual(meta["reference_drops"], [{"name": "boom", "reason": "reference_crash"}])
+        self.assertEqual(meta["expected_mode"], "reference")
+        self.assertNotIn("expected", mock_chat.call_args.kwargs["messages"][0]["content"].split("Output JSON Schema")[1].split("IMPORTANT")[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend import models
+from backend.database import Base
+from backend.services.blob_store import blob_store
+from backend.services.retention import RetentionService
+from backend.utils import now
+
+DAY = 86400.0
+
+
+class TestRetention(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=engine)
+        self.db = sessionmaker(bind=engine)()
+        self.service = RetentionService(engine, archive_dir=self.tmp / "archive", repo_root=self.tmp,
+                                        batch_size=3, session_idle_days=0, file_logs_days=30, blob_grace_hours=0)
+        self.t_old = now() - 60 * DAY
+        self._seed()
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _seed(self):
+        db = self.db
+        db.add(models.Session(id="s1", title="t"))
+        db.add(models.Thread(id="th1", session_id="s1", type="global", title="g"))
+        db.add(models.Message(id="m1", thread_id="th1", role="user", content="hi"))
+        db.add(models.Message(id="m_orphan", thread_id="th_gone", role="user", content="lost"))
+        big = {"stdout": "line\n" * 4000, "exit_code": 1}
+        for i in range(7):
+            db.add(models.EventLog(id=f"old{i}", session_id="s1", type="run", created_at=self.t_old + i,
+                                   payload=blob_store.offload_payload(db, big)))
+            db.add(models.DiagnosisLog(id=f"dx{i}", session_id="s1", event_id=f"old{i}", created_at=now()))
+        db.add(models.EventLog(id="new", session_id="s1", type="run", payload={}, created_at=now()))
+        db.add(models.AIRun(id="r1", session_id="s1", kind="mechanism", status="done", created_at=self.t_old))
+        db.add(models.AIStreamChunk(id="c1", run_id="r1", seq=0, delta="x", created_at=self.t_old))
+        db.add(models.AIStreamChunk(id="c2", run_id="r1", seq=1, delta="y", created_at=now()))
+        db.commit()
+
+    def test_run_archives_aged_rows_cascades_and_collects_blobs(self):
+        report = self.service.run_once()
+        self.assertEqual(report["deleted"]["event_logs"], 7)
+        self.assertEqual(report["deleted"]["diagnosis_logs"], 7) # cascaded from their events
+        self.assertEqual(report["deleted"]["ai_stream_chunks"], 1)
+        self.assertEqual(report["deleted"]["messages"], 1) # orphan
+        self.assertEqual(report["blobs_collected"], 1)
+        self.assertIn("ANALYZE", report["maintenance"])
+        self.assertEqual([e.id for e in self.db.query(models.EventLog)], ["new"])
+        self.assertEqual(sorted(c.id for c in self.db.query(models.AIStreamChunk)), ["c2"])
+        self.assertEqual(self.db.query(models.Message).count(), 1)
+        self.assertEqual(self.db.query(models.Blob).count(), 0)
+        self.assertTrue(list((self.tmp / "archive" / "s1").glob("*-aged-*.jsonl.gz")))
+        self.assertTrue(list((self.tmp / "archive" / "_orphans").glob("*-orphan-*.jsonl.gz")))
+
+        counts = self.service.restore(self.db, "s1")
+        self.db.commit()
+        self.assertEqual(counts["event_logs"], 7)
+        self.db.expire_all()
+        restored = self.db.get(models.EventLog, "old3")
+        self.assertEqual(blob_store.load_payload(self.db, restored.payload)["stdout"], "line\n" * 4000)
+        self.assertEqual(self.db.query(models.DiagnosisLog).count(), 7)
+
+    def test_purge_and_restore_session(self):
+        counts = self.service.purge_session(self.db, "s1")
+        self.db.commit()
+        self.assertEqual(counts["messages"], 1)
+        self.assertEqual(counts["ai_stream_chunks"], 2)
+        self.assertIsNone(self.db.get(models.Session, "s1"))
+        self.assertEqual(self.db.query(models.EventLog).count(), 0)
+        self.assertIsNone(self.service.restore(self.db, "nope"))
+
+        restored = self.service.restore(self.db, "s1")
+        self.db.commit()
+        self.assertEqual(restored["sessions"], 1)
+        self.assertEqual(restored["event_logs"], 8)
+        self.assertEqual(self.db.query(models.Message).filter_by(thread_id="th1").count(), 1)
+        self.assertEqual(self.service.restore(self.db, "s1")["event_logs"], 0) # idempotent
+
+    def test_aged_log_files_are_archived_and_restored(self):
+        path = self.tmp / "logs" / "observations" / "2026-01-01" / "s1.jsonl"
+        path.parent.mkdir(parents=True)
+        path.write_text('{"seq": 0}\n', encoding="utf-8")
+        os.utime(path, (self.t_old, self.t_old))
+        fresh = self.tmp / "telemetry" / "s1.jsonl"
+        fresh.parent.mkdir()
+        fresh.write_text("{}\n", encoding="utf-8")
+        shared = self.tmp / "telemetry" / "oracle_routing.jsonl"
+        shared.write_text("{}\n", encoding="utf-8")
+        os.utime(shared, (self.t_old, self.t_old))
+
+        self.assertEqual(self.service.run_once()["files_archived"], 1)
+        self.assertFalse(path.parent.exists())
+        self.assertTrue(fresh.exists() and shared.exists())
+        archived = next((self.tmp / "archive" / "s1" / "files").rglob("*.gz"))
+        with gzip.open(archived, "rt", encoding="utf-8") as f:
+            self.assertEqual(f.read(), '{"seq": 0}\n')
+
+        self.service.restore(self.db, "s1")
+        self.assertEqual(path.read_text(encoding="utf-8"), '{"seq": 0}\n')
+
+
+if __name__ == "__main__":
+    unittest.main()
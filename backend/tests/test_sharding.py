@@ -0,0 +1,95 @@
+import asyncio
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+
+from backend import models
+from backend.database import Base, build_engine
+from backend.sharding import CATALOG, ShardRouter, request_keys
+
+
+def make_request(path_params=None, query=b"", body=None):
+    raw = json.dumps(body).encode() if body is not None else b""
+    scope = {
+        "type": "http",
+        "method": "POST" if body is not None else "GET",
+        "path": "/",
+        "query_string": query,
+        "headers": [(b"content-type", b"application/json")] if body is not None else [],
+        "path_params": path_params or {},
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": raw, "more_body": False}
+
+    return Request(scope, receive)
+
+
+class TestSharding(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        catalog = build_engine(f"sqlite:///{(self.tmp / 'catalog.db').as_posix()}")
+        Base.metadata.create_all(bind=catalog)
+        self.router = ShardRouter(catalog, enabled=True, shard_dir=self.tmp / "shards")
+        db = sessionmaker(bind=catalog)()
+        db.add(models.Workspace(id="ws1", name="w1"))
+        db.add(models.Workspace(id="ws2", name="w2"))
+        db.add(models.Session(id="s_old", workspace_id="ws1", title="t"))
+        db.add(models.Thread(id="th_old", session_id="s_old", type="global", title="g"))
+        db.add(models.EventLog(id="e_old", session_id="s_old", type="run", payload={"ok": True}))
+        db.commit()
+        db.close()
+
+    def tearDown(self):
+        asyncio.run(self.router.dispose())
+        self.router.catalog.dispose()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_workspaces_get_their_own_shard_and_ids_are_located(self):
+        self.assertEqual(self.router.ensure_workspace("ws1"), "ws1")
+        self.assertTrue((self.tmp / "shards" / "ws1.db").exists())
+        with self.router.sessionmaker("ws1")() as db:
+            db.add(models.Session(id="s_new", workspace_id="ws1", title="t"))
+            db.commit()
+
+        self.router.assign("ws2", "cohort_a")
+        self.assertEqual(self.router.resolve({"workspace_id": "ws2"}), "cohort_a")
+        self.assertEqual(self.router.resolve({"session_id": "s_new", "workspace_id": "ws2"}), "ws1")
+        self.assertEqual(self.router.resolve({"session_id": "s_old"}), CATALOG)
+        self.assertEqual(self.router.resolve({"thread_id": "th_old"}), CATALOG)
+        self.assertEqual(self.router.resolve({}), CATALOG)
+        self.assertEqual(self.router.shard_names(), [CATALOG, "cohort_a", "ws1"])
+
+        counts = self.router.scatter(lambda db: db.query(models.Session).count())
+        self.assertEqual(counts, {CATALOG: 1, "cohort_a": 0, "ws1": 1})
+
+    def test_move_workspace_copies_then_deletes(self):
+        moved = self.router.move_workspace("ws1")
+        self.assertEqual(moved["sessions"], 1)
+        self.assertEqual(moved["event_logs"], 1)
+        self.assertEqual(self.router.resolve({"event_id": "e_old"}), "ws1")
+        with self.router.sessionmaker(CATALOG)() as db:
+            self.assertIsNone(db.get(models.Session, "s_old"))
+            self.assertIsNotNone(db.get(models.Workspace, "ws1")) # the catalog keeps every workspace
+        with self.router.sessionmaker("ws1")() as db:
+            self.assertEqual(db.get(models.EventLog, "e_old").payload, {"ok": True})
+            self.assertEqual(db.get(models.Thread, "th_old").session_id, "s_old")
+
+    def test_request_keys_and_cached_resolution(self):
+        keys = asyncio.run(request_keys(make_request(path_params={"session_id": "s_old"}, query=b"x=1")))
+        self.assertEqual(keys["session_id"], "s_old")
+        keys = asyncio.run(request_keys(make_request(body={"workspace_id": "ws2", "title": "t"})))
+        self.assertEqual(keys, {"workspace_id": "ws2"})
+
+        self.assertEqual(asyncio.run(self.router.resolve_request(make_request(path_params={"session_id": "s_old"}))), CATALOG)
+        self.assertEqual(self.router._locations[("sessions", "s_old")], CATALOG)
+
+
+if __name__ == "__main__":
+    unittest.main()
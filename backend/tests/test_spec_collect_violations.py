@@ -0,0 +1,69 @@
+import json
+import unittest
+from unittest.mock import patch
+
+from backend.services.oracle.llm_oracle import generate_spec_with_llm
+from backend.services.oracle.spec_validator import collect_violations, validate_and_normalize, SpecValidationError
+
+TIE_DESC = "统计出现次数最多的单词，如果并列怎么办由你决定。"
+
+
+def _spec(goal="Most frequent word", ambiguities=None):
+    return {
+        "goal_one_liner": goal,
+        "interaction_model": "function_single",
+        "deliverable": "function",
+        "language": "python",
+        "runtime": "python",
+        "signature": {"function_name": "top_word", "args": ["text"], "returns": "str"},
+        "constraints": [],
+        "assumptions": [],
+        "output_ops": [],
+        "output_shape": {"type": "str"},
+        "ambiguities": ambiguities if ambiguities is not None else [],
+        "public_examples": [{"name": "ex1", "input": ["a b a"], "expected": "a"}],
+    }
+
+
+TIE_AMBIGUITY = [{
+    "ambiguity_id": "tie_breaking",
+    "question": "How to break a tie?",
+    "choices": [{"choice_id": "first", "text": "First seen"}, {"choice_id": "alpha", "text": "Alphabetical"}],
+}]
+
+
+class TestCollectViolations(unittest.TestCase):
+
+    def test_all_violations_reported_with_field_paths(self):
+        spec = _spec(goal="  ")
+        spec["signature"]["returns"] = "int"
+        spec["public_examples"].append({"name": "ex2", "input": ["b"], "expected": "b"})
+        violations = collect_violations(spec, TIE_DESC)
+        paths = [v.field_path for v in violations]
+        self.assertEqual(paths, ["goal_one_liner", "ambiguities", "public_examples[0].expected", "public_examples[1].expected"])
+
+        with self.assertRaises(SpecValidationError) as ctx:
+            validate_and_normalize(spec, TIE_DESC)
+        self.assertEqual(ctx.exception.field_path, "goal_one_liner")
+        self.assertEqual(len(ctx.exception.violations), 4)
+
+    def test_dependent_rules_skip_malformed_fields(self):
+        violations = collect_violations({"signature": "nope"}, "")
+        self.assertIn("signature", [v.field_path for v in violations])
+        self.assertTrue(all(v.error_code == "spec_invalid" for v in violations))
+
+    @patch("backend.services.oracle.llm_oracle.llm_service.chat")
+    def test_multiple_problems_fixed_in_one_round_trip(self, mock_chat):
+        mock_chat.side_effect = [
+            {"text": json.dumps(_spec(goal="")), "latency_ms": 5, "request_id": "r1"},
+            {"text": json.dumps(_spec(ambiguities=TIE_AMBIGUITY)), "latency_ms": 5, "request_id": "r2"},
+        ]
+        spec, meta = generate_spec_with_llm(TIE_DESC, "python", "python", "function", retries=2)
+        self.assertEqual(meta["attempts"], 2)
+        guidance = mock_chat.call_args_list[1].kwargs["messages"][-1]["content"]
+        self.assertIn("Field: goal_one_liner", guidance)
+        self.assertIn("Field: ambiguities", guidance)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+
+from backend.services.oracle.spec_repair import validate_with_repairs, repair_contradictions
+from backend.services.oracle.spec_validator import SpecValidationError
+
+
+def _spec(deliverable="function", function_name="solve", args=None, returns="int", examples=None):
+    return {
+        "goal_one_liner": "Sum numbers",
+        "deliverable": deliverable,
+        "language": "python",
+        "runtime": "python",
+        "signature": {"function_name": function_name, "args": args if args is not None else ["nums"], "returns": returns},
+        "public_examples": examples if examples is not None else [{"name": "ex1", "input": [[1, 2]], "expected": 3}],
+        "ambiguities": [],
+        "assumptions": [],
+        "constraints": [],
+    }
+
+
+class TestSpecRepair(unittest.TestCase):
+
+    def test_clean_spec_needs_no_repairs(self):
+        spec, repairs = validate_with_repairs(_spec(), "Sum a list of numbers.")
+        self.assertEqual(repairs, [])
+        self.assertEqual(spec["signature"]["returns"], "int")
+
+    def test_cli_signature_is_repaired(self):
+        spec, repairs = validate_with_repairs(
+            _spec(deliverable="cli", function_name="solve", args=["nums"], examples=[]),
+            "Read numbers from stdin and print their sum.",
+        )
+        self.assertEqual(spec["signature"]["function_name"], "main")
+        self.assertEqual(spec["signature"]["args"], [])
+        rules = [r["rule"] for r in repairs]
+        self.assertIn("cli_function_name_main", rules)
+        self.assertIn("cli_args_empty", rules)
+
+    def test_function_named_main_is_renamed(self):
+        spec, repairs = validate_with_repairs(_spec(function_name="main"), "Sum a list of numbers.")
+        self.assertEqual(spec["signature"]["function_name"], "solve")
+        self.assertEqual(repairs[0]["from"], "main")
+
+    def test_return_type_follows_examples(self):
+        spec, repairs = validate_with_repairs(_spec(returns="str"), "Sum a list of numbers.")
+        self.assertEqual(spec["signature"]["returns"], "int")
+        self.assertEqual(repairs, [{"rule": "returns_match_examples", "field": "signature.returns", "from": "str", "to": "int"}])
+
+    def test_unrepairable_error_still_raises(self):
+        bad = _spec()
+        bad["signature"]["function_name"] = ""
+        with self.assertRaises(SpecValidationError) as ctx:
+            validate_with_repairs(bad, "Sum a list of numbers.")
+        self.assertEqual(ctx.exception.repairs, [])
+
+    def test_contradiction_repair_broadens_return(self):
+        spec = _spec(returns="str", examples=[{"name": "a", "input": [1], "expected": 1}, {"name": "b", "input": [2], "expected": "x"}])
+        repairs = repair_contradictions(spec, ["return_type_conflict: returns=str examples=int,str"])
+        self.assertEqual(spec["signature"]["returns"], "Any")
+        self.assertEqual(len(repairs), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
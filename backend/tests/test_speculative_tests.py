@@ -0,0 +1,84 @@
+import threading
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend import models
+from backend.database import Base
+from backend.routers.oracle import GenerateTestsBody, _start_speculative_tests, generate_tests
+from backend.services.oracle.speculative import SpeculativeTestGenerator, speculation_key
+from backend.tests.test_bundle_cache import BUNDLE, SPEC
+
+
+class TestSpeculativeTests(unittest.TestCase):
+    def setUp(self):
+        self.gen = SpeculativeTestGenerator(max_workers=1)
+        self.spec = {"goal_one_liner": "sum", "deliverable": "function"}
+        self.key = speculation_key(self.spec, {}, 5, 6, None, 42)
+
+    def test_join_returns_result_when_params_match(self):
+        release = threading.Event()
+
+        def work():
+            release.wait(2)
+            return {"public_examples": [], "hidden_tests": [{"name": "t"}]}, {"raw_text": "x"}
+
+        self.gen.start("v1", self.key, work)
+        release.set()
+        joined = self.gen.take("v1", speculation_key(dict(self.spec), {}, 5, 6, None, 42), timeout=2)
+        self.assertIsNotNone(joined)
+        self.assertEqual(joined[0]["hidden_tests"], [{"name": "t"}])
+        # Consumed: a second request falls back to a fresh call.
+        self.assertIsNone(self.gen.take("v1", self.key, timeout=2))
+
+    def test_mismatched_params_discard_result(self):
+        self.gen.start("v2", self.key, lambda: ({"public_examples": [], "hidden_tests": []}, {}))
+        other = speculation_key(self.spec, {}, 5, 10, None, 42)
+        self.assertIsNone(self.gen.take("v2", other, timeout=2))
+
+    def test_llm_error_is_not_served(self):
+        self.gen.start("v3", self.key, lambda: ({"public_examples": [], "hidden_tests": []}, {"error": "boom"}))
+        self.assertIsNone(self.gen.take("v3", self.key, timeout=2))
+
+    def test_running_call_is_abandoned_not_cancelled(self):
+        started, release = threading.Event(), threading.Event()
+        self.gen.start("v4", self.key, lambda: (started.set(), release.wait(2), ({}, {}))[-1])
+        self.assertTrue(started.wait(2))
+        with self.assertLogs("Backend", level="INFO") as logs:
+            self.assertIsNone(self.gen.take("v4", speculation_key(self.spec, {}, 1, 1, None, 42), timeout=2))
+        release.set()
+        self.assertIn("abandoned version_id=v4 reason=params_mismatch", logs.output[0])
+
+
+class TestSpeculativeConfirmations(unittest.TestCase):
+
+    def setUp(self):
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=engine)
+        self.db = sessionmaker(bind=engine)()
+        self.confirmations = {"selections": {"empty": "zero"}} # carried over from the parent version
+        self.db.add(models.OracleTaskVersion(
+            version_id="v1", task_id="t1", status="ready", spec_json=SPEC,
+            ambiguities_json=SPEC["ambiguities"], user_confirmations_json=self.confirmations,
+            oracle_confidence=0.9, seed=11,
+        ))
+        self.db.commit()
+
+    def tearDown(self):
+        self.db.close()
+
+    @patch("backend.routers.oracle.generate_tests_with_llm")
+    def test_carried_confirmations_are_joined(self, mock_gen):
+        mock_gen.return_value = (BUNDLE, {"prompt_version": "p"})
+        _start_speculative_tests("v1", SPEC, 11, self.confirmations)
+        resp = generate_tests("v1", GenerateTestsBody(expected_mode="llm"), db=self.db)
+        self.assertTrue(resp["speculative_hit"])
+        self.assertEqual(mock_gen.call_count, 1)
+        self.assertEqual(mock_gen.call_args.kwargs["confirmations"], self.confirmations)
+
+
+if __name__ == "__main__":
+    unittest.main()
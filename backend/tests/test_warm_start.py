@@ -0,0 +1,138 @@
+import json
+import random
+import statistics
+import string
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend import models
+from backend.database import Base
+from backend.routers.oracle import SpecBody, create_spec
+from backend.services.oracle.similarity import SimilarityIndex, minhash
+
+DESC_ZH = "实现一个函数 top_word(text)，返回文本中出现次数最多的单词。单词按空格分隔，区分大小写。如果并列，返回字典序最小的那个。"
+DESC_EN = "Write a function total(nums) that returns the sum of a list of integers. An empty list sums to 0. Negative numbers are allowed."
+SPEC = {
+    "goal_one_liner": "Sum a list",
+    "interaction_model": "function_single",
+    "deliverable": "function",
+    "language": "python",
+    "runtime": "python",
+    "signature": {"function_name": "total", "args": ["nums"], "returns": "int"},
+    "constraints": ["Empty list returns 0"],
+    "assumptions": [],
+    "output_ops": [],
+    "output_shape": {"type": "int"},
+    "ambiguities": [],
+    "public_examples": [{"name": "ex1", "input": [[1, 2]], "expected": 3}],
+}
+
+
+class TestSimilarityIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.index = SimilarityIndex(repo_root=Path(self.tmp.name))
+        self.scope = SimilarityIndex.scope("python", "python", "function")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_near_duplicates_match_in_both_languages(self):
+        self.index.add("zh", DESC_ZH, self.scope)
+        self.index.add("en", DESC_EN, self.scope)
+        zh = self.index.query(DESC_ZH.replace("最小", "最大"), self.scope, 0.8)
+        en = self.index.query(DESC_EN.replace("Negative numbers are allowed.", "Negative numbers are allowed too."), self.scope, 0.8)
+        self.assertEqual(zh.version_id, "zh")
+        self.assertEqual(en.version_id, "en")
+        self.assertIsNone(self.index.query("Parse a CSV file and print the column averages.", self.scope, 0.8))
+        self.assertIsNone(self.index.query(DESC_EN, SimilarityIndex.scope("python", "python", "cli"), 0.8))
+        self.assertIsNone(self.index.query(DESC_EN, self.scope, 0.8, exclude={"en"}))
+
+    def test_index_reloads_from_disk(self):
+        self.index.add("en", DESC_EN, self.scope)
+        reloaded = SimilarityIndex(repo_root=Path(self.tmp.name))
+        match = reloaded.query(DESC_EN, self.scope, 0.99)
+        self.assertEqual((match.version_id, match.similarity, match.description), ("en", 1.0, DESC_EN))
+
+    def test_entries_from_an_older_signature_scheme_are_re_signed(self):
+        path = Path(self.tmp.name) / "telemetry" / "oracle_similarity.jsonl"
+        path.parent.mkdir(parents=True)
+        path.write_text(json.dumps({"version_id": "old", "scope": self.scope, "description": DESC_EN, "signature": [1] * 64}) + "\n", encoding="utf-8")
+        self.assertEqual(self.index.query(DESC_EN, self.scope, 0.99).version_id, "old")
+
+    def test_signature_and_query_are_sub_millisecond_at_10k_entries(self):
+        rng = random.Random(7)
+        vocab = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 9))) for _ in range(3000)]
+        texts = [" ".join(rng.choices(vocab, k=90))[:440] for _ in range(10_000)]
+        t0 = time.perf_counter()
+        sigs = [minhash(t) for t in texts]
+        self.assertLess((time.perf_counter() - t0) / len(texts), 0.001)
+        self.index._loaded = True # skip the jsonl log; this measures the in-memory index
+        for i, (text, sig) in enumerate(zip(texts, sigs)):
+            self.index._insert(f"v{i}", self.scope, text, sig)
+
+        latencies = []
+        for text in texts[:200]:
+            t0 = time.perf_counter()
+            match = self.index.query(text + " again", self.scope, 0.8)
+            latencies.append(time.perf_counter() - t0)
+            self.assertIsNotNone(match)
+        self.assertLess(statistics.median(latencies), 0.001, f"median query {statistics.median(latencies) * 1000:.3f} ms")
+
+
+@patch("backend.routers.oracle.ORACLE_SPECULATIVE_TESTS", False)
+class TestCreateSpecWarmStart(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.index = SimilarityIndex(repo_root=Path(self.tmp.name))
+        patcher = patch("backend.routers.oracle.similarity_index", self.index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=engine)
+        self.db = sessionmaker(bind=engine)()
+        self.db.add(models.OracleTask(task_id="t1"))
+        self.db.commit()
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    @patch("backend.services.oracle.llm_oracle.llm_service.chat")
+    def test_reuse_and_adjust(self, mock_chat):
+        mock_chat.return_value = {"text": json.dumps(SPEC), "latency_ms": 5}
+        first = create_spec("t1", SpecBody(task_description=DESC_EN), db=self.db)
+        self.assertIsNone(first["warm_start"])
+        self.assertEqual(mock_chat.call_count, 1)
+
+        edited = DESC_EN.replace("Negative numbers are allowed.", "Negative numbers are allowed too.")
+        offered = create_spec("t1", SpecBody(task_description=edited), db=self.db)
+        self.assertEqual(offered["warm_start"]["source_version_id"], first["version_id"])
+        self.assertEqual(mock_chat.call_count, 2)  # offer only reports the neighbor
+
+        reused = create_spec("t1", SpecBody(task_description=edited, warm_start="reuse"), db=self.db)
+        self.assertEqual(mock_chat.call_count, 2)
+        v = self.db.query(models.OracleTaskVersion).filter_by(version_id=reused["version_id"]).one()
+        self.assertEqual(v.status, "awaiting_confirmation")
+        self.assertEqual(v.spec_json["signature"]["function_name"], "total")
+
+        edited_again = DESC_EN.replace("An empty list sums to 0.", "An empty list sums to 0 as well.")
+        adjusted = create_spec("t1", SpecBody(task_description=edited_again, warm_start="adjust"), db=self.db)
+        self.assertEqual(adjusted["warm_start"]["mode"], "adjust")
+        prompt = mock_chat.call_args.kwargs["messages"][1]["content"]
+        self.assertIn("Existing spec (JSON)", prompt)
+        self.assertIn("\n+" + edited_again, prompt)
+        self.assertIn("\n-Write a function total", prompt)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from sqlalchemy import func, select
+
+from backend import models
+from backend.database import Base, build_engine
+from backend.services.write_behind import WriteBehindFull, WriteBehindWriter
+
+
+def _event(i):
+    return {"id": f"evt_{i}", "session_id": "s1", "type": "edit", "payload": {"i": i}, "created_at": float(i)}
+
+
+class TestWriteBehindWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = build_engine(f"sqlite:///{(Path(self.tmp.name) / 'db.sqlite').as_posix()}")
+        Base.metadata.create_all(bind=self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def _count(self, model):
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(model.__table__)).scalar()
+
+    def test_group_commit_with_flush_barrier(self):
+        writer = WriteBehindWriter(self.engine, enabled=True, batch_size=100, flush_ms=1000)
+        for i in range(250):
+            writer.submit(models.EventLog, _event(i))
+        writer.submit(models.DiagnosisLog, {"id": "diag_1", "session_id": "s1", "trace_id": "t"})
+        self.assertTrue(writer.flush(timeout=5))
+        self.assertEqual(self._count(models.EventLog), 250)
+        self.assertEqual(self._count(models.DiagnosisLog), 1)
+        stats = writer.stats()
+        self.assertEqual((stats["committed"], stats["failed"]), (251, 0))
+        self.assertLess(stats["batches"], 10)
+        writer.close()
+
+    def test_close_drains_queue(self):
+        writer = WriteBehindWriter(self.engine, enabled=True, batch_size=16, flush_ms=5)
+        for i in range(100):
+            writer.submit(models.EventLog, _event(i))
+        writer.close()
+        self.assertEqual(self._count(models.EventLog), 100)
+
+    def test_backpressure_when_full(self):
+        writer = WriteBehindWriter(self.engine, enabled=True, batch_size=1, flush_ms=0, queue_max=2, put_timeout=0.05)
+        release = threading.Event()
+        original = writer._write
+
+        def slow_write(rows):
+            release.wait(5)
+            original(rows)
+
+        with patch.object(writer, "_write", side_effect=slow_write):
+            with self.assertRaises(WriteBehindFull):
+                for i in range(10):
+                    writer.submit(models.EventLog, _event(i))
+            release.set()
+            writer.close()
+        self.assertEqual(self._count(models.EventLog), writer.stats()["submitted"])
+
+    def test_targets_only_its_own_database(self):
+        writer = WriteBehindWriter(self.engine, enabled=True)
+        same = type("S", (), {"bind": build_engine(str(self.engine.url))})()
+        other = type("S", (), {"bind": build_engine("sqlite://")})()
+        self.assertTrue(writer.targets(same))
+        self.assertFalse(writer.targets(other))
+        self.assertFalse(WriteBehindWriter(self.engine, enabled=False).targets(same))
+
+
+if __name__ == "__main__":
+    unittest.main()
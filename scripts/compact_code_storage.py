@@ -0,0 +1,49 @@
+import argparse
+import os
+import sys
+
+# Add root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend import models
+from backend.database import SessionLocal
+from backend.services.code_store import code_store
+
+# Re-encode stored code text as keyframes + line deltas (or, with --expand, back to full text).
+# Safe to re-run; each session is committed on its own.
+
+MODELS = {"code_states": models.CodeState, "code_snapshots": models.CodeSnapshot}
+
+
+def compact(session_id=None, expand=False, dry_run=False):
+    db = SessionLocal()
+    totals = {"rows": 0, "bytes_before": 0, "bytes_after": 0}
+    try:
+        for table, model in MODELS.items():
+            q = db.query(model.session_id).distinct()
+            if session_id:
+                q = q.filter(model.session_id == session_id)
+            for (sid,) in q.all():
+                res = code_store.compact_session(db, model, sid, keyframe_interval=1 if expand else None)
+                if dry_run:
+                    db.rollback()
+                else:
+                    db.commit()
+                for k in totals:
+                    totals[k] += res[k]
+                print(f"[{table}] session={sid} rows={res['rows']} bytes {res['bytes_before']} -> {res['bytes_after']}")
+    finally:
+        db.close()
+    ratio = totals["bytes_before"] / max(totals["bytes_after"], 1)
+    print(f"[TOTAL] rows={totals['rows']} bytes {totals['bytes_before']} -> {totals['bytes_after']} ({ratio:.1f}x){' [dry run]' if dry_run else ''}")
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--session_id", help="only this session")
+    parser.add_argument("--expand", action="store_true", help="rewrite every row as full text (before downgrading)")
+    parser.add_argument("--dry_run", action="store_true")
+    args = parser.parse_args()
+
+    compact(args.session_id, expand=args.expand, dry_run=args.dry_run)
@@ -0,0 +1,67 @@
+import argparse
+import os
+import sys
+
+# Add root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend import models
+from backend.database import SessionLocal
+from backend.services.blob_store import OFFLOADED, blob_store
+
+# Move large values written before the blobs table existed into it (or, with --restore, inline
+# every reference again and empty the table, before downgrading). Safe to re-run; each chunk
+# of rows is committed on its own.
+
+MODELS = {"oracle_task_versions": models.OracleTaskVersion, "oracle_runs": models.OracleRun, "event_logs": models.EventLog}
+CHUNK = 500
+
+
+def offload(restore=False, dry_run=False):
+    db = SessionLocal()
+    changed = {}
+    try:
+        for table, cols in OFFLOADED.items():
+            model = MODELS[table]
+            pk = model.__mapper__.primary_key[0]
+            changed[table] = 0
+            last = None
+            while True:
+                q = db.query(model).order_by(pk)
+                if last is not None:
+                    q = q.filter(pk > last)
+                rows = q.limit(CHUNK).all()
+                if not rows:
+                    break
+                for row in rows:
+                    dirty = False
+                    for col, kind in cols.items():
+                        value = getattr(row, col)
+                        new = blob_store.load_value(db, kind, value) if restore else blob_store.offload_value(db, kind, value)
+                        if new != value:
+                            setattr(row, col, new)
+                            dirty = True
+                    changed[table] += dirty
+                last = getattr(rows[-1], pk.key)
+                if dry_run:
+                    db.rollback()
+                else:
+                    db.commit()
+            print(f"[{table}] rows {'restored' if restore else 'offloaded'}={changed[table]}")
+        if restore and not dry_run:
+            db.query(models.Blob).delete()
+            db.commit()
+        blobs = db.query(models.Blob).count()
+    finally:
+        db.close()
+    print(f"[TOTAL] rows={sum(changed.values())} blobs={blobs}{' [dry run]' if dry_run else ''}")
+    return changed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--restore", action="store_true", help="inline every blob reference again and empty the blobs table (before downgrading)")
+    parser.add_argument("--dry_run", action="store_true")
+    args = parser.parse_args()
+
+    offload(restore=args.restore, dry_run=args.dry_run)
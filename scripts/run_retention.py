@@ -0,0 +1,41 @@
+import argparse
+import json
+import os
+import sys
+
+# Add root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.database import SessionLocal
+from backend.services.retention import RetentionService, retention
+from backend.sharding import CATALOG, shard_router
+
+# One retention pass (archive + delete aged rows and log files, blob GC, ANALYZE/VACUUM) with the
+# RETENTION_* settings, e.g. from cron instead of RETENTION_ENABLED in the API process.
+# --restore <session_id | oracle_<version_id>> puts an archived group back instead.
+# With DB_SHARDING on, the pass runs on every shard (the API process only covers the catalog).
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--restore", metavar="GROUP", help="restore this session id (or oracle_<version_id>) from the archive")
+    args = parser.parse_args()
+
+    if args.restore:
+        db = SessionLocal()
+        try:
+            counts = retention.restore(db, args.restore)
+            if counts is None:
+                sys.exit(f"no archive for {args.restore} under {retention.archive_dir}")
+            db.commit()
+        finally:
+            db.close()
+        print(json.dumps({"restored": counts}, indent=2))
+    elif shard_router.enabled:
+        reports = {CATALOG: retention.run_once()}
+        for name in shard_router.shard_names():
+            if name != CATALOG:
+                reports[name] = RetentionService(shard_router.engine(name)).run_once()
+        print(json.dumps(reports, indent=2))
+    else:
+        print(json.dumps(retention.run_once(), indent=2))
@@ -0,0 +1,78 @@
+import argparse
+import json
+import os
+import sys
+
+# Add root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend import models
+from backend.sharding import CATALOG, shard_router
+
+# Shard maintenance for DB_SHARDING=workspace (DATABASE_URL is the catalog, see backend/sharding.py).
+#   list                          shards with their workspaces and row counts
+#   create <shard>                create the shard database with the current schema
+#   assign <workspace> <shard>    pin a workspace (cohort) to a shard; new sessions go there
+#   move <workspace> [--shard S]  move the workspace's existing sessions into its (or S's) shard
+#   migrate                       alembic upgrade head on every shard (the catalog included)
+# Run move while the workspace is idle; the API process keeps cached locations until restarted.
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def list_shards():
+    def counts(db):
+        return {
+            "workspaces": sorted({ws for (ws,) in db.query(models.Session.workspace_id).distinct()}),
+            "sessions": db.query(models.Session).count(),
+            "event_logs": db.query(models.EventLog).count(),
+        }
+
+    return {"url": {name: shard_router.url_for(name) for name in shard_router.shard_names()},
+            "shards": shard_router.scatter(counts)}
+
+
+def migrate():
+    from alembic import command
+    from alembic.config import Config
+
+    done = []
+    for name in shard_router.shard_names():
+        cfg = Config(os.path.join(ROOT, "alembic.ini"))
+        cfg.set_main_option("sqlalchemy.url", shard_router.url_for(name).replace("%", "%%"))
+        if name != CATALOG:
+            shard_router.engine(name) # new shard files get the schema first
+        command.upgrade(cfg, "head")
+        print(f"[migrate] shard={name} upgraded")
+        done.append(name)
+    return done
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("list")
+    p = sub.add_parser("create")
+    p.add_argument("shard")
+    p = sub.add_parser("assign")
+    p.add_argument("workspace_id")
+    p.add_argument("shard")
+    p = sub.add_parser("move")
+    p.add_argument("workspace_id")
+    p.add_argument("--shard", default=None, help="target shard (default: the workspace's assigned shard, else its own)")
+    sub.add_parser("migrate")
+    args = parser.parse_args()
+
+    if args.cmd == "list":
+        out = list_shards()
+    elif args.cmd == "create":
+        out = {"created": args.shard, "url": str(shard_router.engine(args.shard).url)}
+    elif args.cmd == "assign":
+        shard_router.assign(args.workspace_id, args.shard)
+        shard_router.ensure_workspace(args.workspace_id)
+        out = {"workspace_id": args.workspace_id, "shard": args.shard}
+    elif args.cmd == "move":
+        out = {"moved": shard_router.move_workspace(args.workspace_id, args.shard)}
+    else:
+        out = {"migrated": migrate()}
+    print(json.dumps(out, indent=2))